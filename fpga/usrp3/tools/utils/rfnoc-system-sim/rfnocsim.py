@@ -17,6 +17,7 @@
 #
 
 import collections
+import collections.abc
 import copy
 import re
 import math
@@ -44,11 +45,27 @@ class SimulatorCore:
     Core simulation engine:
     This class owns all the simulation components and
     manages time and other housekeeping operations.
+
+    Time advances in ticks, but run() does not have to evaluate
+    every single one of them. All components are deterministic,
+    so once the state of the network at a tick boundary (see
+    SimComp.get_sim_state()) repeats, the ticks in between form a
+    period that will repeat until the end of the simulation. The
+    core then jumps over as many whole periods as possible, and
+    lets each component account for the skipped periods in its
+    counters (see SimComp.fast_forward()). The last period before
+    the end of the simulation is always evaluated tick by tick, so
+    timestamps and latencies are the same as without jumping.
+    Pass fast_forward=False to evaluate every tick.
     """
+    # Max. number of network states to remember while looking for
+    # a period. The history is cleared when it grows beyond that.
+    MAX_STATE_HISTORY = 4096
 
-    def __init__(self, tick_rate):
+    def __init__(self, tick_rate, fast_forward=True):
         self.__ticks = 0
         self.__tick_rate = tick_rate
+        self.__fast_forward = fast_forward
         self.__tick_aware_comps = list()
         self.__all_comps = dict()
         self.__edge_render_db = list()
@@ -122,8 +139,56 @@ class SimulatorCore:
             c.tick()
 
     def run(self, time_s):
-        for i in range(int(time_s * self.__tick_rate)):
+        end_ticks = self.__ticks + int(time_s * self.__tick_rate)
+        state_history = dict()
+        while self.__ticks < end_ticks:
+            self.tick()
+            if not self.__fast_forward:
+                continue
+            state = self.__get_state()
+            if state is None:
+                continue
+            if state in state_history:
+                period = self.__ticks - state_history[state]
+                # Evaluate one period to measure the counter increments,
+                # and always leave one period to be evaluated at the end.
+                num_periods = (end_ticks - self.__ticks) // period - 2
+                if num_periods > 0:
+                    self.__skip_periods(state, period, num_periods)
+                state_history = dict()
+            else:
+                if len(state_history) >= self.MAX_STATE_HISTORY:
+                    state_history = dict()
+                state_history[state] = self.__ticks
+
+    def __get_state(self):
+        """
+        Returns the state of the network at the current tick boundary,
+        or None if any component cannot be fast-forwarded right now.
+        """
+        state = []
+        for comp in self.__all_comps.values():
+            comp_state = comp.get_sim_state()
+            if comp_state is None:
+                return None
+            state.append(comp_state)
+        return tuple(state)
+
+    def __skip_periods(self, state, period, num_periods):
+        """
+        Evaluates one more period to measure how the counters of each
+        component change per period, then skips num_periods periods.
+        """
+        comps = list(self.__all_comps.values())
+        before = [c.get_sim_counters() for c in comps]
+        for i in range(period):
             self.tick()
+        if self.__get_state() != state:
+            return
+        after = [c.get_sim_counters() for c in comps]
+        for comp, c_before, c_after in zip(comps, before, after):
+            comp.fast_forward(num_periods, period, c_before, c_after)
+        self.__ticks += num_periods * period
 
     def get_ticks(self):
         return self.__ticks
@@ -170,6 +235,31 @@ class SimComp:
     def get_tick_rate(self):
         return self.__sim_core.get_tick_rate()
 
+    def get_sim_state(self):
+        """
+        Returns a hashable value that, together with the state of all
+        other components, determines what this component will do in
+        the following ticks. Returns None if the simulator must not skip
+        ticks right now (e.g. while holding on to a data stream).
+        Components without such state can use the default.
+        """
+        return ()
+
+    def get_sim_counters(self):
+        """
+        Returns the values of all counters that the simulator needs to
+        advance when skipping ticks, in the format fast_forward() expects.
+        """
+        return ()
+
+    def fast_forward(self, num_periods, period, before, after):
+        """
+        Accounts for num_periods skipped periods of period ticks each.
+        before and after are the values get_sim_counters() returned at
+        the start and end of the last evaluated period.
+        """
+        pass
+
     def SimCompError(self, msg):
         raise RuntimeError(msg + ' [' + self.name + ']')
 
@@ -222,6 +312,10 @@ class DataStream:
     Holds information about a date stream that passes through various block.
     The simulator simulates event on the actual stream so each stream Object
     must have a unique payload (items) to disambiguate it from the rest.
+
+    The items of a stream are treated as read-only, and the hops are kept
+    in a tuple, so fork() can hand out copies of a stream to multiple
+    destinations without copying either of them.
     """
     HopInfo = collections.namedtuple('HopInfo', ['location', 'latency'])
 
@@ -255,18 +349,24 @@ class DataStream:
         self.items = []
         self.items.extend(items)
         self.count = count
-        self.__hops = list()
         if producer and parent:
             raise RuntimeError('Data stream cannot have both a producer and a parent stream')
         elif producer:
-            self.__hops.append(self.HopInfo(location='Gen@'+producer.name, latency=producer.get_ticks()))
+            self.__hops = (self.HopInfo(location='Gen@'+producer.name, latency=producer.get_ticks()),)
         elif parent:
-            self.__hops.extend(parent.get_hops())
+            self.__hops = tuple(parent.get_hops())
         else:
             raise RuntimeError('Data stream must have a producer or a parent stream')
 
+    def fork(self):
+        """
+        Returns a copy of this stream. Adding hops to the copy does not
+        affect this stream.
+        """
+        return copy.copy(self)
+
     def add_hop(self, location, latency):
-        self.__hops.append(self.HopInfo(location=location, latency=latency))
+        self.__hops = self.__hops + (self.HopInfo(location=location, latency=latency),)
 
     def get_hops(self):
         return self.__hops
@@ -281,7 +381,7 @@ class DataStream:
     def submatrix_gen(matrix_id, coordinates):
         coord_arr = []
         for c in coordinates:
-            if isinstance(c, collections.Iterable):
+            if isinstance(c, collections.abc.Iterable):
                 coord_arr.append('(' + (','.join(str(x) for x in c)) + ')')
             else:
                 coord_arr.append('(' + str(c) + ')')
@@ -317,6 +417,7 @@ class Producer(SimComp):
         self.__data_count = 0
         self.__byte_count = 0
         self.__backpressure_ticks = 0
+        self.__num_bursts = 0
         self.set_rate(self.get_tick_rate())
 
     def inputs(self, i, bind=False):
@@ -340,12 +441,24 @@ class Producer(SimComp):
                     data.add_hop('BP@'+self.name, self.__backpressure_ticks)
                 data.add_hop(self.name, self.__latency)
                 for dest in self.__dests:
-                    dest.push(copy.deepcopy(data))
+                    dest.push(data.fork())
                 self.__byte_count += data.get_bytes()
                 self.__backpressure_ticks = 0
+                self.__num_bursts += 1
             else:
                 self.__backpressure_ticks += 1
 
+    def get_sim_counters(self):
+        return (self.__byte_count, self.__num_bursts, self.__backpressure_ticks)
+
+    def fast_forward(self, num_periods, period, before, after):
+        self.__byte_count += num_periods * (after[0] - before[0])
+        self.__num_bursts += num_periods * (after[1] - before[1])
+        # If the producer was stalled for the whole period, it still is.
+        # Otherwise, the backpressure is the same at the end of every period.
+        if after[1] == before[1]:
+            self.__backpressure_ticks += num_periods * period
+
     def get_bytes(self):
         return self.__byte_count
 
@@ -398,6 +511,14 @@ class Consumer(SimComp):
     def get_bytes(self):
         return self.__byte_count
 
+    def get_sim_counters(self):
+        return (self.__byte_count,)
+
+    def fast_forward(self, num_periods, period, before, after):
+        # The item DB is refreshed by the period that is evaluated after
+        # fast-forwarding, so only the byte count needs to be advanced.
+        self.__byte_count += num_periods * (after[0] - before[0])
+
     def get_hops(self, item):
         return self.__item_db[item].get_hops()
 
@@ -467,9 +588,15 @@ class Channel(SimComp):
             return
         data.add_hop(self.name, self.__latency)
         for dest in self.__dests:
-            dest.push(copy.deepcopy(data))
+            dest.push(data.fork())
         self.__byte_count += data.get_bytes()
 
+    def get_sim_counters(self):
+        return (self.__byte_count,)
+
+    def fast_forward(self, num_periods, period, before, after):
+        self.__byte_count += num_periods * (after[0] - before[0])
+
     def get_util_attrs(self):
         return ['bandwidth']
 
@@ -498,6 +625,9 @@ class Function(SimComp):
         def get_num(self):
             return self.__num
 
+        def is_empty(self):
+            return not self.__data
+
         def is_ready(self):
             return self.__base_func.is_ready() and not self.__data
 
@@ -583,7 +713,7 @@ class Function(SimComp):
                     self.__max_latency_input = d
             # Call the function
             arg_data_out = self.do_func(arg_data_in)
-            if not isinstance(arg_data_out, collections.Iterable):
+            if not isinstance(arg_data_out, collections.abc.Iterable):
                 arg_data_out = [arg_data_out]
             # Update output args
             for i in range(len(arg_data_out)):
@@ -594,6 +724,19 @@ class Function(SimComp):
             self.__last_exec_ticks = self.get_ticks()
             self.__in_args_pushed = dict()
 
+    def get_sim_state(self):
+        # Ticks can't be skipped while an input argument holds a data
+        # stream, since its hops carry the tick it was generated at.
+        # Subclasses that keep state across calls to do_func() must
+        # add it here, or disable fast-forwarding in the SimulatorCore.
+        for arg in self.__in_args:
+            if not arg.is_empty():
+                return None
+        return min(self.get_ticks() - self.__last_exec_ticks, self.__ticks_per_exec)
+
+    def fast_forward(self, num_periods, period, before, after):
+        self.__last_exec_ticks += num_periods * period
+
     def get_util_attrs(self):
         return []
 
@@ -13,8 +13,11 @@ import logging
 import re
 import time
 import datetime
+import hashlib
+import json
+import xml.etree.ElementTree as ET
 from queue import Queue
-from threading import Thread
+from threading import Thread, Lock
 
 #-------------------------------------------------------
 # Utilities
@@ -36,6 +39,21 @@ RETCODE_EXEC_ERR    = -2
 RETCODE_COMPILE_ERR = -3
 RETCODE_UNKNOWN_ERR = -4
 
+# Bump this when the format of the cache file changes
+CACHE_VERSION = 1
+# Results of a simulation that are stored in the cache, and reported
+RESULT_FIELDS = ['module', 'start_time', 'wall_time', 'sim_time_ns',
+                 'tc_expected', 'tc_run', 'tc_passed']
+# Make target which prints all files a simulation depends on
+SRCS_TARGET = 'print_sim_srcs'
+SRCS_RULE = SRCS_TARGET + \
+    ': ; @echo $(abspath $(DESIGN_SRCS) $(SIM_SRCS) $(INC_SRCS) $(MAKEFILE_LIST))'
+
+# Escape characters (colors) in Vivado output
+_ANSI_ESCAPE = re.compile(r'(?:\x1B[\(@-_]|[\x80-\x9F])[0-?]*[ -/]*[@-~]')
+# Characters which are not allowed in XML 1.0
+_XML_INVALID = re.compile('[\x00-\x08\x0B\x0C\x0E-\x1F]')
+
 def retcode_to_str(code):
     """ Convert internal status code to string
     """
@@ -150,8 +168,7 @@ def parse_output(simout):
     m_fmt1 = re.match(b''.join(tb_match_fmt1), simout, re.DOTALL)
 
     # Remove escape characters (colors) from Vivado output
-    ansi_escape = re.compile(r'(?:\x1B[\(@-_]|[\x80-\x9F])[0-?]*[ -/]*[@-~]')
-    plain_simout = ansi_escape.sub('', simout.decode("utf-8"))
+    plain_simout = _ANSI_ESCAPE.sub('', simout.decode("utf-8"))
 
     # Check for $error() and $fatal() output, which may be missed by the
     # testbench or may occur in a subsequent instance, after a pass.
@@ -189,6 +206,120 @@ def parse_output(simout):
     results['retcode'] = retcode
     return results
 
+def get_sim_sources(path, setupenv):
+    """ Ask make for all files the simulation at the specified path depends
+        on: its design, simulation and include sources, and all makefiles.
+        Returns None if make fails.
+    """
+    setupenv = '' if setupenv is None else '. ' + os.path.realpath(setupenv) + ';'
+    try:
+        output = subprocess.check_output(
+            ['/bin/bash', '-c', "{setupenv} make -s --no-print-directory --eval='{rule}' {target}"
+             .format(setupenv=setupenv, rule=SRCS_RULE, target=SRCS_TARGET)],
+            cwd=path, stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode('utf-8').split()
+
+def hash_sim_sources(path, simulator, basedir, setupenv):
+    """ Hash everything the result of the simulation at the specified path
+        depends on: the contents of its sources, the simulator, and the
+        Vivado installation. Returns None if the sources can't be determined,
+        in which case the simulation can't be cached.
+    """
+    sources = get_sim_sources(path, setupenv)
+    if sources is None:
+        return None
+    sha = hashlib.sha256()
+    sha.update(bytes(simulator + '\0' + os.environ.get('VIVADO_PATH', '') + '\0', 'utf-8'))
+    for source in sorted(set(sources)):
+        # Use paths relative to basedir, so the hash doesn't depend on where
+        # the repository is checked out
+        sha.update(bytes(os.path.relpath(source, basedir) + '\0', 'utf-8'))
+        try:
+            with open(source, 'rb') as srcfile:
+                for chunk in iter(lambda: srcfile.read(1 << 20), b''):
+                    sha.update(chunk)
+        except OSError:
+            # Generated (e.g. IP) or missing file: only its name counts
+            sha.update(b'<missing>')
+        sha.update(b'\0')
+    return sha.hexdigest()
+
+class TestbenchCache:
+    """ Wall times and results of previous simulation runs
+
+        The cache is a JSON file, with one entry per simulator and testbench.
+        It remembers how long the last run took, and whether it passed with
+        sources of a given hash.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = Lock()
+        self._entries = {}
+        if path and os.path.isfile(path):
+            try:
+                with open(path, 'r') as cachefile:
+                    data = json.load(cachefile)
+                if data.get('version') == CACHE_VERSION:
+                    self._entries = data['testbenches']
+            except (OSError, ValueError, KeyError, AttributeError) as e:
+                _LOG.warning('Ignoring unreadable cache file %s: %s', path, str(e))
+
+    @staticmethod
+    def _key(simulator, name):
+        return simulator + ':' + name
+
+    def get_duration(self, simulator, name):
+        """ Return the wall time of the last run in seconds, or None
+        """
+        with self._lock:
+            return self._entries.get(self._key(simulator, name), {}).get('duration')
+
+    def get_passed_result(self, simulator, name, source_hash):
+        """ Return the results of the last run if it passed with sources of
+            source_hash, or None
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(simulator, name))
+            if source_hash is None or entry is None or not entry['passed'] or \
+                    entry['source_hash'] != source_hash:
+                return None
+            return dict(entry['result'])
+
+    def update(self, simulator, name, source_hash, result):
+        """ Store the results of a run, and write the cache file
+        """
+        with self._lock:
+            self._entries[self._key(simulator, name)] = {
+                'duration': result['duration'],
+                'source_hash': source_hash,
+                'passed': result['passed'],
+                'result': get_result_fields(result),
+            }
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        # Write to a temporary file first, so an aborted run doesn't leave a
+        # truncated cache behind
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as cachefile:
+            json.dump({'version': CACHE_VERSION, 'testbenches': self._entries},
+                      cachefile, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+def get_result_fields(result):
+    """ Return the RESULT_FIELDS of a result, converted to JSON types
+    """
+    fields = {}
+    for key in RESULT_FIELDS:
+        if key in result:
+            value = result[key]
+            fields[key] = str(value, 'utf-8') if isinstance(value, bytes) else value
+    return fields
+
 def run_sim(path, simulator, basedir, setupenv):
     """ Run the simulation at the specified path
         The simulator can be specified as the target
@@ -221,16 +352,36 @@ def run_sim(path, simulator, basedir, setupenv):
         _LOG.error('Target ' + path + ' failed to run')
         return {'retcode': RETCODE_UNKNOWN_ERR, 'passed':False, 'stdout':bytes('Unknown Exception', 'utf-8')}
 
-def run_sim_queue(run_queue, out_queue, simulator, basedir, setupenv):
+def run_sim_queue(run_queue, out_queue, simulator, basedir, setupenv, cache=None, force=False):
     """ Thread worker for a simulation runner
         Pull a job from the run queue, run the sim, then place
         output in out_queue
+        If the sources of a sim are unchanged since it last passed, the
+        cached result is used instead, unless force is set
     """
     while not run_queue.empty():
         (name, path) = run_queue.get()
         try:
+            source_hash = None
+            if cache is not None:
+                source_hash = hash_sim_sources(path, simulator, basedir, setupenv)
+                result = None if force else \
+                    cache.get_passed_result(simulator, name, source_hash)
+                if result is not None:
+                    result.update({
+                        'retcode': RETCODE_SUCCESS, 'passed': True, 'cached': True,
+                        'duration': 0.0, 'source_hash': source_hash,
+                        'stdout': bytes('Sources unchanged since last PASS, skipped\n', 'utf-8')})
+                    out_queue.put((name, result))
+                    _LOG.info('CACHED: %s (PASS)', name)
+                    continue
             _LOG.info('Starting: %s', name)
+            start = time.monotonic()
             result = run_sim(path, simulator, basedir, setupenv)
+            result['duration'] = time.monotonic() - start
+            result['source_hash'] = source_hash
+            if cache is not None:
+                cache.update(simulator, name, source_hash, result)
             out_queue.put((name, result))
             _LOG.info('FINISHED: %s (%s, %s)', name, retcode_to_str(result['retcode']), 'PASS' if result['passed'] else 'FAIL!')
         except KeyboardInterrupt:
@@ -242,6 +393,73 @@ def run_sim_queue(run_queue, out_queue, simulator, basedir, setupenv):
         finally:
             run_queue.task_done()
 
+def schedule_sims(sims, simulator, cache):
+    """ Order the simulations to minimize the total wall time of a parallel
+        run: longest first, by their wall time in the cache. Simulations
+        which were never run go first, since they might be long ones.
+    """
+    def sort_key(sim):
+        duration = cache.get_duration(simulator, sim[0]) if cache is not None else None
+        return (duration is not None, -(duration or 0), sim[0])
+    return sorted(sims, key=sort_key)
+
+def get_status(result):
+    """ Return the status of a result as a string
+    """
+    if result.get('cached'):
+        return 'CACHED'
+    if result['retcode'] != RETCODE_SUCCESS:
+        return 'ERROR'
+    return 'PASSED' if result['passed'] else 'FAILED'
+
+def write_json_report(filename, results, simulator):
+    """ Write the results of a run as JSON
+    """
+    report = []
+    for name in sorted(results):
+        r = results[name]
+        entry = {'name': name, 'simulator': simulator, 'status': get_status(r),
+                 'retcode': retcode_to_str(r['retcode']), 'passed': r['passed'],
+                 'cached': r.get('cached', False), 'duration': r.get('duration'),
+                 'source_hash': r.get('source_hash')}
+        entry.update(get_result_fields(r))
+        report.append(entry)
+    with open(filename, 'w') as repfile:
+        json.dump({'simulator': simulator, 'testbenches': report}, repfile, indent=2)
+    _LOG.info('JSON report written to ' + filename)
+
+def write_junit_report(filename, results, simulator):
+    """ Write the results of a run as JUnit XML, one test case per testbench.
+        Cached results are reported as skipped.
+    """
+    suite = ET.Element('testsuite', name='run_testbenches', tests=str(len(results)))
+    counts = {'FAILED': 0, 'ERROR': 0, 'CACHED': 0}
+    total_time = 0.0
+    for name in sorted(results):
+        r = results[name]
+        status = get_status(r)
+        duration = r.get('duration') or 0.0
+        total_time += duration
+        case = ET.SubElement(suite, 'testcase', classname=simulator, name=name,
+                             time='%.3f' % duration)
+        if status in counts:
+            counts[status] += 1
+        if status == 'CACHED':
+            ET.SubElement(case, 'skipped', message='Sources unchanged since last PASS')
+        elif status == 'FAILED':
+            ET.SubElement(case, 'failure', message='Testbench failed')
+        elif status == 'ERROR':
+            ET.SubElement(case, 'error', message=retcode_to_str(r['retcode']))
+        if status != 'CACHED':
+            stdout = _ANSI_ESCAPE.sub('', r['stdout'].decode('utf-8', 'replace'))
+            ET.SubElement(case, 'system-out').text = _XML_INVALID.sub('', stdout)
+    suite.set('failures', str(counts['FAILED']))
+    suite.set('errors', str(counts['ERROR']))
+    suite.set('skipped', str(counts['CACHED']))
+    suite.set('time', '%.3f' % total_time)
+    ET.ElementTree(suite).write(filename, encoding='utf-8', xml_declaration=True)
+    _LOG.info('JUnit report written to ' + filename)
+
 #-------------------------------------------------------
 # Script Actions
 #-------------------------------------------------------
@@ -260,20 +478,27 @@ def do_run(args):
     """
     run_queue = Queue(maxsize=0)
     out_queue = Queue(maxsize=0)
+    cache = TestbenchCache(args.cache) if args.cache else None
+    if cache is not None:
+        _LOG.info('Using the testbench cache %s: targets whose sources are unchanged '
+                  'since they last passed %s.', args.cache,
+                  'are run anyway (--force)' if args.force else 'are skipped')
     _LOG.info('Queueing the following targets to simulate:')
     excludes = read_excludes_file(args.excludes)
     name_maxlen = 0
-    for (name, path) in gather_target_sims(args.basedir, args.target, excludes):
+    sims = gather_target_sims(args.basedir, args.target, excludes)
+    for (name, path) in schedule_sims(sims, args.simulator, cache):
         run_queue.put((name, path))
         name_maxlen = max(name_maxlen, len(name))
-        _LOG.info('* ' + name)
+        duration = cache.get_duration(args.simulator, name) if cache is not None else None
+        _LOG.info('* ' + name + ('' if duration is None else ' (last run: %ds)' % duration))
     # Spawn tasks to run builds
     num_sims = run_queue.qsize()
     num_jobs = min(num_sims, int(args.jobs))
     _LOG.info('Started ' + str(num_jobs) + ' job(s) to process queue...')
     results = {}
     for i in range(num_jobs):
-        worker = Thread(target=run_sim_queue, args=(run_queue, out_queue, args.simulator, args.basedir, args.setupenv))
+        worker = Thread(target=run_sim_queue, args=(run_queue, out_queue, args.simulator, args.basedir, args.setupenv, cache, args.force))
         worker.setDaemon(False)
         worker.start()
     # Wait for build queue to become empty
@@ -320,7 +545,9 @@ def do_run(args):
     log_with_header('RESULTS', hdr_len)
     for name in sorted(results):
         r = results[name]
-        if 'module' in r:
+        if r.get('cached'):
+            _LOG.info('* %s : %s (Cached)', name.ljust(name_maxlen), 'Passed')
+        elif 'module' in r:
             _LOG.info('* %s : %s (Expected=%02d, Run=%02d, Passed=%02d, Elapsed=%s)',
                 name.ljust(name_maxlen), ('Passed' if r['passed'] else 'FAILED'), r['tc_expected'], r['tc_run'], r['tc_passed'], r['wall_time'])
         else:
@@ -329,6 +556,10 @@ def do_run(args):
     _LOG.info('='*hdr_len)
     _LOG.info('SUMMARY: %d out of %d tests passed. Time elapsed was %s'%(num_sims - result_all, num_sims, str(datetime.datetime.now() - start).split('.', 2)[0]))   
     _LOG.info('#'*hdr_len)
+    if args.json:
+        write_json_report(args.json, results, args.simulator)
+    if args.junit:
+        write_junit_report(args.junit, results, args.simulator)
     return result_all
 
 
@@ -388,6 +619,10 @@ def get_options():
     parser.add_argument('-r', '--report', default='testbench_report.csv', help='Name of the output report file')
     parser.add_argument('-x', '--excludes', default=None, help='Name of the excludes file. It contains all targets to exclude.')
     parser.add_argument('-j', '--jobs', default=1, help='Number of parallel simulation jobs to run')
+    parser.add_argument('-c', '--cache', default=None, help='Name of a file in which to cache wall times and results (e.g. testbench_cache.json). When given, the longest targets run first, and targets whose sources are unchanged since they last passed are skipped. Disabled by default.')
+    parser.add_argument('-f', '--force', action='store_true', default=False, help='Run all targets, even those with a cached PASS result')
+    parser.add_argument('--junit', default=None, help='Write a JUnit XML report of the run to this file')
+    parser.add_argument('--json', default=None, help='Write a JSON report of the run to this file')
     parser.add_argument('-l', '--logged', action='store_true', default=False, help='Output is logged, so don\'t show per-second timer')
     parser.add_argument('action', choices=['run', 'cleanup', 'list', 'report'], default='list', help='What to do?')
     parser.add_argument('target', nargs='*', default='.*', help='Space separated simulation target regexes')
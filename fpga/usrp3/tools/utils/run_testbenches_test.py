@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+#
+# Copyright 2026 Ettus Research, a National Instruments Brand
+#
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+"""
+Unit tests for the scheduling and caching of run_testbenches.py
+"""
+
+import json
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from unittest import mock
+import run_testbenches
+
+# Stands in for make: prints the files listed in sources.txt of the current
+# directory as absolute paths, like the print_sim_srcs rule does
+FAKE_MAKE = """#!/bin/sh
+[ -f sources.txt ] || exit 2
+for src in $(cat sources.txt); do echo "$PWD/$src"; done
+"""
+
+def make_result(passed=True, duration=10.0):
+    """ Return a result as produced by run_sim_queue() """
+    return {'passed': passed, 'retcode': 0, 'duration': duration,
+            'module': b'tb_foo', 'tc_expected': 2, 'tc_run': 2, 'tc_passed': 2}
+
+class TestScheduleSims(unittest.TestCase):
+    """ Tests for schedule_sims() """
+    def test_without_cache(self):
+        """ Without a cache, simulations are sorted by name """
+        sims = [('b', 'path_b'), ('a', 'path_a')]
+        self.assertEqual(run_testbenches.schedule_sims(sims, 'xsim', None),
+                         [('a', 'path_a'), ('b', 'path_b')])
+
+    def test_longest_first(self):
+        """ Unknown simulations go first, then the longest ones """
+        cache = run_testbenches.TestbenchCache(None)
+        cache.update('xsim', 'short', None, make_result(duration=10.0))
+        cache.update('xsim', 'long', None, make_result(duration=300.0))
+        cache.update('vsim', 'new', None, make_result(duration=1000.0))
+        sims = [('short', 'p1'), ('long', 'p2'), ('new', 'p3')]
+        self.assertEqual(
+            [name for name, _ in run_testbenches.schedule_sims(sims, 'xsim', cache)],
+            ['new', 'long', 'short'])
+
+class TestTestbenchCache(unittest.TestCase):
+    """ Tests for TestbenchCache """
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'cache.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_persisted(self):
+        """ Entries are written to the file, and read back """
+        cache = run_testbenches.TestbenchCache(self.path)
+        cache.update('xsim', 'tb', 'hash1', make_result(duration=12.5))
+        cache = run_testbenches.TestbenchCache(self.path)
+        self.assertEqual(cache.get_duration('xsim', 'tb'), 12.5)
+        self.assertIsNone(cache.get_duration('vsim', 'tb'))
+        self.assertEqual(cache.get_passed_result('xsim', 'tb', 'hash1')['module'], 'tb_foo')
+
+    def test_passed_result(self):
+        """ Only a PASS with the same source hash is reused """
+        cache = run_testbenches.TestbenchCache(self.path)
+        cache.update('xsim', 'pass', 'hash1', make_result())
+        cache.update('xsim', 'fail', 'hash1', make_result(passed=False))
+        self.assertIsNotNone(cache.get_passed_result('xsim', 'pass', 'hash1'))
+        self.assertIsNone(cache.get_passed_result('xsim', 'pass', 'hash2'))
+        self.assertIsNone(cache.get_passed_result('xsim', 'pass', None))
+        self.assertIsNone(cache.get_passed_result('xsim', 'fail', 'hash1'))
+        self.assertIsNone(cache.get_passed_result('xsim', 'other', 'hash1'))
+
+    def test_ignores_bad_files(self):
+        """ Unreadable files and other versions are ignored """
+        with open(self.path, 'w') as cachefile:
+            cachefile.write('{not json')
+        cache = run_testbenches.TestbenchCache(self.path)
+        self.assertIsNone(cache.get_duration('xsim', 'tb'))
+        with open(self.path, 'w') as cachefile:
+            json.dump({'version': run_testbenches.CACHE_VERSION + 1,
+                       'testbenches': {'xsim:tb': {'duration': 1.0}}}, cachefile)
+        cache = run_testbenches.TestbenchCache(self.path)
+        self.assertIsNone(cache.get_duration('xsim', 'tb'))
+
+class TestHashSimSources(unittest.TestCase):
+    """ Tests for hash_sim_sources(), with a stand-in for make """
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        bin_dir = os.path.join(self.tmp_dir, 'bin')
+        os.mkdir(bin_dir)
+        make_path = os.path.join(bin_dir, 'make')
+        with open(make_path, 'w') as make_file:
+            make_file.write(FAKE_MAKE)
+        os.chmod(make_path, os.stat(make_path).st_mode | stat.S_IXUSR)
+        env = {'PATH': bin_dir + os.pathsep + os.environ['PATH'], 'VIVADO_PATH': '/opt/Xilinx'}
+        self.env_patch = mock.patch.dict(os.environ, env)
+        self.env_patch.start()
+        self.basedir = os.path.join(self.tmp_dir, 'repo')
+        self.tb_dir = os.path.join(self.basedir, 'tb')
+        os.makedirs(self.tb_dir)
+        self.write('tb.sv', 'module tb; endmodule')
+        self.write('dut.v', 'module dut; endmodule')
+        self.write('sources.txt', 'tb.sv dut.v Makefile')
+        self.write('Makefile', 'SIM_TOP = tb')
+
+    def tearDown(self):
+        self.env_patch.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, name, contents):
+        """ Write a file in the testbench directory """
+        with open(os.path.join(self.tb_dir, name), 'w') as out_file:
+            out_file.write(contents)
+
+    def get_hash(self, simulator='xsim'):
+        """ Hash the sources of the testbench """
+        return run_testbenches.hash_sim_sources(self.tb_dir, simulator, self.basedir, None)
+
+    def test_sources(self):
+        """ make is asked for the sources """
+        self.assertEqual(run_testbenches.get_sim_sources(self.tb_dir, None), [
+            os.path.join(self.tb_dir, name) for name in ('tb.sv', 'dut.v', 'Makefile')])
+
+    def test_hash_follows_contents(self):
+        """ The hash changes with the contents of a source, and is stable
+            otherwise
+        """
+        orig_hash = self.get_hash()
+        self.assertEqual(self.get_hash(), orig_hash)
+        self.write('dut.v', 'module dut(input clk); endmodule')
+        self.assertNotEqual(self.get_hash(), orig_hash)
+
+    def test_hash_follows_setup(self):
+        """ The simulator and the Vivado installation are part of the hash """
+        orig_hash = self.get_hash()
+        self.assertNotEqual(self.get_hash('vsim'), orig_hash)
+        with mock.patch.dict(os.environ, {'VIVADO_PATH': '/opt/Xilinx2'}):
+            self.assertNotEqual(self.get_hash(), orig_hash)
+
+    def test_missing_source(self):
+        """ A missing source is hashed by name """
+        self.write('sources.txt', 'tb.sv dut.v ip.xci')
+        self.assertIsNotNone(self.get_hash())
+
+    def test_relocated_checkout(self):
+        """ The hash does not depend on where the repository is """
+        orig_hash = self.get_hash()
+        new_basedir = os.path.join(self.tmp_dir, 'other_repo')
+        shutil.move(self.basedir, new_basedir)
+        self.assertEqual(run_testbenches.hash_sim_sources(
+            os.path.join(new_basedir, 'tb'), 'xsim', new_basedir, None), orig_hash)
+
+    def test_make_fails(self):
+        """ Without a list of sources, there is no hash """
+        os.remove(os.path.join(self.tb_dir, 'sources.txt'))
+        self.assertIsNone(self.get_hash())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,6 +17,7 @@
 #include <chrono>
 #include <complex>
 #include <cstdlib>
+#include <fstream>
 #include <iostream>
 #include <thread>
 
@@ -339,6 +340,7 @@ int UHD_SAFE_MAIN(int argc, char* argv[])
     size_t rx_spp, tx_spp;
     double tx_delay, rx_delay;
     std::string priority;
+    std::string result_json;
     bool elevate_priority = false;
 
     // setup the program options
@@ -379,6 +381,7 @@ int UHD_SAFE_MAIN(int argc, char* argv[])
         ("rx_delay", po::value<double>(&rx_delay)->default_value(0.05), "delay before starting RX in seconds")
         ("priority", po::value<std::string>(&priority)->default_value("normal"), "thread priority (normal, high)")
         ("multi_streamer", "Create a separate streamer per channel")
+        ("result_json", po::value<std::string>(&result_json), "write the results to this file as a JSON object")
     ;
     // clang-format on
     po::variables_map vm;
@@ -650,6 +653,7 @@ int UHD_SAFE_MAIN(int argc, char* argv[])
 	}
     }
 
+    const double requested_duration = duration;
     // sleep for the required duration (add any initial delay)
     if (vm.count("rx_rate") and vm.count("tx_rate")) {
         duration += std::max(rx_delay, tx_delay);
@@ -695,6 +699,41 @@ int UHD_SAFE_MAIN(int argc, char* argv[])
                      % num_seq_errors % num_seqrx_errors % num_underruns
                      % num_late_commands % num_timeouts_tx % num_timeouts_rx
               << std::endl;
+    // write the machine-readable results, so scripts don't need to parse the
+    // summary above
+    if (vm.count("result_json")) {
+        std::ofstream result_file(result_json);
+        result_file
+            << boost::format("{\n"
+                             "  \"num_rx_channels\": %u,\n"
+                             "  \"num_tx_channels\": %u,\n"
+                             "  \"rx_rate\": %f,\n"
+                             "  \"tx_rate\": %f,\n"
+                             "  \"duration\": %f,\n"
+                             "  \"received_samps\": %u,\n"
+                             "  \"dropped_samps\": %u,\n"
+                             "  \"overruns\": %u,\n"
+                             "  \"transmitted_samps\": %u,\n"
+                             "  \"tx_seq_errs\": %u,\n"
+                             "  \"rx_seq_errs\": %u,\n"
+                             "  \"underruns\": %u,\n"
+                             "  \"late_cmds\": %u,\n"
+                             "  \"tx_timeouts\": %u,\n"
+                             "  \"rx_timeouts\": %u\n"
+                             "}\n")
+                   % rx_channel_nums.size() % tx_channel_nums.size()
+                   % (vm.count("rx_rate") ? usrp->get_rx_rate() : 0.0)
+                   % (vm.count("tx_rate") ? usrp->get_tx_rate() : 0.0)
+                   % requested_duration % num_rx_samps % num_dropped_samps
+                   % num_overruns % num_tx_samps % num_seq_errors % num_seqrx_errors
+                   % num_underruns % num_late_commands % num_timeouts_tx
+                   % num_timeouts_rx;
+        if (!result_file) {
+            std::cerr << "ERROR: Could not write results to " << result_json
+                      << std::endl;
+        }
+    }
+
     // finished
     std::cout << std::endl << "Done!" << std::endl << std::endl;
 
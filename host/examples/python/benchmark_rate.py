@@ -10,6 +10,8 @@ Benchmark rate using Python API
 """
 
 import argparse
+import csv
+import json
 from datetime import datetime, timedelta
 import sys
 import time
@@ -21,6 +23,8 @@ import uhd
 
 CLOCK_TIMEOUT = 1000  # 1000mS timeout for external clock locking
 INIT_DELAY = 0.05  # 50mS initial delay before transmit
+RX_COUNTERS = ("num_rx_samps", "num_rx_dropped", "num_rx_overruns", "num_rx_seqerr",
+               "num_rx_timeouts", "num_rx_late")
 
 def parse_args():
     """Parse the command line arguments"""
@@ -65,7 +69,21 @@ def parse_args():
                         help="which RX channel(s) to use (specify \"0\", \"1\", \"0 1\", etc)")
     parser.add_argument("--tx_channels", nargs="+", type=int,
                         help="which TX channel(s) to use (specify \"0\", \"1\", \"0 1\", etc)")
-    return parser.parse_args()
+    parser.add_argument("--multi_streamer", choices=["none", "channel", "mboard"],
+                        default="none",
+                        help="create one streamer (and thread) per channel or per\n"
+                             "motherboard instead of a single streamer for all channels")
+    parser.add_argument("--stats_interval", type=float, default=1.0,
+                        help="interval in seconds at which the counters are sampled\n"
+                             "for --stats_file")
+    parser.add_argument("--stats_file", type=str,
+                        help="write a time series of the counters of every streamer to\n"
+                             "this file. The format is JSON if the file name ends in\n"
+                             ".json, CSV otherwise.")
+    args = parser.parse_args()
+    if args.stats_interval <= 0:
+        parser.error("--stats_interval must be greater than zero")
+    return args
 
 
 class LogFormatter(logging.Formatter):
@@ -185,13 +203,10 @@ def benchmark_rx_rate(usrp, rx_streamer, random, timer_elapsed_event, rx_statist
     #   tick rate to estimate the number of dropped samples. Also, reset the tracking variables
     had_an_overflow = False
     last_overflow = uhd.types.TimeSpec(0)
-    # Setup the statistic counters
-    num_rx_samps = 0
-    num_rx_dropped = 0
-    num_rx_overruns = 0
-    num_rx_seqerr = 0
-    num_rx_timeouts = 0
-    num_rx_late = 0
+    # Setup the statistic counters. They are updated as we go, so the main
+    # thread can sample them while we're running.
+    for counter in RX_COUNTERS:
+        rx_statistics[counter] = 0
 
     rate = usrp.get_rx_rate()
     # Receive until we get the signal to stop
@@ -200,7 +215,8 @@ def benchmark_rx_rate(usrp, rx_streamer, random, timer_elapsed_event, rx_statist
             stream_cmd.num_samps = np.random.randint(1, max_samps_per_packet+1, dtype=int)
             rx_streamer.issue_stream_cmd(stream_cmd)
         try:
-            num_rx_samps += rx_streamer.recv(recv_buffer, metadata) * num_channels
+            rx_statistics["num_rx_samps"] += \
+                rx_streamer.recv(recv_buffer, metadata) * num_channels
         except RuntimeError as ex:
             logger.error("Runtime error in receive: %s", ex)
             return
@@ -210,7 +226,8 @@ def benchmark_rx_rate(usrp, rx_streamer, random, timer_elapsed_event, rx_statist
             # Reset the overflow flag
             if had_an_overflow:
                 had_an_overflow = False
-                num_rx_dropped += (metadata.time_spec - last_overflow).to_ticks(rate)
+                rx_statistics["num_rx_dropped"] += \
+                    (metadata.time_spec - last_overflow).to_ticks(rate)
         elif metadata.error_code == uhd.types.RXMetadataErrorCode.overflow:
             had_an_overflow = True
             # Need to make sure that last_overflow is a new TimeSpec object, not
@@ -221,13 +238,13 @@ def benchmark_rx_rate(usrp, rx_streamer, random, timer_elapsed_event, rx_statist
                 metadata.time_spec.get_frac_secs())
             # If we had a sequence error, record it
             if metadata.out_of_sequence:
-                num_rx_seqerr += 1
+                rx_statistics["num_rx_seqerr"] += 1
             # Otherwise just count the overrun
             else:
-                num_rx_overruns += 1
+                rx_statistics["num_rx_overruns"] += 1
         elif metadata.error_code == uhd.types.RXMetadataErrorCode.late:
             logger.warning("Receiver error: %s, restarting streaming...", metadata.strerror())
-            num_rx_late += 1
+            rx_statistics["num_rx_late"] += 1
             # Radio core will be in the idle state. Issue stream command to restart streaming.
             stream_cmd.time_spec = uhd.types.TimeSpec(
                 usrp.get_time_now().get_real_secs() + INIT_DELAY)
@@ -235,18 +252,11 @@ def benchmark_rx_rate(usrp, rx_streamer, random, timer_elapsed_event, rx_statist
             rx_streamer.issue_stream_cmd(stream_cmd)
         elif metadata.error_code == uhd.types.RXMetadataErrorCode.timeout:
             logger.warning("Receiver error: %s, continuing...", metadata.strerror())
-            num_rx_timeouts += 1
+            rx_statistics["num_rx_timeouts"] += 1
         else:
             logger.error("Receiver error: %s", metadata.strerror())
             logger.error("Unexpected error on receive, continuing...")
 
-    # Return the statistics to the main thread
-    rx_statistics["num_rx_samps"] = num_rx_samps
-    rx_statistics["num_rx_dropped"] = num_rx_dropped
-    rx_statistics["num_rx_overruns"] = num_rx_overruns
-    rx_statistics["num_rx_seqerr"] = num_rx_seqerr
-    rx_statistics["num_rx_timeouts"] = num_rx_timeouts
-    rx_statistics["num_rx_late"] = num_rx_late
     # After we get the signal to stop, issue a stop command
     rx_streamer.issue_stream_cmd(uhd.types.StreamCMD(uhd.types.StreamMode.stop_cont))
 
@@ -266,7 +276,7 @@ def benchmark_tx_rate(usrp, tx_streamer, random, timer_elapsed_event, tx_statist
     metadata.has_time_spec = bool(num_channels)
 
     # Setup the statistic counters
-    num_tx_samps = 0
+    tx_statistics["num_tx_samps"] = 0
     # TODO: The C++ has a single randomly sized packet sent here, then the thread returns
     num_timeouts_tx = 0
     # Transmit until we get the signal to stop
@@ -275,7 +285,7 @@ def benchmark_tx_rate(usrp, tx_streamer, random, timer_elapsed_event, tx_statist
             total_num_samps = np.random.randint(1, max_samps_per_packet + 1, dtype=int)
             num_acc_samps = 0
             while num_acc_samps < total_num_samps:
-                num_tx_samps += tx_streamer.send(
+                tx_statistics["num_tx_samps"] += tx_streamer.send(
                     transmit_buffer, metadata) * num_channels
                 num_acc_samps += min(total_num_samps - num_acc_samps,
                                      tx_streamer.get_max_num_samps())
@@ -283,7 +293,7 @@ def benchmark_tx_rate(usrp, tx_streamer, random, timer_elapsed_event, tx_statist
         while not timer_elapsed_event.is_set():
             try:
                 num_tx_samps_now = tx_streamer.send(transmit_buffer, metadata) * num_channels
-                num_tx_samps += num_tx_samps_now
+                tx_statistics["num_tx_samps"] += num_tx_samps_now
                 if num_tx_samps_now == 0:
                     num_timeouts_tx += 1
                     if (num_timeouts_tx % 10000) == 1:
@@ -294,8 +304,6 @@ def benchmark_tx_rate(usrp, tx_streamer, random, timer_elapsed_event, tx_statist
                 logger.error("Runtime error in transmit: %s", ex)
                 return
 
-    tx_statistics["num_tx_samps"] = num_tx_samps
-
     # Send a mini EOB packet
     metadata.end_of_burst = True
     tx_streamer.send(np.zeros((num_channels, 0), dtype=np.complex64), metadata)
@@ -306,34 +314,101 @@ def benchmark_tx_rate_async_helper(tx_streamer, timer_elapsed_event, tx_async_st
     async_metadata = uhd.types.TXAsyncMetadata()
 
     # Setup the statistic counters
-    num_tx_seqerr = 0
-    num_tx_underrun = 0
-    num_tx_timeouts = 0  # TODO: Not populated yet
-    try:
-        while not timer_elapsed_event.is_set():
-            # Receive the async metadata
-            if not tx_streamer.recv_async_msg(async_metadata, 0.1):
-                continue
+    tx_async_statistics["num_tx_seqerr"] = 0
+    tx_async_statistics["num_tx_underrun"] = 0
+    tx_async_statistics["num_tx_timeouts"] = 0  # TODO: Not populated yet
+    while not timer_elapsed_event.is_set():
+        # Receive the async metadata
+        if not tx_streamer.recv_async_msg(async_metadata, 0.1):
+            continue
 
-            # Handle the error codes
-            if async_metadata.event_code == uhd.types.TXMetadataEventCode.burst_ack:
+        # Handle the error codes
+        if async_metadata.event_code == uhd.types.TXMetadataEventCode.burst_ack:
+            return
+        if async_metadata.event_code in (
+                uhd.types.TXMetadataEventCode.underflow,
+                uhd.types.TXMetadataEventCode.underflow_in_packet):
+            tx_async_statistics["num_tx_underrun"] += 1
+        elif async_metadata.event_code in (
+                uhd.types.TXMetadataEventCode.seq_error,
+                uhd.types.TXMetadataEventCode.seq_error_in_packet):
+            tx_async_statistics["num_tx_seqerr"] += 1
+        else:
+            logger.warning("Unexpected event on async recv (%s), continuing.",
+                           async_metadata.event_code)
+
+
+def get_streamer_channels(usrp, channels, direction, multi_streamer):
+    """
+    Split the channels into one list per streamer, according to the
+    --multi_streamer option
+    """
+    if multi_streamer == "channel":
+        return [[chan] for chan in channels]
+    if multi_streamer == "mboard":
+        channel_groups = {}
+        for chan in channels:
+            usrp_info = getattr(usrp, "get_usrp_{}_info".format(direction))(chan)
+            channel_groups.setdefault(usrp_info.get("mboard_serial", ""), []).append(chan)
+        return list(channel_groups.values())
+    return [channels]
+
+
+def sum_statistics(statistics):
+    """Add up a list of statistics dictionaries"""
+    total = {}
+    for stats in statistics:
+        for counter, value in stats.items():
+            total[counter] = total.get(counter, 0) + value
+    return total
+
+
+class StatsRecorder:
+    """
+    Samples the counters of all streamers into a time series
+
+    The statistics dictionaries are updated by the streaming threads while we
+    read them. We only ever read integers from them, and take a copy first, so
+    this is safe without locks.
+    """
+    SAMPS_COUNTERS = ("num_rx_samps", "num_tx_samps")
+
+    def __init__(self, statistics):
+        """statistics is a dictionary of streamer name -> statistics dictionary"""
+        self._statistics = statistics
+        self._start = time.monotonic()
+        self._last = {}
+        self.samples = []
+
+    def sample(self):
+        """Record the current state of all counters"""
+        now = time.monotonic() - self._start
+        for name, stats in self._statistics.items():
+            snapshot = dict(stats)
+            last_time, last_snapshot = self._last.get(name, (0.0, {}))
+            sample = {"time": round(now, 6), "streamer": name}
+            sample.update(snapshot)
+            # Throughput over the last interval, in samples per second
+            for counter in self.SAMPS_COUNTERS:
+                if counter in snapshot and now > last_time:
+                    sample[counter.replace("num_", "") + "_per_sec"] = \
+                        (snapshot[counter] - last_snapshot.get(counter, 0)) \
+                        / (now - last_time)
+            self._last[name] = (now, snapshot)
+            self.samples.append(sample)
+
+    def write(self, filename):
+        """Write the time series as JSON (if filename ends in .json) or CSV"""
+        with open(filename, "w", newline="") as stats_file:
+            if filename.endswith(".json"):
+                json.dump(self.samples, stats_file, indent=2)
                 return
-            if async_metadata.event_code in (
-                    uhd.types.TXMetadataEventCode.underflow,
-                    uhd.types.TXMetadataEventCode.underflow_in_packet):
-                num_tx_underrun += 1
-            elif async_metadata.event_code in (
-                    uhd.types.TXMetadataEventCode.seq_error,
-                    uhd.types.TXMetadataEventCode.seq_error_in_packet):
-                num_tx_seqerr += 1
-            else:
-                logger.warning("Unexpected event on async recv (%s), continuing.",
-                               async_metadata.event_code)
-    finally:
-        # Write the statistics back
-        tx_async_statistics["num_tx_seqerr"] = num_tx_seqerr
-        tx_async_statistics["num_tx_underrun"] = num_tx_underrun
-        tx_async_statistics["num_tx_timeouts"] = num_tx_timeouts
+            fieldnames = ["time", "streamer"]
+            for sample in self.samples:
+                fieldnames += [key for key in sample if key not in fieldnames]
+            writer = csv.DictWriter(stats_file, fieldnames=fieldnames, restval="")
+            writer.writeheader()
+            writer.writerows(self.samples)
 
 
 def print_statistics(rx_statistics, tx_statistics, tx_async_statistics):
@@ -417,61 +492,78 @@ def main():
     threads = []
     # Make a signal for the threads to stop running
     quit_event = threading.Event()
-    # Create a dictionary for the RX statistics
-    # Note: we're going to use this without locks, so don't access it from the main thread until
-    #       the worker has joined
+    # One dictionary of statistics per streamer, by streamer name. The worker
+    # threads update them as they go; the main thread only takes snapshots
+    # until the workers have joined. The TX thread and its async helper share
+    # a dictionary, but use different keys.
     rx_statistics = {}
-    # Spawn the receive test thread
+    tx_statistics = {}
+    # Spawn the receive test threads
     if args.rx_rate:
         usrp.set_rx_rate(args.rx_rate)
-        st_args = uhd.usrp.StreamArgs(args.rx_cpu, args.rx_otw)
-        st_args.channels = rx_channels
-        st_args.args = uhd.types.DeviceAddr(args.rx_stream_args)
-        rx_streamer = usrp.get_rx_stream(st_args)
-        rx_thread = threading.Thread(target=benchmark_rx_rate,
-                                     args=(usrp, rx_streamer, args.random, quit_event,
-                                           rx_statistics))
-        threads.append(rx_thread)
-        rx_thread.start()
-        rx_thread.setName("bmark_rx_stream")
-
-    # Create a dictionary for the RX statistics
-    # Note: we're going to use this without locks, so don't access it from the main thread until
-    #       the worker has joined
-    tx_statistics = {}
-    tx_async_statistics = {}
-    # Spawn the transmit test thread
+        for idx, streamer_channels in enumerate(get_streamer_channels(
+                usrp, rx_channels, "rx", args.multi_streamer)):
+            name = "rx{}".format(idx)
+            st_args = uhd.usrp.StreamArgs(args.rx_cpu, args.rx_otw)
+            st_args.channels = streamer_channels
+            st_args.args = uhd.types.DeviceAddr(args.rx_stream_args)
+            rx_streamer = usrp.get_rx_stream(st_args)
+            rx_statistics[name] = {}
+            rx_thread = threading.Thread(target=benchmark_rx_rate,
+                                         args=(usrp, rx_streamer, args.random, quit_event,
+                                               rx_statistics[name]))
+            threads.append(rx_thread)
+            rx_thread.start()
+            rx_thread.setName("bmark_{}_stream".format(name))
+
+    # Spawn the transmit test threads
     if args.tx_rate:
         usrp.set_tx_rate(args.tx_rate)
-        st_args = uhd.usrp.StreamArgs(args.tx_cpu, args.tx_otw)
-        st_args.channels = tx_channels
-        st_args.args = uhd.types.DeviceAddr(args.tx_stream_args)
-        tx_streamer = usrp.get_tx_stream(st_args)
-        tx_thread = threading.Thread(target=benchmark_tx_rate,
-                                     args=(usrp, tx_streamer, args.random, quit_event,
-                                           tx_statistics))
-        threads.append(tx_thread)
-        tx_thread.start()
-        tx_thread.setName("bmark_tx_stream")
-
-        tx_async_thread = threading.Thread(target=benchmark_tx_rate_async_helper,
-                                           args=(tx_streamer, quit_event, tx_async_statistics))
-        threads.append(tx_async_thread)
-        tx_async_thread.start()
-        tx_async_thread.setName("bmark_tx_helper")
-
-    # Sleep for the required duration
+        for idx, streamer_channels in enumerate(get_streamer_channels(
+                usrp, tx_channels, "tx", args.multi_streamer)):
+            name = "tx{}".format(idx)
+            st_args = uhd.usrp.StreamArgs(args.tx_cpu, args.tx_otw)
+            st_args.channels = streamer_channels
+            st_args.args = uhd.types.DeviceAddr(args.tx_stream_args)
+            tx_streamer = usrp.get_tx_stream(st_args)
+            tx_statistics[name] = {}
+            tx_thread = threading.Thread(target=benchmark_tx_rate,
+                                         args=(usrp, tx_streamer, args.random, quit_event,
+                                               tx_statistics[name]))
+            threads.append(tx_thread)
+            tx_thread.start()
+            tx_thread.setName("bmark_{}_stream".format(name))
+
+            tx_async_thread = threading.Thread(target=benchmark_tx_rate_async_helper,
+                                               args=(tx_streamer, quit_event,
+                                                     tx_statistics[name]))
+            threads.append(tx_async_thread)
+            tx_async_thread.start()
+            tx_async_thread.setName("bmark_{}_helper".format(name))
+
+    # Sleep for the required duration, sampling the counters as we go
     # If we have a multichannel test, add some time for initialization
     if len(rx_channels) > 1 or len(tx_channels) > 1:
         args.duration += INIT_DELAY
-    time.sleep(args.duration)
+    recorder = StatsRecorder(dict(rx_statistics, **tx_statistics))
+    end_time = time.monotonic() + args.duration
+    while time.monotonic() < end_time:
+        time.sleep(max(min(args.stats_interval, end_time - time.monotonic()), 0))
+        recorder.sample()
     # Interrupt and join the threads
     logger.debug("Sending signal to stop!")
     quit_event.set()
     for thr in threads:
         thr.join()
 
-    print_statistics(rx_statistics, tx_statistics, tx_async_statistics)
+    if args.stats_file:
+        logger.info("Writing statistics time series to %s", args.stats_file)
+        recorder.write(args.stats_file)
+    if len(rx_statistics) > 1 or len(tx_statistics) > 1:
+        for name, stats in dict(rx_statistics, **tx_statistics).items():
+            logger.info("Streamer %s: %s", name, stats)
+    tx_total = sum_statistics(tx_statistics.values())
+    print_statistics(sum_statistics(rx_statistics.values()), tx_total, tx_total)
 
     return True
 
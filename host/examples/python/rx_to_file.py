@@ -35,12 +35,19 @@ def main():
     num_samps = int(np.ceil(args.duration*args.rate))
     if not isinstance(args.channels, list):
         args.channels = [args.channels]
-    samps = usrp.recv_num_samps(num_samps, args.freq, args.rate, args.channels, args.gain)
-    with open(args.output_file, 'wb') as out_file:
-        if args.numpy:
-            np.save(out_file, samps, allow_pickle=False, fix_imports=False)
-        else:
-            samps.tofile(out_file)
+    # Receive straight into a memory-mapped output file, so we don't need to
+    # hold the entire capture in memory. The file layout is the same as that of
+    # the (channels, samples) array returned by recv_num_samps().
+    shape = (len(args.channels), num_samps)
+    if args.numpy:
+        samps = np.lib.format.open_memmap(
+            args.output_file, mode='w+', dtype=np.complex64, shape=shape)
+    else:
+        samps = np.memmap(
+            args.output_file, mode='w+', dtype=np.complex64, shape=shape)
+    usrp.recv_num_samps(num_samps, args.freq, args.rate, args.channels, args.gain,
+                        out=samps)
+    samps.flush()
 
 if __name__ == "__main__":
     main()
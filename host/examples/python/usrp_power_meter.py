@@ -120,18 +120,21 @@ def main():
             global RUN
             RUN = False
         signal.signal(signal.SIGINT, handle_sigint)
-    while RUN:
-        try:
-            power_dbfs = uhd.dsp.signals.get_usrp_power(
-                streamer, num_samps=int(args.samps_per_est))
-        except RuntimeError:
-            # This is a hack b/c the signal handler is not gracefully handling
-            # SIGINT
-            break
-        power_dbm = power_dbfs + ref_level
-        print("Received power: {:+6.2f} dBm".format(power_dbm))
-        if args.mode == 'one-shot':
-            break
+    # The power meter keeps the streamer running between estimates, so
+    # continuous mode doesn't need to restart the stream for every reading
+    with uhd.dsp.signals.PowerMeter(
+            streamer, num_samps=int(args.samps_per_est)) as power_meter:
+        while RUN:
+            try:
+                power_dbfs = power_meter.get_power()[0]
+            except RuntimeError:
+                # This is a hack b/c the signal handler is not gracefully handling
+                # SIGINT
+                break
+            power_dbm = power_dbfs + ref_level
+            print("Received power: {:+6.2f} dBm".format(power_dbm))
+            if args.mode == 'one-shot':
+                break
     return True
 
 if __name__ == "__main__":
@@ -116,6 +116,22 @@ COMMON_PY_TMPL = """<% import time %>\
 
 from enum import Enum
 
+## A list of register array values which marks addresses dirty on assignment
+class _reg_array_t(list):
+    def __init__(self, values, dirty_addrs, addr, step):
+        super().__init__(values)
+        self._dirty_addrs = dirty_addrs
+        self._addr = addr
+        self._step = step
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        if isinstance(index, slice):
+            indices = range(*index.indices(len(self)))
+        else:
+            indices = (index % len(self),)
+        self._dirty_addrs.update(self._addr + i * self._step for i in indices)
+
 ## Create a class for the register map
 class ${name}_t:
     ## Create an enum for each register which has defined values
@@ -128,8 +144,31 @@ class ${name}_t:
     % endif
     %endfor
 
+    ## Scalar field name -> register address, used for dirty tracking
+    _FIELD_ADDRS = {
+        % for reg in regs:
+        % if not reg.is_array:
+        '${reg.get_name()}': ${reg.get_addr()},
+        % endif
+        % endfor
+    }
+
+    ## Array field name -> (base address, address step)
+    _ARRAY_FIELDS = {
+        % for reg in regs:
+        % if reg.is_array:
+        '${reg.get_name()}': (${reg.get_addr()}, ${reg.get_addr_step_size()}),
+        % endif
+        % endfor
+    }
+
+    ## All register addresses, and the distance between adjacent ones
+    _ALL_ADDRS = (${', '.join(str(addr) for addr in all_addrs)},)
+    _ADDR_STEP = ${addr_step}
+
     def __init__(self):
         ## Assign each register to its default value
+        self._dirty_addrs = set()
         self._state = None
         % for reg in regs:
             % if reg.get_enums():
@@ -149,9 +188,63 @@ class ${name}_t:
         self.${reg.get_name()}_mask = ${reg.get_mask()}
         self.${reg.get_name()}_shift = ${reg.get_shift()}
         % endfor
+        ## A fresh map matches the hardware defaults, so nothing is dirty yet
+        self._dirty_addrs.clear()
+
+    def __setattr__(self, name, value):
+        if name in self._ARRAY_FIELDS:
+            addr, step = self._ARRAY_FIELDS[name]
+            value = _reg_array_t(value, self._dirty_addrs, addr, step)
+            self._dirty_addrs.update(addr + i * step for i in range(len(value)))
+        elif name in self._FIELD_ADDRS:
+            self._dirty_addrs.add(self._FIELD_ADDRS[name])
+        object.__setattr__(self, name, value)
 
     ${body}
 
+    def get_dirty_addrs(self):
+        # Return the sorted addresses of all registers which were modified since
+        # the map was created or since the last commit() or clear_dirty().
+        return sorted(self._dirty_addrs)
+
+    def mark_all_dirty(self):
+        # Mark every register as dirty, e.g., to write out the full map after
+        # a chip reset.
+        self._dirty_addrs.update(self._ALL_ADDRS)
+
+    def clear_dirty(self):
+        # Forget all pending changes without writing them.
+        self._dirty_addrs.clear()
+
+    def get_dirty_bursts(self):
+        # Return the dirty registers as a list of bursts. Each burst is a list
+        # of (addr, value) tuples with ascending, adjacent addresses, so
+        # interfaces which support auto-incrementing writes can send each burst
+        # as a single transfer.
+        bursts = []
+        for addr in sorted(self._dirty_addrs):
+            if bursts and addr - bursts[-1][-1][0] == self._ADDR_STEP:
+                bursts[-1].append((addr, self.get_reg(addr)))
+            else:
+                bursts.append([(addr, self.get_reg(addr))])
+        return bursts
+
+    def commit(self, pokes, latch_addrs=()):
+        # Write all dirty registers in ascending address order with a single
+        # call to pokes(), which takes a list of (addr, value) tuples (e.g., a
+        # pokesN() method of a register interface). Then clear the dirty set.
+        # The registers in latch_addrs are written last, in the given order and
+        # whether they are dirty or not. This is for chips where writing one
+        # register (e.g., R0 of a PLL) latches the others.
+        # Returns the number of registers written.
+        addr_vals = [addr_val for burst in self.get_dirty_bursts()
+                     for addr_val in burst if addr_val[0] not in latch_addrs]
+        addr_vals += [(addr, self.get_reg(addr)) for addr in latch_addrs]
+        if addr_vals:
+            pokes(addr_vals)
+        self._dirty_addrs.clear()
+        return len(addr_vals)
+
     def save_state(self):
         if self._state is None:
             self._state = ${name}_t()
@@ -311,6 +404,15 @@ class reg:
         """
         return self._addr_step
 
+    def get_addrs(self):
+        """
+        Return all addresses covered by this register (one per array element)
+        """
+        if self.is_array:
+            return [self._addr + index * self._addr_step
+                    for index in range(self._array_len)]
+        return [self._addr]
+
 class mreg:
     def __init__(self, mreg_des, regs):
         try: self.parse(mreg_des, regs)
@@ -348,6 +450,12 @@ def generate(name, regs_tmpl, body_tmpl='', py_body_tmpl='', file=__file__, appe
         else:
             regs.append(reg(entry))
 
+    #collect all register addresses and the step between adjacent ones
+    all_addrs = sorted(set(addr for r in regs for addr in r.get_addrs()))
+    addr_step = 0
+    for prev_addr, addr in zip(all_addrs, all_addrs[1:]):
+        addr_step = math.gcd(addr_step, addr - prev_addr)
+
     #evaluate the body template with the list of registers
     body = '\n    '.join(parse_tmpl(body_template, regs=regs).splitlines())
 
@@ -358,6 +466,8 @@ def generate(name, regs_tmpl, body_tmpl='', py_body_tmpl='', file=__file__, appe
         mregs=mregs,
         body=body,
         file=file,
+        all_addrs=all_addrs,
+        addr_step=addr_step or 1,
     )
 
     #write the generated code to file specified by argv1
@@ -8,6 +8,7 @@
 #ifndef INCLUDED_UHD_STREAM_PYTHON_HPP
 #define INCLUDED_UHD_STREAM_PYTHON_HPP
 
+#include <uhd/exception.hpp>
 #include <uhd/stream.hpp>
 #include <uhd/types/metadata.hpp>
 #include <boost/format.hpp>
@@ -19,7 +20,12 @@ static size_t wrap_recv(uhd::rx_streamer* rx_stream,
 {
     // Get a numpy array object from given python object
     // No sanity checking possible!
-    PyObject* array_obj           = PyArray_FROM_OF(np_array.ptr(), NPY_ARRAY_CARRAY);
+    // We only require the samples of every channel (i.e., every row) to be
+    // contiguous, not the entire array. That way, we can receive straight into
+    // a view of a larger array (e.g., arr[:, offset:offset+nsamps]) instead of
+    // having numpy create a temporary copy, which would not be copied back.
+    PyObject* array_obj =
+        PyArray_FROM_OF(np_array.ptr(), NPY_ARRAY_ALIGNED | NPY_ARRAY_WRITEABLE);
     PyArrayObject* array_type_obj = reinterpret_cast<PyArrayObject*>(array_obj);
 
     // Get dimensions of the numpy array
@@ -31,6 +37,13 @@ static size_t wrap_recv(uhd::rx_streamer* rx_stream,
     const npy_intp* strides = PyArray_STRIDES(array_type_obj);
     const size_t channels   = rx_stream->get_num_channels();
 
+    if (dims == 0 || strides[dims - 1] != PyArray_ITEMSIZE(array_type_obj)) {
+        // Manually decrement the ref count
+        Py_DECREF(array_obj);
+        throw uhd::value_error(
+            "The samples of every channel must be contiguous in the data array");
+    }
+
     // Check if numpy array sizes are okay
     if (((channels > 1) && (dims != 2)) or ((size_t)shape[0] < channels)) {
         // Manually decrement the ref count
@@ -79,8 +92,19 @@ static size_t wrap_send(uhd::tx_streamer* tx_stream,
     // No sanity checking possible!
     // Note: this increases the ref count, which we'll need to manually decrease at the
     // end
-    PyObject* array_obj           = PyArray_FROM_OF(np_array.ptr(), NPY_ARRAY_CARRAY);
+    // Like in wrap_recv(), views whose rows are contiguous are used as they are
+    // (e.g., arr[:, offset:]). Anything else gets copied into a C array.
+    PyObject* array_obj = PyArray_FROM_OF(np_array.ptr(), NPY_ARRAY_ALIGNED);
     PyArrayObject* array_type_obj = reinterpret_cast<PyArrayObject*>(array_obj);
+    const int ndim                = PyArray_NDIM(array_type_obj);
+    if (ndim == 0
+        || PyArray_STRIDES(array_type_obj)[ndim - 1]
+               != PyArray_ITEMSIZE(array_type_obj)) {
+        PyObject* carray_obj = PyArray_FROM_OF(array_obj, NPY_ARRAY_CARRAY);
+        Py_DECREF(array_obj);
+        array_obj      = carray_obj;
+        array_type_obj = reinterpret_cast<PyArrayObject*>(array_obj);
+    }
 
     // Get dimensions of the numpy array
     const size_t dims     = PyArray_NDIM(array_type_obj);
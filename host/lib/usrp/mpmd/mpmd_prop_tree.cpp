@@ -15,12 +15,41 @@
 #include <uhd/usrp/mboard_eeprom.hpp>
 #include <uhd/utils/cast.hpp>
 #include <boost/algorithm/string/case_conv.hpp>
+#include <algorithm>
 
 using namespace uhd;
 using namespace uhd::mpmd;
 
 namespace {
 
+//! Size of the chunks in which component files are uploaded (bytes)
+constexpr size_t MPMD_UPLOAD_CHUNK_SIZE = 1024 * 1024;
+
+/*! Upload a component file in chunks, so the device can write it to disk as it
+ * arrives instead of receiving it in one piece. If the device has an
+ * unfinished upload of the same file, it is resumed where it left off.
+ *
+ * \param metadata Metadata of the component file
+ * \param data Contents of the component file
+ * \param mb Reference to the actual device
+ */
+void _upload_component_file(const std::map<std::string, std::string>& metadata,
+    const std::vector<uint8_t>& data,
+    mpmd_mboard_impl* mb)
+{
+    const std::string filename = metadata.at("filename");
+    size_t offset = mb->rpc->request_with_token<size_t>("begin_upload", metadata);
+    while (offset < data.size()) {
+        const size_t chunk_size = std::min(MPMD_UPLOAD_CHUNK_SIZE, data.size() - offset);
+        const std::vector<uint8_t> chunk(
+            data.begin() + offset, data.begin() + offset + chunk_size);
+        offset = mb->rpc->request_with_token<size_t>(
+            "upload_chunk", filename, offset, chunk);
+    }
+    mb->rpc->request_with_token<std::string>(
+        MPMD_DEFAULT_INIT_TIMEOUT, "finish_upload", filename);
+}
+
 /*! Update a component using all required files. For example, when updating the FPGA image
  * (.bit or .bin), users can provide a new overlay image (DTS) to apply in addition.
  *
@@ -69,6 +98,15 @@ uhd::usrp::component_files_t _update_component(
         return all_comps_copy;
     }
 
+    // If the device supports it, upload the files in chunks first. They are
+    // then installed by passing empty data to update_component.
+    if (mb->rpc->request_with_token<bool>("supports_feature", "chunked_upload")) {
+        for (size_t i = 0; i < all_data.size(); i++) {
+            _upload_component_file(all_metadata[i], all_data[i], mb);
+            all_data[i].clear();
+        }
+    }
+
     // Now call update component
     mb->rpc->notify_with_token(
         MPMD_DEFAULT_INIT_TIMEOUT, "update_component", all_metadata, all_data);
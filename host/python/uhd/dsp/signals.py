@@ -72,3 +72,166 @@ def get_usrp_power(streamer, num_samps=1e6, chan=0):
         raise RuntimeError(
             "ERROR! get_usrp_power(): Did not receive the correct number of samples!")
     return get_power_dbfs(recv_buffer[chan])
+
+
+class RunningPower:
+    """
+    Numerically stable running mean and variance of a complex signal, with one
+    set of statistics per channel.
+
+    Blocks of samples are merged into the running statistics using the
+    parallel variant of Welford's algorithm, so the variance can be tracked
+    over an arbitrary number of samples without ever holding them all in
+    memory.
+    """
+    def __init__(self, num_chans=1):
+        self.num_chans = num_chans
+        self.reset()
+
+    def reset(self):
+        """
+        Forget all samples seen so far
+        """
+        self.count = 0
+        self._mean = numpy.zeros(self.num_chans, dtype=numpy.complex128)
+        self._m2 = numpy.zeros(self.num_chans, dtype=numpy.float64)
+
+    def update(self, block):
+        """
+        Add a block of samples. block must be of shape (num_chans, n).
+        """
+        block_count = block.shape[-1]
+        if not block_count:
+            return
+        block_mean = numpy.mean(block, axis=-1, dtype=numpy.complex128)
+        block_m2 = numpy.sum(
+            numpy.abs(block - block_mean[:, numpy.newaxis])**2,
+            axis=-1, dtype=numpy.float64)
+        total = self.count + block_count
+        delta = block_mean - self._mean
+        self._mean += delta * (block_count / total)
+        self._m2 += block_m2 + numpy.abs(delta)**2 * (self.count * block_count / total)
+        self.count = total
+
+    def get_mean(self):
+        """
+        Return the mean per channel (this is the DC component of the signal)
+        """
+        if not self.count:
+            raise RuntimeError("RunningPower: No samples were added!")
+        return self._mean.copy()
+
+    def get_variance(self):
+        """
+        Return the variance per channel (this is the power of the signal
+        without its DC component)
+        """
+        if not self.count:
+            raise RuntimeError("RunningPower: No samples were added!")
+        return self._m2 / self.count
+
+    def get_power_dbfs(self):
+        """
+        Return the power in dBFS per channel. This is the running equivalent of
+        get_power_dbfs().
+        """
+        return 10 * numpy.log10(self.get_variance())
+
+
+class PowerMeter:
+    """
+    Continuous power measurement on an RX streamer.
+
+    Unlike get_usrp_power(), this keeps the streamer running for as long as
+    measurements are being taken, so there is no stream start/stop latency per
+    estimate. Samples are received into a small, preallocated buffer and
+    merged into a RunningPower object, so the memory required does not grow
+    with the number of samples per estimate.
+
+    Example:
+    >>> with PowerMeter(streamer, num_samps=int(1e6)) as power_meter:
+    ...     power_dbfs = power_meter.get_power()
+    """
+    def __init__(self, streamer, num_samps=int(1e6), buffer_size=None):
+        """
+        Arguments:
+        streamer -- RX streamer. May have more than one channel.
+        num_samps -- Default number of samples per estimate
+        buffer_size -- Number of samples per channel to receive at a time.
+                       Defaults to the max number of samples per packet.
+        """
+        self._streamer = streamer
+        self.num_samps = int(num_samps)
+        self._num_chans = streamer.get_num_channels()
+        buffer_size = buffer_size or streamer.get_max_num_samps()
+        self._recv_buffer = numpy.zeros(
+            (self._num_chans, int(buffer_size)), dtype=numpy.complex64)
+        self._metadata = uhd.types.RXMetadata()
+        self._running_power = RunningPower(self._num_chans)
+        self._running = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        """
+        Start streaming (if we're not streaming already)
+        """
+        if self._running:
+            return
+        stream_cmd = uhd.types.StreamCMD(uhd.types.StreamMode.start_cont)
+        stream_cmd.stream_now = True
+        self._streamer.issue_stream_cmd(stream_cmd)
+        self._running = True
+
+    def stop(self):
+        """
+        Stop streaming and drop all samples that are still in flight
+        """
+        if not self._running:
+            return
+        self._streamer.issue_stream_cmd(
+            uhd.types.StreamCMD(uhd.types.StreamMode.stop_cont))
+        self._running = False
+        self.flush()
+
+    def flush(self):
+        """
+        Drop all samples that are already buffered, e.g., because they were
+        received before changing a setting that affects the power.
+        """
+        while self._streamer.recv(self._recv_buffer, self._metadata, 0.0) \
+                == self._recv_buffer.shape[1]:
+            pass
+
+    def get_power(self, num_samps=None, timeout=1.0):
+        """
+        Return the measured input power in dBFS, as an array with one value
+        per channel.
+
+        Arguments:
+        num_samps -- Number of samples to average over. Defaults to the value
+                     given in the constructor.
+        timeout -- Timeout for every call to recv()
+        """
+        num_samps = int(num_samps or self.num_samps)
+        self.start()
+        self._running_power.reset()
+        while self._running_power.count < num_samps:
+            samps_recvd = self._streamer.recv(
+                self._recv_buffer, self._metadata, timeout)
+            # An overflow only means that we didn't read fast enough. The
+            # samples we have are still good for a power estimate, so carry on.
+            if self._metadata.error_code not in (
+                    uhd.types.RXMetadataErrorCode.none,
+                    uhd.types.RXMetadataErrorCode.overflow):
+                raise RuntimeError(
+                    "ERROR! PowerMeter: Receive error: {}"
+                    .format(self._metadata.strerror()))
+            samps_used = min(samps_recvd, num_samps - self._running_power.count)
+            self._running_power.update(self._recv_buffer[:, :samps_used])
+        return self._running_power.get_power_dbfs()
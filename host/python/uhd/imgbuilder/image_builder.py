@@ -10,10 +10,14 @@ description or a GRC file into an rfnoc_image_core.v file.
 from collections import deque
 from collections import OrderedDict
 
+import copy
+import hashlib
 import logging
 import os
+import pickle
 import re
 import sys
+import tempfile
 
 import mako.lookup
 import mako.template
@@ -29,6 +33,15 @@ USRP3_LIB_RFNOC_DIR = os.path.join('usrp3', 'lib', 'rfnoc')
 # Subdirectory for the core YAML files
 RFNOC_CORE_DIR = os.path.join('rfnoc', 'core')
 
+# Directory with the Mako templates for the image core
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+# File name of the persistent block description cache (see BlockDescCache)
+BLOCK_DESC_CACHE_FILE = 'block_desc_cache.pickle'
+
+# Bump this whenever the format of the block description cache changes
+BLOCK_DESC_CACHE_VERSION = 1
+
 # Path to the system's bash executable
 BASH_EXECUTABLE = '/bin/bash' # FIXME this should come from somewhere
 
@@ -440,6 +453,96 @@ class ImageBuilderConfig:
                 logging.info("        %s", (io_port,))
             sys.exit(1)
 
+class BlockDescCache:
+    """
+    Cache for parsed YAML files.
+
+    Parsing YAML is the most expensive part of collecting the block
+    descriptions. This cache stores the parsed content of every file together
+    with its size, modification time and SHA256 hash. A file is only parsed
+    again if it was modified and its hash changed.
+
+    If cache_dir is given, the cache is loaded from and saved to a file in that
+    directory, so it persists across invocations. Otherwise, it only lives in
+    memory.
+
+    The cache also records the hash of every file it served (see
+    get_file_hashes()), which is used to decide if generated files are still
+    up to date.
+    """
+    def __init__(self, cache_dir=None):
+        self._cache_file = None
+        self._entries = {}
+        self._file_hashes = OrderedDict()
+        self._dirty = False
+        if cache_dir:
+            self._cache_file = os.path.join(cache_dir, BLOCK_DESC_CACHE_FILE)
+            self._load()
+
+    def _load(self):
+        """
+        Load cache entries from the cache file. A missing, unreadable or
+        outdated cache file is treated like an empty cache.
+        """
+        try:
+            with open(self._cache_file, "rb") as cache_file:
+                version, entries = pickle.load(cache_file)
+        except (IOError, OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return
+        if version == BLOCK_DESC_CACHE_VERSION:
+            self._entries = entries
+            logging.debug("Loaded %d cached YAML files from %s",
+                          len(entries), self._cache_file)
+
+    def save(self):
+        """
+        Write the cache to the cache file, if anything changed. The file is
+        replaced atomically, so concurrent invocations never see a partially
+        written cache.
+        """
+        if not self._cache_file or not self._dirty:
+            return
+        cache_dir = os.path.dirname(self._cache_file)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as cache_file:
+                pickle.dump((BLOCK_DESC_CACHE_VERSION, self._entries), cache_file)
+            os.replace(tmp_name, self._cache_file)
+            self._dirty = False
+        except (IOError, OSError) as ex:
+            logging.warning("Could not write block description cache %s: %s",
+                            self._cache_file, ex)
+
+    def load(self, filename):
+        """
+        Return the parsed content of the YAML file filename. The result is a
+        copy, so callers may modify it.
+        """
+        filename = os.path.abspath(filename)
+        stat = os.stat(filename)
+        entry = self._entries.get(filename)
+        if entry is None or entry[0] != (stat.st_size, stat.st_mtime_ns):
+            with open(filename, "rb") as stream:
+                content = stream.read()
+            file_hash = hashlib.sha256(content).hexdigest()
+            if entry is None or entry[1] != file_hash:
+                logging.debug("Parsing %s", filename)
+                entry = (None, file_hash, ordered_load(content.decode()))
+            entry = ((stat.st_size, stat.st_mtime_ns),) + entry[1:]
+            self._entries[filename] = entry
+            self._dirty = True
+        self._file_hashes[filename] = entry[1]
+        return copy.deepcopy(entry[2])
+
+    def get_file_hashes(self):
+        """
+        Return a dictionary of all files served by this cache, mapping the
+        absolute file name to its SHA256 hash.
+        """
+        return self._file_hashes
+
+
 def load_config(filename):
     """
     Loads yml configuration from filename.
@@ -600,29 +703,31 @@ def collect_module_paths(config_path, include_paths):
     return result
 
 
-def read_block_descriptions(signatures, *paths):
+def read_block_descriptions(signatures, *paths, cache=None):
     """
     Recursive search all pathes for block definitions.
     :param signatures: signature passed to IOConfig initialization
     :param paths: paths to be searched
+    :param cache: BlockDescCache to read the YAML files through. If None,
+                  all files are parsed.
     :return: dictionary of noc blocks. Key is filename of the block, value
              is an IOConfig object
     """
+    if cache is None:
+        cache = BlockDescCache()
     blocks = OrderedDict()
     for path in paths:
+        # os.walk() already descends into all subdirectories
         for root, dirs, files, in os.walk(path):
-            for filename in files:
+            dirs.sort()
+            for filename in sorted(files):
                 if re.match(r".*\.yml$", filename):
-                    with open(os.path.join(root, filename)) as stream:
-                        block = ordered_load(stream)
-                        if "schema" in block and \
-                                block["schema"] == "rfnoc_modtool_args":
-                            logging.info("Adding block description from "
-                                         "%s (%s).", filename, os.path.normpath(root))
-                            blocks[filename] = IOConfig(block, signatures)
-            for dirname in dirs:
-                blocks.update(read_block_descriptions(
-                    os.path.join(root, dirname)))
+                    block = cache.load(os.path.join(root, filename))
+                    if "schema" in block and \
+                            block["schema"] == "rfnoc_modtool_args":
+                        logging.info("Adding block description from "
+                                     "%s (%s).", filename, os.path.normpath(root))
+                        blocks[filename] = IOConfig(block, signatures)
     return blocks
 
 
@@ -684,7 +789,7 @@ def write_edges(config, destination):
                           ((dst[0] << 6) | dst[1])))
 
 
-def write_verilog(config, destination, source, source_hash):
+def write_verilog(config, destination, source, source_hash, generator_hash=None):
     """
     Generates rfnoc_image_core.v file for the device.
 
@@ -697,9 +802,11 @@ def write_verilog(config, destination, source, source_hash):
     :param destination: Filepath to write to
     :param source: Filepath to the image YAML/GRC to generate from
     :param source_hash: Source file hash value
+    :param generator_hash: Hash of all other generator inputs (see
+                           get_generator_hash())
     :return: None
     """
-    template_dir = os.path.join(os.path.dirname(__file__), "templates")
+    template_dir = TEMPLATE_DIR
     lookup = mako.lookup.TemplateLookup(directories=[template_dir])
     tpl_filename = os.path.join(template_dir, "rfnoc_image_core.v.mako")
     tpl = mako.template.Template(
@@ -712,6 +819,7 @@ def write_verilog(config, destination, source, source_hash):
             "config": config,
             "source": source,
             "source_hash": source_hash,
+            "generator_hash": generator_hash,
             })
     except:
         print(exceptions.text_error_template().render())
@@ -722,16 +830,18 @@ def write_verilog(config, destination, source, source_hash):
         image_core_file.write(block)
 
 
-def write_verilog_header(config, destination, source, source_hash):
+def write_verilog_header(config, destination, source, source_hash, generator_hash=None):
     """
     Generates rfnoc_image_core.vh file for the device.
     :param config: ImageBuilderConfig derived from script parameter
     :param destination: Filepath to write to
     :param source: Filepath to the image YAML/GRC to generate from
     :param source_hash: Source file hash value
+    :param generator_hash: Hash of all other generator inputs (see
+                           get_generator_hash())
     :return: None
     """
-    template_dir = os.path.join(os.path.dirname(__file__), "templates")
+    template_dir = TEMPLATE_DIR
     lookup = mako.lookup.TemplateLookup(directories=[template_dir])
     tpl_filename = os.path.join(template_dir, "rfnoc_image_core.vh.mako")
     tpl = mako.template.Template(
@@ -744,6 +854,7 @@ def write_verilog_header(config, destination, source, source_hash):
             "config": config,
             "source": source,
             "source_hash": source_hash,
+            "generator_hash": generator_hash,
             })
     except:
         print(exceptions.text_error_template().render())
@@ -754,6 +865,67 @@ def write_verilog_header(config, destination, source, source_hash):
         image_core_file.write(block)
 
 
+def get_generator_hash(device, image_core_name, file_hashes):
+    """
+    Return a hash of everything besides the image configuration itself that
+    goes into the generated files: The templates, this script, the core
+    configuration and block description files, and the device and image core
+    names.
+    :param device: device to build for
+    :param image_core_name: name of the image core
+    :param file_hashes: dictionary mapping file names to their SHA256 hash, as
+                        returned by BlockDescCache.get_file_hashes()
+    :return: SHA256 hash as hex string
+    """
+    generator_hash = hashlib.sha256()
+    generator_hash.update(repr((device, image_core_name)).encode())
+    generator_files = [os.path.abspath(__file__)]
+    for root, dirs, files in os.walk(TEMPLATE_DIR):
+        dirs.sort()
+        generator_files += [os.path.join(root, name) for name in sorted(files)
+                            if name.endswith(".mako")]
+    for filename in generator_files:
+        with open(filename, "rb") as generator_file:
+            generator_hash.update(generator_file.read())
+    for filename, file_hash in sorted(file_hashes.items()):
+        generator_hash.update(filename.encode())
+        generator_hash.update(file_hash.encode())
+    return generator_hash.hexdigest()
+
+
+def is_up_to_date(source_hash, generator_hash, edge_file, *generated_files):
+    """
+    Check if previously generated files can be reused. This is the case if all
+    files exist and the Verilog files were generated from the same source and
+    generator hashes.
+    :param source_hash: Source file hash value
+    :param generator_hash: Hash of all other generator inputs
+    :param edge_file: Path of the edge file
+    :param generated_files: Paths of the generated Verilog files
+    :return: True if all files are up to date
+    """
+    if not source_hash or not os.path.isfile(edge_file):
+        return False
+    expected = {
+        "// Source SHA256: {}".format(source_hash),
+        "// Generator SHA256: {}".format(generator_hash),
+    }
+    for filename in generated_files:
+        found = set()
+        try:
+            with open(filename) as generated_file:
+                # The hashes are part of the header comment
+                for line in generated_file:
+                    if not line.startswith("//"):
+                        break
+                    found.add(line.strip())
+        except (IOError, OSError):
+            return False
+        if not expected <= found:
+            return False
+    return True
+
+
 def write_build_env():
     """
     # TODO update Makefile entries according to used blocks
@@ -906,6 +1078,9 @@ def build_image(config, fpga_path, config_path, device, **args):
                    clean_all: passed to Makefile
                    GUI: passed to Makefile
                    include_paths: Paths to additional blocks
+                   cache_dir: Directory for the persistent block description
+                   cache (no persistent cache if None)
+                   force: Regenerate files even if they are up to date
     :return: Exit result of build process or 0 if generate-only is given.
     """
     logging.info("Selected device %s", device)
@@ -928,26 +1103,43 @@ def build_image(config, fpga_path, config_path, device, **args):
     device_conf = IOConfig(device_config(core_config_path, device),
                            signatures_conf)
 
+    cache = BlockDescCache(args.get('cache_dir'))
     block_paths = collect_module_paths(config_path, args.get('include_paths', []))
     logging.debug("Looking for block descriptors in:")
     for path in block_paths:
         logging.debug("    %s", os.path.normpath(path))
-    blocks = read_block_descriptions(signatures_conf, *block_paths)
+    blocks = read_block_descriptions(signatures_conf, *block_paths, cache=cache)
+    cache.save()
 
     builder_conf = ImageBuilderConfig(config, blocks, device_conf)
 
-    write_edges(builder_conf, edge_file)
-    write_verilog(
-        builder_conf,
-        image_core_path,
-        source=args.get('source'),
-        source_hash=args.get('source_hash'))
-    write_verilog_header(
-        builder_conf,
-        image_core_header_path,
-        source=args.get('source'),
-        source_hash=args.get('source_hash'))
-    write_build_env()
+    file_hashes = dict(cache.get_file_hashes())
+    for filename in ("io_signatures.yml", "%s_bsp.yml" % device.lower()):
+        filename = os.path.join(core_config_path, filename)
+        with open(filename, "rb") as config_file:
+            file_hashes[os.path.abspath(filename)] = \
+                hashlib.sha256(config_file.read()).hexdigest()
+    generator_hash = get_generator_hash(
+        device, args.get('image_core_name'), file_hashes)
+    if not args.get('force') and is_up_to_date(
+            args.get('source_hash'), generator_hash, edge_file,
+            image_core_path, image_core_header_path):
+        logging.info("Image core files are up to date, skipping generation")
+    else:
+        write_edges(builder_conf, edge_file)
+        write_verilog(
+            builder_conf,
+            image_core_path,
+            source=args.get('source'),
+            source_hash=args.get('source_hash'),
+            generator_hash=generator_hash)
+        write_verilog_header(
+            builder_conf,
+            image_core_header_path,
+            source=args.get('source'),
+            source_hash=args.get('source_hash'),
+            generator_hash=generator_hash)
+        write_build_env()
 
     if "generate_only" in args and args["generate_only"]:
         logging.info("Skip build (generate only option given)")
@@ -24,6 +24,9 @@
 % if source_hash:
 // Source SHA256: ${source_hash}
 % endif
+% if generator_hash:
+// Generator SHA256: ${generator_hash}
+% endif
 //
 
 `define CHDR_WIDTH     ${config.chdr_width}
@@ -25,6 +25,10 @@ class PowerMeterBase:
     Base class for measuring output power (Tx) of the USRP. That means the
     measurement device is receiving and the USRP (the DUT) is transmitting.
     """
+    # Set this to True if get_power() requires user interaction. Such devices
+    # are only read once per measurement point.
+    interactive = False
+
     def __init__(self, options):
         self._options = options
         self.power_offset = 0
@@ -116,6 +120,7 @@ class ManualPowerMeter(PowerMeterBase):
     manually make changes and return values
     """
     key = 'manual'
+    interactive = True
 
     def set_frequency(self, freq):
         """
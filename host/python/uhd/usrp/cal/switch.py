@@ -28,6 +28,27 @@ class SwitchBase:
         """
         raise NotImplementedError()
 
+    def connect_parallel(self, chans, antenna):
+        """
+        Connect the antenna port of all channels in chans to the measurement
+        device at the same time (e.g., through a splitter), so they can be
+        calibrated in parallel. Only switches for which supports_parallel()
+        returns True need to implement this.
+        :param chans: list of channels to connect
+        :param antenna: antenna to connect
+        """
+        if len(chans) == 1:
+            self.connect(chans[0], antenna)
+            return
+        raise NotImplementedError()
+
+    def supports_parallel(self):
+        """
+        Return True if this switch can connect more than one channel to the
+        measurement device at a time.
+        """
+        return False
+
 
 class ManualSwitch(SwitchBase):
     """
@@ -35,11 +56,15 @@ class ManualSwitch(SwitchBase):
     found. It asks the user to change cable setup and halts the calibration
     until the user confirms the configuration. If `mode=auto` is given in
     options connect call assumes there is no need to pause for connecting
-    measurement device with DUT (e.g. only one path is measured).
+    measurement device with DUT (e.g. only one path is measured). If
+    `parallel=1` is given, the user is asked to connect all channels at once
+    (e.g. through a splitter), which lets RX calibration measure them in
+    parallel.
     """
     def __init__(self, direction, options=None):
         self.direction = direction
         self.mode = options.get('mode', '')
+        self.parallel = options.get('parallel', '0') in ('1', 'true', 'yes')
 
     def connect(self, chan, antenna):
         """
@@ -56,6 +81,27 @@ class ManualSwitch(SwitchBase):
         input(f"[{self.direction}] Connect your {dev_type} to device channel {chan}, "
               f"antenna {antenna}. Then, hit Enter.")
 
+    def connect_parallel(self, chans, antenna):
+        """
+        Ask the user to connect all ports of the USRP denoted by chans and
+        antenna to the measurement device at the same time.
+        :param chans: list of channels to connect
+        :param antenna: antenna to connect
+        """
+        if self.mode == 'auto':
+            return # no need to wait for manual connection
+        dev_type = "signal generator" if self.direction == 'rx' else "power meter"
+        chan_list = ", ".join(str(chan) for chan in chans)
+        input(f"[{self.direction}] Connect your {dev_type} to device channels "
+              f"{chan_list}, antenna {antenna}, through a splitter. Then, hit Enter.")
+
+    def supports_parallel(self):
+        """
+        Return True if the user told us that all channels can be connected at
+        once.
+        """
+        return self.parallel
+
 class NISwitch(SwitchBase):
     """
     Use NI switch devices to automatically connect measurement devices with
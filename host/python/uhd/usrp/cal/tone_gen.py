@@ -7,9 +7,8 @@
 Provide a tone generator class for USRPs.
 """
 
-import threading
-import numpy
 import uhd
+from ..tx_engine import TxEngine
 
 class WaveformGenerator:
     """
@@ -19,14 +18,13 @@ class WaveformGenerator:
     def __init__(self, iq_data, streamer=None):
         self._buffer = iq_data
         self._streamer = streamer
-        self._run = False
-        self._thread = None
+        self._engine = None
 
     def set_streamer(self, streamer):
         """
         Update streamer object
         """
-        if self._run:
+        if self._engine is not None:
             self.stop()
         self._streamer = streamer
 
@@ -36,30 +34,19 @@ class WaveformGenerator:
         """
         if not self._streamer:
             raise RuntimeError("No streamer defined!")
-        self._run = True
-        self._thread = threading.Thread(target=self._worker)
-        self._thread.start()
-        self._thread.setName("cal_tx")
+        self._engine = TxEngine(self._streamer)
+        self._engine.start(self._buffer)
 
     def stop(self):
         """
         Stop the transmitter
         """
-        self._run = False
-        self._thread.join()
-        self._thread = None
-
-    def _worker(self):
-        """ Here is where the action happens """
-        metadata = uhd.types.TXMetadata()
-        while self._run:
-            # Give it a long-ish timeout so we don't have to throttle in here
-            if self._streamer.send(self._buffer, metadata, 1.0) != len(self._buffer):
-                print("WARNING: Failed to transmit entire buffer in ToneGenerator!")
-        # Send an EOB packet with a single zero-valued sample to close out TX
-        metadata.end_of_burst = True
-        self._streamer.send(
-            numpy.array([0], dtype=numpy.complex64), metadata, 0.1)
+        engine, self._engine = self._engine, None
+        engine.stop()
+        counters = engine.get_counters()
+        if counters['underflows']:
+            print("WARNING: {} underflows in WaveformGenerator!"
+                  .format(counters['underflows']))
 
 
 class ToneGenerator(WaveformGenerator):
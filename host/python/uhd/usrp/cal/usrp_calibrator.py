@@ -23,6 +23,12 @@ PWR_EST_LLIM = -20
 PWR_EST_IDEAL_LEVEL = -6
 PWR_EST_ULIM = -3
 SIGPWR_LOCK_MAX_ITER = 4
+# Settling detection: Rather than waiting a fixed amount of time after changing
+# gain or input power, we keep estimating the power on short blocks of samples
+# until two consecutive estimates agree to within PWR_SETTLING_TOLERANCE.
+NUM_SAMPS_PER_SETTLING_EST = int(1e5)
+PWR_SETTLING_TOLERANCE = 0.1 # dB
+PWR_SETTLING_MAX_ITER = 20
 
 # The default distance between frequencies at which we measure
 DEFAULT_FREQ_STEP = 10e6 # Hz
@@ -30,10 +36,11 @@ DEFAULT_SAMP_RATE = 5e6
 
 def get_streamer(usrp, direction, chan):
     """
-    Create an appropriate streamer object for this channel
+    Create an appropriate streamer object for this channel. chan may also be a
+    list of channels, in which case the streamer will contain all of them.
     """
     stream_args = uhd.usrp.StreamArgs('fc32', 'sc16')
-    stream_args.channels = [chan]
+    stream_args.channels = list(chan) if isinstance(chan, (list, tuple)) else [chan]
     return usrp.get_rx_stream(stream_args) if direction == 'rx' \
            else usrp.get_tx_stream(stream_args)
 
@@ -76,6 +83,76 @@ def subtract_power(p1_db, p2_db):
     """
     return 10 * numpy.log10(10**(p1_db/10) - 10**(p2_db/10))
 
+def in_est_window(power_db):
+    """
+    Return True if all power values (in dBFS) are within the limits of the
+    power estimation algorithm.
+    """
+    return bool(numpy.all((PWR_EST_LLIM <= numpy.asarray(power_db)) &
+                          (numpy.asarray(power_db) <= PWR_EST_ULIM)))
+
+
+class RxPowerMonitor:
+    """
+    Continuous power estimator for one or more RX channels.
+
+    Unlike get_usrp_power(), this keeps a single streamer running in
+    continuous mode for as long as the calibration is running (see
+    uhd.dsp.signals.PowerMeter). All channels of the streamer are measured
+    from the same block of samples, so they can be calibrated in parallel.
+    """
+    def __init__(self, usrp, chans):
+        self._power_meter = uhd.dsp.signals.PowerMeter(
+            get_streamer(usrp, 'rx', chans), num_samps=NUM_SAMPS_PER_EST)
+
+    def start(self):
+        """
+        Start streaming (if we're not streaming already)
+        """
+        self._power_meter.start()
+
+    def stop(self):
+        """
+        Stop streaming and drop all samples that are still in flight
+        """
+        self._power_meter.stop()
+
+    def flush(self):
+        """
+        Drop all samples that were received before the last change of gain or
+        input power.
+        """
+        self._power_meter.flush()
+
+    def get_power(self, num_samps=NUM_SAMPS_PER_EST):
+        """
+        Return the measured input power in dBFS, as an array with one value
+        per channel.
+        """
+        return self._power_meter.get_power(num_samps)
+
+    def get_settled_power(self, num_samps=NUM_SAMPS_PER_EST):
+        """
+        Return the measured input power in dBFS, per channel, once it has
+        settled.
+
+        Call this after changing gain or input power. Samples that were
+        received before the change are dropped, then the power is estimated on
+        short blocks until consecutive estimates agree on all channels. The
+        returned value is a full-length estimate taken after that.
+        """
+        self.flush()
+        last_power = self.get_power(NUM_SAMPS_PER_SETTLING_EST)
+        for _ in range(PWR_SETTLING_MAX_ITER):
+            power = self.get_power(NUM_SAMPS_PER_SETTLING_EST)
+            if numpy.max(numpy.abs(power - last_power)) <= PWR_SETTLING_TOLERANCE:
+                break
+            last_power = power
+        else:
+            print("WARNING: RX power did not settle within {} estimates!"
+                  .format(PWR_SETTLING_MAX_ITER))
+        return self.get_power(num_samps)
+
 ###############################################################################
 # Base Class
 ###############################################################################
@@ -104,13 +181,19 @@ class USRPCalibratorBase:
         self._mb_serial = usrp.get_usrp_rx_info(0).get('mboard_serial')
         # Littler helper to print stuff with a device ID prefix.
         self.log = lambda *args, **kwargs: print("[{}]".format(self._id), *args, **kwargs)
-        # Channel, antenna, and streamer will get updated in update_port()
+        # Channels, antenna, and streamer will get updated in update_port().
+        # _chan is the first (or only) channel in _chans.
         self._chan = None
+        self._chans = []
         self._ant = ""
         self._streamer = None
+        self._rx_monitor = None
         # These dictionaries store the results that get written out as well as
         # the noise floor for reference
-        self.results = {} # This must be of the form results[freq][gain] = power
+        # This must be of the form results[chan][freq][gain] = power
+        self.results = {}
+        # For RX, _noise[freq][gain] is an array with one value per channel in
+        # _chans. For TX, _noise[freq] is a scalar.
         self._noise = {}
         # The tone generator object is only needed for Tx measurements, and is
         # initialized conditionaly in init()
@@ -142,15 +225,38 @@ class USRPCalibratorBase:
         """
         Notify the device that we've switched channel and/or antenna.
         """
-        self.log("Switching to channel {}, antenna {}.".format(chan, antenna))
+        self.update_ports([chan], antenna)
+
+    def update_ports(self, chans, antenna):
+        """
+        Notify the device that we've switched channels and/or antenna.
+
+        For RX, more than one channel may be given if the signal generator is
+        connected to all of them at the same time (e.g., through a splitter).
+        All channels are then calibrated in parallel.
+        """
+        chans = list(chans)
+        if self._dir == 'tx' and len(chans) > 1:
+            raise ValueError("TX calibration can only measure one channel at a time!")
+        self.log("Switching to channel{} {}, antenna {}.".format(
+            "s" if len(chans) > 1 else "",
+            ", ".join(str(chan) for chan in chans),
+            antenna))
         self._ant = antenna
-        if chan != self._chan:
-            # This will be an RX streamer for RX power cal, and a TX streamer
-            # for TX power cal.
-            self._streamer = get_streamer(self._usrp, self._dir, chan)
-            if self._dir == 'tx':
+        if chans != self._chans:
+            # For RX power cal, we stream continuously using an RX power
+            # monitor. For TX power cal, we need a TX streamer.
+            if self._dir == 'rx':
+                if self._rx_monitor is not None:
+                    self._rx_monitor.stop()
+                # Release the old streamer before creating a new one
+                self._rx_monitor = None
+                self._rx_monitor = RxPowerMonitor(self._usrp, chans)
+            else:
+                self._streamer = get_streamer(self._usrp, self._dir, chans[0])
                 self._tone_gen.set_streamer(self._streamer)
-        self._chan = chan
+        self._chans = chans
+        self._chan = chans[0]
 
     def _get_frequencies(self, start_hint=None, stop_hint=None, step_hint=None):
         """
@@ -200,13 +306,15 @@ class USRPCalibratorBase:
             for freq in freqs:
                 self._noise[freq] = {}
                 tune_req = uhd.types.TuneRequest(freq)
-                self._usrp.set_rx_freq(tune_req, self._chan)
+                for chan in self._chans:
+                    self._usrp.set_rx_freq(tune_req, chan)
                 time.sleep(self.tune_settling_time)
                 for gain in self._gains:
-                    self._usrp.set_rx_gain(gain, self._chan)
-                    self._noise[freq][gain] = get_usrp_power(self._streamer)
-                    print("[RX] Noise floor: {:7.2f} MHz / {} dB => {:+6.2f} dBFS"
-                          .format(freq/1e6, gain, self._noise[freq][gain]))
+                    self._set_rx_gain(gain, self._chans)
+                    self._noise[freq][gain] = self._rx_monitor.get_settled_power()
+                    print("[RX] Noise floor: {:7.2f} MHz / {} dB => {} dBFS"
+                          .format(freq/1e6, gain,
+                                  self._format_power(self._noise[freq][gain])))
         return freqs
 
     def start(self):
@@ -226,36 +334,57 @@ class USRPCalibratorBase:
             self._tone_gen.stop()
         else:
             self._meas_dev.enable(False)
+            self._rx_monitor.stop()
         if store:
             self.store()
 
+    def _set_rx_gain(self, gain, chans):
+        """
+        Set the RX gain on all given channels
+        """
+        for chan in chans:
+            self._usrp.set_rx_gain(gain, chan)
+
+    @staticmethod
+    def _format_power(power):
+        """
+        Format an array of power values (one per channel) for printing
+        """
+        return ", ".join("{:+6.2f}".format(pwr) for pwr in numpy.atleast_1d(power))
+
     def run_rx_cal(self, freq):
         """
         Run the actual RX calibration for this frequency.
+
+        All channels in _chans are calibrated at the same time. The signal
+        generator power is locked in such that the strongest channel is at the
+        ideal level; channels are dropped from the measurement once their
+        signal approaches the noise floor.
         """
+        chans = self._chans
         # Go to highest gain, lock in signal generator
-        self._usrp.set_rx_gain(max(self._gains), self._chan)
-        time.sleep(0.1) # Settling time of the USRP, highly conservative
+        self._set_rx_gain(max(self._gains), chans)
         self.log("Locking in signal generator power...")
         self.log("Requesting input power: {:+.2f} dBm."
                  .format(self.min_detectable_signal))
         usrp_input_power = self._meas_dev.set_power(self.min_detectable_signal)
-        recvd_power = get_usrp_power(self._streamer)
-        self.log("Got input power: {:+.2f} dBm. Received power: {:.2f} dBFS. "
+        recvd_power = self._rx_monitor.get_settled_power()
+        power_delta = PWR_EST_IDEAL_LEVEL - numpy.max(recvd_power)
+        self.log("Got input power: {:+.2f} dBm. Received power: {} dBFS. "
                  "Requesting new input power: {:+.2f} dBm."
                  .format(usrp_input_power,
-                         recvd_power,
-                         usrp_input_power + PWR_EST_IDEAL_LEVEL - recvd_power))
-        usrp_input_power = self._meas_dev.set_power(
-            usrp_input_power + PWR_EST_IDEAL_LEVEL - recvd_power)
+                         self._format_power(recvd_power),
+                         usrp_input_power + power_delta))
+        usrp_input_power = self._meas_dev.set_power(usrp_input_power + power_delta)
         siggen_locked = False
         for _ in range(SIGPWR_LOCK_MAX_ITER):
-            recvd_power = get_usrp_power(self._streamer)
-            if PWR_EST_LLIM <= recvd_power <= PWR_EST_ULIM:
+            recvd_power = self._rx_monitor.get_settled_power()
+            if in_est_window(recvd_power):
                 siggen_locked = True
                 break
-            self.log("Receiving input power: {:+.2f} dBFS.".format(recvd_power))
-            power_delta = PWR_EST_IDEAL_LEVEL - recvd_power
+            self.log("Receiving input power: {} dBFS."
+                     .format(self._format_power(recvd_power)))
+            power_delta = PWR_EST_IDEAL_LEVEL - numpy.max(recvd_power)
             # Update power output by the delta from the desired input value:
             self.log("Requesting input power: {:+.2f} dBm."
                      .format(usrp_input_power + power_delta))
@@ -267,38 +396,45 @@ class USRPCalibratorBase:
         self.log("Locked signal generator in at input power level: {:+6.2f} dBm."
                  .format(usrp_input_power))
         # Now iterate through gains
-        results = {}
+        results = {chan: {} for chan in chans}
+        # These are the indices (into chans) of the channels we're still measuring
+        active = list(range(len(chans)))
         # Gains are in decreasing order!
         last_gain = self._gains[0]
         for gain in self._gains:
-            self._usrp.set_rx_gain(gain, self._chan) # Set the new gain
+            active_chans = [chans[idx] for idx in active]
+            self._set_rx_gain(gain, active_chans) # Set the new gain
             self.log("Set gain to: {} dB. Got gain: {} dB."
-                     .format(gain, self._usrp.get_rx_gain(self._chan)))
-            time.sleep(0.1) # Settling time of the USRP, highly conservative
+                     .format(gain, ", ".join(
+                         str(self._usrp.get_rx_gain(chan)) for chan in active_chans)))
             gain_delta = last_gain - gain # This is our gain step
+            last_gain = gain
             if gain_delta:
                 # If we decrease the device gain, we need to crank up the input
                 # power
                 usrp_input_power = self._meas_dev.set_power(
                     min(usrp_input_power + gain_delta, self.max_input_power))
-                # usrp_input_power = self._meas_dev.set_power(usrp_input_power + gain_delta)
                 self.log("New input power is: {:+.2f} dBm".format(usrp_input_power))
-            recvd_power = get_usrp_power(self._streamer)
-            self.log("Received power: {:.2f} dBFS".format(recvd_power))
+            # No need to wait for the new gain: get_settled_power() takes care
+            # of that.
+            recvd_power = self._rx_monitor.get_settled_power()[active]
+            self.log("Received power: {} dBFS".format(self._format_power(recvd_power)))
             # It's possible that we lose the lock on the signal power, so allow
             # for a correction
-            if not PWR_EST_LLIM <= recvd_power <= PWR_EST_ULIM:
-                power_delta = PWR_EST_IDEAL_LEVEL - recvd_power
+            if not in_est_window(recvd_power):
+                power_delta = PWR_EST_IDEAL_LEVEL - numpy.max(recvd_power)
                 self.log("Adapting input power to: {:+.2f} dBm."
                          .format(usrp_input_power + power_delta))
                 usrp_input_power = self._meas_dev.set_power(usrp_input_power + power_delta)
                 self.log("New input power is: {:+.2f} dBm".format(usrp_input_power))
                 # And then of course, measure again
-                recvd_power = get_usrp_power(self._streamer)
-                self.log("Received power: {:.2f} dBFS".format(recvd_power))
+                recvd_power = self._rx_monitor.get_settled_power()[active]
+                self.log("Received power: {} dBFS"
+                         .format(self._format_power(recvd_power)))
+            noise_power = self._noise[freq][gain][active]
             # Note: The noise power should be way down there, and really
             # shouldn't matter. We subtract it anyway for formal correctness.
-            recvd_signal_power = subtract_power(recvd_power, self._noise[freq][gain])
+            recvd_signal_power = subtract_power(recvd_power, noise_power)
             # A note on the following equation: 'recvd_signal_power' is in dBFS,
             # and usrp_input_power is in dBm. However, this is the reference
             # signal, so we need the power (in dBm) that corresponds to 0 dBFS.
@@ -306,13 +442,45 @@ class USRPCalibratorBase:
             # want is usrp_input_power - (recvd_signal_power - 0dBFS), and the
             # result of the equation is in dBm again. We omit the subtract-by-zero
             # since our variables don't have units.
-            results[gain] = usrp_input_power - recvd_signal_power
-            self.log(f"{gain:4.2f} dB => {results[gain]:+6.2f} dBm")
-            # If we get too close to the noise floor, we stop
-            if recvd_power - self._noise[freq][gain] <= 1.5:
-                self.log("Can no longer detect input signal. Terminating.")
+            for chan, signal_power in zip(active_chans, recvd_signal_power):
+                results[chan][gain] = usrp_input_power - signal_power
+                self.log(f"Channel {chan}: {gain:4.2f} dB => "
+                         f"{results[chan][gain]:+6.2f} dBm")
+            # If we get too close to the noise floor, we stop measuring that
+            # channel
+            still_active = []
+            for idx, pwr, noise in zip(active, recvd_power, noise_power):
+                if pwr - noise <= 1.5:
+                    self.log("Can no longer detect input signal on channel {}."
+                             .format(chans[idx]))
+                else:
+                    still_active.append(idx)
+            active = still_active
+            if not active:
+                self.log("Terminating.")
                 break
-        self.results[freq] = results
+        for chan in chans:
+            self.results.setdefault(chan, {})[freq] = results[chan]
+
+    def _get_settled_tx_power(self):
+        """
+        Return the power measured by the power meter once it has settled.
+
+        Instead of waiting a fixed time after a gain change, we keep reading
+        the power meter until two consecutive readings agree. Interactive
+        power meters only get asked once.
+        """
+        power = self._meas_dev.get_power()
+        if self._meas_dev.interactive:
+            return power
+        for _ in range(PWR_SETTLING_MAX_ITER):
+            last_power = power
+            power = self._meas_dev.get_power()
+            if abs(power - last_power) <= PWR_SETTLING_TOLERANCE:
+                return power
+        self.log("WARNING: TX power did not settle within {} readings!"
+                 .format(PWR_SETTLING_MAX_ITER))
+        return power
 
     def run_tx_cal(self, freq):
         """
@@ -321,31 +489,33 @@ class USRPCalibratorBase:
         results = {}
         for gain in self._gains:
             self._usrp.set_tx_gain(gain, self._chan)
-            time.sleep(0.1) # Settling time of the USRP, highly conservative
-            results[gain] = self._meas_dev.get_power()
+            results[gain] = self._get_settled_tx_power()
             self.log(f"{gain:4.2f} dB => {results[gain]:+6.2f} dBm")
-        self.results[freq] = results
+        self.results.setdefault(self._chan, {})[freq] = results
 
     def store(self):
         """
-        Return the results object
-        """
-        chan_info = getattr(self._usrp, "get_usrp_{}_info".format(self._dir))(self._chan)
-        cal_key = chan_info.get("{}_ref_power_key".format(self._dir))
-        cal_serial = chan_info.get("{}_ref_power_serial".format(self._dir))
-        cal_data = uhd.usrp.cal.PwrCal(self.cal_name, cal_serial, int(time.time()))
-        if self.temp:
-            cal_data.set_temperature(self.temp)
-        if self.ref_gain:
-            cal_data.set_ref_gain(self.ref_gain)
-        for freq, results in self.results.items():
-            max_power = max(results.values())
-            min_power = min(results.values())
-            cal_data.add_power_table(results, min_power, max_power, freq)
-        database.write_cal_data(
-            cal_key,
-            cal_serial,
-            cal_data.serialize())
+        Write the results of all channels to the calibration database
+        """
+        for chan, chan_results in self.results.items():
+            chan_info = getattr(self._usrp, "get_usrp_{}_info".format(self._dir))(chan)
+            cal_key = chan_info.get("{}_ref_power_key".format(self._dir))
+            cal_serial = chan_info.get("{}_ref_power_serial".format(self._dir))
+            cal_data = uhd.usrp.cal.PwrCal(self.cal_name, cal_serial, int(time.time()))
+            if self.temp:
+                cal_data.set_temperature(self.temp)
+            if self.ref_gain:
+                cal_data.set_ref_gain(self.ref_gain)
+            for freq, results in chan_results.items():
+                if not results:
+                    continue
+                max_power = max(results.values())
+                min_power = min(results.values())
+                cal_data.add_power_table(results, min_power, max_power, freq)
+            database.write_cal_data(
+                cal_key,
+                cal_serial,
+                cal_data.serialize())
         self.results = {}
 
 class B200Calibrator(USRPCalibratorBase):
@@ -9,6 +9,7 @@ Python UHD module containing the MultiUSRP and other objects
 
 import numpy as np
 from .. import libpyuhd as lib
+from .tx_engine import TxEngine
 
 
 def _get_mpm_client(token, mb_args):
@@ -36,6 +37,76 @@ class MultiUSRP(lib.usrp.multi_usrp):
                 self.get_tree().access_device_addr("/mboards/0/args").get().to_dict()
             setattr(self, 'get_mpm_client', lambda: _get_mpm_client(token, mb_args))
 
+    def _config_rx(self, freq, rate, channels, gain):
+        """
+        Apply rate, frequency, and gain to all RX channels
+        """
+        for chan in channels:
+            super(MultiUSRP, self).set_rx_rate(rate, chan)
+            super(MultiUSRP, self).set_rx_freq(lib.types.tune_request(freq), chan)
+            super(MultiUSRP, self).set_rx_gain(gain, chan)
+
+    def _get_rx_streamer(self, streamer, channels):
+        """
+        Return streamer, or create an fc32 RX streamer if it is None
+        """
+        if streamer is None:
+            st_args = lib.usrp.stream_args("fc32", "sc16")
+            st_args.channels = channels
+            streamer = super(MultiUSRP, self).get_rx_stream(st_args)
+        return streamer
+
+    def _start_rx_stream(self, streamer, channels, start_time):
+        """
+        Issue the start-stream command.
+        """
+        stream_cmd = lib.types.stream_cmd(lib.types.stream_mode.start_cont)
+        stream_cmd.stream_now = (len(channels) == 1) and start_time is None
+        if not stream_cmd.stream_now:
+            if start_time is not None:
+                stream_cmd.time_spec = start_time
+            else:
+                stream_cmd.time_spec = lib.types.time_spec(
+                    super(MultiUSRP, self).get_time_now().get_real_secs() + 0.05)
+        streamer.issue_stream_cmd(stream_cmd)
+
+    @staticmethod
+    def _stop_rx_stream(streamer):
+        """
+        Issue the stop-stream command and flush the queue.
+        """
+        metadata = lib.types.rx_metadata()
+        stream_cmd = lib.types.stream_cmd(lib.types.stream_mode.stop_cont)
+        streamer.issue_stream_cmd(stream_cmd)
+        flush_buffer = np.zeros(
+            (streamer.get_num_channels(), streamer.get_max_num_samps()),
+            dtype=np.complex64)
+        while streamer.recv(flush_buffer, metadata):
+            pass
+
+    @staticmethod
+    def _recv_into(streamer, buffer, metadata, chunk_size):
+        """
+        Fill buffer, which must be of shape (num_channels, num_samps), with
+        samples from a running streamer.
+
+        The streamer writes straight into views of buffer, so there is no
+        intermediate copy. buffer may also be a numpy.memmap, in which case the
+        samples go straight to the file. chunk_size limits the number of
+        samples received per call to recv(), which keeps this responsive to
+        Ctrl-C for long captures.
+        """
+        num_samps = buffer.shape[-1]
+        recv_samps = 0
+        while recv_samps < num_samps:
+            samps = streamer.recv(
+                buffer[:, recv_samps:min(recv_samps + chunk_size, num_samps)],
+                metadata)
+            if metadata.error_code != lib.types.rx_metadata_error_code.none:
+                print(metadata.strerror())
+            recv_samps += samps
+        return buffer
+
     def recv_num_samps(self,
                        num_samps,
                        freq,
@@ -43,7 +114,8 @@ class MultiUSRP(lib.usrp.multi_usrp):
                        channels=(0,),
                        gain=10,
                        start_time=None,
-                       streamer=None):
+                       streamer=None,
+                       out=None):
         """
         RX a finite number of samples from the USRP
 
@@ -61,70 +133,84 @@ class MultiUSRP(lib.usrp.multi_usrp):
                            None, then streaming starts immediately.
         :param streamer: An RX streamer object. If None, this function will create
                          one locally and attempt to destroy it afterwards.
+        :param out: An optional complex64 array of shape
+                    (len(channels), num_samps) to receive into, e.g., a
+                    numpy.memmap to capture straight to a file. If None, a new
+                    array is allocated.
         :return: numpy array of complex floating-point samples (fc32)
         """
-        def _config_streamer(streamer):
-            """
-            Set up the correct streamer
-            """
-            if streamer is None:
-                st_args = lib.usrp.stream_args("fc32", "sc16")
-                st_args.channels = channels
-                streamer = super(MultiUSRP, self).get_rx_stream(st_args)
-            return streamer
-        def _start_stream(streamer):
-            """
-            Issue the start-stream command.
-            """
-            stream_cmd = lib.types.stream_cmd(lib.types.stream_mode.start_cont)
-            stream_cmd.stream_now = (len(channels) == 1) and start_time is None
-            if not stream_cmd.stream_now:
-                if start_time is not None:
-                    stream_cmd.time_spec = start_time
-                else:
-                    stream_cmd.time_spec = lib.types.time_spec(
-                        super(MultiUSRP, self).get_time_now().get_real_secs() + 0.05)
-            streamer.issue_stream_cmd(stream_cmd)
-        def _stop_stream(streamer):
-            """
-            Issue the stop-stream command and flush the queue.
-            """
-            metadata = lib.types.rx_metadata()
-            stream_cmd = lib.types.stream_cmd(lib.types.stream_mode.stop_cont)
-            streamer.issue_stream_cmd(stream_cmd)
-            while streamer.recv(recv_buffer, metadata):
-                pass
+        if out is None:
+            out = np.empty((len(channels), num_samps), dtype=np.complex64)
+        elif out.shape != (len(channels), num_samps) or out.dtype != np.complex64:
+            raise ValueError(
+                "recv_num_samps(): out must be a complex64 array of shape {}!"
+                .format((len(channels), num_samps)))
         ## And go!
-        # Configure USRP
-        for chan in channels:
-            super(MultiUSRP, self).set_rx_rate(rate, chan)
-            super(MultiUSRP, self).set_rx_freq(lib.types.tune_request(freq), chan)
-            super(MultiUSRP, self).set_rx_gain(gain, chan)
-        # Configure streamer
-        streamer = _config_streamer(streamer)
+        self._config_rx(freq, rate, channels, gain)
+        streamer = self._get_rx_streamer(streamer, channels)
         metadata = lib.types.rx_metadata()
-        # Set up buffers and counters
-        result = np.empty((len(channels), num_samps), dtype=np.complex64)
-        recv_buffer = np.zeros(
-            (len(channels), streamer.get_max_num_samps()), dtype=np.complex64)
-        recv_samps = 0
-        samps = 0
+        # Receive up to 100 ms worth of samples per call to recv()
+        chunk_size = max(streamer.get_max_num_samps(), int(rate / 10))
         # Now stream
-        _start_stream(streamer)
-        while recv_samps < num_samps:
-            samps = streamer.recv(recv_buffer, metadata)
-            if metadata.error_code != lib.types.rx_metadata_error_code.none:
-                print(metadata.strerror())
-            if samps:
-                real_samps = min(num_samps - recv_samps, samps)
-                result[:, recv_samps:recv_samps + real_samps] = \
-                        recv_buffer[:, 0:real_samps]
-                recv_samps += real_samps
-        # Stop and clean up
-        _stop_stream(streamer)
-        # Help the garbage collection
-        streamer = None
-        return result
+        self._start_rx_stream(streamer, channels, start_time)
+        try:
+            self._recv_into(streamer, out, metadata, chunk_size)
+        finally:
+            # Stop and clean up
+            self._stop_rx_stream(streamer)
+            # Help the garbage collection
+            streamer = None
+        return out
+
+    def recv_blocks(self,
+                    block_size,
+                    freq,
+                    rate=1e6,
+                    channels=(0,),
+                    gain=10,
+                    num_blocks=None,
+                    start_time=None,
+                    streamer=None):
+        """
+        RX samples from the USRP in blocks of a fixed size
+
+        This is a generator: Streaming starts with the first block that is
+        requested, and stops once num_blocks blocks were yielded, or when the
+        generator is closed. The memory required is independent of the
+        duration of the capture.
+
+        Example:
+        >>> for block in usrp.recv_blocks(10000, 1e9, num_blocks=100):
+        ...     out_file.write(block.tobytes())
+
+        :param block_size: number of samples per channel and block
+        :param freq: RX frequency (Hz)
+        :param rate: RX sample rate (Hz)
+        :param channels: list of channels to RX on
+        :param gain: RX gain (dB)
+        :param num_blocks: number of blocks to RX. If None, keep receiving until
+                           the generator is closed.
+        :param start_time: A valid TimeSpec object with the starting time. If
+                           None, then streaming starts immediately.
+        :param streamer: An RX streamer object. If None, this function will create
+                         one locally and attempt to destroy it afterwards.
+        :return: yields numpy arrays of shape (len(channels), block_size). The
+                 same array is reused for every block, so copy it if it needs
+                 to outlive the next iteration.
+        """
+        self._config_rx(freq, rate, channels, gain)
+        streamer = self._get_rx_streamer(streamer, channels)
+        metadata = lib.types.rx_metadata()
+        block = np.empty((len(channels), block_size), dtype=np.complex64)
+        self._start_rx_stream(streamer, channels, start_time)
+        try:
+            num_recvd_blocks = 0
+            while num_blocks is None or num_recvd_blocks < num_blocks:
+                yield self._recv_into(streamer, block, metadata, block_size)
+                num_recvd_blocks += 1
+        finally:
+            self._stop_rx_stream(streamer)
+            streamer = None
 
     def send_waveform(self,
                       waveform_proto,
@@ -134,7 +220,8 @@ class MultiUSRP(lib.usrp.multi_usrp):
                       channels=(0,),
                       gain=10,
                       start_time=None,
-                      streamer=None):
+                      streamer=None,
+                      burst_size=None):
         """
         TX a finite number of samples from the USRP
         :param waveform_proto: numpy array of samples to TX
@@ -147,6 +234,9 @@ class MultiUSRP(lib.usrp.multi_usrp):
                            None, then streaming starts immediately.
         :param streamer: A TX streamer object. If None, this function will create
                          one locally and attempt to destroy it afterwards.
+        :param burst_size: Number of samples per call to send(). The waveform is
+                           repeated until it is at least this long. See TxEngine
+                           for the default.
         :return: the number of transmitted samples
         """
         def _config_streamer(streamer):
@@ -166,34 +256,15 @@ class MultiUSRP(lib.usrp.multi_usrp):
 
         # Configure streamer
         streamer = _config_streamer(streamer)
-        # Set up buffers and counters
-        buffer_samps = streamer.get_max_num_samps()
-        proto_len = waveform_proto.shape[-1]
-        if proto_len < buffer_samps:
-            waveform_proto = np.tile(waveform_proto,
-                                     (1, int(np.ceil(float(buffer_samps)/proto_len))))
-            proto_len = waveform_proto.shape[-1]
-        send_samps = 0
         max_samps = int(np.floor(duration * rate))
-        if len(waveform_proto.shape) == 1:
-            waveform_proto = waveform_proto.reshape(1, waveform_proto.size)
-        if waveform_proto.shape[0] < len(channels):
-            waveform_proto = np.tile(waveform_proto[0], (len(channels), 1))
-        # Now stream
-        metadata = lib.types.tx_metadata()
-        if start_time is not None:
-            metadata.time_spec = start_time
-        while send_samps < max_samps:
-            real_samps = min(proto_len, max_samps-send_samps)
-            if real_samps < proto_len:
-                print(waveform_proto[:, :real_samps])
-                samples = streamer.send(waveform_proto[:, :real_samps], metadata)
-            else:
-                samples = streamer.send(waveform_proto, metadata)
-            send_samps += samples
-        # Send EOB to terminate Tx
-        metadata.end_of_burst = True
-        streamer.send(np.zeros((len(channels), 1), dtype=np.complex64), metadata)
+        # Now stream. The TX engine sends from its own thread, so we only need
+        # to wait for it to finish.
+        engine = TxEngine(streamer, burst_size=burst_size)
+        engine.start(waveform_proto, num_samps=max_samps, start_time=start_time)
+        try:
+            engine.wait()
+        finally:
+            engine.stop()
         # Help the garbage collection
         streamer = None
-        return send_samps
+        return engine.get_counters()['samps_sent']
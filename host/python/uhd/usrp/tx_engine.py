@@ -0,0 +1,318 @@
+#
+# Copyright 2026 Ettus Research, a National Instruments Brand
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+""" @package usrp
+Threaded TX engine for Python applications
+"""
+
+import queue
+import threading
+import time
+import numpy as np
+from .. import libpyuhd as lib
+
+# Number of packets worth of samples per call to send(), unless the user asks
+# for something else. Larger bursts mean fewer calls into UHD per second.
+DEFAULT_PACKETS_PER_BURST = 32
+# Time to wait for the ACK of the final burst after the end-of-burst was sent
+BURST_ACK_TIMEOUT = 1.0
+
+def tile_waveform(waveform, num_chans, burst_size):
+    """
+    Return waveform as a C-contiguous complex64 array of shape
+    (num_chans, N), where N is the smallest multiple of the waveform length
+    that is at least burst_size. Repeating the result is thus equivalent to
+    repeating the original waveform.
+
+    If waveform has fewer rows than num_chans, its first row is used for all
+    channels.
+    """
+    waveform = np.asarray(waveform, dtype=np.complex64)
+    if waveform.ndim == 1:
+        waveform = waveform.reshape(1, waveform.size)
+    if waveform.shape[0] < num_chans:
+        waveform = np.tile(waveform[0], (num_chans, 1))
+    proto_len = waveform.shape[-1]
+    if not proto_len:
+        raise ValueError("Cannot transmit an empty waveform!")
+    reps = max(int(np.ceil(float(burst_size) / proto_len)), 1)
+    return np.ascontiguousarray(np.tile(waveform[:num_chans], (1, reps)))
+
+
+class TxEngine:
+    """
+    Transmit from a dedicated thread, so Python applications can keep a TX
+    streamer fed at full rate.
+
+    The engine runs in one of two modes:
+    - Waveform mode: start(waveform) repeats a waveform until num_samps samples
+      were sent, or until stop() is called. The waveform is pre-tiled to
+      burst_size samples, so every call to send() moves a large, constant
+      amount of data.
+    - Queue mode: start() without a waveform transmits the buffers passed to
+      submit(), in order. The queue holds num_buffers buffers (two means
+      double-buffering: one buffer is being sent while the next one is
+      prepared).
+
+    A second thread reads async messages from the streamer, and counts
+    underflows, sequence errors, and time errors. It keeps running after the
+    end-of-burst was sent, until the burst is acknowledged (or for at most
+    BURST_ACK_TIMEOUT seconds), so the counters include the events of the
+    whole burst. get_counters() returns a snapshot of all counters while the
+    engine is running.
+
+    If the send thread raises an exception, wait() and stop() re-raise it.
+
+    Example:
+    >>> engine = TxEngine(streamer)
+    >>> engine.start(tone, num_samps=int(10e6))
+    >>> engine.wait()
+    >>> print(engine.get_counters())
+    """
+    def __init__(self, streamer, burst_size=None, num_buffers=2, send_timeout=1.0):
+        """
+        Arguments:
+        streamer -- TX streamer
+        burst_size -- Minimum number of samples per channel for every call to
+                      send() in waveform mode. Defaults to
+                      DEFAULT_PACKETS_PER_BURST packets.
+        num_buffers -- Depth of the queue in queue mode
+        send_timeout -- Timeout for every call to send()
+        """
+        self._streamer = streamer
+        self._num_chans = streamer.get_num_channels()
+        self.burst_size = \
+            burst_size or streamer.get_max_num_samps() * DEFAULT_PACKETS_PER_BURST
+        self._send_timeout = send_timeout
+        self._queue = queue.Queue(maxsize=num_buffers)
+        self._stop_event = threading.Event()
+        self._send_thread = None
+        self._async_thread = None
+        self._send_error = None
+        self._eob_sent = threading.Event()
+        self._waveform = None
+        self._num_samps = None
+        self._counters_lock = threading.Lock()
+        self._counters = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        with self._counters_lock:
+            self._counters = {
+                'samps_sent': 0,
+                'sends': 0,
+                'send_timeouts': 0,
+                'bursts_acked': 0,
+                'underflows': 0,
+                'seq_errors': 0,
+                'time_errors': 0,
+            }
+
+    def _inc(self, counter, value=1):
+        with self._counters_lock:
+            self._counters[counter] += value
+
+    def get_counters(self):
+        """
+        Return a snapshot of the counters as a dictionary
+        """
+        with self._counters_lock:
+            return dict(self._counters)
+
+    def is_running(self):
+        """
+        Return True if the send thread is still running
+        """
+        return self._send_thread is not None and self._send_thread.is_alive()
+
+    def start(self, waveform=None, num_samps=None, start_time=None):
+        """
+        Start transmitting.
+
+        :param waveform: Waveform to repeat (1D, or one row per channel). If
+                         None, transmit the buffers passed to submit().
+        :param num_samps: Number of samples per channel to transmit in
+                          waveform mode. If None, transmit until stop() is
+                          called.
+        :param start_time: A valid TimeSpec object with the starting time. If
+                           None, then streaming starts immediately.
+        """
+        if self.is_running():
+            raise RuntimeError("TxEngine is already running!")
+        self._waveform = None if waveform is None else \
+            tile_waveform(waveform, self._num_chans, self.burst_size)
+        self._num_samps = num_samps
+        self._stop_event.clear()
+        self._eob_sent.clear()
+        self._send_error = None
+        self._reset_counters()
+        self._send_thread = threading.Thread(
+            target=self._send_worker, args=(start_time,), name="tx_engine_send")
+        self._async_thread = threading.Thread(
+            target=self._async_worker, name="tx_engine_async")
+        self._send_thread.start()
+        self._async_thread.start()
+
+    def submit(self, samples, timeout=None):
+        """
+        Queue a buffer for transmission (queue mode only). Blocks while the
+        queue is full.
+
+        :param samples: complex64 samples, 1D or of shape (num_channels, N)
+        :param timeout: Max. time to wait for space in the queue. If None,
+                        wait forever.
+        :return: True if the buffer was queued, False on timeout
+        """
+        try:
+            self._queue.put(samples, timeout=timeout)
+        except queue.Full:
+            return False
+        return True
+
+    def finish(self):
+        """
+        Signal that no more buffers will be submitted (queue mode only). The
+        engine terminates the burst once all queued buffers were sent.
+        """
+        self._queue.put(None)
+
+    def wait(self, timeout=None):
+        """
+        Wait for transmission to complete, i.e., until num_samps samples were
+        sent in waveform mode, or until all buffers were sent after finish() in
+        queue mode.
+
+        :return: True if transmission is complete
+        :raises: The exception raised by the send thread, if any
+        """
+        if self._send_thread is not None:
+            self._send_thread.join(timeout)
+            if self._send_thread.is_alive():
+                return False
+        self._join_async_thread()
+        self._raise_send_error()
+        return True
+
+    def stop(self):
+        """
+        Stop transmitting, terminate the burst, and wait for all threads to
+        finish. Buffers that are still queued are dropped.
+
+        :raises: The exception raised by the send thread, if any
+        """
+        self._stop_event.set()
+        if self._send_thread is not None:
+            self._send_thread.join()
+        self._join_async_thread()
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._raise_send_error()
+
+    def _join_async_thread(self):
+        if self._async_thread is not None:
+            self._async_thread.join()
+            self._async_thread = None
+
+    def _raise_send_error(self):
+        """ Re-raise the exception of the send thread (only once) """
+        send_error, self._send_error = self._send_error, None
+        if send_error is not None:
+            raise send_error
+
+    def _buffers(self):
+        """
+        Generate the buffers to send, for either mode
+        """
+        if self._waveform is None:
+            while not self._stop_event.is_set():
+                try:
+                    samples = self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if samples is None:
+                    return
+                yield samples
+            return
+        burst_len = self._waveform.shape[-1]
+        if self._num_samps is None:
+            while True:
+                yield self._waveform
+        num_bursts, remainder = divmod(int(self._num_samps), burst_len)
+        for _ in range(num_bursts):
+            yield self._waveform
+        if remainder:
+            yield self._waveform[:, :remainder]
+
+    def _send_worker(self, start_time):
+        """
+        Run _send_buffers(), and store its exception for wait() and stop()
+        """
+        try:
+            self._send_buffers(start_time)
+        except Exception as ex: # pylint: disable=broad-except
+            self._send_error = ex
+
+    def _send_buffers(self, start_time):
+        """ Here is where the action happens """
+        metadata = lib.types.tx_metadata()
+        if start_time is not None:
+            metadata.has_time_spec = True
+            metadata.time_spec = start_time
+        for samples in self._buffers():
+            samples = np.asarray(samples)
+            if samples.ndim == 1:
+                samples = samples.reshape(1, samples.size)
+            num_samps = samples.shape[-1]
+            offset = 0
+            while offset < num_samps and not self._stop_event.is_set():
+                samps_sent = self._streamer.send(
+                    samples[:, offset:], metadata, self._send_timeout)
+                metadata.has_time_spec = False
+                self._inc('sends')
+                if samps_sent < num_samps - offset:
+                    self._inc('send_timeouts')
+                offset += samps_sent
+                self._inc('samps_sent', samps_sent)
+            if self._stop_event.is_set():
+                break
+        # Send an EOB packet with a single zero-valued sample to close out TX
+        metadata.end_of_burst = True
+        self._streamer.send(
+            np.zeros((self._num_chans, 1), dtype=np.complex64), metadata, 0.1)
+        self._eob_sent.set()
+
+    def _async_worker(self):
+        """
+        Count async events until the final burst was acknowledged. Gives up
+        BURST_ACK_TIMEOUT seconds after the end-of-burst was sent, or as soon
+        as the send thread stops without sending one.
+        """
+        async_metadata = lib.types.async_metadata()
+        event_codes = lib.types.tx_metadata_event_code
+        counter_map = {
+            event_codes.burst_ack: 'bursts_acked',
+            event_codes.underflow: 'underflows',
+            event_codes.underflow_in_packet: 'underflows',
+            event_codes.seq_error: 'seq_errors',
+            event_codes.seq_error_in_packet: 'seq_errors',
+            event_codes.time_error: 'time_errors',
+        }
+        ack_deadline = None
+        while True:
+            if not self.is_running():
+                if not self._eob_sent.is_set():
+                    return
+                if ack_deadline is None:
+                    ack_deadline = time.monotonic() + BURST_ACK_TIMEOUT
+                elif time.monotonic() > ack_deadline:
+                    return
+            if not self._streamer.recv_async_msg(async_metadata, 0.1):
+                continue
+            counter = counter_map.get(async_metadata.event_code)
+            if counter:
+                self._inc(counter)
+            # Only the final packet of a run has the end-of-burst flag
+            if async_metadata.event_code == event_codes.burst_ack:
+                return
@@ -8,14 +8,24 @@ RPC/MPM utilities for debugging USRPs
 """
 
 from enum import Enum
+import asyncio
+import itertools
 import multiprocessing
 import queue
 import signal
+import socket
+import msgpack
 from mprpc import RPCClient
 from mprpc.exceptions import RPCError
 
 MPM_RPC_PORT = 49601
 
+# msgpack-RPC message types
+_MSGPACKRPC_REQUEST = 0
+_MSGPACKRPC_RESPONSE = 1
+# msgpack-RPC message IDs are 32-bit unsigned integers
+_MSGPACKRPC_MAX_MSGID = 1 << 32
+
 def _claim_loop(client, cmd_q, token_q):
     """
     Process that runs a claim loop.
@@ -124,6 +134,308 @@ class MPMClaimer:
             self.token = self._token_q.get(False)
         return self.token
 
+class MPMPipelinedConnection:
+    """
+    Persistent msgpack-RPC connection to MPM which allows for multiple
+    outstanding requests.
+
+    MPM processes the requests of one connection in order, so a number of
+    requests can be written to the socket in one go and the responses read
+    back afterwards, paying for a single network round trip.
+
+    This class has the same call() method as mprpc.RPCClient, so it can be
+    used as a drop-in replacement.
+    """
+    RECV_SIZE = 65536
+
+    def __init__(self, host, port=MPM_RPC_PORT, timeout=None):
+        self._sock = socket.create_connection((host, port), timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._packer = msgpack.Packer(use_bin_type=True)
+        self._unpacker = msgpack.Unpacker(raw=False)
+        self._msg_ids = itertools.cycle(range(_MSGPACKRPC_MAX_MSGID))
+        # msg_id -> (error, result) for responses which were received, but not
+        # yet collected
+        self._responses = {}
+
+    def close(self):
+        """
+        Close the connection. Outstanding responses are lost.
+        """
+        self._sock.close()
+        self._responses.clear()
+
+    def send_requests(self, calls):
+        """
+        Send a list of (method, args) requests with a single write, without
+        waiting for the responses. Returns the list of message IDs, which can
+        be passed to get_result().
+        """
+        msg_ids = []
+        data = bytearray()
+        for method, args in calls:
+            msg_id = next(self._msg_ids)
+            data += self._packer.pack(
+                [_MSGPACKRPC_REQUEST, msg_id, method, list(args)])
+            msg_ids.append(msg_id)
+        self._sock.sendall(data)
+        return msg_ids
+
+    def get_response(self, msg_id):
+        """
+        Wait for the response to the request with the given message ID and
+        return it as an (error, result) tuple. Responses to other requests which
+        arrive in the meantime are kept for later.
+        """
+        while msg_id not in self._responses:
+            data = self._sock.recv(self.RECV_SIZE)
+            if not data:
+                raise ConnectionResetError("MPM closed the RPC connection")
+            self._unpacker.feed(data)
+            for msg_type, resp_id, error, result in self._unpacker:
+                assert msg_type == _MSGPACKRPC_RESPONSE
+                self._responses[resp_id] = (error, result)
+        return self._responses.pop(msg_id)
+
+    def get_result(self, msg_id):
+        """
+        Like get_response(), but returns the result only, and raises an
+        RPCError if the call failed.
+        """
+        error, result = self.get_response(msg_id)
+        if error:
+            raise RPCError(error)
+        return result
+
+    def call(self, method, *args):
+        """
+        Execute a single RPC call and return its result.
+        """
+        return self.get_result(self.send_requests([(method, args)])[0])
+
+
+class MPMBatchCall:
+    """
+    Placeholder for the outcome of a call which was queued in an MPMBatch.
+    """
+    def __init__(self, command, args, rpc_args):
+        self.command = command
+        # Arguments as passed by the user, and as sent over RPC (with token)
+        self.args = args
+        self.rpc_args = rpc_args
+        self.error = None
+        self._result = None
+        self._done = False
+
+    def _set(self, error, result):
+        self.error = error
+        self._result = result
+        self._done = True
+
+    def result(self):
+        """
+        Return the result of the call, or raise an RPCError if it failed.
+        """
+        if not self._done:
+            raise RuntimeError(
+                "[MPMRPC] Result of `{}' is not available until the batch was "
+                "sent".format(self.command))
+        if self.error:
+            raise RPCError(self.error)
+        return self._result
+
+
+class MPMBatch:
+    """
+    Collects RPC calls and executes them all at once when the context is left.
+    Remote methods are available as attributes, just like on MPMClient, but
+    they return MPMBatchCall placeholders instead of results:
+
+    >>> with client.batch() as batch:
+    ...     temp = batch.get_mb_sensor('temp')
+    ...     ref_locked = batch.get_mb_sensor('ref_locked')
+    >>> print(temp.result(), ref_locked.result())
+
+    On a pipelined client, all calls are sent with one write and the results
+    are collected afterwards. Otherwise, if the device supports it and a claim
+    is held, the calls are executed with a single multicall() on the device.
+    As a last resort, the calls are executed one by one.
+    """
+    def __init__(self, client):
+        self._mpm_client = client
+        self.calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+
+    def __getattr__(self, command):
+        if command.startswith('_') or \
+                command not in self._mpm_client._remote_methods:
+            raise AttributeError(command)
+        return lambda *args: self.call(command, *args)
+
+    def call(self, command, *args):
+        """
+        Queue a call to a remote method. The token is added if required.
+        """
+        batch_call = MPMBatchCall(
+            command, args, self._mpm_client._get_call_args(command, args))
+        self.calls.append(batch_call)
+        return batch_call
+
+    def execute(self):
+        """
+        Execute all queued calls and return their MPMBatchCall objects. Failed
+        calls do not stop the batch; they raise when their result is accessed.
+        """
+        calls, self.calls = self.calls, []
+        rpc_client = self._mpm_client._client
+        if isinstance(rpc_client, MPMPipelinedConnection):
+            msg_ids = rpc_client.send_requests(
+                [(batch_call.command, batch_call.rpc_args) for batch_call in calls])
+            for batch_call, msg_id in zip(calls, msg_ids):
+                batch_call._set(*rpc_client.get_response(msg_id))
+        elif 'multicall' in self._mpm_client._remote_methods \
+                and getattr(self._mpm_client, '_token', None):
+            results = rpc_client.call(
+                'multicall', self._mpm_client._token,
+                [(batch_call.command, list(batch_call.args)) for batch_call in calls])
+            for batch_call, (error, result) in zip(calls, results):
+                batch_call._set(error, result)
+        else:
+            for batch_call in calls:
+                try:
+                    batch_call._set(
+                        None, rpc_client.call(batch_call.command, *batch_call.rpc_args))
+                except RPCError as ex:
+                    batch_call._set(str(ex), None)
+        return calls
+
+
+class AsyncMPMClient:
+    """
+    asyncio MPM RPC client. All requests share one connection, and any number of
+    them may be outstanding at the same time. This makes it cheap to poll many
+    devices concurrently:
+
+    >>> async def poll(hosts):
+    ...     clients = [AsyncMPMClient(host) for host in hosts]
+    ...     await asyncio.gather(*(client.connect() for client in clients))
+    ...     return await asyncio.gather(*(
+    ...         client.get_mb_sensor('temp') for client in clients))
+
+    Remote methods are added as coroutine methods on connect(). This client
+    does not claim the device; pass a token to call methods which require one.
+    """
+    RECV_SIZE = 65536
+
+    def __init__(self, host, port=MPM_RPC_PORT, token=None):
+        self.host = host
+        self.port = port
+        self._token = token
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+        self._packer = msgpack.Packer(use_bin_type=True)
+        self._msg_ids = itertools.cycle(range(_MSGPACKRPC_MAX_MSGID))
+        # msg_id -> future for all outstanding requests
+        self._pending = {}
+        self._remote_methods = []
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def connect(self):
+        """
+        Open the connection and add all remote methods to this object.
+        """
+        self._reader, self._writer = \
+            await asyncio.open_connection(self.host, self.port)
+        sock = self._writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader_task = asyncio.ensure_future(self._read_responses())
+        for command, docs, requires_token in await self.call('list_methods'):
+            self._add_command(command, docs, requires_token)
+
+    async def close(self):
+        """
+        Close the connection. Outstanding calls fail with ConnectionError.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._reader_task is not None:
+            await self._reader_task
+            self._reader_task = None
+
+    async def call(self, method, *args):
+        """
+        Execute a single RPC call and return its result.
+        """
+        if self._writer is None:
+            raise ConnectionError("[MPMRPC] Not connected")
+        msg_id = next(self._msg_ids)
+        future = asyncio.get_event_loop().create_future()
+        self._pending[msg_id] = future
+        self._writer.write(self._packer.pack(
+            [_MSGPACKRPC_REQUEST, msg_id, method, list(args)]))
+        await self._writer.drain()
+        return await future
+
+    async def _read_responses(self):
+        """
+        Task which dispatches incoming responses to the waiting calls.
+        """
+        unpacker = msgpack.Unpacker(raw=False)
+        try:
+            while True:
+                data = await self._reader.read(self.RECV_SIZE)
+                if not data:
+                    break
+                unpacker.feed(data)
+                for _, msg_id, error, result in unpacker:
+                    future = self._pending.pop(msg_id, None)
+                    if future is None or future.done():
+                        continue
+                    if error:
+                        future.set_exception(RPCError(error))
+                    else:
+                        future.set_result(result)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(
+                        ConnectionError("MPM closed the RPC connection"))
+            self._pending.clear()
+
+    def _add_command(self, command, docs, requires_token):
+        """
+        Add a remote method as coroutine method to this object
+        """
+        if hasattr(self, command):
+            return
+        async def new_command(*args):
+            if requires_token:
+                if not self._token:
+                    raise RuntimeError(
+                        "[MPMRPC] Cannot execute `{}' -- no claim available!"
+                        .format(command))
+                args = (self._token,) + args
+            return await self.call(command, *args)
+        new_command.__doc__ = docs
+        setattr(self, command, new_command)
+        self._remote_methods.append(command)
+
+
 class InitMode(Enum):
     """
     Init modes for MPM session
@@ -138,13 +450,18 @@ class InitMode(Enum):
 class MPMClient:
     """
     MPM RPC Client: Will make all MPM commands accessible as Python methods.
+
+    With pipelined=True, the client uses a persistent MPMPipelinedConnection,
+    which lets batch() send all queued calls with a single round trip.
     """
-    def __init__(self, init_mode, host, port=MPM_RPC_PORT, token=None):
+    def __init__(self, init_mode, host, port=MPM_RPC_PORT, token=None,
+                 pipelined=False):
         assert isinstance(init_mode, InitMode)
         print("[MPMRPC] Attempting to connect to {host}:{port}...".format(
             host=host, port=port
         ))
         self._remote_methods = []
+        self._requires_token = {}
         if init_mode == InitMode.Hijack:
             assert token
             self._token = token
@@ -154,7 +471,11 @@ class MPMClient:
             self._token = self._claimer.token
 
         try:
-            self._client = RPCClient(host, port, pack_params={'use_bin_type': True})
+            if pipelined:
+                self._client = MPMPipelinedConnection(host, port)
+            else:
+                self._client = RPCClient(
+                    host, port, pack_params={'use_bin_type': True})
             print("[MPMRPC] Connection successful.")
         except Exception as ex:
             print("[MPMRPC] Connection refused: {}".format(ex))
@@ -187,6 +508,13 @@ class MPMClient:
         """
         self._claimer.exit()
 
+    def batch(self):
+        """
+        Return an MPMBatch context which collects calls and executes them all
+        at once when the context is left.
+        """
+        return MPMBatch(self)
+
     def _add_command(self, command, docs, requires_token):
         """
         Add a command to the current session
@@ -198,18 +526,28 @@ class MPMClient:
             new_command.__doc__ = docs
             setattr(self, command, new_command)
             self._remote_methods.append(command)
+            self._requires_token[command] = requires_token
 
-    def _rpc_template(self, command, requires_token, *args, **kwargs):
+    def _get_call_args(self, command, args):
         """
-        Template function to create new RPC shell commands
+        Return the RPC arguments for command, with the token prepended if the
+        command requires one.
         """
-        if requires_token and not self._token:
+        if not self._requires_token.get(command):
+            return args
+        if not self._token:
             raise RuntimeError(
                 "[MPMRPC] Cannot execute `{}' -- no claim available!"
                 .format(command))
         # Put token as the first argument if required:
+        return (self._token,) + args
+
+    def _rpc_template(self, command, requires_token, *args, **kwargs):
+        """
+        Template function to create new RPC shell commands
+        """
         if requires_token:
-            args = (self._token,) + args
+            args = self._get_call_args(command, args)
         if kwargs:
             return self._client.call(command, *args, **kwargs)
         if args:
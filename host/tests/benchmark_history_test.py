@@ -0,0 +1,141 @@
+#
+# Copyright 2026 Ettus Research, a National Instruments Brand
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""
+Unit test for the benchmark_rate history database
+"""
+
+import os
+import pathlib
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(
+    pathlib.Path(__file__).parent.absolute(), 'streaming_performance'))
+# pylint: disable=wrong-import-position
+import benchmark_history
+import parse_benchmark_rate
+
+RATE = 10e6
+DURATION = 10.0
+EXPECTED_SAMPS = int(RATE * DURATION)
+
+def mk_results(received_samps=EXPECTED_SAMPS, **kwargs):
+    """ Returns the parsed results of a 1xRX run at RATE for DURATION """
+    values = {field: 0 for field in parse_benchmark_rate.Results._fields}
+    values.update({
+        "num_rx_channels": 1,
+        "rx_rate": RATE,
+        "received_samps": received_samps,
+    })
+    values.update(kwargs)
+    return parse_benchmark_rate.Results(**values)
+
+def mk_config(device="X410"):
+    """ Returns the config of a 1xRX run at RATE """
+    return benchmark_history.get_config(device, {"rx_rate": RATE, "rx_channels": "0"})
+
+class BenchmarkHistoryTest(unittest.TestCase):
+    """ Test storing and comparing benchmark_rate results """
+    def setUp(self):
+        self.history = benchmark_history.BenchmarkHistory(":memory:")
+
+    def tearDown(self):
+        self.history.close()
+
+    def add_runs(self, uhd_version, results_list, config=None):
+        """ Stores a list of results for a config and UHD version """
+        for results in results_list:
+            self.history.add_run(config or mk_config(), uhd_version, DURATION, results)
+
+    def test_get_uhd_version(self):
+        self.assertEqual(
+            benchmark_history.get_uhd_version(
+                "[INFO] [UHD] linux; GNU C++ version 9.3.0; "
+                "Boost_107100; UHD_4.2.0.git-10-g1a2b3c4\n"),
+            "4.2.0.git-10-g1a2b3c4")
+        self.assertEqual(
+            benchmark_history.get_uhd_version("UHD 4.2.0.0-0-g0d8f0bd2\n"),
+            "4.2.0.0-0-g0d8f0bd2")
+        self.assertIsNone(benchmark_history.get_uhd_version("no version here"))
+
+    def test_get_config(self):
+        self.assertEqual(
+            benchmark_history.get_config("X410", {"tx_rate": "1e6", "tx_channels": "0,1"}),
+            {"device": "X410", "rx_rate": 0.0, "tx_rate": 1e6,
+             "rx_channels": "", "tx_channels": "0,1"})
+
+    def test_record_and_get_runs(self):
+        self.add_runs("4.2.0", [mk_results(), mk_results(EXPECTED_SAMPS // 2, overruns=3)])
+        self.add_runs("4.3.0", [mk_results()])
+        self.add_runs("4.2.0", [mk_results()], mk_config("N310"))
+        runs = self.history.get_runs(mk_config(), "4.2.0")
+        self.assertEqual(len(runs), 2)
+        self.assertEqual([run["rx_throughput"] for run in runs], [1.0, 0.5])
+        self.assertEqual([run["tx_throughput"] for run in runs], [0.0, 0.0])
+        self.assertEqual([run["overruns"] for run in runs], [0, 3])
+        self.assertEqual(self.history.get_configs("X410"), [
+            (mk_config(), "4.2.0", 2),
+            (mk_config(), "4.3.0", 1),
+        ])
+        self.assertEqual(len(self.history.get_configs()), 3)
+
+    def test_compare_no_regression(self):
+        self.add_runs("base", [mk_results(EXPECTED_SAMPS - 10)] * 3)
+        # A drop below throughput_tolerance and a rise below error_tolerance
+        self.add_runs("cand", [mk_results(int(EXPECTED_SAMPS * 0.995)), mk_results(),
+                               mk_results(overruns=1)])
+        self.assertEqual(benchmark_history.compare(
+            self.history.get_runs(mk_config(), "base"),
+            self.history.get_runs(mk_config(), "cand")), [])
+
+    def test_compare_regression(self):
+        self.add_runs("base", [mk_results()] * 3)
+        self.add_runs("cand", [mk_results(int(EXPECTED_SAMPS * 0.9), dropped_samps=100)] * 3)
+        regressions = benchmark_history.compare(
+            self.history.get_runs(mk_config(), "base"),
+            self.history.get_runs(mk_config(), "cand"), mk_config())
+        self.assertEqual([r.metric for r in regressions], ["rx_throughput", "dropped_samps"])
+        self.assertEqual(regressions[0].config, mk_config())
+        self.assertAlmostEqual(regressions[0].baseline, 1.0)
+        self.assertAlmostEqual(regressions[0].candidate, 0.9)
+        self.assertAlmostEqual(regressions[0].tolerance, 0.01)
+        self.assertEqual(regressions[1].candidate, 100)
+
+    def test_compare_noisy_runs(self):
+        # The same drop in the mean isn't flagged if the runs are noisy enough
+        self.add_runs("base", [mk_results(EXPECTED_SAMPS), mk_results(EXPECTED_SAMPS // 2)])
+        self.add_runs("cand", [mk_results(EXPECTED_SAMPS - EXPECTED_SAMPS // 10),
+                               mk_results(EXPECTED_SAMPS // 2 - EXPECTED_SAMPS // 10)])
+        base_runs = self.history.get_runs(mk_config(), "base")
+        cand_runs = self.history.get_runs(mk_config(), "cand")
+        self.assertEqual(benchmark_history.compare(base_runs, cand_runs), [])
+        self.assertEqual(
+            [r.metric for r in benchmark_history.compare(base_runs, cand_runs, num_sigmas=0.1)],
+            ["rx_throughput"])
+
+    def test_compare_without_runs(self):
+        self.add_runs("base", [mk_results()])
+        self.assertEqual(benchmark_history.compare(
+            self.history.get_runs(mk_config(), "base"), []), [])
+
+    def test_compare_versions(self):
+        self.add_runs("base", [mk_results()] * 2)
+        self.add_runs("cand", [mk_results(overruns=5)] * 2)
+        # N310 regressed as well, B210 has no baseline
+        self.add_runs("base", [mk_results()] * 2, mk_config("N310"))
+        self.add_runs("cand", [mk_results(underruns=5)] * 2, mk_config("N310"))
+        self.add_runs("cand", [mk_results(overruns=5)] * 2, mk_config("B210"))
+        regressions = benchmark_history.compare_versions(self.history, "base", "cand")
+        self.assertEqual(
+            sorted((r.config["device"], r.metric) for r in regressions),
+            [("N310", "underruns"), ("X410", "overruns")])
+        regressions = benchmark_history.compare_versions(
+            self.history, "base", "cand", device="X410")
+        self.assertEqual([(r.config["device"], r.metric) for r in regressions],
+                         [("X410", "overruns")])
+
+if __name__ == '__main__':
+    unittest.main()
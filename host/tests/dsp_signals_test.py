@@ -0,0 +1,76 @@
+#
+# Copyright 2026 Ettus Research, a National Instruments Brand
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""
+Unit test for uhd.dsp.signals
+"""
+
+import unittest
+import numpy as np
+from uhd.dsp.signals import RunningPower, get_power_dbfs
+
+class RunningPowerTest(unittest.TestCase):
+    """ Test the running statistics of RunningPower against numpy """
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        num_samps = 10000
+        # Two channels with different DC offsets and powers. The second one
+        # has a large DC offset, where the naive E[|x|^2] - |E[x]|^2 loses
+        # precision.
+        noise = rng.standard_normal((2, num_samps)) + 1j * rng.standard_normal((2, num_samps))
+        self.signal = (noise * np.array([[0.5], [1e-3]])
+                       + np.array([[0.1 - 0.2j], [1e3 + 1e3j]])).astype(np.complex64)
+
+    def check_stats(self, running_power, signal):
+        """ The statistics match those numpy computes over the whole signal """
+        self.assertEqual(running_power.count, signal.shape[-1])
+        np.testing.assert_allclose(
+            running_power.get_mean(), np.mean(signal, axis=-1, dtype=np.complex128),
+            rtol=1e-9)
+        np.testing.assert_allclose(
+            running_power.get_variance(), np.var(signal.astype(np.complex128), axis=-1),
+            rtol=1e-9)
+        if signal.shape[-1] < 2:
+            # The variance of a single sample is zero, there is no power to compare
+            return
+        np.testing.assert_allclose(
+            running_power.get_power_dbfs(),
+            [get_power_dbfs(chan.astype(np.complex128)) for chan in signal],
+            rtol=1e-9)
+
+    def test_chunked_updates(self):
+        # Uneven chunks, including empty and single sample ones
+        chunk_sizes = [0, 1, 7, 1000, 1, 0, 4096, 2500]
+        chunk_sizes.append(self.signal.shape[-1] - sum(chunk_sizes))
+        running_power = RunningPower(num_chans=2)
+        offset = 0
+        for chunk_size in chunk_sizes:
+            running_power.update(self.signal[:, offset:offset + chunk_size])
+            offset += chunk_size
+            if offset:
+                self.check_stats(running_power, self.signal[:, :offset])
+
+    def test_chunking_does_not_matter(self):
+        whole = RunningPower(num_chans=2)
+        whole.update(self.signal)
+        chunked = RunningPower(num_chans=2)
+        for chunk in np.array_split(self.signal, 37, axis=-1):
+            chunked.update(chunk)
+        np.testing.assert_allclose(chunked.get_mean(), whole.get_mean(), rtol=1e-12)
+        np.testing.assert_allclose(chunked.get_variance(), whole.get_variance(), rtol=1e-9)
+
+    def test_reset(self):
+        running_power = RunningPower(num_chans=2)
+        with self.assertRaises(RuntimeError):
+            running_power.get_variance()
+        running_power.update(self.signal[:, :100])
+        running_power.reset()
+        with self.assertRaises(RuntimeError):
+            running_power.get_mean()
+        running_power.update(self.signal[:, 100:200])
+        self.check_stats(running_power, self.signal[:, 100:200])
+
+if __name__ == '__main__':
+    unittest.main()
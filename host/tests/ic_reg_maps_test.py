@@ -0,0 +1,110 @@
+#
+# Copyright 2026 Ettus Research, a National Instruments Brand
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""
+Unit test for the dirty tracking of the generated Python register maps
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import importlib
+import pathlib
+
+def generate_reg_map(name, out_dir):
+    """ Run gen_<name>.py and import the generated Python register map """
+    gen_path = os.path.normpath(os.path.join(
+        pathlib.Path(__file__).parent.absolute(),
+        '..', 'lib', 'ic_reg_maps', 'gen_{}.py'.format(name)))
+    out_path = os.path.join(out_dir, '{}.py'.format(name))
+    subprocess.check_call([sys.executable, gen_path, out_path])
+    spec = importlib.util.spec_from_file_location(name, out_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class IcRegMapsTest(unittest.TestCase):
+    """ Test dirty tracking and commit() of generated register maps """
+    @classmethod
+    def setUpClass(cls):
+        with tempfile.TemporaryDirectory() as out_dir:
+            cls.lmx2572_regs = generate_reg_map('lmx2572_regs', out_dir)
+            cls.zbx_cpld_regs = generate_reg_map('zbx_cpld_regs', out_dir)
+
+    def test_fields_mark_dirty(self):
+        """ Assigning a field marks its register dirty """
+        regs = self.lmx2572_regs.lmx2572_regs_t()
+        self.assertEqual(regs.get_dirty_addrs(), [])
+        regs.pll_num_lower = 1
+        regs.pll_den_upper = 2
+        regs.pll_num_upper = 3
+        self.assertEqual(regs.get_dirty_addrs(), [38, 42, 43])
+        regs.clear_dirty()
+        self.assertEqual(regs.get_dirty_addrs(), [])
+
+    def test_bursts(self):
+        """ Adjacent dirty registers are grouped into bursts """
+        regs = self.lmx2572_regs.lmx2572_regs_t()
+        regs.pll_num_lower = 1
+        regs.pll_den_upper = 2
+        regs.pll_num_upper = 3
+        self.assertEqual(regs.get_dirty_bursts(), [
+            [(38, regs.get_reg(38))],
+            [(42, regs.get_reg(42)), (43, regs.get_reg(43))],
+        ])
+
+    def test_commit(self):
+        """ commit() writes all dirty registers with a single call """
+        regs = self.lmx2572_regs.lmx2572_regs_t()
+        calls = []
+        self.assertEqual(regs.commit(calls.append), 0)
+        self.assertEqual(calls, [])
+        regs.pll_num_upper = 3
+        regs.pll_den_upper = 2
+        self.assertEqual(regs.commit(calls.append), 2)
+        self.assertEqual(calls, [[(38, regs.get_reg(38)), (42, regs.get_reg(42))]])
+        self.assertEqual(regs.get_dirty_addrs(), [])
+
+    def test_commit_latch_addrs(self):
+        """ commit() writes the latching registers last, even if clean """
+        regs = self.lmx2572_regs.lmx2572_regs_t()
+        calls = []
+        self.assertEqual(regs.commit(calls.append, latch_addrs=(0, 0)), 2)
+        regs.pll_num_upper = 3
+        regs.fcal_en = regs.fcal_en_t.FCAL_EN_ENABLE
+        regs.pll_n_lower_16_bits = 100
+        self.assertEqual(regs.commit(calls.append, latch_addrs=(0,)), 3)
+        self.assertEqual(calls[-1], [
+            (36, regs.get_reg(36)), (42, regs.get_reg(42)), (0, regs.get_reg(0))])
+        self.assertEqual(regs.get_dirty_addrs(), [])
+
+    def test_mark_all_dirty(self):
+        """ mark_all_dirty() marks every register """
+        regs = self.lmx2572_regs.lmx2572_regs_t()
+        regs.mark_all_dirty()
+        self.assertEqual(regs.get_dirty_addrs(), sorted(regs._ALL_ADDRS))
+
+    def test_arrays_mark_dirty(self):
+        """ Assigning array elements marks the matching registers dirty """
+        regs = self.zbx_cpld_regs.zbx_cpld_regs_t()
+        base_addr, step = regs._ARRAY_FIELDS['RX0_RX_LED']
+        enable = regs.RX0_RX_LED_t.RX0_RX_LED_ENABLE
+        regs.RX0_RX_LED[3] = enable
+        self.assertEqual(regs.get_dirty_addrs(), [base_addr + 3 * step])
+        regs.RX0_RX_LED[-1] = enable
+        regs.RX0_RX_LED[4:6] = [enable, enable]
+        self.assertEqual(regs.get_dirty_addrs(), [
+            base_addr + index * step
+            for index in (3, 4, 5, len(regs.RX0_RX_LED) - 1)])
+        self.assertEqual([len(burst) for burst in regs.get_dirty_bursts()], [3, 1])
+        regs.clear_dirty()
+        regs.RX0_RX_LED = [enable] * 4
+        self.assertEqual(regs.get_dirty_addrs(),
+                         [base_addr + index * step for index in range(4)])
+
+if __name__ == '__main__':
+    unittest.main()
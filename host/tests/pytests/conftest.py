@@ -52,6 +52,14 @@ def pytest_addoption(parser):
         required=True,
         type=str,
         help="")
+    parser.addoption(
+        "--history_db",
+        type=str,
+        help="store results in this benchmark history database")
+    parser.addoption(
+        "--baseline_uhd_version",
+        type=str,
+        help="fail on regressions against the results of this UHD version in the history database")
 
 
 def pytest_configure(config):
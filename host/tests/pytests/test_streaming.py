@@ -1,6 +1,8 @@
 import pytest
+import subprocess
 from pathlib import Path
 import batch_run_benchmark_rate
+import benchmark_history
 import test_length_utils
 from test_length_utils import Test_Length_Smoke, Test_Length_Full, Test_Length_Stress
 
@@ -244,11 +246,35 @@ def test_streaming(pytestconfig, dut_type, use_dpdk, dual_10G, rate, rx_rate, rx
         benchmark_rate_params["tx_rate"] = tx_rate
         benchmark_rate_params["tx_channels"] = tx_channels
 
+    # store results in the history database, if requested. The device name
+    # includes the link setup, since that changes the achievable throughput.
+    history = None
+    uhd_version = None
+    device = dut_type + ("_dpdk" if use_dpdk else "") + ("_dual_10G" if dual_10G else "")
+    if pytestconfig.getoption('history_db'):
+        uhd_config_info = Path(pytestconfig.getoption('uhd_build_dir')) / 'utils/uhd_config_info'
+        uhd_version = benchmark_history.get_uhd_version(subprocess.run(
+            [uhd_config_info, "--version"], stdout=subprocess.PIPE).stdout.decode('ASCII'))
+        history = benchmark_history.BenchmarkHistory(pytestconfig.getoption('history_db'))
+
     # run benchmark rate
     print()
-    results = batch_run_benchmark_rate.run(benchmark_rate_path, iterations, benchmark_rate_params)
-    stats = batch_run_benchmark_rate.calculate_stats(results)
-    print(batch_run_benchmark_rate.get_summary_string(stats, iterations, benchmark_rate_params))
+    try:
+        results = batch_run_benchmark_rate.run(benchmark_rate_path, iterations, benchmark_rate_params,
+                                               history=history, device=device, uhd_version=uhd_version)
+        stats = batch_run_benchmark_rate.calculate_stats(results)
+        print(batch_run_benchmark_rate.get_summary_string(stats, iterations, benchmark_rate_params))
+
+        # compare results against the baseline
+        regressions = []
+        baseline = pytestconfig.getoption('baseline_uhd_version')
+        if history is not None and baseline:
+            config = benchmark_history.get_config(device, benchmark_rate_params)
+            regressions = benchmark_history.compare(
+                history.get_runs(config, baseline), history.get_runs(config, uhd_version), config)
+    finally:
+        if history is not None:
+            history.close()
 
     # compare results against thresholds
     dropped_samps_threshold = 0
@@ -301,3 +327,7 @@ def test_streaming(pytestconfig, dut_type, use_dpdk, dual_10G, rate, rx_rate, rx
         f"""Number of late commands exceeded threshold.
             Expected late commands: <= {late_cmds_threshold}
             Actual late commands:      {stats.avg_vals.late_cmds}"""
+
+    assert not regressions, \
+        "Regressions against {}:\n".format(baseline) + \
+        "\n".join(benchmark_history.format_regression(r) for r in regressions)
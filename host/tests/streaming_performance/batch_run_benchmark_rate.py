@@ -12,7 +12,10 @@ batch_run_benchmark_rate.py --path <benchmark_rate_dir>/benchmark_rate --iterati
 """
 import argparse
 import collections
+import os
 import re
+import tempfile
+import benchmark_history
 import parse_benchmark_rate
 import run_benchmark_rate
 
@@ -40,21 +43,59 @@ def calculate_stats(results):
         max_vals      = result_max,
         non_zero_vals = result_nz)
 
-def run(path, iterations, benchmark_rate_params, stop_on_error=True):
+def run_once(path, benchmark_rate_params):
+    """
+    Runs benchmark rate once. Returns the process and the parsed result, or
+    None. The result is read from the JSON file benchmark_rate writes, and
+    parsed from its output if that is not available (older versions of
+    benchmark_rate don't support --result_json).
+    """
+    result = None
+    if run_benchmark_rate.supports_arg(path, "result_json"):
+        fd, json_path = tempfile.mkstemp(prefix="benchmark_rate_", suffix=".json")
+        os.close(fd)
+        try:
+            params = dict(benchmark_rate_params)
+            params["result_json"] = json_path
+            proc = run_benchmark_rate.run(path, params)
+            result = parse_benchmark_rate.parse_json(json_path)
+        finally:
+            os.remove(json_path)
+    else:
+        proc = run_benchmark_rate.run(path, benchmark_rate_params)
+    if result is None:
+        result = parse_benchmark_rate.parse(proc.stdout.decode('ASCII'))
+    return proc, result
+
+def run(path, iterations, benchmark_rate_params, stop_on_error=True,
+        history=None, device=None, uhd_version=None):
     """
     Runs benchmark rate multiple times and returns a list of parsed results.
+
+    If history (a benchmark_history.BenchmarkHistory) is given, every result
+    is also stored there, keyed by device, the rates and channels, and
+    uhd_version (defaults to the UHD version benchmark_rate reports).
+    Iterations run one after another, as they all share the same device.
     """
     print("Running benchmark rate {} times with the following arguments: ".format(iterations))
     for key, val in benchmark_rate_params.items():
         print("{:14} {}".format(key, val))
 
+    if history is not None:
+        config = benchmark_history.get_config(device, benchmark_rate_params)
+        duration = float(benchmark_rate_params.get("duration", 10))
+
     parsed_results = []
     iteration = 0
     while iteration < iterations:
-        proc = run_benchmark_rate.run(path, benchmark_rate_params)
-        result = parse_benchmark_rate.parse(proc.stdout.decode('ASCII'))
+        proc, result = run_once(path, benchmark_rate_params)
         if result != None:
             parsed_results.append(result)
+            if history is not None:
+                output = (proc.stdout + proc.stderr).decode('ASCII', 'replace')
+                run_version = uhd_version or \
+                    benchmark_history.get_uhd_version(output) or "unknown"
+                history.add_run(config, run_version, duration, result)
             iteration += 1
         else:
             if stop_on_error:
@@ -187,11 +228,24 @@ def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("--path", type=str, required=True, help="path to benchmark rate example")
     parser.add_argument("--iterations", type=int, default=100, help="number of iterations to run")
+    parser.add_argument("--db", type=str, help="store results in this history database")
+    parser.add_argument("--device", type=str, default="unknown",
+                        help="device name to store results under")
+    parser.add_argument("--uhd_version", type=str,
+                        help="UHD version to store results under "
+                             "(default: as reported by benchmark rate)")
     params = parser.parse_args(rest)
-    return params.path, params.iterations, benchmark_rate_params
+    return params, benchmark_rate_params
 
 if __name__ == "__main__":
-    path, iterations, params = parse_args();
-    results = run(path, iterations, params)
+    args, params = parse_args()
+    path, iterations = args.path, args.iterations
+    history = benchmark_history.BenchmarkHistory(args.db) if args.db else None
+    try:
+        results = run(path, iterations, params, history=history,
+                      device=args.device, uhd_version=args.uhd_version)
+    finally:
+        if history is not None:
+            history.close()
     stats = calculate_stats(results)
     print(get_summary_string(stats, iterations, params))
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Copyright 2026 Ettus Research, A National Instrument Brand
+
+SPDX-License-Identifier: GPL-3.0-or-later
+
+Stores benchmark_rate results in a local SQLite database, and compares the
+runs of one UHD version against those of a baseline to detect regressions.
+
+Every run is keyed by device, rates, channels, and the version of the UHD
+build that produced it, as reported by benchmark_rate. A regression is flagged if a throughput metric drops,
+or an error counter rises, by more than a statistical tolerance (a number of
+standard errors of the difference of the means) and a fixed minimum
+tolerance.
+
+Example usage:
+benchmark_history.py --db history.sqlite list
+benchmark_history.py --db history.sqlite compare --device X410 --baseline 4.2.0.git-10-g1a2b3c4 --candidate 4.2.0.git-12-g5d6e7f8
+"""
+import argparse
+import collections
+import math
+import re
+import sqlite3
+import sys
+import time
+import parse_benchmark_rate
+
+# Metrics where a drop is a regression. These are the number of samples that
+# were received/transmitted as a fraction of the expected number of samples.
+THROUGHPUT_METRICS = ("rx_throughput", "tx_throughput")
+# Metrics where a rise is a regression
+ERROR_METRICS = (
+    "dropped_samps",
+    "overruns",
+    "rx_seq_errs",
+    "tx_seq_errs",
+    "underruns",
+    "late_cmds",
+    "rx_timeouts",
+    "tx_timeouts",
+)
+CONFIG_FIELDS = ("device", "rx_rate", "tx_rate", "rx_channels", "tx_channels")
+
+Regression = collections.namedtuple(
+    'Regression',
+    """
+    config
+    metric
+    baseline
+    candidate
+    tolerance
+    """
+)
+
+def get_uhd_version(output):
+    """
+    Returns the UHD version from the output of a UHD application, or None.
+    The version is taken from the line UHD logs on startup
+    (e.g. "[INFO] [UHD] linux; ...; UHD_4.2.0.git-10-g1a2b3c4"), or from the
+    output of uhd_config_info --version ("UHD 4.2.0.git-10-g1a2b3c4").
+    """
+    match = re.search(r"\bUHD[_ ](\d+\.\d+\S*)", output)
+    return match.group(1) if match else None
+
+def get_config(device, benchmark_rate_params):
+    """
+    Returns the configuration key of a run as a dict.
+    """
+    return {
+        "device": device,
+        "rx_rate": float(benchmark_rate_params.get("rx_rate", 0) or 0),
+        "tx_rate": float(benchmark_rate_params.get("tx_rate", 0) or 0),
+        "rx_channels": str(benchmark_rate_params.get("rx_channels", "")),
+        "tx_channels": str(benchmark_rate_params.get("tx_channels", "")),
+    }
+
+class BenchmarkHistory:
+    """
+    SQLite database of benchmark_rate runs.
+    """
+    def __init__(self, db_path):
+        self._conn = sqlite3.connect(db_path)
+        self._conn.row_factory = sqlite3.Row
+        columns = ", ".join(
+            "{} INTEGER NOT NULL".format(field)
+            for field in parse_benchmark_rate.Results._fields
+            if field not in ("rx_rate", "tx_rate"))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "timestamp REAL NOT NULL, "
+            "uhd_version TEXT NOT NULL, "
+            "device TEXT NOT NULL, "
+            "rx_rate REAL NOT NULL, "
+            "tx_rate REAL NOT NULL, "
+            "rx_channels TEXT NOT NULL, "
+            "tx_channels TEXT NOT NULL, "
+            "duration REAL NOT NULL, "
+            + columns + ")")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS runs_config ON runs "
+            "(device, rx_rate, tx_rate, rx_channels, tx_channels, uhd_version)")
+        self._conn.commit()
+
+    def close(self):
+        """
+        Closes the database.
+        """
+        self._conn.close()
+
+    def add_run(self, config, uhd_version, duration, results):
+        """
+        Stores a single parsed benchmark_rate result. config is a dict as
+        returned by get_config(). The rates of the config are stored, rather
+        than those reported in results, so runs can be looked up by the
+        requested values.
+        """
+        row = dict(results._asdict())
+        row.update(config)
+        row.update({
+            "timestamp": time.time(),
+            "uhd_version": uhd_version,
+            "duration": float(duration),
+        })
+        keys = sorted(row)
+        self._conn.execute(
+            "INSERT INTO runs ({}) VALUES ({})".format(
+                ", ".join(keys), ", ".join("?" * len(keys))),
+            [row[key] for key in keys])
+        self._conn.commit()
+
+    def get_runs(self, config, uhd_version):
+        """
+        Returns all runs of a config and UHD version as a list of dicts, with
+        the throughput metrics added.
+        """
+        query = "SELECT * FROM runs WHERE uhd_version = ? AND " + \
+            " AND ".join("{} = ?".format(field) for field in CONFIG_FIELDS)
+        rows = self._conn.execute(
+            query, [uhd_version] + [config[field] for field in CONFIG_FIELDS])
+        return [_add_throughput(dict(row)) for row in rows]
+
+    def get_configs(self, device=None):
+        """
+        Returns a list of (config, uhd_version, number of runs), optionally
+        limited to a single device.
+        """
+        query = "SELECT {}, uhd_version, COUNT(*) AS num_runs FROM runs".format(
+            ", ".join(CONFIG_FIELDS))
+        params = []
+        if device is not None:
+            query += " WHERE device = ?"
+            params.append(device)
+        query += " GROUP BY {}, uhd_version ORDER BY {}, MIN(timestamp)".format(
+            ", ".join(CONFIG_FIELDS), ", ".join(CONFIG_FIELDS))
+        return [
+            ({field: row[field] for field in CONFIG_FIELDS},
+             row["uhd_version"], row["num_runs"])
+            for row in self._conn.execute(query, params)
+        ]
+
+def _add_throughput(run):
+    """
+    Adds the throughput metrics to a run.
+    """
+    for direction, samps in (("rx", "received_samps"), ("tx", "transmitted_samps")):
+        expected_samps = \
+            run["num_{}_channels".format(direction)] * run["duration"] * run[direction + "_rate"]
+        run[direction + "_throughput"] = \
+            run[samps] / expected_samps if expected_samps > 0 else 0.0
+    return run
+
+def _mean_var(values):
+    """
+    Returns mean and (sample) variance of a list of values.
+    """
+    mean = sum(values) / len(values)
+    if len(values) < 2:
+        return mean, 0.0
+    return mean, sum((x - mean) ** 2 for x in values) / (len(values) - 1)
+
+def compare(baseline_runs, candidate_runs, config=None, num_sigmas=3.0,
+            throughput_tolerance=0.01, error_tolerance=0.5):
+    """
+    Compares two lists of runs of the same config, and returns a list of
+    Regression objects.
+
+    A metric regresses if the difference of its means exceeds both
+    num_sigmas standard errors of that difference, and a fixed minimum
+    tolerance: throughput_tolerance (relative to the baseline) for
+    throughput metrics, and error_tolerance (absolute counts) for error
+    counters.
+    """
+    regressions = []
+    if not baseline_runs or not candidate_runs:
+        return regressions
+    for metric in THROUGHPUT_METRICS + ERROR_METRICS:
+        base_mean, base_var = _mean_var([run[metric] for run in baseline_runs])
+        cand_mean, cand_var = _mean_var([run[metric] for run in candidate_runs])
+        std_err = math.sqrt(
+            base_var / len(baseline_runs) + cand_var / len(candidate_runs))
+        if metric in THROUGHPUT_METRICS:
+            tolerance = max(num_sigmas * std_err, throughput_tolerance * base_mean)
+            regressed = base_mean - cand_mean > tolerance
+        else:
+            tolerance = max(num_sigmas * std_err, error_tolerance)
+            regressed = cand_mean - base_mean > tolerance
+        if regressed:
+            regressions.append(
+                Regression(config, metric, base_mean, cand_mean, tolerance))
+    return regressions
+
+def compare_versions(history, baseline, candidate, device=None, **kwargs):
+    """
+    Compares all configs for which both UHD versions have runs. Returns a list
+    of Regression objects.
+    """
+    configs = {}
+    for config, uhd_version, _ in history.get_configs(device):
+        configs.setdefault(tuple(config.values()), (config, set()))[1].add(uhd_version)
+    regressions = []
+    for config, uhd_versions in configs.values():
+        if baseline in uhd_versions and candidate in uhd_versions:
+            regressions += compare(
+                history.get_runs(config, baseline),
+                history.get_runs(config, candidate),
+                config, **kwargs)
+    return regressions
+
+def format_config(config):
+    """
+    Returns a config as a short string, e.g.:
+    X410 rx 2.457e+08 sps on 0,1, tx 0.000e+00 sps on -
+    """
+    return "{} rx {:.3e} sps on {}, tx {:.3e} sps on {}".format(
+        config["device"], config["rx_rate"], config["rx_channels"] or "-",
+        config["tx_rate"], config["tx_channels"] or "-")
+
+def format_regression(regression):
+    """
+    Returns a regression as a human-readable string.
+    """
+    return "{}: {} regressed from {:.4g} to {:.4g} (tolerance {:.4g})".format(
+        format_config(regression.config), regression.metric,
+        regression.baseline, regression.candidate, regression.tolerance)
+
+def parse_args():
+    """
+    Parse the command line arguments for benchmark history.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", type=str, required=True, help="path to the history database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    list_parser = subparsers.add_parser("list", help="list stored configs and UHD versions")
+    list_parser.add_argument("--device", type=str, help="only list this device")
+    compare_parser = subparsers.add_parser(
+        "compare", help="compare the runs of two UHD versions")
+    compare_parser.add_argument("--device", type=str, help="only compare this device")
+    compare_parser.add_argument("--baseline", type=str, required=True,
+                                help="UHD version of the baseline")
+    compare_parser.add_argument("--candidate", type=str, required=True,
+                                help="UHD version to check")
+    compare_parser.add_argument("--num_sigmas", type=float, default=3.0,
+                                help="statistical tolerance in standard errors")
+    compare_parser.add_argument("--throughput_tolerance", type=float, default=0.01,
+                                help="minimum relative drop in throughput to flag")
+    compare_parser.add_argument("--error_tolerance", type=float, default=0.5,
+                                help="minimum rise in mean error counts to flag")
+    return parser.parse_args()
+
+def main():
+    """
+    Lists the history, or compares two UHD versions. Returns the exit code.
+    """
+    args = parse_args()
+    history = BenchmarkHistory(args.db)
+    try:
+        if args.command == "list":
+            for config, uhd_version, num_runs in history.get_configs(args.device):
+                print("{} @ {}: {} runs".format(format_config(config), uhd_version, num_runs))
+            return 0
+        regressions = compare_versions(
+            history, args.baseline, args.candidate, args.device,
+            num_sigmas=args.num_sigmas,
+            throughput_tolerance=args.throughput_tolerance,
+            error_tolerance=args.error_tolerance)
+    finally:
+        history.close()
+    for regression in regressions:
+        print(format_regression(regression))
+    if regressions:
+        print("{} regression(s) found.".format(len(regressions)))
+        return 1
+    print("No regressions found.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
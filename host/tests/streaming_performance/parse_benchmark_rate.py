@@ -8,6 +8,7 @@ values printed at the end of execution.
 """
 
 import collections
+import json
 import re
 import csv
 
@@ -118,6 +119,18 @@ def parse(result_str):
     else:
         return None
 
+def parse_json(file_name):
+    """
+    Reads the results that benchmark_rate wrote with --result_json. Returns
+    None if the file is missing or incomplete.
+    """
+    try:
+        with open(file_name) as result_file:
+            result = json.load(result_file)
+        return Results(**{field: result[field] for field in Results._fields})
+    except (OSError, ValueError, KeyError):
+        return None
+
 def write_benchmark_rate_csv(results, file_name):
     with open(file_name, 'w', newline='') as f:
         w = csv.writer(f)
@@ -7,6 +7,7 @@ Helper script that provides a Python interface to run the benchmark rate C++
 example.
 """
 import argparse
+import functools
 import subprocess
 
 def run(path, params):
@@ -21,6 +22,15 @@ def run(path, params):
 
     return subprocess.run(proc_params, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
+@functools.lru_cache()
+def supports_arg(path, arg):
+    """
+    Returns True if the help message of benchmark rate lists the argument
+    --<arg>. Older versions do not support all arguments of create_parser().
+    """
+    proc = subprocess.run([path, "--help"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return "--" + arg + " " in (proc.stdout + proc.stderr).decode('ASCII', 'replace')
+
 def create_parser():
     parser = argparse.ArgumentParser()
     parser.add_argument("--args", type=str, help="single uhd device address args")
@@ -40,6 +50,7 @@ def create_parser():
     parser.add_argument("--random", type=str, help="Run with random values of samples in send() and recv()")
     parser.add_argument("--rx_channels", type=str, help="which RX channel(s) to use")
     parser.add_argument("--tx_channels", type=str, help="which TX channel(s) to use")
+    parser.add_argument("--result_json", type=str, help="write the results to this file as JSON")
     return parser
 
 def parse_args():
@@ -0,0 +1,219 @@
+#
+# Copyright 2026 Ettus Research, a National Instruments Brand
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""
+Unit test for uhd.usrp.tx_engine
+"""
+
+import enum
+import queue
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+import numpy as np
+from uhd.usrp import tx_engine
+from uhd.usrp.tx_engine import TxEngine, tile_waveform
+
+class EventCode(enum.Enum):
+    """ Stands in for tx_metadata_event_code """
+    burst_ack = 1
+    underflow = 2
+    seq_error = 4
+    time_error = 8
+    underflow_in_packet = 16
+    seq_error_in_packet = 32
+
+class TxMetadata:
+    """ Stands in for tx_metadata """
+    def __init__(self):
+        self.has_time_spec = False
+        self.time_spec = None
+        self.end_of_burst = False
+
+class AsyncMetadata:
+    """ Stands in for async_metadata, whose event_code is read-only """
+    def __init__(self):
+        self.event_code = None
+
+FAKE_LIB = SimpleNamespace(types=SimpleNamespace(
+    tx_metadata=TxMetadata,
+    async_metadata=AsyncMetadata,
+    tx_metadata_event_code=EventCode))
+
+class FakeStreamer:
+    """
+    TX streamer which records every call to send(). Once it was sent the
+    end-of-burst, it reports the events in eob_events as async messages,
+    after a delay of ack_delay seconds.
+    """
+    def __init__(self, num_chans=1, max_samps_per_send=None, fail=False,
+                 eob_events=(EventCode.burst_ack,), ack_delay=0.0):
+        self.num_chans = num_chans
+        self.max_samps_per_send = max_samps_per_send
+        self.fail = fail
+        self.eob_events = eob_events
+        self.ack_delay = ack_delay
+        self.sends = []
+        self._async_msgs = queue.Queue()
+
+    def get_num_channels(self):
+        return self.num_chans
+
+    def get_max_num_samps(self):
+        return 10
+
+    def send(self, samples, metadata, timeout):
+        if self.fail:
+            raise RuntimeError("send failed")
+        num_samps = samples.shape[-1]
+        if metadata.end_of_burst:
+            threading.Timer(
+                self.ack_delay,
+                lambda: [self._async_msgs.put(event) for event in self.eob_events]).start()
+        elif self.max_samps_per_send:
+            num_samps = min(num_samps, self.max_samps_per_send)
+        self.sends.append(
+            (np.array(samples[..., :num_samps]), metadata.has_time_spec, metadata.end_of_burst))
+        return num_samps
+
+    def recv_async_msg(self, metadata, timeout):
+        try:
+            metadata.event_code = self._async_msgs.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        return True
+
+    def get_samples(self):
+        """ Returns all samples sent before the end-of-burst """
+        return np.concatenate([samples for samples, _, eob in self.sends if not eob], axis=-1)
+
+class TileWaveformTest(unittest.TestCase):
+    """ Test tile_waveform() """
+    def test_1d(self):
+        waveform = np.arange(7)
+        tiled = tile_waveform(waveform, 2, 20)
+        self.assertEqual(tiled.shape, (2, 21))
+        self.assertEqual(tiled.dtype, np.complex64)
+        self.assertTrue(tiled.flags['C_CONTIGUOUS'])
+        for row in tiled:
+            np.testing.assert_array_equal(row, np.tile(waveform, 3))
+
+    def test_rows(self):
+        waveform = np.array([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
+        # Extra rows are dropped
+        np.testing.assert_array_equal(
+            tile_waveform(waveform, 2, 6), [[1, 2, 3, 1, 2, 3], [4, 5, 6, 4, 5, 6]])
+        # Missing rows are filled with the first one
+        np.testing.assert_array_equal(
+            tile_waveform(waveform[:1], 2, 1), [[1, 2, 3], [1, 2, 3]])
+
+    def test_empty(self):
+        with self.assertRaises(ValueError):
+            tile_waveform(np.zeros(0), 1, 10)
+
+class TxEngineTest(unittest.TestCase):
+    """ Test the TxEngine start/stop lifecycle """
+    def setUp(self):
+        patcher = mock.patch.object(tx_engine, 'lib', FAKE_LIB)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def check_eob(self, streamer):
+        """ The last send() is the end-of-burst, and only that one """
+        self.assertEqual([eob for _, _, eob in streamer.sends],
+                         [False] * (len(streamer.sends) - 1) + [True])
+
+    def test_waveform_mode(self):
+        streamer = FakeStreamer(num_chans=2, max_samps_per_send=30)
+        engine = TxEngine(streamer, burst_size=100)
+        waveform = np.arange(8)
+        engine.start(waveform, num_samps=250, start_time=1.0)
+        self.assertTrue(engine.wait(5.0))
+        self.assertFalse(engine.is_running())
+        samples = streamer.get_samples()
+        self.assertEqual(samples.shape, (2, 250))
+        for row in samples:
+            np.testing.assert_array_equal(row, np.tile(waveform, 32)[:250])
+        self.assertEqual([time_spec for _, time_spec, _ in streamer.sends],
+                         [True] + [False] * (len(streamer.sends) - 1))
+        self.check_eob(streamer)
+        counters = engine.get_counters()
+        self.assertEqual(counters['samps_sent'], 250)
+        self.assertEqual(counters['sends'], len(streamer.sends) - 1)
+        self.assertGreater(counters['send_timeouts'], 0)
+        self.assertEqual(counters['bursts_acked'], 1)
+
+    def test_queue_mode(self):
+        streamer = FakeStreamer()
+        engine = TxEngine(streamer)
+        engine.start()
+        buffers = [np.full(size, index, dtype=np.complex64)
+                   for index, size in enumerate((5, 20, 3))]
+        for buffer in buffers:
+            self.assertTrue(engine.submit(buffer, timeout=1.0))
+        engine.finish()
+        self.assertTrue(engine.wait(5.0))
+        np.testing.assert_array_equal(streamer.get_samples(), [np.concatenate(buffers)])
+        self.check_eob(streamer)
+        self.assertEqual(engine.get_counters()['samps_sent'], 28)
+
+    def test_stop(self):
+        streamer = FakeStreamer()
+        engine = TxEngine(streamer, burst_size=10)
+        engine.start(np.ones(10))
+        with self.assertRaises(RuntimeError):
+            engine.start(np.ones(10))
+        time.sleep(0.05)
+        engine.stop()
+        self.assertFalse(engine.is_running())
+        self.check_eob(streamer)
+        self.assertEqual(engine.get_counters()['bursts_acked'], 1)
+        # The engine can be restarted
+        engine.start(np.ones(10), num_samps=10)
+        self.assertTrue(engine.wait(5.0))
+        self.assertEqual(engine.get_counters()['samps_sent'], 10)
+
+    def test_events_until_burst_ack(self):
+        # The async thread keeps counting after the send thread is done,
+        # until the burst is acknowledged
+        streamer = FakeStreamer(
+            eob_events=(EventCode.underflow, EventCode.seq_error_in_packet,
+                        EventCode.burst_ack, EventCode.time_error),
+            ack_delay=0.3)
+        engine = TxEngine(streamer)
+        engine.start(np.ones(10), num_samps=10)
+        self.assertTrue(engine.wait(5.0))
+        counters = engine.get_counters()
+        self.assertEqual(counters['underflows'], 1)
+        self.assertEqual(counters['seq_errors'], 1)
+        self.assertEqual(counters['bursts_acked'], 1)
+        self.assertEqual(counters['time_errors'], 0)
+
+    def test_missing_burst_ack(self):
+        streamer = FakeStreamer(eob_events=())
+        engine = TxEngine(streamer)
+        with mock.patch.object(tx_engine, 'BURST_ACK_TIMEOUT', 0.2):
+            engine.start(np.ones(10), num_samps=10)
+            self.assertTrue(engine.wait(5.0))
+        self.assertEqual(engine.get_counters()['bursts_acked'], 0)
+
+    def test_send_error(self):
+        streamer = FakeStreamer(fail=True)
+        engine = TxEngine(streamer)
+        engine.start(np.ones(10), num_samps=10)
+        with self.assertRaisesRegex(RuntimeError, "send failed"):
+            engine.wait(5.0)
+        # The error is only raised once
+        engine.stop()
+        engine.start()
+        engine.submit(np.ones(10))
+        with self.assertRaisesRegex(RuntimeError, "send failed"):
+            engine.stop()
+        self.assertFalse(engine.is_running())
+
+if __name__ == '__main__':
+    unittest.main()
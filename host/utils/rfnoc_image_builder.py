@@ -18,6 +18,8 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import sys
 import argparse
+import concurrent.futures
+import copy
 import hashlib
 import logging
 import os
@@ -40,7 +42,10 @@ def setup_parser():
     config_group = parser.add_mutually_exclusive_group(required=True)
     config_group.add_argument(
         "-y", "--yaml-config",
-        help="Path to yml configuration file")
+        nargs="+",
+        help="Path to yml configuration file. If multiple files are given, "
+             "their image cores are generated in parallel (requires "
+             "--generate-only).")
     config_group.add_argument(
         "-r", "--grc-config",
         help="Path to grc file to generate config from")
@@ -105,6 +110,27 @@ def setup_parser():
         help="Path to the base install for Xilinx Vivado if not in default "
              "location (e.g., /tools/Xilinx/Vivado).",
         default=None)
+    parser.add_argument(
+        "-j", "--jobs",
+        help="Number of image configurations to generate in parallel. "
+             "Defaults to the number of CPUs.",
+        type=int,
+        default=os.cpu_count())
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory for the block description cache. Defaults to "
+             "$XDG_CACHE_HOME/uhd/imgbuilder.",
+        default=os.path.join(
+            os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+            "uhd", "imgbuilder"))
+    parser.add_argument(
+        "--no-cache",
+        help="Do not use the block description cache",
+        action="store_true")
+    parser.add_argument(
+        "-f", "--force",
+        help="Generate files even if they are up to date",
+        action="store_true")
 
     return parser
 
@@ -192,12 +218,12 @@ def get_config_path():
         os.path.dirname(__file__), '..', 'include', 'uhd')))
 
 
-def main():
+def run_image_builder(args):
     """
-    Wrapper for image_builder.build_image.
-    :return: exit code
+    Run image_builder.build_image for a single image configuration.
+    :param args: arguments passed to the script, with a single yaml_config
+    :return: return value of image_builder.build_image
     """
-    args = setup_parser().parse_args()
     if args.log_level is not None:
         logging.root.setLevel(args.log_level.upper())
 
@@ -206,7 +232,7 @@ def main():
     with open(source, "rb") as source_file:
         source_hash.update(source_file.read())
 
-    image_builder.build_image(
+    return image_builder.build_image(
         config=config,
         fpga_path=get_fpga_path(args),
         config_path=get_config_path(),
@@ -222,7 +248,95 @@ def main():
         router_hex_path=args.router_hex_output,
         include_paths=args.include_dir,
         vivado_path=args.vivado_path,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        force=args.force,
         )
 
+
+def get_output_paths(args):
+    """
+    Returns the files which run_image_builder() will write for a single image
+    configuration.
+    :param args: arguments passed to the script, with a single yaml_config
+    :return: tuple of image core, image core header and edge file paths
+    """
+    _, source, _, image_core_name, _ = image_config(args)
+    return (
+        image_builder.generate_image_core_path(
+            args.image_core_output, image_core_name, source),
+        image_builder.generate_image_core_header_path(
+            args.image_core_output, image_core_name, source),
+        image_builder.generate_edge_file_path(
+            args.router_hex_output, image_core_name, source),
+    )
+
+
+def run_image_builder_parallel(args):
+    """
+    Generate the image cores for all YAML configurations in args.yaml_config
+    in parallel.
+    :param args: arguments passed to the script
+    :return: exit code
+    """
+    if not args.generate_only:
+        logging.error("Multiple image configurations can only be processed "
+                      "with --generate-only.")
+        return 1
+    if args.image_core_output or args.router_hex_output:
+        logging.error("--image-core-output and --router-hex-output can't be "
+                      "used with multiple image configurations.")
+        return 1
+    # Every configuration gets its own copy of the arguments
+    jobs = []
+    for yaml_config in args.yaml_config:
+        job_args = copy.copy(args)
+        job_args.yaml_config = yaml_config
+        jobs.append(job_args)
+    # Two configurations writing the same files would overwrite each other
+    # (e.g. when they share the same image_core_name)
+    outputs = {}
+    result = 0
+    for job_args in jobs:
+        for path in get_output_paths(job_args):
+            if path in outputs:
+                logging.error("%s and %s both generate %s",
+                              outputs[path], job_args.yaml_config, path)
+                result = 1
+            outputs[path] = job_args.yaml_config
+    if result:
+        logging.error("Set a unique image_core_name for each image configuration.")
+        return result
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max(1, min(args.jobs, len(jobs)))) as executor:
+        futures = {executor.submit(run_image_builder, job_args): job_args.yaml_config
+                   for job_args in jobs}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+            except SystemExit as ex:
+                if ex.code:
+                    logging.error("Failed to generate %s", futures[future])
+                    result = 1
+            except Exception as ex:
+                logging.error("Failed to generate %s: %s", futures[future], ex)
+                result = 1
+    return result
+
+
+def main():
+    """
+    Wrapper for image_builder.build_image.
+    :return: exit code
+    """
+    args = setup_parser().parse_args()
+    if args.log_level is not None:
+        logging.root.setLevel(args.log_level.upper())
+
+    if args.yaml_config and len(args.yaml_config) > 1:
+        return run_image_builder_parallel(args)
+    if args.yaml_config:
+        args.yaml_config = args.yaml_config[0]
+    run_image_builder(args)
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -8,6 +8,7 @@
 Utility to run power calibrations with USRPs
 """
 
+import os
 import sys
 import time
 import math
@@ -93,14 +94,24 @@ def parse_args():
     parser.add_argument(
         '-r', '--rate', type=float,
         help='Sampling rate at which the calibration is performed')
+    parser.add_argument(
+        '--parallel', action='store_true',
+        help='Calibrate all channels of an antenna port at the same time. This '
+             'is only available for RX calibration, and requires a switch that '
+             'can connect the signal generator to all channels at once (e.g., '
+             'the manual switch with --switch-option parallel=1 and a '
+             'splitter). The splitter loss must be included in --attenuation.')
     parser.add_argument(
         '--store', metavar='filename.pickle',
-        help='If provided, will store intermediate cal data. This can be analyzed '
-        'separately, or loaded into the tool with --load.')
+        help='If provided, will store intermediate cal data. The file is updated '
+        'after every frequency, so an interrupted calibration can be resumed '
+        'by passing the same file to --load. It can also be analyzed '
+        'separately.')
     parser.add_argument(
         '--load', metavar='filename.pickle',
-        help='If provided, will load intermediate cal data instead of running a '
-        'measurement.')
+        help='If provided, will load intermediate cal data. Channels and '
+        'antennas that were completely calibrated are not measured again, '
+        'partially calibrated ones resume at the next frequency.')
     return parser.parse_args()
 
 
@@ -150,14 +161,87 @@ def sanitize_args(usrp, args, default_rate):
     return channels, antennas, actual_rate
 
 
-def init_results(pickle_file):
+class CalCheckpoint:
+    """
+    Intermediate cal data, stored incrementally to a pickle file.
+
+    results[chan][ant][freq][gain] holds the measured power. A channel/antenna
+    pair is only marked complete once all of its frequencies were measured, so
+    an interrupted calibration can be resumed from the pickle file.
+    """
+    def __init__(self, load_file=None, store_file=None):
+        self.results = {}
+        self.complete = set()
+        self._store_file = store_file
+        if load_file is not None:
+            self._load(load_file)
+
+    def _load(self, pickle_file):
+        """
+        Load results from pickle file. Files written by older versions of this
+        tool only contain complete results.
+        """
+        with open(pickle_file, 'rb') as results_file:
+            data = pickle.load(results_file)
+        if 'results' in data and 'complete' in data:
+            self.results = data['results']
+            self.complete = set(data['complete'])
+        else:
+            self.results = data
+            self.complete = {
+                (chan, ant) for chan in data for ant in data[chan]}
+
+    def is_complete(self, chan, ant):
+        """
+        Return True if this channel/antenna pair was completely calibrated
+        """
+        return (chan, ant) in self.complete
+
+    def get_partial(self, chan, ant):
+        """
+        Return the results of a channel/antenna pair, of the form
+        results[freq][gain] = power
+        """
+        return dict(self.results.get(chan, {}).get(ant, {}))
+
+    def update(self, chan, ant, freq, freq_results):
+        """
+        Add the results for a single frequency, and write them out
+        """
+        self.results.setdefault(chan, {}).setdefault(ant, {})[freq] = freq_results
+        self.store()
+
+    def mark_complete(self, chan, ant):
+        """
+        Mark a channel/antenna pair as complete, and write that out
+        """
+        self.complete.add((chan, ant))
+        self.store()
+
+    def store(self):
+        """
+        Write the current state to the pickle file, if we have one. The file is
+        replaced atomically, so it stays intact if we get interrupted.
+        """
+        if self._store_file is None:
+            return
+        tmp_file = self._store_file + '.tmp'
+        with open(tmp_file, 'wb') as results_file:
+            pickle.dump({
+                'results': self.results,
+                'complete': sorted(self.complete),
+            }, results_file)
+        os.replace(tmp_file, self._store_file)
+
+
+def get_port_groups(channels, antennas, parallel):
     """
-    Initialize results from pickle file, or empty dict
+    Return a list of (chans, antenna) tuples, where every tuple is calibrated
+    in one go.
     """
-    if pickle_file is None:
-        return {}
-    with open(pickle_file, 'rb') as results_file:
-        return pickle.load(results_file)
+    if parallel:
+        return [(channels, ant) for ant in antennas]
+    return [([chan], ant) for chan in channels for ant in antennas]
 
 class CalRunner:
     """
@@ -174,15 +258,16 @@ class CalRunner:
             print("=== Using USRP LO offset: {:.2f} MHz"
                   .format(self.lo_offset / 1e6))
 
-    def run(self, chan, freq):
+    def run(self, chans, freq):
         """
-        Run all cal steps for a single frequency
+        Run all cal steps for a single frequency on all channels in chans
         """
         print("=== Running calibration at frequency {:.3f} MHz...".format(freq / 1e6))
         tune_req = uhd.types.TuneRequest(freq, self.lo_offset)
-        getattr(self.usrp, 'set_{}_freq'.format(self.dir))(tune_req, chan)
+        for chan in chans:
+            getattr(self.usrp, 'set_{}_freq'.format(self.dir))(tune_req, chan)
         time.sleep(self.usrp_cal.tune_settling_time)
-        actual_freq = getattr(self.usrp, 'get_{}_freq'.format(self.dir))(chan)
+        actual_freq = getattr(self.usrp, 'get_{}_freq'.format(self.dir))(chans[0])
         if abs(actual_freq - freq) > 1.0:
             print("WARNING: Frequency was coerced from {:.2f} MHz to {:.2f} MHz!"
                   .format(freq / 1e6, actual_freq / 1e6))
@@ -210,7 +295,12 @@ def main():
         gain_step=args.gain_step,
     )
     channels, antennas, rate = sanitize_args(usrp, args, usrp_cal.default_rate)
-    results = init_results(args.load)
+    parallel = args.parallel and len(channels) > 1
+    if parallel and (args.dir != 'rx' or not switch.supports_parallel()):
+        raise ValueError(
+            "Parallel calibration requires RX direction and a switch that can "
+            "connect all channels at once!")
+    checkpoint = CalCheckpoint(args.load, args.store)
     usrp_cal.init(
         rate=rate,
         tone_freq=args.tone_freq,
@@ -218,38 +308,52 @@ def main():
     )
     print("=== Launching calibration...")
     cal_runner = CalRunner(usrp, usrp_cal, meas_dev, args)
-    for chan in channels:
-        if chan not in results:
-            results[chan] = {}
-        for ant in antennas:
-            if ant in results[chan]:
+    for chans, ant in get_port_groups(channels, antennas, parallel):
+        for chan in chans:
+            if checkpoint.is_complete(chan, ant):
                 print("=== Using pickled data for channel {}, antenna {}."
                       .format(chan, ant))
-                continue
-            print("=== Running calibration for channel {}, antenna {}."
-                  .format(chan, ant))
-            # Set up all the objects
+        chans = [chan for chan in chans if not checkpoint.is_complete(chan, ant)]
+        if not chans:
+            continue
+        print("=== Running calibration for channel{} {}, antenna {}."
+              .format("s" if len(chans) > 1 else "",
+                      ", ".join(str(chan) for chan in chans), ant))
+        # Set up all the objects
+        for chan in chans:
             getattr(usrp, 'set_{}_antenna'.format(args.dir))(ant, chan)
-            switch.connect(chan, ant)
-            usrp_cal.update_port(chan, ant)
-            freqs = usrp_cal.init_frequencies(args.start, args.stop, args.step)
-            usrp_cal.start() # This will activate siggen
-            # Now calibrate
-            for freq in freqs:
-                try:
-                    cal_runner.run(chan, freq)
-                except RuntimeError as ex:
-                    print("ERROR: Stopping calibration due to exception: {}"
-                          .format(str(ex)))
-                    usrp_cal.stop()
-                    return 1
-            # Store results for pickling and shut down for next antenna port
-            results[chan][ant] = usrp_cal.results
-            usrp_cal.stop() # This will deactivate siggen and store the data
+        if len(chans) > 1:
+            switch.connect_parallel(chans, ant)
+        else:
+            switch.connect(chans[0], ant)
+        usrp_cal.update_ports(chans, ant)
+        freqs = usrp_cal.init_frequencies(args.start, args.stop, args.step)
+        # Pick up where we left off, if we have partial results
+        for chan in chans:
+            usrp_cal.results[chan] = checkpoint.get_partial(chan, ant)
+        usrp_cal.start() # This will activate siggen
+        # Now calibrate
+        for freq in freqs:
+            if all(freq in usrp_cal.results[chan] for chan in chans):
+                print("=== Using pickled data at frequency {:.3f} MHz."
+                      .format(freq / 1e6))
+                continue
+            try:
+                cal_runner.run(chans, freq)
+            except RuntimeError as ex:
+                print("ERROR: Stopping calibration due to exception: {}"
+                      .format(str(ex)))
+                usrp_cal.stop()
+                return 1
+            # Checkpoint the results for this frequency
+            for chan in chans:
+                checkpoint.update(
+                    chan, ant, freq, usrp_cal.results[chan].get(freq, {}))
+        for chan in chans:
+            checkpoint.mark_complete(chan, ant)
+        usrp_cal.stop() # This will deactivate siggen and store the data
     if args.store:
-        print("=== Storing pickled calibration data to {}...".format(args.store))
-        with open(args.store, 'wb') as results_file:
-            pickle.dump(results, results_file)
+        print("=== Stored pickled calibration data to {}.".format(args.store))
     return 0
 
 if __name__ == "__main__":
@@ -10,6 +10,7 @@
 #include <boost/noncopyable.hpp>
 #include <memory>
 #include <string>
+#include <vector>
 
 namespace mpm { namespace spi {
 
@@ -44,6 +45,14 @@ public:
      */
     virtual uint64_t transfer64_40(const uint64_t data) = 0;
 
+    /*! Convenience function: Send a list of 24 bit write-only xfers as a
+     *  single SPI message. Chip select is deasserted between the xfers, so
+     *  each of them is seen as a separate transaction by the device.
+     *
+     * \param data The write data of the xfers, in order
+     */
+    virtual void write24_batch(const std::vector<uint32_t>& data) = 0;
+
     /*!
      * \param device The path to the spidev used (e.g. "/dev/spidev0.0")
      * \param speed_hz Transaction speed in Hz
@@ -10,6 +10,8 @@
 #include <boost/noncopyable.hpp>
 #include <cstdint>
 #include <string>
+#include <utility>
+#include <vector>
 
 namespace mpm { namespace types {
 
@@ -34,6 +36,9 @@ public:
     //! Write \p data to \p addr
     void poke32(const uint32_t addr, const uint32_t data);
 
+    //! Write a list of (address, data) pairs, in order
+    void pokes32(const std::vector<std::pair<uint32_t, uint32_t>>& addr_vals);
+
     //! Read data from \p addr
     uint32_t peek32(const uint32_t addr);
 
@@ -7,7 +7,10 @@
 #pragma once
 
 #include <boost/noncopyable.hpp>
+#include <cstdint>
 #include <memory>
+#include <utility>
+#include <vector>
 
 namespace mpm { namespace types {
 
@@ -34,6 +37,30 @@ public:
      */
     virtual void poke16(const uint32_t addr, const uint16_t data) = 0;
 
+    /*! Write a list of (address, 8-bit value) pairs, in order
+     *
+     * Interfaces which can batch writes override this to issue them as a
+     * single transaction. The default calls poke8() for every pair.
+     */
+    virtual void pokes8(const std::vector<std::pair<uint32_t, uint8_t>>& addr_vals)
+    {
+        for (const auto& addr_val : addr_vals) {
+            poke8(addr_val.first, addr_val.second);
+        }
+    }
+
+    /*! Write a list of (address, 16-bit value) pairs, in order
+     *
+     * Interfaces which can batch writes override this to issue them as a
+     * single transaction. The default calls poke16() for every pair.
+     */
+    virtual void pokes16(const std::vector<std::pair<uint32_t, uint16_t>>& addr_vals)
+    {
+        for (const auto& addr_val : addr_vals) {
+            poke16(addr_val.first, addr_val.second);
+        }
+    }
+
     /*! Return a 32-bit value from a given address
      */
     virtual uint32_t peek32(const uint64_t addr) = 0;
@@ -11,6 +11,7 @@
 #include "log_buf.hpp"
 #include "mmap_regs_iface.hpp"
 #include "regs_iface.hpp"
+#include <pybind11/stl.h>
 
 void export_types(py::module& top_module)
 {
@@ -26,6 +27,8 @@ void export_types(py::module& top_module)
         .def("poke8", &regs_iface::poke8)
         .def("peek16", &regs_iface::peek16)
         .def("poke16", &regs_iface::poke16)
+        .def("pokes8", &regs_iface::pokes8)
+        .def("pokes16", &regs_iface::pokes16)
         .def("peek32", &regs_iface::peek32)
         .def("poke32", &regs_iface::poke32);
 
@@ -45,5 +48,6 @@ void export_types(py::module& top_module)
         .def("open", &mmap_regs_iface::open)
         .def("close", &mmap_regs_iface::close)
         .def("peek32", &mmap_regs_iface::peek32)
-        .def("poke32", &mmap_regs_iface::poke32);
+        .def("poke32", &mmap_regs_iface::poke32)
+        .def("pokes32", &mmap_regs_iface::pokes32);
 }
@@ -72,6 +72,30 @@ public:
         _spi_iface->transfer24_16(transaction);
     }
 
+    void pokes8(const std::vector<std::pair<uint32_t, uint8_t>>& addr_vals)
+    {
+        std::vector<uint32_t> transactions;
+        transactions.reserve(addr_vals.size());
+        for (const auto& addr_val : addr_vals) {
+            transactions.push_back(_write_flags | (addr_val.first << _addr_shift)
+                                   | (addr_val.second << _data_shift));
+        }
+
+        _spi_iface->write24_batch(transactions);
+    }
+
+    void pokes16(const std::vector<std::pair<uint32_t, uint16_t>>& addr_vals)
+    {
+        std::vector<uint32_t> transactions;
+        transactions.reserve(addr_vals.size());
+        for (const auto& addr_val : addr_vals) {
+            transactions.push_back(_write_flags | (addr_val.first << _addr_shift)
+                                   | (addr_val.second << _data_shift));
+        }
+
+        _spi_iface->write24_batch(transactions);
+    }
+
     uint32_t peek32(const uint64_t addr)
     {
         /* Note: _addr_shift and _read_flags will be offset from the
@@ -138,3 +138,45 @@ int transfer(
     return 0;
 }
 
+
+/* Number of transfers per SPI_IOC_MESSAGE ioctl. The size of the transfer
+ * array is limited by the size field of the ioctl number. */
+#define MAX_BATCH_XFERS 256
+
+int transfer_batch(
+        int fd,
+        uint8_t *tx, uint32_t len, uint32_t num_xfers,
+        uint32_t speed_hz, uint8_t bits_per_word, uint16_t delay_us
+) {
+    struct spi_ioc_transfer tr[MAX_BATCH_XFERS];
+    uint32_t num_msg_xfers;
+    uint32_t i;
+    int err;
+
+    while (num_xfers > 0) {
+        num_msg_xfers = num_xfers < MAX_BATCH_XFERS ? num_xfers : MAX_BATCH_XFERS;
+        memset(tr, 0, sizeof(tr[0]) * num_msg_xfers);
+        for (i = 0; i < num_msg_xfers; i++) {
+            tr[i].tx_buf = (unsigned long) tx;
+            tr[i].len = len;
+            tr[i].speed_hz = speed_hz;
+            tr[i].delay_usecs = delay_us;
+            tr[i].bits_per_word = bits_per_word;
+            // Deassert chip select between the transfers of a message
+            tr[i].cs_change = (i + 1 < num_msg_xfers);
+            tr[i].tx_nbits = 1; // Standard SPI
+            tr[i].rx_nbits = 1; // Standard SPI
+            tx += len;
+        }
+
+        err = ioctl(fd, SPI_IOC_MESSAGE(num_msg_xfers), tr);
+        if (err < 0) {
+            fprintf(stderr, "%s: Failed ioctl: %d\n", __func__, err);
+            perror("ioctl: \n");
+            return err;
+        }
+        num_xfers -= num_msg_xfers;
+    }
+
+    return 0;
+}
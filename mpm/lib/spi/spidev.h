@@ -43,3 +43,25 @@ int transfer(
         uint32_t speed_hz, uint8_t bits_per_word, uint16_t delay_us
 );
 
+
+/*! Do a series of write-only SPI transactions over spidev
+ *
+ * The transactions are handed to the kernel as few SPI messages as
+ * possible, and chip select is deasserted between them.
+ *
+ * \param tx Buffer of data to be written, len bytes per transaction
+ * \param len Number of bytes in each transaction
+ * \param num_xfers Number of transactions
+ * \param speed_hz Speed of this transaction in Hz
+ * \param bits_per_word 8, dude
+ * \param delay_us Delay between transfers
+ *
+ * Assumption: spidev was configured properly beforehand.
+ *
+ * \returns 0 if all is golden
+ */
+int transfer_batch(
+        int fd,
+        uint8_t *tx, uint32_t len, uint32_t num_xfers,
+        uint32_t speed_hz, uint8_t bits_per_word, uint16_t delay_us
+);
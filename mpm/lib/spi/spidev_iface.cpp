@@ -111,6 +111,24 @@ public:
         return result;
     }
 
+    void write24_batch(const std::vector<uint32_t>& data)
+    {
+        if (data.empty()) {
+            return;
+        }
+        std::vector<uint8_t> tx;
+        tx.reserve(3 * data.size());
+        for (const uint32_t word : data) {
+            tx.push_back((word >> 16) & 0xFF);
+            tx.push_back((word >> 8) & 0xFF);
+            tx.push_back(word & 0xFF);
+        }
+
+        if (transfer_batch(_fd, tx.data(), 3, data.size(), _speed, _bits, _delay) != 0) {
+            throw mpm::runtime_error(str(boost::format("SPI Transaction failed!")));
+        }
+    }
+
 private:
     int _fd;
     const uint32_t _mode;
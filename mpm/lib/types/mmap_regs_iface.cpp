@@ -85,6 +85,14 @@ void mmap_regs_iface::poke32(const uint32_t addr, const uint32_t data)
     _mmap[addr / sizeof(uint32_t)] = data;
 }
 
+void mmap_regs_iface::pokes32(const std::vector<std::pair<uint32_t, uint32_t>>& addr_vals)
+{
+    MPM_ASSERT_THROW(_mmap);
+    for (const auto& addr_val : addr_vals) {
+        _mmap[addr_val.first / sizeof(uint32_t)] = addr_val.second;
+    }
+}
+
 uint32_t mmap_regs_iface::peek32(const uint32_t addr)
 {
     MPM_ASSERT_THROW(_mmap);
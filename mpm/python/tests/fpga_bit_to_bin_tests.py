@@ -0,0 +1,108 @@
+#
+# Copyright 2026 Ettus Research, a National Instruments Brand
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""
+Tests related to usrp_mpm.fpga_bit_to_bin
+"""
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from base_tests import TestBase
+from usrp_mpm.fpga_bit_to_bin import fpga_bit_to_bin
+
+
+def make_bit_file(bitstream, part_name=b"xc7z100ffg900\x00"):
+    """
+    Returns the contents of a bit file holding the given raw bitstream
+    """
+    def field(key, value):
+        return key + struct.pack('>H', len(value)) + value
+    # The 'a' field has no key byte, only its length
+    return struct.pack('>H', 9) + bytes(9) + \
+        field(b'', b'a') + struct.pack('>H', 10) + b"design.v\x00\x00" + \
+        field(b'b', part_name) + \
+        field(b'c', b"2026/01/01\x00") + \
+        field(b'd', b"12:00:00\x00") + \
+        b'e' + struct.pack('>I', len(bitstream)) + bitstream
+
+
+class TestFpgaBitToBin(TestBase):
+    """
+    Tests the conversion of bit files to bin files
+    """
+    # Long enough to span several blocks, and not a multiple of the block
+    # lengths used below
+    BITSTREAM = bytes(range(256)) * 13
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.bit_path = os.path.join(self.tmp_dir, 'image.bit')
+        self.bin_path = os.path.join(self.tmp_dir, 'image.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def convert(self, contents, **kwargs):
+        """
+        Convert a bit file with the given contents, and return the bin file
+        """
+        with open(self.bit_path, 'wb') as bit_file:
+            bit_file.write(contents)
+        fpga_bit_to_bin(self.bit_path, self.bin_path, **kwargs)
+        with open(self.bin_path, 'rb') as bin_file:
+            return bin_file.read()
+
+    def test_copy(self):
+        """
+        Without flipping, the bitstream is copied unchanged
+        """
+        for blocklen in (1, 7, 1024, -1):
+            self.assertEqual(
+                self.convert(make_bit_file(self.BITSTREAM), blocklen=blocklen),
+                self.BITSTREAM)
+
+    def test_flip(self):
+        """
+        Flipping swaps the bytes of every 32-bit word, whatever the block
+        length
+        """
+        expected = b''.join(
+            self.BITSTREAM[index:index + 4][::-1]
+            for index in range(0, len(self.BITSTREAM), 4))
+        for blocklen in (1, 7, 1024, -1):
+            self.assertEqual(
+                self.convert(make_bit_file(self.BITSTREAM), flip=True, blocklen=blocklen),
+                expected)
+
+    def test_flip_partial_word(self):
+        """
+        A bitstream which doesn't end on a word can't be flipped
+        """
+        with self.assertRaises(RuntimeError):
+            self.convert(make_bit_file(self.BITSTREAM[:-1]), flip=True)
+        self.assertEqual(self.convert(make_bit_file(self.BITSTREAM[:-1])),
+                         self.BITSTREAM[:-1])
+
+    def test_empty_bitstream(self):
+        """
+        An empty bitstream results in an empty bin file
+        """
+        self.assertEqual(self.convert(make_bit_file(b''), flip=True, blocklen=-1), b'')
+
+    def test_bad_headers(self):
+        """
+        Files which are not bit files, or partial bitstreams, are rejected
+        """
+        with self.assertRaises(RuntimeError):
+            self.convert(b'\x00\x08' + make_bit_file(self.BITSTREAM)[2:])
+        with self.assertRaises(NotImplementedError):
+            self.convert(make_bit_file(self.BITSTREAM, b"xc7z100;PARTIAL=TRUE\x00"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#
+# Copyright 2026 Ettus Research, a National Instruments Brand
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""
+Tests related to usrp_mpm.gpsd_iface
+"""
+
+import json
+import threading
+import unittest
+from unittest import mock
+from base_tests import TestBase
+from usrp_mpm import gpsd_iface
+
+
+def make_tpv(seconds, mode=3):
+    """
+    Returns a TPV report at the given number of seconds after the epoch
+    """
+    return {
+        'class': 'TPV',
+        'mode': mode,
+        'time': '1970-01-01T00:00:{:02d}.000Z'.format(seconds),
+    }
+
+
+class TestGPSDIfaceExtension(TestBase):
+    """
+    Tests the GPS sensors, which are served from the cache of a
+    GPSDWatcher. The watcher is not connected to GPSd, reports are put into
+    its cache by the tests.
+    """
+    def setUp(self):
+        with mock.patch.object(gpsd_iface.GPSDWatcher, 'start'):
+            self.gps_ext = gpsd_iface.GPSDIfaceExtension()
+        self.gps_ext.REPORT_TIMEOUT = 0.2
+        self.watcher = self.gps_ext._gpsd_watcher
+
+    def tearDown(self):
+        self.gps_ext._initialized = False
+
+    def test_get_report_returns_cached(self):
+        """
+        A cached report is returned without waiting
+        """
+        self.watcher._store_report(make_tpv(1))
+        self.assertEqual(self.watcher.get_report('TPV', timeout=0), make_tpv(1))
+
+    def test_get_report_timeout(self):
+        """
+        get_report() returns an empty dict if no matching report arrives
+        """
+        self.watcher._store_report(make_tpv(1, mode=0))
+        self.assertEqual(
+            self.watcher.get_report('TPV', lambda tpv: tpv['mode'] > 0, timeout=0.05), {})
+        self.assertEqual(self.watcher.get_report('SKY', timeout=0.05), {})
+
+    def test_gps_time_waits_for_next_second(self):
+        """
+        The time sensor returns the second following the cached report
+        """
+        self.watcher._store_report(make_tpv(1))
+        timer = threading.Timer(0.05, self.watcher._store_report, args=(make_tpv(2),))
+        timer.start()
+        sensor = self.gps_ext.get_gps_time_sensor()
+        timer.join()
+        self.assertEqual(sensor['value'], '2')
+
+    def test_gps_time_without_time(self):
+        """
+        The time sensor fails instead of waiting if GPSd reports no time
+        """
+        self.watcher._store_report({'class': 'TPV', 'mode': 1})
+        with self.assertRaises(RuntimeError):
+            self.gps_ext.get_gps_time_sensor()
+
+    def test_gps_time_timeout(self):
+        """
+        The time sensor fails if the next second is never reported
+        """
+        self.watcher._store_report(make_tpv(1))
+        with self.assertRaises(RuntimeError):
+            self.gps_ext.get_gps_time_sensor()
+
+    def test_no_reports(self):
+        """
+        Without any reports, the sensors report no fix instead of blocking
+        """
+        self.assertFalse(self.gps_ext.get_gps_lock())
+        self.assertEqual(json.loads(self.gps_ext.get_gps_tpv_sensor()['value']), {})
+        self.assertEqual(json.loads(self.gps_ext.get_gps_sky_sensor()['value']), {})
+        self.assertIn(',0,', self.gps_ext.get_gps_gpgga_sensor()['value'])
+        with self.assertRaises(RuntimeError):
+            self.gps_ext.get_gps_time_sensor()
+
+    def test_gps_lock(self):
+        """
+        The lock status follows the mode of the latest TPV report
+        """
+        self.watcher._store_report(make_tpv(1, mode=1))
+        self.assertFalse(self.gps_ext.get_gps_lock())
+        self.watcher._store_report(make_tpv(1, mode=3))
+        self.assertTrue(self.gps_ext.get_gps_lock())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+#
+# Copyright 2026 Ettus Research, a National Instruments Brand
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""
+Tests related to usrp_mpm.rpc_server
+"""
+
+import unittest
+from types import SimpleNamespace
+from base_tests import TestBase
+from test_utilities import MockLog
+from usrp_mpm.rpc_server import MPMServer, no_claim, TOKEN_LEN
+
+TOKEN = b'a' * TOKEN_LEN
+
+
+class MockPeriphManager(object):
+    """
+    Peripheral manager with a few RPC methods, which records the calls made
+    """
+    def __init__(self):
+        self.dboards = []
+        self.calls = []
+
+    def set_value(self, value):
+        """ Claimed method """
+        self.calls.append(('set_value', value))
+        return value + 1
+
+    def fail(self):
+        """ Claimed method which always fails """
+        self.calls.append(('fail',))
+        raise RuntimeError("fail was called")
+
+    @no_claim
+    def get_name(self):
+        """ Safe method """
+        self.calls.append(('get_name',))
+        return 'mock'
+
+
+class MockMPMServer(MPMServer):
+    """
+    MPMServer which registers the methods of a MockPeriphManager. Skips the
+    creation of a real peripheral manager and of the RPC server, and counts
+    the resets of the claim timer instead of running it.
+    """
+    def __init__(self):
+        # pylint: disable=super-init-not-called
+        self.log = MockLog()
+        self.client_host = 'localhost'
+        self.client_port = 49152
+        self._state = SimpleNamespace(
+            claim_status=SimpleNamespace(value=True),
+            claim_token=SimpleNamespace(value=TOKEN))
+        self._db_methods = []
+        self._mb_methods = []
+        self._claimed_functions = {}
+        self.claimed_methods = list(self.default_claimed_methods)
+        self._last_error = ""
+        self.timer_resets = 0
+        self.periph_manager = MockPeriphManager()
+        self._init_rpc_calls(self.periph_manager)
+
+    def _reset_timer(self):
+        self.timer_resets += 1
+
+    def get_log_buf(self, token):
+        """ Returns the token it was called with """
+        return [token]
+
+
+class TestMulticall(TestBase):
+    """
+    Tests the multicall() RPC method of MPMServer
+    """
+    def setUp(self):
+        self.server = MockMPMServer()
+        self.calls = self.server.periph_manager.calls
+
+    def test_results_in_order(self):
+        """
+        The calls are executed in order, and return one (error, result)
+        pair each. The timer is reset once for the whole list.
+        """
+        results = self.server.multicall(TOKEN, [
+            ('set_value', [1]),
+            ('get_name', []),
+            ('set_value', [5]),
+        ])
+        self.assertEqual(results, [(None, 2), (None, 'mock'), (None, 6)])
+        self.assertEqual(self.calls, [('set_value', 1), ('get_name',), ('set_value', 5)])
+        self.assertEqual(self.server.timer_resets, 1)
+
+    def test_failure_does_not_stop(self):
+        """
+        A failing call is reported and recorded as the last error, and the
+        remaining calls are still executed
+        """
+        results = self.server.multicall(TOKEN, [
+            ('fail', []),
+            ('set_value', [1]),
+        ])
+        self.assertEqual(results, [("fail was called", None), (None, 2)])
+        self.assertEqual(self.server.get_last_error(), "fail was called")
+        self.assertEqual(self.calls, [('fail',), ('set_value', 1)])
+
+    def test_builtin_methods(self):
+        """
+        Built-in methods which take a token get it prepended, the others
+        are called with the arguments as given
+        """
+        results = self.server.multicall(TOKEN, [
+            ('get_log_buf', []),
+            ('ping', ['data']),
+        ])
+        self.assertEqual(results, [(None, [TOKEN]), (None, 'data')])
+
+    def test_rejected_methods(self):
+        """
+        Private, unknown and nested calls are rejected, without stopping
+        the other calls
+        """
+        results = self.server.multicall(TOKEN, [
+            ('_reset_timer', []),
+            ('no_such_method', []),
+            ('multicall', [[('set_value', [1])]]),
+            ('set_value', [2]),
+        ])
+        self.assertEqual([error is None for error, _ in results],
+                         [False, False, False, True])
+        self.assertEqual(self.calls, [('set_value', 2)])
+        self.assertEqual(self.server.timer_resets, 1)
+
+    def test_invalid_token(self):
+        """
+        Without a valid claim, no call is executed
+        """
+        with self.assertRaises(RuntimeError):
+            self.server.multicall(b'b' * TOKEN_LEN, [('get_name', [])])
+        self.server._state.claim_status.value = False
+        with self.assertRaises(RuntimeError):
+            self.server.multicall(TOKEN, [('get_name', [])])
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.server.timer_resets, 0)
+
+    def test_same_as_single_calls(self):
+        """
+        Claimed methods return the same through multicall() as when called
+        one by one
+        """
+        self.assertEqual(self.server.set_value(TOKEN, 3),
+                         self.server.multicall(TOKEN, [('set_value', [3])])[0][1])
+        with self.assertRaises(RuntimeError):
+            self.server.set_value(b'b' * TOKEN_LEN, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,6 +13,11 @@ import argparse
 from sys_utils_tests import TestNet
 from mpm_utils_tests import TestMpmUtils
 from eeprom_tests import TestEeprom
+from gpsd_iface_tests import TestGPSDIfaceExtension
+from sensor_cache_tests import TestSensorCache
+from upload_tests import TestChunkedUpload
+from fpga_bit_to_bin_tests import TestFpgaBitToBin
+from rpc_server_tests import TestMulticall
 from usrp_mpm import __simulated__
 
 import importlib.util
@@ -24,9 +29,15 @@ TESTS = {
         TestNet,
         TestMpmUtils,
         TestEeprom,
+        TestGPSDIfaceExtension,
+        TestSensorCache,
+        TestChunkedUpload,
+        TestFpgaBitToBin,
+        TestMulticall,
     },
     'n3xx': set(),
-    'x4xx': set()
+    'x4xx': set(),
+    'sim': set()
 }
 
 if not __simulated__:
@@ -34,6 +45,17 @@ if not __simulated__:
     TESTS['x4xx'].update({
         TestZynqComponents
     })
+else:
+    from simulator_tests import TestPacketRing, TestChdrInputStream, TestChdrOutputStream, \
+        TestSampleSources, TestBlockModels, TestTopologyConfig
+    TESTS['sim'].update({
+        TestPacketRing,
+        TestChdrInputStream,
+        TestChdrOutputStream,
+        TestSampleSources,
+        TestBlockModels,
+        TestTopologyConfig,
+    })
 
 def parse_args():
     """Parse arguments when running this as a script"""
@@ -0,0 +1,141 @@
+#
+# Copyright 2026 Ettus Research, a National Instruments Brand
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""
+Tests related to the sensor snapshot cache of usrp_mpm.periph_manager
+"""
+
+import threading
+import unittest
+import msgpack
+from base_tests import TestBase
+from test_utilities import MockLog
+from usrp_mpm.periph_manager.base import PeriphManagerBase
+
+
+class MockPeriphManager(PeriphManagerBase):
+    """
+    Peripheral manager with a counting temperature sensor and a GPS time
+    sensor which blocks until released. Skips the hardware initialization of
+    PeriphManagerBase.
+    """
+    mboard_sensor_callback_map = {
+        'temp': 'get_temp_sensor',
+        'gps_time': 'get_gps_time_sensor',
+    }
+    sensor_cache_refresh_interval = 0.02
+
+    def __init__(self):
+        # pylint: disable=super-init-not-called
+        self.log = MockLog()
+        self.dboards = []
+        self._sensor_cache = {}
+        self._sensor_keep_warm = {}
+        self._sensor_cache_lock = threading.Lock()
+        self._sensor_cache_thread = None
+        self._sensor_cache_stop = threading.Event()
+        self.temp_reads = 0
+        self.gps_release = threading.Event()
+
+    def get_temp_sensor(self):
+        """ Counts the reads """
+        self.temp_reads += 1
+        return {'name': 'temp', 'value': str(self.temp_reads)}
+
+    def get_gps_time_sensor(self):
+        """ Blocks like the real GPS time sensor """
+        self.gps_release.wait()
+        return {'name': 'gps_time', 'value': '0'}
+
+
+class MockDboard(object):
+    """
+    Daughterboard with one sensor per direction and channel
+    """
+    def get_sensors(self, direction, chan):
+        """ Returns the sensor names """
+        return ['lo_locked']
+
+    def get_sensor(self, direction, sensor_name, chan):
+        """ Returns a sensor naming its direction and channel """
+        return {'name': sensor_name, 'value': '{}{}'.format(direction, chan)}
+
+
+class TestSensorCache(TestBase):
+    """
+    Tests for get_mb_sensors_snapshot() and the thread keeping it warm
+    """
+    def setUp(self):
+        self.mgr = MockPeriphManager()
+
+    def tearDown(self):
+        self.mgr.gps_release.set()
+        self.mgr._stop_sensor_cache_worker()
+
+    def test_snapshot_skips_blocking_sensors(self):
+        """
+        The GPS time sensor is not part of the snapshot, so the snapshot does
+        not block on it
+        """
+        snapshot = self.mgr.get_mb_sensors_snapshot()
+        self.assertEqual(list(snapshot.keys()), ['temp'])
+
+    def test_snapshot_uses_cache(self):
+        """
+        A second snapshot within the TTL is served from the cache, max_age=0
+        forces a read
+        """
+        self.mgr.sensor_cache_refresh_interval = 10
+        self.assertEqual(self.mgr.get_mb_sensors_snapshot()['temp']['value'], '1')
+        self.assertEqual(self.mgr.get_mb_sensors_snapshot()['temp']['value'], '1')
+        self.assertEqual(
+            self.mgr.get_mb_sensors_snapshot(max_age=0)['temp']['value'], '2')
+
+    def test_worker_refreshes_and_expires(self):
+        """
+        The worker thread refreshes requested sensors, and stops once they
+        were not requested for sensor_cache_keep_warm seconds
+        """
+        self.mgr.sensor_cache_ttl = 0.04
+        self.mgr.sensor_cache_keep_warm = 0.2
+        self.mgr.get_mb_sensors_snapshot()
+        thread = self.mgr._sensor_cache_thread
+        self.assertIsNotNone(thread)
+        thread.join(2.0)
+        self.assertFalse(thread.is_alive())
+        self.assertGreater(self.mgr.temp_reads, 2)
+        self.assertIsNone(self.mgr._sensor_cache_thread)
+        self.assertEqual(self.mgr._sensor_keep_warm, {})
+
+    def test_stop_worker(self):
+        """
+        Once stopped, the worker is not started again by a snapshot
+        """
+        self.mgr.get_mb_sensors_snapshot()
+        thread = self.mgr._sensor_cache_thread
+        self.mgr._stop_sensor_cache_worker()
+        thread.join(1.0)
+        self.assertFalse(thread.is_alive())
+        self.mgr.get_mb_sensors_snapshot()
+        self.assertIsNone(self.mgr._sensor_cache_thread)
+
+    def test_snapshots_pass_msgpack(self):
+        """
+        The snapshots can be decoded by a msgpack client with the default
+        settings, which reject integer map keys
+        """
+        self.mgr.dboards = [MockDboard()]
+        for snapshot in (self.mgr.get_mb_sensors_snapshot(),
+                         self.mgr.get_db_sensors_snapshot(chans=[0, 1])):
+            self.assertEqual(
+                msgpack.unpackb(msgpack.packb(snapshot, use_bin_type=True), raw=False),
+                snapshot)
+        self.assertEqual(
+            self.mgr.get_db_sensors_snapshot(chans=[0, 1])[0]['tx']['1']['lo_locked']['value'],
+            'tx1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,545 @@
+#
+# Copyright 2026 Ettus Research, a National Instruments Brand
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""
+Tests related to usrp_mpm.simulator
+"""
+
+import os
+import struct
+import sys
+import tempfile
+import threading
+import unittest
+import numpy
+from base_tests import TestBase
+from test_utilities import MockLog
+from usrp_mpm.simulator.chdr_stream import PacketRing, ChdrInputStream, ChdrOutputStream
+from usrp_mpm.simulator.rfnoc_common import StreamSpec
+from usrp_mpm.simulator import sample_source
+from usrp_mpm.simulator import block_models
+from usrp_mpm.simulator.config import TopologyConfig
+from usrp_mpm.simulator.sample_source import SampleSink
+
+
+class RecordingSink(SampleSink):
+    """
+    Sample sink which stores all payloads it accepts
+    """
+    def __init__(self):
+        self.payloads = []
+        self.closed = False
+
+    def accept_payload(self, payload):
+        self.payloads.append(bytes(payload))
+
+    def close(self):
+        self.closed = True
+
+
+class TestPacketRing(TestBase):
+    """
+    Tests for the PacketRing used by the RX path of the simulator
+    """
+    def test_fifo_order(self):
+        """
+        Items come out in the order they went in, also across the wrap
+        around of the slot indices
+        """
+        ring = PacketRing(4)
+        for value in range(10):
+            ring.put(value)
+            ring.put(value + 100)
+            self.assertEqual(ring.get(), value)
+            self.assertEqual(ring.get(), value + 100)
+        self.assertEqual(len(ring), 0)
+        self.assertEqual(ring.high_water, 2)
+
+    def test_put_blocks_while_full(self):
+        """
+        put() waits for get() to make space
+        """
+        ring = PacketRing(2)
+        ring.put(0)
+        ring.put(1)
+        producer = threading.Thread(target=ring.put, args=(2,))
+        producer.start()
+        producer.join(0.1)
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(ring.get(), 0)
+        producer.join(1.0)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual([ring.get(), ring.get()], [1, 2])
+
+    def test_close_unblocks_get(self):
+        """
+        A consumer waiting on an empty ring returns None once the ring is
+        closed
+        """
+        ring = PacketRing(2)
+        results = []
+        consumer = threading.Thread(target=lambda: results.append(ring.get()))
+        consumer.start()
+        consumer.join(0.1)
+        self.assertTrue(consumer.is_alive())
+        ring.close()
+        consumer.join(1.0)
+        self.assertFalse(consumer.is_alive())
+        self.assertEqual(results, [None])
+
+    def test_close_unblocks_put(self):
+        """
+        A producer waiting on a full ring returns once the ring is closed
+        """
+        ring = PacketRing(1)
+        ring.put(0)
+        producer = threading.Thread(target=ring.put, args=(1,))
+        producer.start()
+        ring.close()
+        producer.join(1.0)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(ring.get(), 0)
+        self.assertIsNone(ring.get())
+
+    def test_concurrent_producers(self):
+        """
+        Several threads may put() into the same ring. No item is lost or
+        duplicated, and the items of each producer stay in order.
+        """
+        num_producers = 4
+        num_items = 2000
+        ring = PacketRing(8)
+        # Switch threads as often as possible, to interleave the producers
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, switch_interval)
+        producers = [
+            threading.Thread(target=lambda index=index: [
+                ring.put((index, value)) for value in range(num_items)])
+            for index in range(num_producers)
+        ]
+        for producer in producers:
+            producer.start()
+        received = [ring.get() for _ in range(num_producers * num_items)]
+        for producer in producers:
+            producer.join(1.0)
+            self.assertFalse(producer.is_alive())
+        self.assertEqual(len(ring), 0)
+        for index in range(num_producers):
+            self.assertEqual([value for source, value in received if source == index],
+                             list(range(num_items)))
+
+
+class TestChdrInputStream(TestBase):
+    """
+    Tests for the RX thread of the simulator
+    """
+    def test_finish_closes_sink(self):
+        """
+        finish() stops the worker thread, which closes the sample sink
+        """
+        sink = RecordingSink()
+        stream = ChdrInputStream(MockLog(), None, sink, None, 1)
+        stream.queue_payload(b"\x01\x02\x03\x04", 20)
+        stream.finish()
+        self.assertFalse(stream.thread.is_alive())
+        self.assertTrue(sink.closed)
+
+    def test_payloads_reach_sink(self):
+        """
+        Queued payloads are handed to the sample sink and counted
+        """
+        sink = RecordingSink()
+        stream = ChdrInputStream(MockLog(), None, sink, None, 1)
+        stream.queue_payload(b"\x01\x02\x03\x04", 20)
+        stream.queue_payload(b"\x05\x06\x07\x08", 20)
+        # Wait for the worker to drain the ring
+        for _ in range(100):
+            if len(sink.payloads) == 2:
+                break
+            threading.Event().wait(0.01)
+        stream.finish()
+        self.assertEqual(sink.payloads, [b"\x01\x02\x03\x04", b"\x05\x06\x07\x08"])
+        self.assertEqual(stream.get_stats()['packets'], 2)
+        self.assertEqual(stream.get_stats()['bytes'], 40)
+
+
+class CountingSource(sample_source.SampleSource):
+    """
+    Sample source whose n-th buffer is filled with the byte n
+    """
+    def __init__(self):
+        self.count = 0
+
+    def fill_buffer(self, buffer):
+        buffer[:] = bytes([self.count & 0xFF]) * len(buffer)
+        self.count += 1
+        return len(buffer)
+
+    def close(self):
+        pass
+
+
+class RecordingSendWrapper:
+    """
+    Stands in for the SendWrapper of ChdrEndpoint, and records the packets
+    of every batch handed to it
+    """
+    def __init__(self):
+        self.packets = []
+
+    def send_batch(self, batch, addr):
+        self.packets.extend(bytes(buffer) for buffer in batch.buffers)
+        batch.mark_sent()
+
+
+class HeaderlessOutputStream(ChdrOutputStream):
+    """
+    ChdrOutputStream with a bare 64 bit header instead of one serialized by
+    ChdrPacket, so the test does not depend on the CHDR library
+    """
+    def _make_template(self, timestamp):
+        return 0, 8
+
+
+class TestChdrOutputStream(TestBase):
+    """
+    Tests for the TX thread of the simulator
+    """
+    def run_stream(self, num_packets, seconds_per_packet):
+        """
+        Stream num_packets packets of 16 bytes, paced at seconds_per_packet,
+        and return the packets which were sent
+        """
+        spec = StreamSpec()
+        spec.is_continuous = False
+        spec.total_samples = num_packets * 4
+        spec.packet_samples = 16
+        spec.sample_rate = 16 / seconds_per_packet
+        spec.capacity_packets = 1000
+        spec.capacity_bytes = 1000000
+        send_wrapper = RecordingSendWrapper()
+        stream = HeaderlessOutputStream(MockLog(), 64, CountingSource(), spec, send_wrapper)
+        stream.thread.join(5.0)
+        self.assertFalse(stream.thread.is_alive())
+        self.assertEqual(stream.get_stats()['packets'], num_packets)
+        return send_wrapper.packets
+
+    def check_packets(self, packets, num_packets):
+        """
+        Check that the packets carry consecutive sequence numbers and
+        payloads
+        """
+        self.assertEqual(len(packets), num_packets)
+        for index, packet in enumerate(packets):
+            word, = struct.unpack_from("<Q", packet, 0)
+            self.assertEqual((word >> 32) & 0xFFFF, index)
+            self.assertEqual((word >> 16) & 0xFFFF, 24)
+            self.assertEqual(packet[8:], bytes([index]) * 16)
+
+    def test_rate_paced(self):
+        """
+        Packets which are due later than the batch window are sent one by
+        one, and none of them is lost or duplicated
+        """
+        self.check_packets(self.run_stream(6, 5 * ChdrOutputStream.BATCH_WINDOW), 6)
+
+    def test_batched(self):
+        """
+        Packets which are due within the batch window are sent in batches
+        """
+        num_packets = 2 * ChdrOutputStream.BATCH_PACKETS + 3
+        self.check_packets(self.run_stream(num_packets, 1e-6), num_packets)
+
+
+def fill(source, num_bytes):
+    """
+    Returns the next num_bytes bytes of source, read with fill_buffer()
+    """
+    buffer = bytearray(num_bytes)
+    assert source.fill_buffer(memoryview(buffer)) == num_bytes
+    return bytes(buffer)
+
+
+class TestSampleSources(TestBase):
+    """
+    Tests for the sample sources and sinks of the simulator
+    """
+    def test_null_samples(self):
+        """
+        NullSamples provides zeros, and swallows packets
+        """
+        source = sample_source.NullSamples()
+        self.assertEqual(fill(source, 64), bytes(64))
+        self.assertEqual(fill(source, 16), bytes(16))
+        source.accept_payload(b"\x01\x02")
+
+    def test_table_source_wraps(self):
+        """
+        A TableSource repeats its table across packet boundaries, with both
+        fill_buffer() and fill_packet()
+        """
+        samples = numpy.arange(5) / 8.0
+        source = sample_source.TableSource(samples)
+        expected = numpy.tile(source.table, 8).tobytes()
+        data = fill(source, 12) + fill(source, 28)
+        packet = sample_source._PayloadPacket()
+        source.fill_packet(packet, 20)
+        data += packet.get_payload_bytes()
+        self.assertEqual(data, expected[:60])
+
+    def test_multi_tone_phase_accumulator(self):
+        """
+        Without a table, MultiToneSource produces the same tones from its
+        phase accumulator, with a continuous phase across packets
+        """
+        table_source = sample_source.MultiToneSource(freqs="1e5,2.5e5")
+        self.assertEqual(len(table_source.table), 2 * 20)
+        class NoTableSource(sample_source.MultiToneSource):
+            """ MultiToneSource which never uses a table """
+            MAX_TABLE_SIZE = 0
+        source = NoTableSource(freqs="1e5,2.5e5")
+        self.assertIsNone(source.table)
+        expected = numpy.frombuffer(fill(table_source, 400), dtype=numpy.int16)
+        actual = numpy.frombuffer(fill(source, 96) + fill(source, 304), dtype=numpy.int16)
+        self.assertLessEqual(numpy.abs(expected - actual.astype(int)).max(), 1)
+
+    def test_multi_tone_odd_frequencies(self):
+        """
+        Frequencies without a short common period don't need a huge table
+        """
+        source = sample_source.MultiToneSource(rate=1e6, freqs="123456.5,1e5")
+        self.assertIsNone(source.table)
+        self.assertEqual(len(fill(source, 4000)), 4000)
+
+    def test_prbs(self):
+        """
+        The PRBS has the period and balance of a maximum length sequence,
+        and matches a bit by bit LFSR
+        """
+        order, tap = 9, sample_source.PrbsBurstSource.TAPS[9]
+        state = (1 << order) - 1
+        expected = []
+        for _ in range((1 << order) - 1):
+            bit = ((state >> (order - 1)) ^ (state >> (tap - 1))) & 1
+            state = ((state << 1) | bit) & ((1 << order) - 1)
+            expected.append(bit)
+        bits = sample_source.PrbsBurstSource._prbs(order, tap)
+        self.assertEqual(bits.tolist(), expected)
+        bits = sample_source.PrbsBurstSource._prbs(15, 14)
+        self.assertEqual(len(bits), (1 << 15) - 1)
+        self.assertEqual(int(bits.sum()), 1 << 14)
+        with self.assertRaises(ValueError):
+            sample_source.PrbsBurstSource(order=31)
+
+    def test_prbs_burst(self):
+        """
+        A burst holds the symbols followed by the gap
+        """
+        source = sample_source.PrbsBurstSource(order=7, samples_per_symbol=2, gap_samples=10)
+        self.assertEqual(len(source.table), 2 * (2 * 127 + 10))
+        self.assertFalse(source.table[-20:].any())
+        self.assertEqual(set(numpy.abs(source.table[:2 * 254:2]).tolist()), {16384})
+
+    def test_mmap_file_roundtrip(self):
+        """
+        Samples written by MmapFileSink are read back by MmapFileSource,
+        also when converting to and from fc32
+        """
+        payload = numpy.arange(-64, 64, dtype=numpy.int16).tobytes()
+        for file_format in sample_source.SAMPLE_FORMATS:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, "samples.dat")
+                sink = sample_source.MmapFileSink(path, file_format=file_format)
+                sink.accept_payload(payload[:100])
+                sink.accept_payload(payload[100:])
+                sink.close()
+                bytes_per_value = 4 if file_format == "fc32" else 2
+                self.assertEqual(os.path.getsize(path), 128 * bytes_per_value)
+                source = sample_source.MmapFileSource(
+                    path, repeat=True, file_format=file_format)
+                self.assertEqual(fill(source, 256), payload)
+                # Repeating wraps around within a packet
+                self.assertEqual(fill(source, 200) + fill(source, 312),
+                                 payload + payload)
+                source.close()
+
+    def test_file_source_end(self):
+        """
+        A FileSource without repeat is exhausted at the end of the file
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "samples.dat")
+            sink = sample_source.FileSink(path)
+            sink.accept_payload(b"\x01\x02\x03\x04")
+            sink.close()
+            source = sample_source.FileSource(path)
+            packet = sample_source._PayloadPacket()
+            self.assertIs(source.fill_packet(packet, 16), packet)
+            self.assertEqual(packet.get_payload_bytes(), b"\x01\x02\x03\x04")
+            self.assertIsNone(source.fill_packet(packet, 16))
+            source.close()
+
+
+def to_sc16(samples):
+    """
+    Returns complex samples as interleaved sc16 bytes
+    """
+    return sample_source._to_sc16(numpy.asarray(samples, dtype=numpy.complex64)).tobytes()
+
+
+class TestBlockModels(TestBase):
+    """
+    Tests for the NoC block models and processing stages of the simulator
+    """
+    def test_decim_stage(self):
+        """
+        DecimStage averages groups of samples, also across buffers
+        """
+        stage = block_models.DecimStage(4)
+        samples = numpy.arange(10, dtype=numpy.complex64)
+        out = numpy.concatenate((stage.process(samples[:3]), stage.process(samples[3:])))
+        self.assertEqual(out.tolist(), [1.5, 5.5])
+        self.assertEqual(stage.residue.tolist(), [8, 9])
+        self.assertEqual(stage.rate_ratio, 0.25)
+
+    def test_interp_stage(self):
+        """
+        InterpStage repeats every sample
+        """
+        stage = block_models.InterpStage(3)
+        out = stage.process(numpy.array([1, 2], dtype=numpy.complex64))
+        self.assertEqual(out.tolist(), [1, 1, 1, 2, 2, 2])
+        self.assertEqual(stage.rate_ratio, 3.0)
+
+    def test_fir_stage(self):
+        """
+        FirStage matches a single convolution when fed in pieces
+        """
+        taps = [0.5, 0.25, 0.125]
+        samples = (numpy.arange(20) % 7).astype(numpy.complex64)
+        stage = block_models.FirStage(taps)
+        out = numpy.concatenate([stage.process(samples[start:start + 6])
+                                 for start in range(0, 20, 6)])
+        expected = numpy.convolve(samples, taps)[:20]
+        self.assertTrue(numpy.allclose(out, expected))
+
+    def test_fft_stage(self):
+        """
+        FftStage transforms complete frames only, and the inverse
+        transform undoes the forward transform
+        """
+        samples = numpy.exp(2j * numpy.pi * numpy.arange(24) / 8).astype(numpy.complex64)
+        forward = block_models.FftStage(8)
+        spectrum = numpy.concatenate((forward.process(samples[:5]), forward.process(samples[5:])))
+        self.assertEqual(len(spectrum), 24)
+        self.assertEqual(forward.residue.size, 0)
+        # A tone at bin 1 ends up at index 5 after the fftshift
+        self.assertTrue(numpy.allclose(numpy.abs(spectrum[:8]), numpy.eye(8)[5], atol=1e-6))
+        inverse = block_models.FftStage(8, forward=False)
+        restored = inverse.process(numpy.fft.ifftshift(spectrum[:8]) * 8)
+        self.assertTrue(numpy.allclose(numpy.fft.ifftshift(restored), samples[:8], atol=1e-5))
+        magnitude = block_models.FftStage(8, magnitude=2)
+        self.assertTrue(numpy.allclose(magnitude.process(samples[:8]).real, numpy.eye(8)[5]))
+
+    def test_models_follow_registers(self):
+        """
+        The stages of the DDC, DUC, FIR and FFT models follow the
+        registers written by UHD
+        """
+        ddc = block_models.block_models["ddc"](decim="4")
+        self.assertEqual(ddc.make_stage().decim, 4)
+        ddc.write_reg(ddc.SR_N_ADDR, 8)
+        ddc.write_reg(ddc.SR_M_ADDR, 1)
+        self.assertEqual(ddc.make_stage().decim, 8)
+        ddc.write_reg(ddc.SR_N_ADDR, 1)
+        self.assertEqual(type(ddc.make_stage()), block_models.Stage)
+        duc = block_models.block_models["duc"](interp="2")
+        self.assertEqual(duc.make_stage().interp, 2)
+        fir = block_models.block_models["fir"](taps="0.5,0.5")
+        self.assertEqual(fir.read_reg(fir.REG_FIR_MAX_NUM_COEFFS_ADDR), 41)
+        self.assertEqual(fir.make_stage().taps.tolist(), [0.5, 0.5])
+        fir.write_reg(fir.REG_FIR_LOAD_COEFF_ADDR, 32767)
+        fir.write_reg(fir.REG_FIR_LOAD_COEFF_LAST_ADDR, 0xFFFF & -32767)
+        self.assertEqual(fir.make_stage().taps.tolist(), [1.0, -1.0])
+        fft = block_models.block_models["fft"](length="64")
+        self.assertEqual(fft.make_stage().length, 64)
+        fft.write_reg(fft.REG_LENGTH_LOG2_ADDR, 4)
+        fft.write_reg(fft.REG_DIRECTION_ADDR, 0)
+        self.assertEqual(fft.make_stage().length, 16)
+        self.assertFalse(fft.make_stage().forward)
+
+    def test_processed_source(self):
+        """
+        A ProcessedSource decimates the samples of its source
+        """
+        table = numpy.array([0.5, 0.25, -0.5, -0.25], dtype=numpy.complex64)
+        source = block_models.ProcessedSource(
+            sample_source.TableSource(table), [block_models.DecimStage(2)], block_samps=3)
+        self.assertEqual(source.rate_ratio, 0.5)
+        self.assertEqual(fill(source, 12) + fill(source, 4), to_sc16([0.375, -0.375] * 2))
+        packet = sample_source._PayloadPacket()
+        self.assertIs(source.fill_packet(packet, 8), packet)
+        self.assertEqual(packet.get_payload_bytes(), to_sc16([0.375, -0.375]))
+
+    def test_processed_sink(self):
+        """
+        A ProcessedSink hands the processed samples to its sink, and skips
+        empty outputs
+        """
+        sink = RecordingSink()
+        processed = block_models.ProcessedSink(sink, [block_models.DecimStage(2)])
+        processed.accept_payload(to_sc16([0.5]))
+        self.assertEqual(sink.payloads, [])
+        processed.accept_payload(to_sc16([0.25, 0.125, 0.125]))
+        self.assertEqual(sink.payloads, [to_sc16([0.375, 0.125])])
+        processed.close()
+        self.assertTrue(sink.closed)
+
+
+class TestTopologyConfig(TestBase):
+    """
+    Tests for the parsing and validation of the simulated NoC topology
+    """
+    def test_from_sections(self):
+        """
+        Blocks and connections are read from the config sections
+        """
+        topology = TopologyConfig.from_sections(
+            {"num_stream_ep": "2", "connections": "radio0:0 -> ddc0, ddc0:0->sep1:0"},
+            [("radio0", {"type": "radio"}), ("ddc0", {"type": "ddc", "decim": "2"})])
+        self.assertEqual(topology.num_stream_ep, 2)
+        self.assertEqual([name for name, _ in topology.blocks], ["radio0", "ddc0"])
+        self.assertIsInstance(topology.blocks[1][1], block_models.block_models["ddc"])
+        self.assertEqual(topology.connections, [
+            (("radio0", 0), ("ddc0", 0)), (("ddc0", 0), ("sep1", 0))])
+
+    def test_default(self):
+        """
+        The default topology is a radio connected to one stream endpoint
+        """
+        topology = TopologyConfig.default()
+        self.assertEqual(topology.num_stream_ep, 1)
+        self.assertEqual(len(topology.connections), 4)
+
+    def test_invalid(self):
+        """
+        Unknown blocks and topologies without a radio are rejected
+        """
+        with self.assertRaises(ValueError):
+            TopologyConfig.from_sections({}, [("foo0", {"type": "foo"})])
+        with self.assertRaises(ValueError):
+            TopologyConfig.from_sections({}, [("foo0", {})])
+        with self.assertRaises(ValueError):
+            TopologyConfig.from_sections(
+                {"connections": "radio0:0 -> ddc1:0"},
+                [("radio0", {"type": "radio"}), ("ddc0", {"type": "ddc"})])
+        with self.assertRaises(ValueError):
+            TopologyConfig.from_sections(
+                {"connections": "sep0:0 -> ddc0:0"}, [("ddc0", {"type": "ddc"})])
+
+
+if __name__ == '__main__':
+    unittest.main()
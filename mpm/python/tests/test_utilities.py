@@ -168,6 +168,7 @@ class MockLog(object):
     messages in a queue.
     """
     # The MockLog class is not currently implemented to be thread safe
+    # Like logging.Logger, messages are formatted with msg % args
     def __init__(self):
         self.error_log = queue.Queue()
         self.warning_log = queue.Queue()
@@ -175,20 +176,20 @@ class MockLog(object):
         self.trace_log = queue.Queue()
         self.debug_log = queue.Queue()
 
-    def error(self, msg):
-        self.error_log.put_nowait(msg)
+    def error(self, msg, *args):
+        self.error_log.put_nowait(msg % args if args else msg)
 
-    def warning(self, msg):
-        self.warning_log.put_nowait(msg)
+    def warning(self, msg, *args):
+        self.warning_log.put_nowait(msg % args if args else msg)
 
-    def info(self, msg):
-        self.info_log.put_nowait(msg)
+    def info(self, msg, *args):
+        self.info_log.put_nowait(msg % args if args else msg)
 
-    def trace(self, msg):
-        self.trace_log.put_nowait(msg)
+    def trace(self, msg, *args):
+        self.trace_log.put_nowait(msg % args if args else msg)
 
-    def debug(self, msg):
-        self.debug_log.put_nowait(msg)
+    def debug(self, msg, *args):
+        self.debug_log.put_nowait(msg % args if args else msg)
 
     def clear_all(self):
         """ Clears all log queues """
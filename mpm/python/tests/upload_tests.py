@@ -0,0 +1,167 @@
+#
+# Copyright 2026 Ettus Research, a National Instruments Brand
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""
+Tests related to the chunked component upload of usrp_mpm.periph_manager
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from hashlib import md5
+from unittest import mock
+from base_tests import TestBase
+from test_utilities import MockLog
+from usrp_mpm.periph_manager import base
+from usrp_mpm.periph_manager.base import PeriphManagerBase
+
+
+class MockPeriphManager(PeriphManagerBase):
+    """
+    Peripheral manager with a single updateable component, which records the
+    files it installs. Skips the hardware initialization of PeriphManagerBase.
+    """
+    updateable_components = {
+        'fpga': {'callback': 'update_fpga', 'path': '/lib/firmware/fpga.bin'},
+    }
+
+    def __init__(self):
+        # pylint: disable=super-init-not-called
+        self.log = MockLog()
+        self._uploads = {}
+        self.installed = []
+
+    def update_fpga(self, filepath, metadata):
+        """ Records the installed file """
+        with open(filepath, 'rb') as comp_file:
+            self.installed.append((metadata['id'], comp_file.read()))
+
+
+class TestChunkedUpload(TestBase):
+    """
+    Tests for begin_upload(), upload_chunk(), finish_upload() and
+    abort_upload()
+    """
+    DATA = bytes(range(256)) * 16
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.path_patch = mock.patch.object(base, 'UPLOAD_BASEPATH', self.upload_dir)
+        self.path_patch.start()
+        self.mgr = MockPeriphManager()
+
+    def tearDown(self):
+        for filename in list(self.mgr._uploads):
+            self.mgr._close_upload(filename)
+        self.path_patch.stop()
+        shutil.rmtree(self.upload_dir)
+
+    def metadata(self, filename='fpga.bin', data=DATA):
+        """ Returns the metadata of an upload of data """
+        return {'id': 'fpga', 'filename': filename, 'md5': md5(data).hexdigest()}
+
+    def upload(self, data, offset=0, chunk_size=1000, filename='fpga.bin'):
+        """ Uploads data in chunks, starting at offset """
+        while offset < len(data):
+            offset = self.mgr.upload_chunk(
+                filename, offset, data[offset:offset + chunk_size])
+        return offset
+
+    def test_upload_and_install(self):
+        """
+        An uploaded file is installed by update_component() with empty data
+        """
+        self.assertEqual(self.mgr.begin_upload(self.metadata()), 0)
+        self.assertEqual(self.upload(self.DATA), len(self.DATA))
+        self.assertEqual(self.mgr.finish_upload('fpga.bin'), md5(self.DATA).hexdigest())
+        self.mgr.update_component([self.metadata()], [b''])
+        self.assertEqual(self.mgr.installed, [('fpga', self.DATA)])
+        self.assertEqual(self.mgr._uploads, {})
+
+    def test_resume(self):
+        """
+        begin_upload() resumes an unfinished upload with the same md5 hash,
+        and restarts it otherwise
+        """
+        self.mgr.begin_upload(self.metadata())
+        self.upload(self.DATA[:2000])
+        first_file = self.mgr._uploads['fpga.bin']['file']
+        self.assertEqual(self.mgr.begin_upload(self.metadata()), 2000)
+        self.upload(self.DATA, offset=2000)
+        self.mgr.finish_upload('fpga.bin')
+        with open(os.path.join(self.upload_dir, 'fpga.bin'), 'rb') as comp_file:
+            self.assertEqual(comp_file.read(), self.DATA)
+        # A different file with the same name starts over
+        self.mgr.begin_upload(self.metadata())
+        self.upload(self.DATA[:2000])
+        first_file = self.mgr._uploads['fpga.bin']['file']
+        self.assertEqual(self.mgr.begin_upload(self.metadata(data=b'other')), 0)
+        self.assertTrue(first_file.closed)
+
+    def test_offset_mismatch(self):
+        """
+        A chunk at the wrong offset is rejected, and the upload can continue
+        """
+        self.mgr.begin_upload(self.metadata())
+        self.upload(self.DATA[:1000])
+        with self.assertRaises(RuntimeError):
+            self.mgr.upload_chunk('fpga.bin', 500, self.DATA[500:1500])
+        self.upload(self.DATA, offset=1000)
+        self.mgr.finish_upload('fpga.bin')
+
+    def test_md5_mismatch(self):
+        """
+        finish_upload() fails if the data does not match the md5 hash, and
+        the file is deleted
+        """
+        self.mgr.begin_upload(self.metadata())
+        self.upload(self.DATA[:-1] + b'\x00')
+        with self.assertRaises(RuntimeError):
+            self.mgr.finish_upload('fpga.bin')
+        self.assertFalse(os.path.exists(os.path.join(self.upload_dir, 'fpga.bin')))
+        with self.assertRaises(RuntimeError):
+            self.mgr.upload_chunk('fpga.bin', len(self.DATA), b'')
+
+    def test_abort(self):
+        """
+        abort_upload() closes and deletes the file
+        """
+        self.mgr.begin_upload(self.metadata())
+        upload_file = self.mgr._uploads['fpga.bin']['file']
+        self.mgr.abort_upload('fpga.bin')
+        self.assertTrue(upload_file.closed)
+        self.assertFalse(os.path.exists(upload_file.name))
+        with self.assertRaises(RuntimeError):
+            self.mgr.upload_chunk('fpga.bin', 0, self.DATA)
+        with self.assertRaises(RuntimeError):
+            self.mgr.abort_upload('fpga.bin')
+
+    def test_timeout(self):
+        """
+        Idle uploads are aborted
+        """
+        self.mgr.upload_timeout = 0
+        self.mgr.begin_upload(self.metadata())
+        upload_file = self.mgr._uploads['fpga.bin']['file']
+        self.mgr.begin_upload(self.metadata(filename='other.bin'))
+        self.assertTrue(upload_file.closed)
+        self.assertNotIn('fpga.bin', self.mgr._uploads)
+
+    def test_max_unfinished_uploads(self):
+        """
+        Starting more than max_unfinished_uploads uploads aborts the least
+        recently active one
+        """
+        self.mgr.max_unfinished_uploads = 2
+        self.mgr.begin_upload(self.metadata(filename='a.bin'))
+        self.mgr.begin_upload(self.metadata(filename='b.bin'))
+        self.upload(self.DATA[:10], filename='a.bin')
+        self.mgr.begin_upload(self.metadata(filename='c.bin'))
+        self.assertEqual(sorted(self.mgr._uploads), ['a.bin', 'c.bin'])
+
+
+if __name__ == '__main__':
+    unittest.main()
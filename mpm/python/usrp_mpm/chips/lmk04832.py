@@ -24,17 +24,19 @@ class LMK04832:
         self.regs_iface = regs_iface
         assert hasattr(self.regs_iface, 'peek8')
         assert hasattr(self.regs_iface, 'poke8')
+        assert hasattr(self.regs_iface, 'pokes8')
         self.poke8 = regs_iface.poke8
         self.peek8 = regs_iface.peek8
+        self._pokes8 = regs_iface.pokes8
         self.enable_3wire_spi = False
 
     def pokes8(self, addr_vals):
         """
-        Apply a series of pokes.
-        pokes8([(0,1),(0,2)]) is the same as calling poke8(0,1), poke8(0,2).
+        Apply a series of pokes as a single transaction on the register
+        interface. pokes8([(0,1),(0,2)]) writes the same values in the same
+        order as calling poke8(0,1), poke8(0,2).
         """
-        for addr, val in addr_vals:
-            self.poke8(addr, val)
+        self._pokes8(list(addr_vals))
 
     def get_chip_id(self):
         """
@@ -98,8 +100,7 @@ class LMK04832:
         Returns False if the PLL(s) do not lock before the timeout (in ms)
         """
         # Sets and clears the CLR_PLLX_LD_LOST for PLL1 and PLL2
-        self.poke8(0x182, 0x03)
-        self.poke8(0x182, 0x00)
+        self.pokes8(((0x182, 0x03), (0x182, 0x00)))
         # Now poll lock status until timeout
         end_time = time.monotonic() + (timeout / 1000)
         while time.monotonic() < end_time:
@@ -134,17 +135,19 @@ class LMK04832:
         state as overall success otherwise the method fails.
         """
 
-        # 1) Setup device for synchronizing PLL1 R
-        self.poke8(0x145, 0x50) # PLL1R_SYNC_EN    (6) = 1
-                                # PLL1R_SYNC_SRC (5,4) = Sync pin
-                                # PLL2R_SYNC_EN    (3) = 0
+        self.pokes8((
+            # 1) Setup device for synchronizing PLL1 R
+            (0x145, 0x50), # PLL1R_SYNC_EN    (6) = 1
+                           # PLL1R_SYNC_SRC (5,4) = Sync pin
+                           # PLL2R_SYNC_EN    (3) = 0
 
-        # Do NOT change clkin0_TYPE and Clkin[0,1]_DEMUX.
-        # Both are set in initialization and remain static.
+            # Do NOT change clkin0_TYPE and Clkin[0,1]_DEMUX.
+            # Both are set in initialization and remain static.
 
-        # 2) Arm PLL1 R divider for synchronization
-        self.poke8(0x177, 0x20)
-        self.poke8(0x177, 0)
+            # 2) Arm PLL1 R divider for synchronization
+            (0x177, 0x20),
+            (0x177, 0),
+        ))
 
         # 3) Send rising edge on SYNC pin
         result = sync_pin_callback()
@@ -27,7 +27,9 @@ class LMX2572(object):
         self.regs_iface = regs_iface
         assert hasattr(self.regs_iface, 'peek16')
         assert hasattr(self.regs_iface, 'poke16')
+        assert hasattr(self.regs_iface, 'pokes16')
         self._poke16 = regs_iface.poke16
+        self._pokes16_iface = regs_iface.pokes16
         self._peek16 = regs_iface.peek16
 
         self._lmx2572_regs = lmx2572_regs_t()
@@ -58,12 +60,15 @@ class LMX2572(object):
     def commit(self):
         """
         Calculates the settings when needed and writes the settings to the device
+
+        All registers changed since the last write go out in a single
+        transaction, in ascending order. R0 is written last, twice, to latch
+        the double buffered registers and start the frequency calibration.
         """
         if self._need_recalculation:
             self._calculate_settings()
             self._need_recalculation = False
-        self._write_registers_reference_chain()
-        self._write_registers_frequency_tuning()
+        self._lmx2572_regs.commit(self._pokes16, latch_addrs=(0, 0))
 
     def check_pll_locked(self):
         """
@@ -147,11 +152,18 @@ class LMX2572(object):
 
     def _pokes16(self, addr_vals):
         """
-        Apply a series of pokes.
-        pokes16((0,1),(0,2)) is the same as calling poke16(0,1), poke16(0,2).
+        Apply a series of pokes as a single transaction on the register
+        interface. pokes16([(0,1),(0,2)]) writes the same values in the same
+        order as calling poke16(0,1), poke16(0,2).
+        """
+        self._pokes16_iface(list(addr_vals))
+
+    def _write_regs(self, addrs):
+        """
+        Write the current register map values for the given addresses, in the
+        given order.
         """
-        for addr, val in addr_vals:
-            self._poke16(addr, val)
+        self._pokes16([(addr, self._lmx2572_regs.get_reg(addr)) for addr in addrs])
 
     def _set_output_a_enable(self, enable_output):
         """
@@ -260,79 +272,8 @@ class LMX2572(object):
         """
         Performs the intial register writes for the LMX2572
         """
-        for register in reversed(range(NUMBER_OF_LMX2572_REGISTERS)):
-            if register in LMX2572.READ_ONLY_REGISTERS:
-                continue
-            self._poke16(register, self._lmx2572_regs.get_reg(register))
-
-    def _write_registers_frequency_tuning(self):
-        """
-        This function writes just the registers for frequency tuning
-        """
-        # Write PLL_N to registers R34 and R36
-        self._poke16(34, self._lmx2572_regs.get_reg(34))
-        self._poke16(36, self._lmx2572_regs.get_reg(36))
-        # Write PLL_DEN to registers R38 and R39
-        self._poke16(38, self._lmx2572_regs.get_reg(38))
-        self._poke16(39, self._lmx2572_regs.get_reg(39))
-        # Write PLL_NUM to registers R42 and R43
-        self._poke16(42, self._lmx2572_regs.get_reg(42))
-        self._poke16(43, self._lmx2572_regs.get_reg(43))
-        
-        # MASH_SEED to registers R40 and R41
-        self._poke16(40, self._lmx2572_regs.get_reg(40))
-        self._poke16(41, self._lmx2572_regs.get_reg(41))
-
-        # Write OUTA_PWR to register R44 or OUTB_PWR to register R45
-        # Write OUTA_MUX to register R45 and/or OUTB_MUX to register R46 
-        self._poke16(44, self._lmx2572_regs.get_reg(44))
-        self._poke16(45, self._lmx2572_regs.get_reg(45))
-        self._poke16(46, self._lmx2572_regs.get_reg(46))
-
-        # Write CHDIV to register R75
-        self._poke16(75, self._lmx2572_regs.get_reg(75))
-
-        # Write CPG to register R14
-        self._poke16(14, self._lmx2572_regs.get_reg(14))
-
-        # Write PFD_DLY_SEL to register R37
-        self._poke16(37, self._lmx2572_regs.get_reg(37))
-
-        # Write VCO_SEL to register R20
-        self._poke16(20, self._lmx2572_regs.get_reg(20))
-
-        # Write VCO_DACISET_STRT to register R17
-        self._poke16(17, self._lmx2572_regs.get_reg(17))
-
-        # Write VCO_CALCTRL_STRT to register R78
-        self._poke16(78, self._lmx2572_regs.get_reg(78))
-
-        # Write R0 to latch double buffered registers
-        self._poke16(0, self._lmx2572_regs.get_reg(0))
-        self._poke16(0, self._lmx2572_regs.get_reg(0))
-
-    def _write_registers_reference_chain(self):
-        """
-        This function writes the registers that are used for setting the reference chain
-        """
-        # Write FCAL_HPFD_ADJ to register R0
-        # Write FCAL_LPFD_ADJ to register R0
-        self._poke16(0, self._lmx2572_regs.get_reg(0))
-
-        # Write MULT_HI to register R9
-        # Write OSC_2X to register R9
-        self._poke16(9, self._lmx2572_regs.get_reg(9))
-
-        # Write MULT to register R10
-        self._poke16(10, self._lmx2572_regs.get_reg(10))
-
-        # Write PLL_R to register R11
-        self._poke16(11, self._lmx2572_regs.get_reg(11))
-        # Write PLL_R_PRE to register R12
-        self._poke16(12, self._lmx2572_regs.get_reg(12))
-
-        # if Phase SYNC being used: 
-        # Write MASH_RST_COUNT to registers R69 and 70
-        if self.get_synchronization():
-            self._poke16(70, self._lmx2572_regs.get_reg(70))
-            self._poke16(69, self._lmx2572_regs.get_reg(69))
+        self._write_regs([
+            register for register in reversed(range(NUMBER_OF_LMX2572_REGISTERS))
+            if register not in LMX2572.READ_ONLY_REGISTERS
+        ])
+        self._lmx2572_regs.clear_dirty()
@@ -9,6 +9,11 @@ Update the CPLD image using the on-chip flash on Intel MAX10 devices
 """
 import os
 import time
+import numpy as np
+
+# Lookup table to reverse the bit order of a byte
+BIT_REVERSE_LUT = np.array(
+    [int('{:08b}'.format(byte)[::-1], 2) for byte in range(256)], dtype=np.uint8)
 
 class Max10CpldFlashCtrl():
     """
@@ -29,6 +34,26 @@ class Max10CpldFlashCtrl():
     # Masks for FLASH_STATUS_REG
     FLASH_MEM_INIT_ENABLED_MASK = 0x10000
 
+    # Value of an erased flash word
+    FLASH_ERASED_WORD           = 0xFFFFFFFF
+
+    # Flash layout of the supported MAX10 variants (word addresses, see
+    # reconfig_engine.v). Without memory initialization, the image occupies
+    # the CFM0 sector only. With memory initialization, it starts in the
+    # sectors below CFM0, which are always erased together.
+    FLASH_LAYOUTS = {
+        'm04': {'cfm0_start': 0x9C00, 'mem_init_start': 0x1000,
+                'cfm0_sector': 4, 'mem_init_sectors': [2, 3]},
+        'm08': {'cfm0_start': 0xAC00, 'mem_init_start': 0x2000,
+                'cfm0_sector': 5, 'mem_init_sectors': [3, 4]},
+    }
+
+    # Polling intervals of wait_for_idle() in seconds. Reads and writes
+    # complete within microseconds, so polling starts out fast and backs off
+    # while waiting for long operations such as sector erases.
+    POLL_MIN_INTERVAL           = 10e-6
+    POLL_MAX_INTERVAL           = 1e-3
+
     def __init__(self, logger, regs, reconfig_regs_offset, cpld_min_revision):
         if logger == None:
             logger = get_logger('update_cpld')
@@ -36,6 +61,8 @@ class Max10CpldFlashCtrl():
         self.regs = regs
         self.reconfig_regs_offset = reconfig_regs_offset
         self.cpld_min_revision = cpld_min_revision
+        self.num_words_read = 0
+        self.num_words_written = 0
 
     def peek32(self, addr):
         return self.regs.peek32(addr + self.reconfig_regs_offset)
@@ -98,36 +125,54 @@ class Max10CpldFlashCtrl():
         else:
             self.log.error('Cannot wait for unknown operation {}'.format(operation))
             raise RuntimeError('Cannot wait for unknown operation {}'.format(operation))
-        for _ in range(0, timeout):
+        deadline = time.monotonic() + timeout / 1000
+        interval = self.POLL_MIN_INTERVAL
+        while True:
             status = self.peek32(self.FLASH_STATUS_REG)
             if (status & status_bit):
                 return True
-            time.sleep(0.001) # 1 ms
-        return False
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(interval)
+            interval = min(2 * interval, self.POLL_MAX_INTERVAL)
+
+    def get_max10_variant(self):
+        """
+        Determine the M04 or M08 variant based on the value encoded in the
+        FLASH_CFM0_START_ADDR_REG register
+        """
+        start_addr = self.get_start_addr()
+        for variant, layout in self.FLASH_LAYOUTS.items():
+            if start_addr in (layout['cfm0_start'], layout['mem_init_start']):
+                return variant
+        raise RuntimeError('Unknown MAX10 variant (FLASH_CFM0_START_ADDR_REG=0x{:04X})'.format(start_addr))
+
+    def get_erase_groups(self):
+        """
+        Return the flash sectors occupied by the image as a list of
+        (sectors, start_addr, end_addr) tuples. The sectors of a tuple are
+        erased together, and hold the words from start_addr to end_addr
+        (inclusive).
+        """
+        self.max10_variant = self.get_max10_variant()
+        layout = self.FLASH_LAYOUTS[self.max10_variant]
+        start_addr = self.get_start_addr()
+        end_addr = self.get_end_addr()
+        if start_addr < layout['cfm0_start']:
+            return [(layout['mem_init_sectors'], start_addr, layout['cfm0_start'] - 1),
+                    ([layout['cfm0_sector']], layout['cfm0_start'], end_addr)]
+        return [([layout['cfm0_sector']], start_addr, end_addr)]
 
-    def erase_flash_memory(self):
+    def erase_flash_memory(self, sectors=None):
+        """
+        Erase the given flash sectors. If sectors is None, erase all sectors
+        occupied by the image.
+        """
+        if sectors is None:
+            sectors = [sector
+                       for group_sectors, _, _ in self.get_erase_groups()
+                       for sector in group_sectors]
         with self:
-            # determine M04 or M08 variant based on
-            # value encoded in the FLASH_CFM0_START_ADDR_REG
-            # register
-            start_addr = self.get_start_addr()
-            if start_addr == 0x9C00:
-                self.max10_variant = "m04"
-            elif start_addr == 0xAC00:
-                self.max10_variant = "m08"
-            else:
-                raise RuntimeError('Unknown MAX10 variant (FLASH_CFM0_START_ADDR_REG=0x{:04X})'.format(start_addr))
-            # check for sectors to be erased:
-            if self.is_memory_initialization_enabled():
-                if self.max10_variant == "m04":
-                    sectors = [2, 3, 4]
-                else:
-                    sectors = [3, 4, 5]
-            else:
-                if self.max10_variant == "m04":
-                    sectors = [4]
-                else:
-                    sectors = [5]
             # erase each sector individually
             for sector in sectors:
                 # start erase
@@ -139,13 +184,22 @@ class Max10CpldFlashCtrl():
                     return False
             return True
 
-    def program_flash_memory(self, raw_data):
+    def program_flash_memory(self, raw_data, start=0, stop=None):
+        """
+        Write raw_data[start:stop] to flash, which must have been erased
+        before. Words which equal the erased value are skipped.
+        """
+        raw_data = np.asarray(raw_data, dtype=np.uint32)
+        stop = len(raw_data) if stop is None else stop
+        indices = start + np.flatnonzero(raw_data[start:stop] != self.FLASH_ERASED_WORD)
+        start_time = time.monotonic()
         with self:
             # write words one at a time
-            for i, data in enumerate(raw_data):
+            for count, (i, data) in enumerate(zip(indices.tolist(),
+                                                  raw_data[indices].tolist())):
                 # status display
-                if (i%1000 == 0):
-                    self.log.debug('%d%% written', i*4/self.file_size*100)
+                if (count%1000 == 0):
+                    self.log.debug('%d%% written', count/len(indices)*100)
                 # write address and data
                 self.poke32(self.FLASH_ADDR_REG, self.cpld_start_address+i)
                 self.poke32(self.FLASH_WRITE_DATA_REG, data)
@@ -158,11 +212,20 @@ class Max10CpldFlashCtrl():
                     return False
                 if not self.check_reconfig_engine_status(expected_value=0x1110):
                     return False
+        self.num_words_written += len(indices)
+        self.log_throughput('Wrote', len(indices), start_time)
         return True
 
-    def verify_flash_memory(self, raw_data):
+    def verify_flash_memory(self, raw_data, start=0, stop=None):
+        """
+        Compare raw_data[start:stop] to the flash contents. Returns False on
+        the first mismatch.
+        """
+        stop = len(raw_data) if stop is None else stop
+        start_time = time.monotonic()
+        num_words = 0
         # read words one at a time
-        for i, data in enumerate(raw_data):
+        for i, data in enumerate(np.asarray(raw_data[start:stop]).tolist(), start):
             # write address
             self.poke32(self.FLASH_ADDR_REG, self.cpld_start_address+i)
             # start read operation
@@ -174,23 +237,34 @@ class Max10CpldFlashCtrl():
                 return False
             # read data from device
             device_data = self.peek32(self.FLASH_READ_DATA_REG)
+            num_words += 1
+            self.num_words_read += 1
             if (data != device_data):
                 self.log.debug("CPLD image mismatch! address %d, expected value 0x%08X,"
                                " read value 0x%08X" %
                                (i+self.cpld_start_address, data, device_data))
                 return False
             # status display
-            if (i%1000 == 0):
-                self.log.debug('%d%% verified', i*4/self.file_size*100)
+            if (num_words%1000 == 0):
+                self.log.debug('%d%% verified', num_words/(stop-start)*100)
+        self.log_throughput('Verified', num_words, start_time)
         return True
 
+    def log_throughput(self, action, num_words, start_time):
+        duration = time.monotonic() - start_time
+        self.log.debug('%s %d words in %.2f s (%.0f words/s)', action, num_words,
+                       duration, num_words/duration if duration > 0 else 0)
+
     def reverse_bits_in_byte(self, n):
-        result = 0
-        for _ in range(8):
-            result <<= 1
-            result |= n & 1
-            n >>= 1
-        return result
+        return int(BIT_REVERSE_LUT[n & 0xFF])
+
+    def read_image_file(self, filename):
+        """
+        Read the image file and convert it to 32-bit words, reversing the bit
+        order of every byte to be compatible with Altera's on-chip flash IP.
+        """
+        data = np.fromfile(filename, dtype=np.uint8)
+        return BIT_REVERSE_LUT[data].view('>u4').astype(np.uint32)
 
     def update(self, filename):
         if not self.check_revision():
@@ -205,30 +279,32 @@ class Max10CpldFlashCtrl():
             self.log.error("Unexpected file size! Required size: %d bytes" % expected_size)
             return False
 
-        # Convert data from bytes to 32-bit words and reverse bit order
-        # to be compatible with Altera's on-chip flash IP
-        raw_data = []
-        with open(filename, 'rb') as binary_file:
-            for _ in range(self.file_size//4):
-                number = 0
-                for _ in range(4):
-                    number <<= 8
-                    number |= self.reverse_bits_in_byte(int.from_bytes(binary_file.read(1), 'big'))
-                raw_data.append(number)
+        raw_data = self.read_image_file(filename)
+        start_time = time.monotonic()
+        self.num_words_read = 0
+        self.num_words_written = 0
 
         if not self.check_reconfig_engine_status():
             return False
 
+        # Only sectors whose contents differ from the image are erased and
+        # reprogrammed. Verification of a sector stops at its first mismatch.
         self.log.debug('Checking if update is necessary...')
-        if self.verify_flash_memory(raw_data):
+        groups = [(sectors, start_addr-self.cpld_start_address,
+                   end_addr+1-self.cpld_start_address)
+                  for sectors, start_addr, end_addr in self.get_erase_groups()]
+        groups = [(sectors, start, stop) for sectors, start, stop in groups
+                  if not self.verify_flash_memory(raw_data, start, stop)]
+        if not groups:
             self.log.info('CPLD already programmed with specified image, not reprogramming.')
             return True
 
         if not self.check_reconfig_engine_status():
             return False
 
-        self.log.debug('Erasing CPLD flash memory...')
-        if not (self.erase_flash_memory()
+        sectors = [sector for group_sectors, _, _ in groups for sector in group_sectors]
+        self.log.debug('Erasing CPLD flash sectors %s...', sectors)
+        if not (self.erase_flash_memory(sectors)
                 and self.check_reconfig_engine_status()):
             self.log.error('There was an error while reprogramming the CPLD image. '
                            'Please program the CPLD again with a valid image before power '
@@ -237,7 +313,8 @@ class Max10CpldFlashCtrl():
         self.log.debug('CPLD flash memory erased.')
 
         self.log.debug('Programming flash memory...')
-        if not (self.program_flash_memory(raw_data)
+        if not (all(self.program_flash_memory(raw_data, start, stop)
+                    for _, start, stop in groups)
                 and self.check_reconfig_engine_status()):
             self.log.error('There was an error while reprogramming the CPLD image. '
                            'Please program the CPLD again with a valid image before power '
@@ -246,7 +323,8 @@ class Max10CpldFlashCtrl():
         self.log.debug('Flash memory programming complete.')
 
         self.log.debug('Verifying image in flash...')
-        if not (self.verify_flash_memory(raw_data)
+        if not (all(self.verify_flash_memory(raw_data, start, stop)
+                    for _, start, stop in groups)
                 and self.check_reconfig_engine_status()):
             self.log.error('There was an error while reprogramming the CPLD image. '
                            'Please program the CPLD again with a valid image before power '
@@ -254,6 +332,10 @@ class Max10CpldFlashCtrl():
             return False
         self.log.debug('Flash image verification complete.')
 
+        duration = time.monotonic() - start_time
+        self.log.info('CPLD flash update took %.1f s (%d words read, %d words written, '
+                      '%.0f words/s)', duration, self.num_words_read, self.num_words_written,
+                      (self.num_words_read+self.num_words_written)/duration)
         self.log.info('CPLD reprogrammed! Please power-cycle the device.')
 
         return True
@@ -115,6 +115,10 @@ Using the Eye Scan tool:
      the measurement by calling the function eyescan_full_scan(...).
      This function receives the array of GTs to scan, the horizontal range, and the
      vertical range. It returns the name of the PES file (automatically generated).
+     When called with to_file=False, no file is written; instead, the counters are
+     returned as a dictionary (see eyescan_results()), which can be sent over RPC.
+     With concurrent_lanes=True, all lanes are polled round-robin at each offset
+     coordinate instead of waiting for each lane in turn.
 
      Here is an example on how to start the scan:
        scan_lanes = [0, 1, 2, 3]
@@ -143,8 +147,10 @@ Theory of operation:
   by the GT instantiation at the FPGA. This tools implements the algorithm to control
   the Eye Scan measurement state machine for the given GT(s) and retreive the counts.
   This task is repetead over and over again through the vertical and horizontal ranges
-  specified by the user. The results for each offset coordinate are stored in a custom
-  binary file (.pes) that is then processed (BER calculation) and visualized.
+  specified by the user. The results for each offset coordinate are stored in a
+  preallocated NumPy structured array (see PES_COUNTER_DTYPE), which is written in one
+  shot to a custom binary file (.pes) that is then processed (BER calculation) and
+  visualized.
 
   When a EyeScanTool object is created (i.e. __init__ is called), the "fixed"
   configuration parameters for the GT(s) instantiation is defined. Also, the provided
@@ -170,8 +176,13 @@ import time
 import math
 import datetime
 from builtins import object
+import numpy
 from usrp_mpm.mpmlog import get_logger
 
+# One entry of the PES data section: the 16-bit counters of a single lane for a
+# single UT sign at a single offset coordinate, stored little-endian.
+PES_COUNTER_DTYPE = numpy.dtype([('sample_count', '<u2'), ('error_count', '<u2')])
+
 class EyeScanTool(object):
     """
     Provides a library to perform Eye Scan measurements using the NI JESD core.
@@ -186,6 +197,10 @@ class EyeScanTool(object):
     # E.g. PRINT_STATUS_EVERY = 1 will print a status message every offset measurement.
     PRINT_STATUS_EVERY = 10
 
+    # Encoding of the eye scan control FSM states in es_control_status[3:1].
+    STATE_DECODE = {'WAIT': 0b000, 'RESET': 0b001, 'COUNT': 0b011, \
+                    'END' : 0b010, 'ARMED': 0b101, 'READ' : 0b100}
+
     lanes = None
     # Array that defines the available lanes to measure.
     lane_num = None
@@ -510,8 +525,7 @@ class EyeScanTool(object):
           wait_for -> State which the function waits the FSM to transition to.
                       {'WAIT','RESET','COUNT','END','ARMED','READ'}
         """
-        STATE_DECODE = {'WAIT': 0b000, 'RESET': 0b001, 'COUNT': 0b011, \
-                        'END' : 0b010, 'ARMED': 0b101, 'READ' : 0b100}
+        STATE_DECODE = self.STATE_DECODE
         self.log.trace("Waiting for %s state at MGT #%d", wait_for, self.lane_num)
         # Validate the state input parameter.
         assert wait_for.upper() in ('WAIT', 'RESET', 'COUNT', 'END', 'ARMED', 'READ')
@@ -519,7 +533,7 @@ class EyeScanTool(object):
         # the given state.
         state_reached = False
         iterations = 0
-        delay = 2 ** (self.prescale - 13) if (self.prescale > 13) else 0
+        delay = self._poll_delay()
         while not state_reached:
             # Read the status register.
             es_control_status = self.jesdcore.drp_access(rd=True, addr=0x151)
@@ -546,6 +560,14 @@ class EyeScanTool(object):
         return state_reached
 
 
+    def _poll_delay(self):
+        """
+        Returns the delay (in ms) between two polls of the eye scan FSM status. Higher
+        prescale values make the measurement take longer, so poll less often.
+        """
+        return 2 ** (self.prescale - 13) if (self.prescale > 13) else 0
+
+
     def eyescan_counters(self):
         """
         This function reads the error and sample counters for the current lane number.
@@ -561,18 +583,23 @@ class EyeScanTool(object):
         return counters
 
 
-    def eyescan_acquisition(self, hor_offset=0, ver_offset=0):
+    def eyescan_acquisition(self, hor_offset=0, ver_offset=0, concurrent_lanes=False):
         """
         This function performs an acquisition for each lane in the lanes global array.
         Each GT is tested at the same "coordinate". Only after all GTs measurements
         are completed, the function returns.
 
         Parameters:
-          hor_offset -> Horizontal phase offset.
-                        [-32, 32] corresponding to -0.5 UI to +0.5 UI.
-          ver_offset -> Vertical voltage offset.
-                        [-127, 127] corresponding to 0.39% increments.
+          hor_offset       -> Horizontal phase offset.
+                              [-32, 32] corresponding to -0.5 UI to +0.5 UI.
+          ver_offset       -> Vertical voltage offset.
+                              [-127, 127] corresponding to 0.39% increments.
+          concurrent_lanes -> When True, poll all lanes round-robin and service each
+                              one as soon as its FSM ends, instead of waiting for
+                              the lanes one after the other.
         """
+        if concurrent_lanes:
+            return self._eyescan_acquisition_concurrent(hor_offset, ver_offset)
         self.log.trace("Starting acquisition for GTs {}".format(self.lanes))
         acq_counters = [] # Array that stores multiple sl_counters lists.
         for _ in range(0, max(self.lanes) + 1):
@@ -634,7 +661,56 @@ class EyeScanTool(object):
         return acq_counters
 
 
-    def eyescan_sweep(self, bin_file, parsed_ranges):
+    def _eyescan_acquisition_concurrent(self, hor_offset, ver_offset, exit_after=10000):
+        """
+        Same as eyescan_acquisition(), but the FSMs of all lanes are polled round-robin.
+        As soon as a lane reaches the END state, its counters are read and (DFE eq.
+        only) its -UT measurement is started, while the other lanes keep counting.
+        """
+        self.log.trace("Starting concurrent acquisition for GTs {}".format(self.lanes))
+        ut_signs = ('+UT', '-UT') if self.eq_mode == 'DFE' else ('+UT',)
+        acq_counters = [{} for _ in range(0, max(self.lanes) + 1)]
+        # Start the FSM on all the requested lanes.
+        for current_lane in self.lanes:
+            self.set_global_lane(current_lane)
+            self.eyescan_control(err_det_en=True, run=False, arm=False)
+            self.eyescan_offset(hor_offset, ver_offset, ut_sign='+UT')
+            self.eyescan_control(err_det_en=True, run=True, arm=False)
+        # Maps each lane that is still counting to the index of its current UT sign.
+        pending = {lane: 0 for lane in self.lanes}
+        delay = self._poll_delay()
+        iterations = 0
+        while pending:
+            for current_lane in list(pending):
+                self.set_global_lane(current_lane)
+                es_control_status = self.jesdcore.drp_access(rd=True, addr=0x151)
+                current_state = (es_control_status & 0x000E) >> 1
+                if current_state != self.STATE_DECODE['END']:
+                    continue
+                ut_index = pending[current_lane]
+                self.eyescan_control(err_det_en=True, run=False, arm=False)
+                acq_counters[current_lane][ut_signs[ut_index]] = self.eyescan_counters()
+                if ut_index + 1 < len(ut_signs):
+                    self.eyescan_offset(hor_offset, ver_offset, ut_sign=ut_signs[ut_index + 1])
+                    self.eyescan_control(err_det_en=True, run=True, arm=False)
+                    pending[current_lane] = ut_index + 1
+                else:
+                    self.log.debug("Single measurement finalized for GT #%d (H=%d, V=%d, %s).",
+                                   current_lane, hor_offset, ver_offset, self.eq_mode)
+                    del pending[current_lane]
+            iterations += 1
+            if pending and iterations >= exit_after:
+                self.set_global_lane(None)
+                self.log.error("END state was not reached at GTs %s after %d polls.",
+                               sorted(pending), iterations)
+                raise Exception("Eyescan status timed out, see log for details.")
+            if pending:
+                time.sleep(delay / 1000.0)
+        self.set_global_lane(None)
+        return acq_counters
+
+
+    def eyescan_sweep(self, bin_file, parsed_ranges, concurrent_lanes=False):
         """
         Performs Eye Scan "measurement loop" (error counting) acquisitions across the
         given phase and voltage offset ranges.
@@ -661,54 +737,74 @@ class EyeScanTool(object):
             lanes     -> total number of lanes to be scanned. Defined as len(self.lanes).
             curr_lane -> a given lane number. It should be any value in the lanes array.
 
+        The counters are collected in a structured array of PES_COUNTER_DTYPE with
+        shape (hor_iterations, ver_iterations, lanes, 1 or 2 UT signs), whose memory
+        layout matches the data section of the file described above. The array is
+        returned, and written to bin_file in one shot at the end of the sweep.
+
         Parameters:
-          bin_file      -> Binary file reference to write data to. Passed from top level function.
-          parsed_ranges -> This is a keyed list with parsed parameters from parse_ranges().
+          bin_file         -> Binary file reference to write data to. Passed from top
+                              level function. May be None to skip writing the file.
+          parsed_ranges    -> This is a keyed list with parsed parameters from parse_ranges().
+          concurrent_lanes -> Passed on to eyescan_acquisition().
         """
-        def write_byte_counters(acq_counters):
-            """
-            This method writes the acquisition counters for each lane to the binary file.
-            """
-            # Write the sample and error counters for all given lanes.
-            for current_lane in self.lanes:
-                # Write the counters for the current lane.
-                sl_counters = acq_counters[current_lane]
-                self.log.debug("Writing +UT counters for GT #{0}: {1}"
-                               .format(current_lane, sl_counters))
-                byte_number = (sl_counters['+UT']['sample_count']).to_bytes(2, 'little')
-                bin_file.write(byte_number)
-                byte_number = (sl_counters['+UT']['error_count' ]).to_bytes(2, 'little')
-                bin_file.write(byte_number)
-                # -UT results only exists when DFE eq. mode is used.
-                if '-UT' in sl_counters:
-                    self.log.debug("Writing -UT counters for GT #%d...", current_lane)
-                    byte_number = (sl_counters['-UT']['sample_count']).to_bytes(2, 'little')
-                    bin_file.write(byte_number)
-                    byte_number = (sl_counters['-UT']['error_count' ]).to_bytes(2, 'little')
-                    bin_file.write(byte_number)
-        #
         gts_string = "GTs {}".format(self.lanes)
         self.log.trace("Starting sweep for %s ...", gts_string)
+        hor_offsets = range(parsed_ranges['hor_start'], parsed_ranges['hor_stop'] + 1,
+                            parsed_ranges['hor_step'])
+        ver_offsets = range(parsed_ranges['ver_start'], parsed_ranges['ver_stop'] + 1,
+                            parsed_ranges['ver_step'])
+        ut_signs = ('+UT', '-UT') if self.eq_mode == 'DFE' else ('+UT',)
+        counters = numpy.zeros(
+            (len(hor_offsets), len(ver_offsets), len(self.lanes), len(ut_signs)),
+            dtype=PES_COUNTER_DTYPE)
         # Perform the Eye Scan sweep!
-        acq_counters = []
-        total_iterations = parsed_ranges['hor_iterations'] * parsed_ranges['ver_iterations']
+        total_iterations = len(hor_offsets) * len(ver_offsets)
         iterations = 0
         # Outer loop iterates horizontally.
-        for hor_offset in range(parsed_ranges['hor_start'], parsed_ranges['hor_stop'] + 1,
-                                parsed_ranges['hor_step']):
+        for hor_index, hor_offset in enumerate(hor_offsets):
             # Inner loop iterates vertically.
-            for ver_offset in range(parsed_ranges['ver_start'], parsed_ranges['ver_stop'] + 1,
-                                    parsed_ranges['ver_step']):
+            for ver_index, ver_offset in enumerate(ver_offsets):
                 # Perform a single acquisition at each "coordinate".
-                acq_counters = self.eyescan_acquisition(hor_offset, ver_offset)
-                # Write the data to a binary file.
-                write_byte_counters(acq_counters)
+                acq_counters = self.eyescan_acquisition(hor_offset, ver_offset,
+                                                        concurrent_lanes)
+                # Store the counters of all lanes for this coordinate.
+                point = counters[hor_index, ver_index]
+                for lane_index, current_lane in enumerate(self.lanes):
+                    for ut_index, ut_sign in enumerate(ut_signs):
+                        point[lane_index, ut_index] = (
+                            acq_counters[current_lane][ut_sign]['sample_count'],
+                            acq_counters[current_lane][ut_sign]['error_count'])
                 # Report Eye Scan progress.
                 iterations += 1
                 progress = iterations / total_iterations * 100
                 # Only print status messages every PRINT_STATUS_EVERY iterations.
                 if iterations % self.PRINT_STATUS_EVERY == 0:
                     self.log.info("Eye Scan progress for %s sweep: %.2f %%", gts_string, progress)
+        # Write the data section of the binary file at once.
+        if bin_file is not None:
+            bin_file.write(counters.tobytes())
+        return counters
+
+
+    def eyescan_results(self, counters, hor_range, ver_range):
+        """
+        Converts the counters array returned by eyescan_sweep() into a dictionary
+        of plain Python types, so that it can be returned over RPC.
+        The counter lists are indexed as [hor_index][ver_index][lane_index][ut_index].
+        """
+        return {
+            'prescale': self.prescale,
+            'rxout_div': self.rxout_div,
+            'rx_int_datawidth': self.rx_int_datawidth,
+            'eq_mode': self.eq_mode,
+            'hor_range': dict(hor_range),
+            'ver_range': dict(ver_range),
+            'lanes': list(self.lanes),
+            'ut_signs': ['+UT', '-UT'] if self.eq_mode == 'DFE' else ['+UT'],
+            'sample_count': counters['sample_count'].tolist(),
+            'error_count': counters['error_count'].tolist(),
+        }
 
 
     def create_pes_file(self, hor_range, ver_range):
@@ -805,10 +901,14 @@ class EyeScanTool(object):
     def eyescan_full_scan(self,
                           scan_lanes=[0],
                           hor_range={'start':-32 , 'stop':32 , 'step': 1},
-                          ver_range={'start':-127, 'stop':127, 'step': 2}):
+                          ver_range={'start':-127, 'stop':127, 'step': 2},
+                          to_file=True,
+                          concurrent_lanes=False):
         """
         This function performs all the GT configuration and starts the eye scan sweep.
         The binary file should be open here.
+        Returns the PES file name, or the results dictionary from eyescan_results()
+        when to_file is False.
 
         Parameters:
           scan_lanes -> Array that represents which GTs will be scanned. The maximum size
@@ -823,17 +923,25 @@ class EyeScanTool(object):
                           'start' -> Defines the first point of the range. [-127,127].
                           'stop'  -> Defines the last point of the range. [-127,127].
                           'step'  -> Defines the step at which the range is iterated. [1,2,4,8].
+          to_file          -> When False, do not create a PES file but return the results.
+          concurrent_lanes -> Poll all lanes round-robin at each coordinate.
         """
         # Set the global lanes variable that defines which lanes will be scanned.
         self.lanes = scan_lanes
         # Extract the needed parameters from the given ranges.
         parsed_ranges = self.parse_ranges(hor_range, ver_range)
+        if not to_file:
+            self.eyescan_config()
+            counters = self.eyescan_sweep(None, parsed_ranges, concurrent_lanes)
+            return self.eyescan_results(counters, hor_range, ver_range)
         # Create the .pes binary file.
         file_name, pes_file = self.create_pes_file(hor_range, ver_range)
-        # Configure the requested lanes.
-        self.eyescan_config()
-        # Perform the sweep on the requested lanes.
-        self.eyescan_sweep(pes_file, parsed_ranges)
-        # Close the binary file.
-        pes_file.close()
+        try:
+            # Configure the requested lanes.
+            self.eyescan_config()
+            # Perform the sweep on the requested lanes.
+            self.eyescan_sweep(pes_file, parsed_ranges, concurrent_lanes)
+        finally:
+            # Close the binary file.
+            pes_file.close()
         return file_name
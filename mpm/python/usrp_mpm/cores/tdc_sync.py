@@ -12,6 +12,7 @@ import math
 from fractions import gcd
 from functools import reduce
 from builtins import object
+import numpy as np
 from usrp_mpm.mpmutils import poll_with_timeout
 from usrp_mpm.mpmlog import get_logger
 
@@ -19,6 +20,14 @@ def mean(vals):
     " Calculate arithmetic mean of vals "
     return float(sum(vals)) / max(len(vals), 1)
 
+# Number of times the offset valid flag is polled back-to-back before we start
+# sleeping between polls. Once the TDC is running, a new measurement is
+# available after a few us, so most reads never get past this.
+TDC_POLL_SPIN_COUNT = 16
+# Upper bound for the sleep between two polls of the offset valid flag. The
+# sleep starts small and doubles until it reaches this value.
+TDC_POLL_MAX_INTERVAL = 1e-3
+
 
 class ClockSynchronizer(object):
     """
@@ -398,25 +407,23 @@ class ClockSynchronizer(object):
             self.log.error("TDC is not configured prior to requesting measurements!")
             raise RuntimeError("TDC is not configured prior to requesting measurements!")
 
-        measure_offset = lambda: self._read_tdc_meas(
-            self.meas_clk_freq, self.ref_clk_freq, self.radio_clk_freq
-        )
-
         # Retrieve the measurements.
         tdc_start_time = time.time()
         self.log.trace("Reading {} TDC measurements from device...".format(num_meas))
-        measurements = [measure_offset() for _ in range(num_meas)]
+        measurements = self._convert_tdc_meas(
+            self._read_tdc_meas_raw(num_meas),
+            self.meas_clk_freq, self.ref_clk_freq, self.radio_clk_freq
+        )
 
         # All the measurements taken in a single run should be nearly identical. The
         # expected max delta between all measurements (from accuracy calculations)
         # is 1 ns. Take the average of the measurements and then compare each value mean
         # to see if it fits this criteria.
-        current_value = mean(measurements)
+        current_value = float(np.mean(measurements)) if num_meas else 0.0
 
         max_skew = 0.5e-9 # 500 ps of tolerated skew either direction
-        meas_err = bool(sum([x < current_value-max_skew for x in measurements])) or \
-                   bool(sum([x > current_value+max_skew for x in measurements]))
-        meas_range = max(measurements) - min(measurements)
+        meas_err = bool(np.any(np.abs(measurements - current_value) > max_skew))
+        meas_range = float(np.ptp(measurements)) if num_meas else 0.0
 
         self.log.trace("TDC Measurements Collected! Average = {:.3f} ns. "
                        "Range: {:.3f} ns".format(current_value*1e9, meas_range*1e9))
@@ -492,35 +499,79 @@ class ClockSynchronizer(object):
         """
         Return the offset (in seconds) from the SP to the RP.
         """
-        # Current worst-case time given a 40kHz pulse rate and 2^17 measurements for
-        # the period average operation is ~3.28 s... Round up to 5.0 s. This value is
-        # only for the first measurement to appear... subsequent repeat runs should be
-        # only a few us long.
-        timeout = time.time() + 5.0
+        return float(self._convert_tdc_meas(
+            self._read_tdc_meas_raw(1), meas_clk_freq, ref_clk_freq, radio_clk_freq
+        )[0])
+
+
+    def _wait_for_tdc_meas(self, timeout):
+        """
+        Poll SP_OFFSET_1 until the offset valid flag is set, and return its
+        value. Polls back-to-back for a few iterations, then sleeps between polls
+        (with exponential backoff) so waiting for the first measurement does not
+        hog the CPU.
+        """
+        peek32 = self.peek32
+        sp_offset_1 = self.SP_OFFSET_1
+        for _ in range(TDC_POLL_SPIN_COUNT):
+            sp_offset_msb = peek32(sp_offset_1)
+            if sp_offset_msb & 0x100 == 0x100:
+                return sp_offset_msb
+        interval = 1e-6
         while True:
-            sp_offset_msb = self.peek32(self.SP_OFFSET_1)
+            sp_offset_msb = peek32(sp_offset_1)
             if sp_offset_msb & 0x100 == 0x100:
-                break
+                return sp_offset_msb
             if time.time() > timeout:
                 error_msg = "Offsets failed to update within timeout."
                 self.log.error(error_msg)
                 raise RuntimeError(error_msg)
+            time.sleep(interval)
+            interval = min(2 * interval, TDC_POLL_MAX_INTERVAL)
 
-        # CRITICAL: These register values are locked when SP_OFFSET_1 is read and
-        # reloaded when SP_OFFSET_1 is read again, to keep one value from updating before
-        # the other. The SP and RP measurements are only meaningful when compared to one
-        # another from the same TDC run.
-        sp_offset_lsb = self.peek32(self.SP_OFFSET_0)
-        rp_offset_msb = self.peek32(self.RP_OFFSET_1)
-        rp_offset_lsb = self.peek32(self.RP_OFFSET_0)
 
-        sp_offset = (sp_offset_msb & 0xFF) << 32
-        sp_offset = (sp_offset | sp_offset_lsb)
-        rp_offset = (rp_offset_msb & 0xFF) << 32
-        rp_offset = (rp_offset | rp_offset_lsb)
+    def _read_tdc_meas_raw(self, num_meas):
+        """
+        Read num_meas raw measurements from the TDC. Returns a NumPy array of
+        shape (num_meas, 4), where every row holds the register values
+        SP_OFFSET_1, SP_OFFSET_0, RP_OFFSET_1, RP_OFFSET_0 of one TDC run.
+        """
+        raw = np.empty((num_meas, 4), dtype=np.int64)
+        peek32 = self.peek32
+        sp_offset_0 = self.SP_OFFSET_0
+        rp_offset_1 = self.RP_OFFSET_1
+        rp_offset_0 = self.RP_OFFSET_0
+        for idx in range(num_meas):
+            # Current worst-case time given a 40kHz pulse rate and 2^17 measurements for
+            # the period average operation is ~3.28 s... Round up to 5.0 s. This value is
+            # only for the first measurement to appear... subsequent repeat runs should be
+            # only a few us long.
+            sp_offset_msb = self._wait_for_tdc_meas(time.time() + 5.0)
+            # CRITICAL: These register values are locked when SP_OFFSET_1 is read and
+            # reloaded when SP_OFFSET_1 is read again, to keep one value from updating
+            # before the other. The SP and RP measurements are only meaningful when
+            # compared to one another from the same TDC run.
+            raw[idx] = (
+                sp_offset_msb,
+                peek32(sp_offset_0),
+                peek32(rp_offset_1),
+                peek32(rp_offset_0),
+            )
+        return raw
+
+
+    @staticmethod
+    def _convert_tdc_meas(raw, meas_clk_freq, ref_clk_freq, radio_clk_freq):
+        """
+        Convert raw measurements as returned by _read_tdc_meas_raw() into the
+        offsets (in seconds) from the SP to the RP. Returns a NumPy array with
+        one offset per measurement.
+        """
+        sp_offset = ((raw[:, 0] & 0xFF) << 32) | raw[:, 1]
+        rp_offset = ((raw[:, 2] & 0xFF) << 32) | raw[:, 3]
 
         # Do the subtraction before converting to floating point.
-        sp_rp = float(sp_offset - rp_offset) / (1<<27)
+        sp_rp = (sp_offset - rp_offset).astype(np.float64) / (1<<27)
 
         # Some Math...
         # Convert the reading from meas_clk ticks to picoseconds
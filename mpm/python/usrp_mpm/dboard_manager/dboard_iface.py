@@ -64,6 +64,15 @@ class DboardIface(object):
     def poke_db_cpld(self, addr, val):
         raise NotImplementedError('DboardIface::poke_db_cpld() not supported!')
 
+    def pokes_db_cpld(self, addr_vals):
+        """
+        Write a list of (addr, value) tuples to the DB CPLD. Motherboards which
+        can write several registers with less overhead than individual
+        poke_db_cpld() calls should override this.
+        """
+        for addr, val in addr_vals:
+            self.poke_db_cpld(addr, val)
+
     def ctrl_spi_reset(self):
         raise NotImplementedError('DboardIface::ctrl_spi_reset() not supported!')
 
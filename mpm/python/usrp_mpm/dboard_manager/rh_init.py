@@ -382,6 +382,10 @@ class RhodiumInitManager(object):
           prescale   -> Controls the prescaling of the sample count to keep both sample
                         count and error count in reasonable precision.
                         Valid values: from 0 to 31.
+          to_file    -> When True (default), write a PES file and return its name.
+                        Otherwise, return the results as a dictionary (see
+                        EyeScanTool.eyescan_results()).
+          concurrent_lanes -> When True, poll all lanes round-robin at each offset.
         """
         # The following constants must be defined according to GTs configuration
         # for each project. For further details, refer to the eyescan.py file.
@@ -414,14 +418,19 @@ class RhodiumInitManager(object):
         test_val = adc_regs.peek8(0x0573)
         adc_regs.poke8(0x0573, 0x13)
         # Perform eye scan on given lanes and range.
-        file_name = eyescan_tool.eyescan_full_scan(args['scan_lanes'],
-                                                   args['hor_range'], args['ver_range'])
+        # Like rx_eyescan, these options may be given as str or bool.
+        to_file = args.get('to_file', True) in (True, 'True')
+        concurrent_lanes = args.get('concurrent_lanes', False) in (True, 'True')
+        result = eyescan_tool.eyescan_full_scan(args['scan_lanes'],
+                                                args['hor_range'], args['ver_range'],
+                                                to_file=to_file,
+                                                concurrent_lanes=concurrent_lanes)
         # Do some housekeeping...
         # adc_regs.poke8(0x0550, test_val) # Enable normal operation.
         adc_regs.poke8(0x0573, test_val) # Enable normal operation.
         adc_regs.poke8(0x0000, 0x81) # Reset.
         eyescan_tool = None
-        return file_name
+        return result
 
     def _tx_prbs_test(self, jesdcore, args):
         """
@@ -497,6 +497,39 @@ class Rhodium(BfrfsEEPROM, DboardManagerBase):
     # Debug
     ##########################################################################
 
+    def rx_eyescan(self, scan_lanes=None, hor_range=None, ver_range=None,
+                   to_file=False, concurrent_lanes=False):
+        """
+        Perform an eye scan on the ADC to FPGA JESD204B link via RPC shell.
+        Returns the results as a dictionary (see EyeScanTool.eyescan_results()),
+        or the name of the PES file on the device if to_file is True. Lanes and
+        ranges default to the ones used by init() (see
+        RhodiumInitManager._rx_eyescan()).
+
+        The eye scan circuitry is only enabled if init() was called with
+        rx_eyescan=True. The ADC is reset after the scan, so the daughterboard
+        has to be initialized again before streaming.
+        """
+        if self._init_args is None or \
+                not RhodiumInitManager.JESD_DEFAULT_ARGS.get("enable_rx_eyescan"):
+            raise RuntimeError("The eye scan circuitry is not enabled, "
+                               "initialize the daughterboard with rx_eyescan=True.")
+        args = dict(self._init_args)
+        for key, value in (('scan_lanes', scan_lanes),
+                           ('hor_range', hor_range),
+                           ('ver_range', ver_range)):
+            if value is not None:
+                args[key] = value
+        args['to_file'] = to_file
+        args['concurrent_lanes'] = concurrent_lanes
+        with open_uio(
+            label="dboard-regs-{}".format(self.slot_idx),
+            read_only=False
+        ) as radio_regs:
+            jesdcore = nijesdcore.NIJESDCore(radio_regs, self.slot_idx,
+                                             **RhodiumInitManager.JESD_DEFAULT_ARGS)
+            return RhodiumInitManager(self, self._spi_ifaces)._rx_eyescan(jesdcore, args)
+
     def cpld_peek(self, addr):
         """
         Debug for accessing the CPLD via the RPC shell.
@@ -66,6 +66,9 @@ class X4xxDboardIface(DboardIface):
     def poke_db_cpld(self, addr, val):
         self.db_cpld_iface.poke32(addr, val)
 
+    def pokes_db_cpld(self, addr_vals):
+        self.db_cpld_iface.pokes32(addr_vals)
+
     ####################################################################
     # Management Bus
     ####################################################################
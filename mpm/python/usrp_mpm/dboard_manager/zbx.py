@@ -113,6 +113,7 @@ class ZBX(DboardManagerBase):
         self._assert_rev_compatibility(eeprom["rev_compat"])
         # Initialize daughterboard CPLD control
         self.poke_cpld = self.db_iface.poke_db_cpld
+        self.pokes_cpld = self.db_iface.pokes_db_cpld
         self.peek_cpld = self.db_iface.peek_db_cpld
         self.regs = zbx_cpld_regs_t()
         self._spi_addr = self.regs.SPI_READY_addr
@@ -172,9 +173,7 @@ class ZBX(DboardManagerBase):
         self.regs.ENABLE_TX_POS_7V0 = self.regs.ENABLE_TX_POS_7V0_t(int(enable))
         self.regs.ENABLE_RX_POS_7V0 = self.regs.ENABLE_RX_POS_7V0_t(int(enable))
         self.regs.ENABLE_POS_3V3 = self.regs.ENABLE_POS_3V3_t(int(enable))
-        self.poke_cpld(
-            self.regs.ENABLE_POS_3V3_addr,
-            self.regs.get_reg(self.regs.ENABLE_POS_3V3_addr))
+        self.regs.commit(self.pokes_cpld)
 
     def _check_compat_version(self):
         """ Check compatibility of DB CPLD image and SW regmap """
@@ -215,21 +214,9 @@ class ZBX(DboardManagerBase):
         Set the CPLD into a safe state.
         """
         cpld_regs = zbx_cpld_regs_t()
-        # We un-configure some registers to force a change later. None of these
-        # values get written to the CPLD!
-        cpld_regs.RF0_OPTION = cpld_regs.RF0_OPTION.RF0_OPTION_FPGA_STATE
-        cpld_regs.RF1_OPTION = cpld_regs.RF1_OPTION.RF1_OPTION_FPGA_STATE
-        cpld_regs.SW_RF0_CONFIG = 255
-        cpld_regs.SW_RF1_CONFIG = 255
-        cpld_regs.TX0_DSA1[0] = 0
-        cpld_regs.TX0_DSA2[0] = 0
-        cpld_regs.RX0_DSA1[0] = 0
-        cpld_regs.RX0_DSA2[0] = 0
-        cpld_regs.RX0_DSA3_A[0] = 0
-        cpld_regs.RX0_DSA3_B[0] = 0
-        cpld_regs.save_state()
-        # Now all the registers we touch will be enumerated by get_changed_addrs()
-        # Everything below *will* get written to the CPLD:
+        # A fresh register map starts out clean. Every register we assign below
+        # is marked dirty (even if it matches the default value) and *will* get
+        # written to the CPLD:
         # ATR control
         cpld_regs.RF0_OPTION = cpld_regs.RF0_OPTION.RF0_OPTION_SW_DEFINED
         cpld_regs.RF1_OPTION = cpld_regs.RF1_OPTION.RF1_OPTION_SW_DEFINED
@@ -291,8 +278,7 @@ class ZBX(DboardManagerBase):
         cpld_regs.RX0_DSA2[0] = 15
         cpld_regs.RX0_DSA3_A[0] = 15
         cpld_regs.RX0_DSA3_B[0] = 15
-        for addr in cpld_regs.get_changed_addrs():
-            self.poke_cpld(addr, cpld_regs.get_reg(addr))
+        cpld_regs.commit(self.pokes_cpld)
         # pylint: enable=too-many-statements
 
     #########################################################################
@@ -363,13 +349,12 @@ class ZBX(DboardManagerBase):
         """
         if self._clock_enabled != bool(value):
             return
-        addr = self.regs.get_addr("PLL_REF_CLOCK_ENABLE")
         enum = self.regs.PLL_REF_CLOCK_ENABLE_t
         if value:
-            reg_value = enum.PLL_REF_CLOCK_ENABLE_DISABLE.value
+            self.regs.PLL_REF_CLOCK_ENABLE = enum.PLL_REF_CLOCK_ENABLE_DISABLE
         else:
-            reg_value = enum.PLL_REF_CLOCK_ENABLE_ENABLE.value
-        self.poke_cpld(addr, reg_value)
+            self.regs.PLL_REF_CLOCK_ENABLE = enum.PLL_REF_CLOCK_ENABLE_ENABLE
+        self.regs.commit(self.pokes_cpld)
         self._clock_enabled = not bool(value)
 
     #########################################################################
@@ -406,7 +391,7 @@ class ZBX(DboardManagerBase):
         self.regs.ADDRESS = addr
         self.regs.START_TRANSACTION = \
             self.regs.START_TRANSACTION_t.START_TRANSACTION_ENABLE
-        self.poke_cpld(self._spi_addr, self.regs.get_reg(self._spi_addr))
+        self.regs.commit(self.pokes_cpld)
 
     def _lo_spi_check_status(self, lo_name, addr, write=False):
         """ Wait for SPI Ready and check the success of the LO SPI transaction """
@@ -445,7 +430,7 @@ class ZBX(DboardManagerBase):
         """ Set the frontpanel LEDs """
         assert channel in (0, 1)
 
-        self.regs.save_state()
+        self.regs.clear_dirty()
         if channel == 0:
             # ensure to be in SW controlled mode
             self.regs.RF0_OPTION = self.regs.RF0_OPTION.RF0_OPTION_SW_DEFINED
@@ -467,8 +452,7 @@ class ZBX(DboardManagerBase):
             self.regs.TX1_TRX_LED[0] = self.regs.TX1_TRX_LED[0].TX1_TRX_LED_ENABLE \
                 if bool(trx_tx) else self.regs.TX1_TRX_LED[0].TX1_TRX_LED_DISABLE
 
-        for addr in self.regs.get_changed_addrs():
-            self.poke_cpld(addr, self.regs.get_reg(addr))
+        self.regs.commit(self.pokes_cpld)
 
     ###########################################################################
     # Sensors
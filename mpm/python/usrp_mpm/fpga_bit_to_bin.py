@@ -8,7 +8,12 @@
 Convert FPGA Bit files to bin files suitable for flashing
 """
 import argparse
+import os
 import struct
+import numpy as np
+
+# Default number of 32-bit words to convert at a time
+DEFAULT_BLOCK_LEN = 1024 * 1024
 
 def parse_args():
     """Parse arguments when running this as a script"""
@@ -16,8 +21,9 @@ def parse_args():
     parser = argparse.ArgumentParser(description=parser_help)
     parser.add_argument('-f', '--flip', dest='flip', action='store_true', default=False,
                         help='Flip 32-bit endianess (needed for Zynq)')
-    parser.add_argument('-l', '--blen', type=int, default=-1,
-                        help="Size of block (in words) to read at one time")
+    parser.add_argument('-l', '--blen', type=int, default=DEFAULT_BLOCK_LEN,
+                        help="Size of block (in words) to read at one time "
+                             "(-1 to read the whole file at once)")
     parser.add_argument("bitfile", help="Input bit file name")
     parser.add_argument("binfile", help="Output bin file name")
     return parser.parse_args()
@@ -25,32 +31,26 @@ def parse_args():
 
 def bin_to_file(bitfile, binfilename, flip, blocksize):
     """Reads a raw bitstream, byte-swaps (if desired), and writes to a binfile"""
+    if blocksize <= 0:
+        # Read everything that's left in one go
+        blocksize = max(os.fstat(bitfile.fileno()).st_size - bitfile.tell(), 0) \
+            // struct.calcsize('I') + 1
+    # Reuse a single buffer for all blocks, and swap the words in place
+    buf = bytearray(blocksize * struct.calcsize('I'))
+    words = np.frombuffer(buf, dtype=np.uint32)
     with open(binfilename, 'wb') as binfile:
         while True:
-            # Calculate how many bytes to read the requested blocksize
-            # -1 feels a little cleaner than -1*(large number), but isn't necessary
-            readlen = -1 if (blocksize <= 0) else blocksize * struct.calcsize('I')
-            byteblock = bitfile.read(readlen)
-            if flip:
-                # Check how many ints we actually read
-                actual_blocksize = int(len(byteblock) / struct.calcsize('I'))
-                # Create the format string accordingly
-                fmt_string = str(actual_blocksize)+"I"
-                # Byte swap with an unpack and a pack with opposite endianness
-                int_arr = struct.unpack(">"+fmt_string, byteblock)
-                binstream = struct.pack("<"+fmt_string, *int_arr)
-            else:
-                # Don't need to do anything special
-                binstream = byteblock
-            binfile.write(binstream)
-            # Check if we're done. Either we
-            # a) read the entire file in one go, or
-            # b) read a partial block in the last read
-            if (blocksize == -1) or (len(byteblock) < readlen):
+            readlen = bitfile.readinto(buf)
+            if not readlen:
                 break
+            if flip:
+                if readlen % struct.calcsize('I'):
+                    raise RuntimeError("Bitstream length is not a multiple of 32 bits")
+                words[:readlen // struct.calcsize('I')].byteswap(inplace=True)
+            binfile.write(memoryview(buf)[:readlen])
 
 
-def fpga_bit_to_bin(bitfilename, binfilename, flip=False, blocklen=-1):
+def fpga_bit_to_bin(bitfilename, binfilename, flip=False, blocklen=DEFAULT_BLOCK_LEN):
     """Process the FPGA bit file at bitfilename, and write a bin file to binfilename"""
     # Read the header
     # The header consists of several fields, with keys and lengths to divide the file.
@@ -14,6 +14,7 @@ import select
 import datetime
 import math
 import re
+import threading
 from usrp_mpm.mpmlog import get_logger
 
 def _deg_to_dm(angle):
@@ -68,7 +69,7 @@ def gpgga_from_tpv_sky(tpv_sensor_data, sky_sensor_data):
         gpgga += "0.0,W,"
 
     quality = 0
-    if tpv_sensor_data['mode'] > 1:
+    if tpv_sensor_data.get('mode', 0) > 1:
         if tpv_sensor_data.get('status') == 2:
             quality = 2
         else:
@@ -119,14 +120,23 @@ class GPSDIface:
     command), this function should return immediately. However, if no report is ready, the function
     waits until an interesting result is ready and returns that. This is achieved by discarding
     `mode=0` responses.
+
+    If stream_reports is True, the WATCH command asks GPSd to stream every report as it arrives
+    instead of waiting for POLL commands (see GPSDWatcher).
     """
-    def __init__(self):
+    # Number of bytes requested from the socket per read
+    RECV_SIZE = 4096
+
+    def __init__(self, stream_reports=False):
         # Make a logger
         try:
             self.log = get_logger('GPSDIface')
         except AssertionError:
             from usrp_mpm.mpmlog import get_main_logger
             self.log = get_main_logger('GPSDIface')
+        self.stream_reports = stream_reports
+        # Data received from GPSD which doesn't form a complete line yet
+        self._read_buffer = b''
         # Make a socket to connect to GPSD
         self.gpsd_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
@@ -141,6 +151,7 @@ class GPSDIface:
 
     def open(self):
         """Open the socket to GPSD"""
+        self._read_buffer = b''
         self.gpsd_socket.connect(('localhost', 2947))
         version_str = self.read_class("VERSION")
         self.enable_watch()
@@ -153,7 +164,10 @@ class GPSDIface:
 
     def enable_watch(self):
         """Send a WATCH command, which starts operation"""
-        self.gpsd_socket.sendall(b'?WATCH={"enable":true};')
+        if self.stream_reports:
+            self.gpsd_socket.sendall(b'?WATCH={"enable":true,"json":true};')
+        else:
+            self.gpsd_socket.sendall(b'?WATCH={"enable":true};')
         self.log.trace(self.read_class("DEVICES"))
         self.log.trace(self.read_class("WATCH"))
 
@@ -187,23 +201,28 @@ class GPSDIface:
         query_cmd = b'?WATCH={"enable":false};'
         self.gpsd_socket.sendall(query_cmd)
 
-    def socket_read_line(self, timeout=60, interval=0):
+    def socket_read_line(self, timeout=60):
         """
         Read from a socket until newline. If there was no newline until the timeout
         occurs, raise an error. Otherwise, return the line.
+
+        Data is read in blocks of up to RECV_SIZE bytes, and whatever follows the
+        newline is kept for the next call. The thread sleeps in select() while
+        waiting for data.
         """
-        line = b''
         end_time = time.time() + timeout
-        while time.time() < end_time:
-            socket_ready = select.select([self.gpsd_socket], [], [], 0)[0]
+        while b'\n' not in self._read_buffer:
+            time_left = end_time - time.time()
+            if time_left <= 0:
+                raise socket.timeout
+            socket_ready = select.select([self.gpsd_socket], [], [], time_left)[0]
             if socket_ready:
-                next_char = self.gpsd_socket.recv(1)
-                if next_char == b'\n':
-                    return line.decode('ascii')
-                line += next_char
-            else:
-                time.sleep(interval)
-        raise socket.timeout
+                data = self.gpsd_socket.recv(self.RECV_SIZE)
+                if not data:
+                    raise ConnectionResetError("GPSD closed the connection")
+                self._read_buffer += data
+        line, self._read_buffer = self._read_buffer.split(b'\n', 1)
+        return line.decode('ascii')
 
     def read_class(self, class_name, socket_timeout=60):
         """return json data for spcecfic key of 'class'
@@ -257,6 +276,99 @@ class GPSDIface:
         return result.get(resp_class, [{}])[0]
 
 
+class GPSDWatcher:
+    """
+    Keeps the latest report of every GPSD response class (TPV, SKY, ...) in a cache.
+
+    A background thread subscribes to GPSD in watch mode, so reports are pushed to us as GPSD
+    produces them, and nobody has to wait for a POLL round trip. If the connection to GPSD is
+    lost, the cache is cleared and the thread keeps trying to reconnect.
+    """
+    # Seconds to wait between reconnection attempts
+    RECONNECT_INTERVAL = 5
+    # Seconds without any report after which we assume the connection is dead
+    READ_TIMEOUT = 10
+
+    def __init__(self):
+        self._gpsd_iface = GPSDIface(stream_reports=True)
+        self.log = self._gpsd_iface.log
+        self._reports = {}
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """
+        Connect to GPSD and start the watch thread. Raises an exception if GPSD can't be
+        reached.
+        """
+        self._gpsd_iface.open()
+        self._running = True
+        self._thread = threading.Thread(target=self._watch_worker, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the watch thread and close the connection"""
+        self._running = False
+        self._gpsd_iface.close()
+
+    def _watch_worker(self):
+        """Read reports from GPSD and store them in the cache"""
+        while self._running:
+            try:
+                report = json.loads(self._gpsd_iface.socket_read_line(self.READ_TIMEOUT))
+            except json.JSONDecodeError as ex:
+                self.log.warning("JSON decode error: %s", ex)
+                continue
+            except socket.timeout:
+                # GPSD may legitimately be quiet, e.g. with no GPS device attached
+                continue
+            except (socket.error, ValueError):
+                if not self._running:
+                    break
+                self._reconnect()
+                continue
+            self._store_report(report)
+
+    def _reconnect(self):
+        """Reopen the connection to GPSD, invalidating all cached reports"""
+        self.log.warning("Reconnecting to GPSD.")
+        with self._cond:
+            self._reports = {}
+        self._gpsd_iface.close()
+        while self._running:
+            try:
+                self._gpsd_iface.gpsd_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                self._gpsd_iface.open()
+                return
+            except socket.error:
+                self.log.warning("Error during GPSD reconnect.")
+                self._gpsd_iface.close()
+                time.sleep(self.RECONNECT_INTERVAL)
+
+    def _store_report(self, report):
+        """Put a report into the cache, and wake up everyone waiting for one"""
+        with self._cond:
+            self._reports[report.get('class', '')] = report
+            self._cond.notify_all()
+
+    def get_report(self, class_name, predicate=None, timeout=None):
+        """
+        Return the latest report of class class_name (e.g. 'TPV') for which predicate returns
+        True. If there is no such report in the cache, wait for one to arrive. If none arrives
+        within timeout seconds, return an empty dictionary. A timeout of None waits forever.
+        """
+        def _ready():
+            report = self._reports.get(class_name)
+            return report is not None and (predicate is None or predicate(report))
+        with self._cond:
+            if not self._cond.wait_for(_ready, timeout):
+                self.log.warning(
+                    "Timeout waiting for GPS report (class `{}')".format(class_name))
+                return {}
+            return self._reports[class_name]
+
+
 class GPSDIfaceExtension:
     """
     Wrapper class that facilitates the 'extension' of a `context` object. The
@@ -275,12 +387,16 @@ class GPSDIfaceExtension:
             # we can call `get_gps_time`
             print(self.get_gps_time())
     """
+    # Seconds to wait for a GPSD report before giving up. GPSD sends reports
+    # about once per second, as long as it has a GPS device.
+    REPORT_TIMEOUT = 15
+
     def __init__(self):
-        self._gpsd_iface = GPSDIface()
-        self._log = self._gpsd_iface.log
+        self._gpsd_watcher = GPSDWatcher()
+        self._log = self._gpsd_watcher.log
         self._initialized = False
         try:
-            self._gpsd_iface.open()
+            self._gpsd_watcher.start()
             self._initialized = True
         except (ConnectionRefusedError, ConnectionResetError):
             self._log.warning(
@@ -288,7 +404,18 @@ class GPSDIfaceExtension:
 
     def __del__(self):
         if self._initialized:
-            self._gpsd_iface.close()
+            self._gpsd_watcher.stop()
+
+    def _get_valid_tpv(self, predicate=None):
+        """
+        Return the latest TPV report which has a non-trivial mode (and satisfies predicate, if
+        given), waiting up to REPORT_TIMEOUT seconds for one if necessary. Returns an empty
+        dictionary on timeout.
+        """
+        return self._gpsd_watcher.get_report(
+            'TPV',
+            lambda tpv: tpv.get("mode", 0) > 0 and (predicate is None or predicate(tpv)),
+            self.REPORT_TIMEOUT)
 
     def extend(self, context):
         """
@@ -320,36 +447,29 @@ class GPSDIfaceExtension:
             time_dt = datetime.datetime.strptime(time_str, "%Y-%m-%dT%H:%M:%S.%fZ")
             epoch_dt = datetime.datetime(1970, 1, 1)
             return (time_dt - epoch_dt).total_seconds()
-        # Read responses from GPSD until we get a non-trivial mode and until next second.
-        gps_time_prev = 0
-        while True:
-            gps_info = self._gpsd_iface.get_gps_info(resp_class='tpv', timeout=15)
-            gps_mode = gps_info.get("mode", 0)
-            gps_time = parse_time(gps_info.get("time", ""))
-            if gps_mode == 0:
-                self._log.warning("GPSD reported invalid mode."
-                                  "Return from GPSD is %s", gps_info)
-                continue
-            if gps_time_prev == 0:
-                gps_time_prev = gps_time
-                continue
-            if int(gps_time) - int(gps_time_prev) >= 1:
-                return {
-                    'name': 'gps_time',
-                    'type': 'INTEGER',
-                    'unit': 'seconds',
-                    'value': str(int(gps_time)),
-                }
+        # Wait for a TPV report with a non-trivial mode, then for one from the next second.
+        gps_info = self._get_valid_tpv()
+        if 'time' not in gps_info:
+            raise RuntimeError(
+                "GPSD did not report the time. Return from GPSD is {}".format(gps_info))
+        gps_time_prev = int(parse_time(gps_info["time"]))
+        gps_info = self._get_valid_tpv(
+            lambda tpv: 'time' in tpv and int(parse_time(tpv["time"])) > gps_time_prev)
+        if not gps_info:
+            raise RuntimeError("Timeout waiting for the next GPS second")
+        return {
+            'name': 'gps_time',
+            'type': 'INTEGER',
+            'unit': 'seconds',
+            'value': str(int(parse_time(gps_info["time"]))),
+        }
 
     def get_gps_tpv_sensor(self):
         """Get a TPV response from GPSd as a sensor dict"""
-        self._log.trace("Polling GPS TPV results from GPSD")
-        # Read responses from GPSD until we get a non-trivial mode
-        while True:
-            gps_info = self._gpsd_iface.get_gps_info(resp_class='tpv', timeout=15)
-            self._log.trace("GPS info: {}".format(gps_info))
-            if gps_info.get("mode", 0) > 0:
-                break
+        self._log.trace("Reading cached GPS TPV results")
+        # Use the latest report with a non-trivial mode
+        gps_info = self._get_valid_tpv()
+        self._log.trace("GPS info: {}".format(gps_info))
         # Return the JSON'd results
         gps_tpv = json.dumps(gps_info)
         return {
@@ -361,9 +481,9 @@ class GPSDIfaceExtension:
 
     def get_gps_sky_sensor(self):
         """Get a SKY response from GPSd as a sensor dict"""
-        self._log.trace("Polling GPS SKY results from GPSD")
-        # Just get the first SKY result
-        gps_info = self._gpsd_iface.get_gps_info(resp_class='sky', timeout=15)
+        self._log.trace("Reading cached GPS SKY results")
+        # Just get the latest SKY result
+        gps_info = self._gpsd_watcher.get_report('SKY', timeout=self.REPORT_TIMEOUT)
         # Return the JSON'd results
         gps_sky = json.dumps(gps_info)
         return {
@@ -375,21 +495,12 @@ class GPSDIfaceExtension:
 
     def get_gps_gpgga_sensor(self):
         """Get GPGGA sensor data by parsing TPV and SKY sensor data"""
-        self._log.trace("Polling GPS TPV and SKY results from GPSD")
-        # Read responses from GPSD until we get both a SKY response and TPV
-        # response in non-trivial mode
-        while True:
-            gps_info = self._gpsd_iface.get_gps_info(resp_class='', timeout=15)
-            self._log.trace("GPS info: {}".format(gps_info))
-            # Response types are 'list of dicts', but they can be empty lists so
-            # we need to prepare for that:
-            tpv_sensor_data = gps_info.get('tpv')
-            sky_sensor_data = gps_info.get('sky')
-            if tpv_sensor_data and sky_sensor_data:
-                tpv_sensor_data = tpv_sensor_data[0]
-                sky_sensor_data = sky_sensor_data[0]
-                if tpv_sensor_data.get("mode", 0) > 0:
-                    break
+        self._log.trace("Reading cached GPS TPV and SKY results")
+        # Wait until we have both a SKY report and a TPV report in non-trivial mode. If
+        # either doesn't arrive, the GPGGA sentence reports no fix.
+        tpv_sensor_data = self._get_valid_tpv()
+        sky_sensor_data = self._gpsd_watcher.get_report('SKY', timeout=self.REPORT_TIMEOUT)
+        self._log.trace("GPS info: {} {}".format(tpv_sensor_data, sky_sensor_data))
         return {
             'name': 'gpgga',
             'type': 'STRING',
@@ -407,12 +518,9 @@ class GPSDIfaceExtension:
         if not self._initialized:
             self._log.warning("Cannot query GPS lock, GPSd not initialized!")
             return False
-        # Read responses from GPSD until we get a non-trivial mode
-        while True:
-            gps_info = self._gpsd_iface.get_gps_info(resp_class='tpv', timeout=15)
-            self._log.trace("GPS info: {}".format(gps_info))
-            if gps_info.get("mode", 0) > 0:
-                break
+        # Use the latest report with a non-trivial mode. No report means no lock.
+        gps_info = self._get_valid_tpv()
+        self._log.trace("GPS info: {}".format(gps_info))
         # 2 == 2D fix, 3 == 3D fix.
         # https://gpsd.gitlab.io/gpsd/gpsd_json.html
         return gps_info.get("mode", 0) >= 2
@@ -10,9 +10,11 @@ Mboard implementation base class
 
 from __future__ import print_function
 import os
+import threading
 from enum import Enum
+from functools import partial
 from hashlib import md5
-from time import sleep
+from time import sleep, monotonic
 from concurrent import futures
 from builtins import str
 from builtins import object
@@ -29,6 +31,9 @@ from usrp_mpm import eeprom
 from usrp_mpm.rpc_server import no_claim, no_rpc
 from usrp_mpm import prefs
 
+# Uploaded component files are stored here before they get installed
+UPLOAD_BASEPATH = os.path.join(os.sep, "tmp", "uploads")
+
 def get_dboard_class_from_pid(pid):
     """
     Given a PID, return a dboard class initializer callable.
@@ -109,6 +114,28 @@ class PeriphManagerBase(object):
     # A list of available sensors on the motherboard. This dictionary is a map
     # of the form sensor_name -> method name
     mboard_sensor_callback_map = {}
+    # The sensor snapshot API (get_mb_sensors_snapshot(),
+    # get_db_sensors_snapshot()) serves values from a cache. This is the
+    # default time (in seconds) a cached value stays valid.
+    sensor_cache_ttl = 1.0
+    # Per-sensor TTL overrides for motherboard sensors, of the form
+    # sensor_name -> TTL. A TTL of 0 disables caching for that sensor.
+    mboard_sensor_cache_ttl_map = {}
+    # Motherboard sensors which are left out of the snapshot, because reading
+    # them blocks (gps_time waits for the next GPS second, the others for a
+    # GPSd report). They can still be read with get_mb_sensor().
+    mboard_sensor_snapshot_excludes = ['gps_time', 'gps_tpv', 'gps_sky', 'gpgga']
+    # A background thread keeps cached sensors warm for this many seconds
+    # after they were last requested through the snapshot API...
+    sensor_cache_keep_warm = 10.0
+    # ...checking every this many seconds which of them need a refresh
+    sensor_cache_refresh_interval = 0.5
+    # Unfinished chunked uploads (see begin_upload()) are aborted when no
+    # chunk arrived for this many seconds...
+    upload_timeout = 600.0
+    # ...or when a new upload would exceed this many unfinished uploads (the
+    # least recently active one is aborted)
+    max_unfinished_uploads = 4
     # This is a sanity check value to see if the correct number of
     # daughterboards are detected. If somewhere along the line more than
     # max_num_dboards dboards are found, an error or warning is raised,
@@ -171,7 +198,7 @@ class PeriphManagerBase(object):
     # symbol glob fox auxiliary boards
     auxboard_eeprom_symbols = "*aux_eeprom"
     # List of discoverable features supported by a device.
-    discoverable_features = []
+    discoverable_features = ["chunked_upload"]
 
 
     # Disable checks for unused args in the overridables, because the default
@@ -246,6 +273,15 @@ class PeriphManagerBase(object):
         # Set up logging
         self.log = get_logger('PeriphManager')
         self.claimed = False
+        # Sensor cache: key -> (timestamp, value)
+        self._sensor_cache = {}
+        # Recently requested sensors: key -> (timestamp, read function, TTL)
+        self._sensor_keep_warm = {}
+        self._sensor_cache_lock = threading.Lock()
+        self._sensor_cache_thread = None
+        self._sensor_cache_stop = threading.Event()
+        # Chunked component uploads: filename -> upload state
+        self._uploads = {}
         try:
             self.mboard_info = self._get_mboard_info()
             self.log.info("Device serial number: {}"
@@ -766,6 +802,7 @@ class PeriphManagerBase(object):
         deconstruction.
         """
         self.log.trace("Teardown called for Peripheral Manager base.")
+        self._stop_sensor_cache_worker()
         for each in self.dboards:
             each.tear_down()
 
@@ -905,13 +942,15 @@ class PeriphManagerBase(object):
         """
         Updates the device component specified by comp_dict
         :param metadata_l: List of dictionary of strings containing metadata
-        :param data_l: List of binary string with the file contents to be written
+        :param data_l: List of binary string with the file contents to be
+                       written. Pass an empty string for files which were
+                       uploaded with begin_upload()/finish_upload().
         """
         # We need a 'metadata' and a 'data' for each file we want to update
         assert (len(metadata_l) == len(data_l)),\
             "update_component arguments must be the same length"
         # Iterate through the components, updating each in turn
-        basepath = os.path.join(os.sep, "tmp", "uploads")
+        basepath = UPLOAD_BASEPATH
         for metadata, data in zip(metadata_l, data_l):
             id_str = metadata['id']
             filename = os.path.basename(metadata['filename'])
@@ -920,6 +959,9 @@ class PeriphManagerBase(object):
                     id_str, self.updateable_components.keys()
                 ))
                 raise KeyError("Update component not implemented for {}".format(id_str))
+            if not data and self._uploads.get(filename, {}).get('finished'):
+                self.log.trace("Using uploaded file for component: {}".format(id_str))
+                continue
             self.log.trace("Downloading component: {}".format(id_str))
             if 'md5' in metadata:
                 given_hash = metadata['md5']
@@ -953,12 +995,161 @@ class PeriphManagerBase(object):
             id_str = metadata['id']
             filename = os.path.basename(metadata['filename'])
             filepath = os.path.join(basepath, filename)
+            self._uploads.pop(filename, None)
             update_func = \
                 getattr(self, self.updateable_components[id_str]['callback'])
             self.log.info("Installing component `%s'", id_str)
             update_func(filepath, metadata)
         return True
 
+    # update_component() receives every file as a single RPC argument, so the
+    # whole file has to be held in memory. The following calls upload a file
+    # in chunks instead, which are hashed and written to the file as they
+    # arrive. Once finish_upload() succeeded, the file is installed by calling
+    # update_component() with empty data for it.
+    def begin_upload(self, metadata):
+        """
+        Start uploading a component file, or resume an unfinished upload of
+        the same file with the same md5 hash.
+        :param metadata: Dictionary of strings containing the metadata, as
+                         passed to update_component()
+        :return: Offset (in bytes) at which to continue the upload
+        """
+        id_str = metadata['id']
+        filename = os.path.basename(metadata['filename'])
+        if id_str not in self.updateable_components:
+            self.log.error("{0} not an updateable component ({1})".format(
+                id_str, self.updateable_components.keys()
+            ))
+            raise KeyError("Update component not implemented for {}".format(id_str))
+        self._expire_uploads()
+        upload = self._uploads.get(filename)
+        if upload is not None and not upload['finished'] \
+                and 'md5' in metadata \
+                and upload['metadata'].get('md5') == metadata['md5']:
+            self.log.debug("Resuming upload of {} at offset {}".format(
+                filename, upload['offset']))
+            upload['last_active'] = monotonic()
+            return upload['offset']
+        self._close_upload(filename)
+        unfinished = sorted(
+            (upload['last_active'], name)
+            for name, upload in iteritems(self._uploads)
+            if not upload['finished'])
+        for _, name in unfinished[:max(0, len(unfinished) - self.max_unfinished_uploads + 1)]:
+            self.log.warning("Aborting upload of {} to make room for {}".format(
+                name, filename))
+            self._discard_upload(name)
+        if not os.path.isdir(UPLOAD_BASEPATH):
+            self.log.trace("Creating directory {}".format(UPLOAD_BASEPATH))
+            os.makedirs(UPLOAD_BASEPATH)
+        filepath = os.path.join(UPLOAD_BASEPATH, filename)
+        self.log.trace("Uploading component {} to {}".format(id_str, filepath))
+        self._uploads[filename] = {
+            'metadata': metadata,
+            'file': open(filepath, 'wb'),
+            'hash': md5(),
+            'offset': 0,
+            'finished': False,
+            'last_active': monotonic(),
+        }
+        return 0
+
+    def upload_chunk(self, filename, offset, data):
+        """
+        Write a chunk of a file whose upload was started with begin_upload().
+        Chunks must be uploaded in order.
+        :param filename: Filename, as given in the metadata
+        :param offset: Offset of this chunk in the file (in bytes)
+        :param data: Binary string with the chunk contents
+        :return: Offset (in bytes) at which to continue the upload
+        """
+        upload = self._get_upload(filename)
+        if offset != upload['offset']:
+            raise RuntimeError(
+                "Upload of {} expects offset {}, got {}".format(
+                    filename, upload['offset'], offset))
+        upload['file'].write(data)
+        upload['hash'].update(data)
+        upload['offset'] += len(data)
+        upload['last_active'] = monotonic()
+        return upload['offset']
+
+    def finish_upload(self, filename):
+        """
+        Finish the upload of a file, and check its md5 hash (if one was given
+        in the metadata).
+        :param filename: Filename, as given in the metadata
+        :return: md5 hash of the uploaded file
+        """
+        upload = self._get_upload(filename)
+        comp_hash = upload['hash'].hexdigest()
+        given_hash = upload['metadata'].get('md5')
+        if given_hash is not None and comp_hash != given_hash:
+            self._discard_upload(filename)
+            self.log.error("Component file hash mismatched:\n"
+                           "Calculated {}\n"
+                           "Given      {}\n".format(comp_hash, given_hash))
+            raise RuntimeError("Component file hash mismatch")
+        self._close_upload(filename)
+        self.log.trace("Uploaded {} ({} bytes, md5 {})".format(
+            filename, upload['offset'], comp_hash))
+        upload['finished'] = True
+        self._uploads[filename] = upload
+        return comp_hash
+
+    def abort_upload(self, filename):
+        """
+        Abort an unfinished upload, and delete the partially uploaded file.
+        :param filename: Filename, as given in the metadata
+        """
+        self._get_upload(filename)
+        self._discard_upload(filename)
+
+    def _expire_uploads(self):
+        """
+        Abort all unfinished uploads which were idle for upload_timeout seconds
+        """
+        now = monotonic()
+        for filename, upload in list(iteritems(self._uploads)):
+            if not upload['finished'] and \
+                    now - upload['last_active'] > self.upload_timeout:
+                self.log.warning("Upload of {} timed out, aborting".format(
+                    filename))
+                self._discard_upload(filename)
+
+    def _get_upload(self, filename):
+        """
+        Return the state of an unfinished upload
+        """
+        self._expire_uploads()
+        upload = self._uploads.get(os.path.basename(filename))
+        if upload is None or upload['finished']:
+            raise RuntimeError("No upload of {} in progress".format(filename))
+        return upload
+
+    def _discard_upload(self, filename):
+        """
+        Forget about an upload, and delete the partially uploaded file
+        """
+        upload = self._uploads.get(os.path.basename(filename))
+        self._close_upload(filename)
+        if upload is None:
+            return
+        try:
+            os.remove(upload['file'].name)
+        except OSError as ex:
+            self.log.debug("Could not remove {}: {}".format(
+                upload['file'].name, str(ex)))
+
+    def _close_upload(self, filename):
+        """
+        Close the file of an upload (if any), and forget about the upload
+        """
+        upload = self._uploads.pop(os.path.basename(filename), None)
+        if upload is not None and not upload['file'].closed:
+            upload['file'].close()
+
     @no_claim
     def get_component_info(self, component_name):
         """
@@ -1011,9 +1202,160 @@ class PeriphManagerBase(object):
             )
             self.log.error(error_msg)
             raise RuntimeError(error_msg)
-        return getattr(
-            self, self.mboard_sensor_callback_map.get(sensor_name)
-        )()
+        # Always read the sensor, but use the value to freshen the cache
+        return self._update_cached_sensor(
+            ('mb', sensor_name),
+            getattr(self, self.mboard_sensor_callback_map.get(sensor_name)))
+
+    def get_mb_sensors_snapshot(self, max_age=None):
+        """
+        Return the values of all motherboard sensors in one call, as a
+        dictionary sensor_name -> sensor value (see get_mb_sensor() for the
+        format of the sensor values).
+
+        Values are served from a cache, which a background thread keeps up
+        to date. A cached value is used if it is younger than max_age
+        seconds, or than the sensor's TTL if max_age is not given (see
+        sensor_cache_ttl). Sensors which fail to read are left out, as are
+        the ones in mboard_sensor_snapshot_excludes.
+        """
+        snapshot = {}
+        for sensor_name, callback_name in \
+                iteritems(self.mboard_sensor_callback_map):
+            if sensor_name in self.mboard_sensor_snapshot_excludes:
+                continue
+            try:
+                snapshot[sensor_name] = self._read_cached_sensor(
+                    ('mb', sensor_name),
+                    getattr(self, callback_name),
+                    self.mboard_sensor_cache_ttl_map.get(
+                        sensor_name, self.sensor_cache_ttl),
+                    max_age)
+            except Exception as ex:
+                self.log.warning(
+                    "Failed to read sensor `%s': %s", sensor_name, str(ex))
+        return snapshot
+
+    def get_db_sensors_snapshot(self, chans=None, max_age=None):
+        """
+        Return the values of all daughterboard sensors in one call. The result
+        is a list with one entry per daughterboard slot, each of the form
+        {'rx': {chan: {sensor_name: sensor value}}, 'tx': {...}}. The channels
+        are keyed by their string representation, because msgpack clients
+        reject integer map keys by default.
+
+        chans is the list of channels to read (defaults to [0]). See
+        get_mb_sensors_snapshot() for the caching behaviour.
+        """
+        chans = [0] if chans is None else chans
+        snapshot = []
+        for slot_idx, dboard in enumerate(self.dboards):
+            db_snapshot = {}
+            for direction in ('rx', 'tx'):
+                db_snapshot[direction] = {}
+                for chan in chans:
+                    chan_snapshot = {}
+                    for sensor_name in dboard.get_sensors(direction, chan):
+                        try:
+                            chan_snapshot[sensor_name] = self._read_cached_sensor(
+                                (slot_idx, direction, sensor_name, chan),
+                                partial(dboard.get_sensor,
+                                        direction, sensor_name, chan),
+                                self.sensor_cache_ttl,
+                                max_age)
+                        except Exception as ex:
+                            self.log.warning(
+                                "Failed to read sensor `%s' on DB %d: %s",
+                                sensor_name, slot_idx, str(ex))
+                    db_snapshot[direction][str(chan)] = chan_snapshot
+            snapshot.append(db_snapshot)
+        return snapshot
+
+    def _read_cached_sensor(self, key, read_sensor, ttl, max_age=None):
+        """
+        Return the cached value for the sensor identified by key if it is
+        younger than max_age (or ttl), otherwise read it with read_sensor().
+        Also marks the sensor to be kept warm by _refresh_sensor_cache().
+        """
+        now = monotonic()
+        max_age = ttl if max_age is None else max_age
+        with self._sensor_cache_lock:
+            self._sensor_keep_warm[key] = (now, read_sensor, ttl)
+            cached = self._sensor_cache.get(key)
+            if self._sensor_cache_thread is None and not self._sensor_cache_stop.is_set():
+                self._sensor_cache_thread = threading.Thread(
+                    target=self._sensor_cache_worker,
+                    name="sensor_cache",
+                    daemon=True)
+                self._sensor_cache_thread.start()
+        if cached is not None and now - cached[0] < max_age:
+            return cached[1]
+        return self._update_cached_sensor(key, read_sensor)
+
+    def _update_cached_sensor(self, key, read_sensor):
+        """
+        Read a sensor and store the value in the sensor cache.
+        """
+        value = read_sensor()
+        with self._sensor_cache_lock:
+            self._sensor_cache[key] = (monotonic(), value)
+        return value
+
+    def _refresh_sensor_cache(self):
+        """
+        Re-read all cached sensors which were requested recently and whose
+        value is at least half their TTL old, so that snapshot requests can be
+        served from the cache. Sensors which were not requested for
+        sensor_cache_keep_warm seconds are no longer refreshed.
+
+        This is called periodically by _sensor_cache_worker().
+        """
+        now = monotonic()
+        stale = []
+        with self._sensor_cache_lock:
+            for key, (last_request, read_sensor, ttl) in \
+                    list(iteritems(self._sensor_keep_warm)):
+                if now - last_request > self.sensor_cache_keep_warm:
+                    del self._sensor_keep_warm[key]
+                    continue
+                cached = self._sensor_cache.get(key)
+                if ttl > 0 and (cached is None or now - cached[0] >= ttl / 2):
+                    stale.append((key, read_sensor))
+        for key, read_sensor in stale:
+            try:
+                self._update_cached_sensor(key, read_sensor)
+            except Exception as ex:
+                self.log.debug("Failed to refresh sensor %s: %s", key, str(ex))
+
+    def _sensor_cache_worker(self):
+        """
+        Thread which keeps the sensor cache warm. It is started by the first
+        snapshot request, and stops once no sensor was requested for
+        sensor_cache_keep_warm seconds (the next request starts it again), or
+        on tear_down().
+
+        This runs in its own thread rather than in the status monitor, so slow
+        sensors can't delay the status monitor or tear_down().
+        """
+        while not self._sensor_cache_stop.wait(self.sensor_cache_refresh_interval):
+            self._refresh_sensor_cache()
+            with self._sensor_cache_lock:
+                if not self._sensor_keep_warm:
+                    self._sensor_cache_thread = None
+                    return
+        with self._sensor_cache_lock:
+            self._sensor_cache_thread = None
+
+    def _stop_sensor_cache_worker(self):
+        """
+        Stop the thread which keeps the sensor cache warm, and don't start it
+        again.
+        """
+        self._sensor_cache_stop.set()
+        with self._sensor_cache_lock:
+            thread = self._sensor_cache_thread
+        if thread is not None:
+            thread.join(self.sensor_cache_refresh_interval)
 
     ##########################################################################
     # EEPROMS
@@ -359,6 +359,7 @@ class e320(ZynqComponents, PeriphManagerBase):
         """
         self.log.trace("Tearing down E320 device...")
         self._tear_down = True
+        self._stop_sensor_cache_worker()
         if self._device_initialized:
             self._status_monitor_thread.join(3 * E320_MONITOR_THREAD_INTERVAL)
             if self._status_monitor_thread.is_alive():
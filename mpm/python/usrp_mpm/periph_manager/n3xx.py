@@ -472,6 +472,7 @@ class n3xx(ZynqComponents, PeriphManagerBase):
         """
         self.log.trace("Tearing down N3xx device...")
         self._tear_down = True
+        self._stop_sensor_cache_worker()
         if self._device_initialized:
             self._status_monitor_thread.join(3 * N3XX_MONITOR_THREAD_INTERVAL)
             if self._status_monitor_thread.is_alive():
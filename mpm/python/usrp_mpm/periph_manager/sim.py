@@ -209,6 +209,15 @@ class sim(PeriphManagerBase):
         """
         return 64
 
+    def get_stream_stats(self):
+        """
+        Return the throughput counters of the simulated streams. This is a
+        list with one dictionary per stream endpoint, which contains the
+        epid and the counters of the 'rx' (host to simulator) and 'tx'
+        (simulator to host) streams.
+        """
+        return self.chdr_endpoint.get_stream_stats()
+
     ###########################################################################
     # Transport API
     ###########################################################################
@@ -432,6 +432,10 @@ class CtrlportRegs:
         def poke32(self, addr, val):
             self.regs.poke32(addr + self.offset, val)
 
+        def pokes32(self, addr_vals):
+            self.regs.pokes32(
+                [(addr + self.offset, val) for addr, val in addr_vals])
+
     def __init__(self, label, log):
         self.log = log.getChild("CtrlportRegs")
         self._regs_uio_opened = False
@@ -481,6 +485,20 @@ class CtrlportRegs:
             with self.regs:
                 return self.regs.poke32(addr, val)
 
+    def pokes32(self, addr_vals):
+        """
+        Write a list of (addr, value) tuples, in order, as a single burst
+        through the UIO register interface.
+        """
+        if self.regs is None:
+            raise RuntimeError('The ctrlport registers were never configured!')
+        addr_vals = list(addr_vals)
+        if self._regs_uio_opened:
+            return self.regs.pokes32(addr_vals)
+        else:
+            with self.regs:
+                return self.regs.pokes32(addr_vals)
+
     def set_mb_pl_cpld_divider(self, divider_value):
         if not self.min_mb_cpld_spi_divider <= divider_value <= 0xFFFF:
             self.log.error('Cannot set MB CPLD SPI divider to invalid value {}'
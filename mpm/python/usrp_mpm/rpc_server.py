@@ -51,7 +51,7 @@ class MPMServer(RPCServer):
     """
     # This is a list of methods in this class which require a claim
     default_claimed_methods = ['init', 'update_component', 'reclaim', 'unclaim',
-                               'get_log_buf']
+                               'get_log_buf', 'multicall']
 
     ###########################################################################
     # RPC Server Initialization
@@ -91,6 +91,9 @@ class MPMServer(RPCServer):
                 to_binary_str(device_info.get("fpga", "n/a"))
         self._db_methods = []
         self._mb_methods = []
+        # Maps the names of claimed periph/dboard commands to the functions
+        # they wrap, so multicall() can skip the per-call token check
+        self._claimed_functions = {}
         self.claimed_methods = copy.copy(self.default_claimed_methods)
         self._last_error = ""
         self._init_rpc_calls(self.periph_manager)
@@ -118,6 +121,7 @@ class MPMServer(RPCServer):
         # Clear old calls:
         for meth_list in (self._db_methods, self._mb_methods):
             for method in meth_list:
+                self._claimed_functions.pop(method, None)
                 if hasattr(self, method):
                     delattr(self, method)
                 else:
@@ -179,24 +183,32 @@ class MPMServer(RPCServer):
                     "token `{}'.".format(command, token)
                 )
                 raise RuntimeError("Invalid token!")
-            try:
-                # Because we can only reach this point with a valid claim,
-                # there's no harm in resetting the timer
-                self._reset_timer()
-                return function(*args)
-            except Exception as ex:
-                self.log.error(
-                    "Uncaught exception in method %s: %s \n %s ",
-                    command, str(ex), traceback.format_exc()
-                )
-                self._last_error = str(ex)
-                raise
-            finally:
-                if not self._state.claim_status.value:
-                    self.log.error("Lost claim during API call to `%s'!",
-                                   command)
+            # Because we can only reach this point with a valid claim,
+            # there's no harm in resetting the timer
+            self._reset_timer()
+            return self._call_claimed_function(function, command, args)
         new_claimed_function.__doc__ = function.__doc__
         setattr(self, command, new_claimed_function)
+        self._claimed_functions[command] = function
+
+    def _call_claimed_function(self, function, command, args):
+        """
+        Call the function behind a claimed command. The caller must have
+        checked the token already.
+        """
+        try:
+            return function(*args)
+        except Exception as ex:
+            self.log.error(
+                "Uncaught exception in method %s: %s \n %s ",
+                command, str(ex), traceback.format_exc()
+            )
+            self._last_error = str(ex)
+            raise
+        finally:
+            if not self._state.claim_status.value:
+                self.log.error("Lost claim during API call to `%s'!",
+                               command)
 
     def _add_safe_command(self, function, command):
         """
@@ -450,6 +462,49 @@ class MPMServer(RPCServer):
             for record in log_records
         ]
 
+    ###########################################################################
+    # Batched calls
+    ###########################################################################
+    def multicall(self, token, calls):
+        """
+        Execute a list of (method, args) calls in order, and return a list of
+        (error, result) pairs, one per call. error is None if the call
+        succeeded, and the error string otherwise. A failing call does not
+        stop the remaining ones.
+
+        The token is checked, and the claim timer reset, once for the whole
+        list. Methods which require a token must be listed without it.
+        """
+        if not self._check_token_valid(token):
+            self.log.warning(
+                "Attempt to run multicall without valid claim from {}".format(
+                    self.client_host
+                )
+            )
+            raise RuntimeError("Invalid token!")
+        self._reset_timer()
+        results = []
+        for method, args in calls:
+            try:
+                results.append((None, self._multicall_one(token, method, args)))
+            except Exception as ex:
+                results.append((str(ex), None))
+        return results
+
+    def _multicall_one(self, token, method, args):
+        """
+        Execute a single call on behalf of multicall().
+        """
+        if method in self._claimed_functions:
+            return self._call_claimed_function(
+                self._claimed_functions[method], method, args)
+        if method.startswith('_') or method == 'multicall' \
+                or not callable(getattr(self, method, None)):
+            raise RuntimeError("Unknown method `{}'".format(method))
+        if method in self.claimed_methods:
+            return getattr(self, method)(token, *args)
+        return getattr(self, method)(*args)
+
     ###########################################################################
     # Session initialization
     ###########################################################################
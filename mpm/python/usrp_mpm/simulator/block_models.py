@@ -0,0 +1,346 @@
+#
+# Copyright 2020 Ettus Research, a National Instruments Brand
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""
+This module contains models of the NoC blocks which the simulator can
+instantiate. A model answers the register reads UHD's block controller
+makes, and provides the processing stages applied to samples streamed
+through the block.
+
+Stages process complex64 NumPy arrays one buffer at a time, and keep
+whatever state they need to process a continuous stream (filter history,
+incomplete FFT frames, ...). A new stage is created for every stream, from
+the register values UHD has written by then.
+"""
+import numpy
+from .sample_source import SampleSource, SampleSink, SC16_SCALE, _to_sc16
+
+block_models = {}
+
+def block_model(cls):
+    """This decorator adds a class to the global list of block models"""
+    block_models[cls.type_name] = cls
+    return cls
+
+def _to_complex(payload):
+    """Convert interleaved sc16 samples to complex64 in [-1.0, 1.0)"""
+    samples = numpy.frombuffer(payload, dtype=numpy.int16)
+    samples = samples[:len(samples) & ~1].astype(numpy.float32)
+    samples /= numpy.float32(SC16_SCALE)
+    return samples.view(numpy.complex64)
+
+class Stage:
+    """A processing stage, which passes samples through unchanged.
+
+    rate_ratio is the output sample rate divided by the input sample rate
+    """
+    rate_ratio = 1.0
+
+    def process(self, samples):
+        """Process a buffer of complex64 samples, and return the output
+        samples (which may be fewer or more than the input samples)
+        """
+        return samples
+
+class DecimStage(Stage):
+    """Decimate by averaging every decim consecutive samples. This is a
+    boxcar filter with unity gain at DC, roughly what a CIC does.
+    """
+    def __init__(self, decim):
+        self.decim = decim
+        self.rate_ratio = 1.0 / decim
+        self.residue = numpy.zeros(0, dtype=numpy.complex64)
+
+    def process(self, samples):
+        if self.residue.size:
+            samples = numpy.concatenate((self.residue, samples))
+        num_out = len(samples) // self.decim
+        self.residue = samples[num_out * self.decim:]
+        return samples[:num_out * self.decim].reshape(num_out, self.decim) \
+            .mean(axis=1).astype(numpy.complex64)
+
+class InterpStage(Stage):
+    """Interpolate by repeating every sample interp times (zero-order
+    hold)
+    """
+    def __init__(self, interp):
+        self.interp = interp
+        self.rate_ratio = float(interp)
+
+    def process(self, samples):
+        return numpy.repeat(samples, self.interp)
+
+class FirStage(Stage):
+    """Apply a FIR filter, carrying its history over from one buffer to
+    the next
+    """
+    def __init__(self, taps):
+        self.taps = numpy.asarray(taps, dtype=numpy.float32)
+        self.history = numpy.zeros(len(self.taps) - 1, dtype=numpy.complex64)
+
+    def process(self, samples):
+        samples = numpy.concatenate((self.history, samples))
+        if len(self.history):
+            self.history = samples[-len(self.history):]
+        return numpy.convolve(samples, self.taps, mode='valid').astype(numpy.complex64)
+
+class FftStage(Stage):
+    """Compute the FFT of consecutive frames of length samples. The
+    output is scaled by 1/length, and optionally converted to magnitude
+    or magnitude squared (still as complex samples, with an imaginary
+    part of zero).
+    """
+    def __init__(self, length, forward=True, magnitude=0):
+        self.length = length
+        self.forward = forward
+        self.magnitude = magnitude
+        self.residue = numpy.zeros(0, dtype=numpy.complex64)
+
+    def process(self, samples):
+        if self.residue.size:
+            samples = numpy.concatenate((self.residue, samples))
+        num_frames = len(samples) // self.length
+        self.residue = samples[num_frames * self.length:]
+        frames = samples[:num_frames * self.length].reshape(num_frames, self.length)
+        if self.forward:
+            out = numpy.fft.fft(frames, axis=1) / self.length
+        else:
+            out = numpy.fft.ifft(frames, axis=1)
+        out = numpy.fft.fftshift(out, axes=1).ravel()
+        if self.magnitude == 1:
+            out = numpy.abs(out)
+        elif self.magnitude == 2:
+            out = numpy.abs(out) ** 2
+        return out.astype(numpy.complex64)
+
+class ProcessedSource(SampleSource):
+    """This SampleSource passes the samples of another source through a
+    list of stages. Samples are pulled from the source in blocks of at
+    least block_samps samples.
+    """
+    def __init__(self, source, stages, block_samps=4096):
+        self.source = source
+        self.stages = stages
+        self.block_samps = block_samps
+        self.rate_ratio = 1.0
+        for stage in stages:
+            self.rate_ratio *= stage.rate_ratio
+        self.input = bytearray(0)
+        self.pending = numpy.zeros(0, dtype=numpy.complex64)
+
+    def _pull(self, num_samps):
+        """Process enough input samples to produce about num_samps output
+        samples. Returns False if the source is exhausted.
+        """
+        num_in = max(int(numpy.ceil(num_samps / self.rate_ratio)), self.block_samps)
+        if len(self.input) < 4 * num_in:
+            self.input = bytearray(4 * num_in)
+        num_bytes = self.source.fill_buffer(memoryview(self.input)[:4 * num_in])
+        if num_bytes == 0:
+            return False
+        samples = _to_complex(self.input[:num_bytes])
+        for stage in self.stages:
+            samples = stage.process(samples)
+        self.pending = numpy.concatenate((self.pending, samples))
+        return True
+
+    def fill_buffer(self, buffer):
+        num_samps = len(buffer) // 4
+        while len(self.pending) < num_samps:
+            if not self._pull(num_samps - len(self.pending)):
+                break
+        out = _to_sc16(self.pending[:num_samps])
+        self.pending = self.pending[num_samps:]
+        buffer[:out.nbytes] = memoryview(out).cast("B")
+        return out.nbytes
+
+    def fill_packet(self, packet, payload_size):
+        payload = bytearray(payload_size)
+        payload_len = self.fill_buffer(memoryview(payload))
+        if payload_len == 0:
+            return None
+        packet.set_payload_bytes(bytes(payload[:payload_len]))
+        return packet
+
+    def close(self):
+        self.source.close()
+
+class ProcessedSink(SampleSink):
+    """This SampleSink passes the received samples through a list of
+    stages before handing them to another sink
+    """
+    def __init__(self, sink, stages):
+        self.sink = sink
+        self.stages = stages
+
+    def accept_payload(self, payload):
+        samples = _to_complex(payload)
+        for stage in self.stages:
+            samples = stage.process(samples)
+        if len(samples):
+            self.sink.accept_payload(memoryview(_to_sc16(samples)).cast("B"))
+
+    def accept_packet(self, packet):
+        self.accept_payload(bytes(packet.get_payload_bytes()))
+
+    def close(self):
+        self.sink.close()
+
+class BlockModel:
+    """This class is the base of the block models.
+
+    Models are constructed with the string values of their config
+    section (see TopologyConfig in config.py). Writes to the registers
+    are stored and read back. Registers which were not written read as
+    the value in default_regs, or zero.
+
+    has_regs is False for blocks whose registers are handled by
+    NocBlockRegs itself (the radio).
+    """
+    type_name = None
+    noc_id = None
+    has_regs = True
+    default_regs = {}
+
+    def __init__(self, num_ports=1):
+        self.num_ports = int(num_ports)
+        self.regs = {}
+
+    def read_reg(self, addr):
+        """Read a register of this block"""
+        return self.regs.get(addr, self.default_regs.get(addr, 0))
+
+    def write_reg(self, addr, value):
+        """Write a register of this block"""
+        self.regs[addr] = value
+
+    def make_stage(self):
+        """Return a new Stage for a stream through this block"""
+        return Stage()
+
+@block_model
+class RadioModel(BlockModel):
+    """The radio. Its registers are handled by NocBlockRegs, and its
+    samples come from the SampleSource of the stream.
+    """
+    type_name = "radio"
+    noc_id = 0x12AD1000
+    has_regs = False
+
+    def __init__(self, num_ports=2):
+        super().__init__(num_ports)
+
+@block_model
+class DdcModel(BlockModel):
+    """The DDC block. It decimates by the rate change UHD configures
+    (see ddc_block_control.cpp), or by decim until UHD configures one.
+    Frequency shifting is not modelled.
+    """
+    type_name = "ddc"
+    noc_id = 0xDDC00000
+    # Compat number, number of halfbands, max. CIC decimation
+    default_regs = {0: 0x00000001, 8: 3, 16: 255}
+    SR_N_ADDR = 128 * 8
+    SR_M_ADDR = 129 * 8
+
+    def __init__(self, num_ports=1, decim=1):
+        super().__init__(num_ports)
+        self.default_regs = dict(self.default_regs)
+        self.default_regs[self.SR_N_ADDR] = int(decim)
+        self.default_regs[self.SR_M_ADDR] = 1
+
+    def make_stage(self):
+        decim = max(self.read_reg(self.SR_N_ADDR) // max(self.read_reg(self.SR_M_ADDR), 1), 1)
+        return DecimStage(decim) if decim > 1 else Stage()
+
+@block_model
+class DucModel(BlockModel):
+    """The DUC block. It interpolates by the rate change UHD configures
+    (see duc_block_control.cpp), or by interp until UHD configures one.
+    Frequency shifting is not modelled.
+    """
+    type_name = "duc"
+    noc_id = 0xD0C00000
+    # Compat number, number of halfbands, max. CIC interpolation
+    default_regs = {0: 0x00000001, 8: 3, 16: 255}
+    SR_N_ADDR = 128 * 8
+    SR_M_ADDR = 129 * 8
+
+    def __init__(self, num_ports=1, interp=1):
+        super().__init__(num_ports)
+        self.default_regs = dict(self.default_regs)
+        self.default_regs[self.SR_N_ADDR] = 1
+        self.default_regs[self.SR_M_ADDR] = int(interp)
+
+    def make_stage(self):
+        interp = max(self.read_reg(self.SR_M_ADDR) // max(self.read_reg(self.SR_N_ADDR), 1), 1)
+        return InterpStage(interp) if interp > 1 else Stage()
+
+@block_model
+class FirModel(BlockModel):
+    """The FIR filter block. Coefficients loaded by UHD (see
+    fir_filter_block_control.cpp) replace the initial taps, which are a
+    comma separated list of floats.
+    """
+    type_name = "fir"
+    noc_id = 0xF1120000
+    REG_FIR_MAX_NUM_COEFFS_ADDR = 0
+    REG_FIR_LOAD_COEFF_ADDR = 4
+    REG_FIR_LOAD_COEFF_LAST_ADDR = 8
+
+    def __init__(self, num_ports=1, taps="1.0", max_num_coeffs=41):
+        super().__init__(num_ports)
+        self.default_regs = {self.REG_FIR_MAX_NUM_COEFFS_ADDR: int(max_num_coeffs)}
+        self.taps = [float(tap) for tap in str(taps).split(",")]
+        self.loading = []
+
+    def write_reg(self, addr, value):
+        if addr in (self.REG_FIR_LOAD_COEFF_ADDR, self.REG_FIR_LOAD_COEFF_LAST_ADDR):
+            # Coefficients are signed 16 bit values
+            coeff = value & 0xFFFF
+            self.loading.append((coeff - 0x10000 if coeff & 0x8000 else coeff) / 32767.0)
+            if addr == self.REG_FIR_LOAD_COEFF_LAST_ADDR:
+                self.taps = self.loading
+                self.loading = []
+            return
+        super().write_reg(addr, value)
+
+    def make_stage(self):
+        return FirStage(self.taps)
+
+@block_model
+class FftModel(BlockModel):
+    """The FFT block. Length, direction and magnitude output are taken
+    from the registers UHD writes (see fft_block_control.cpp), or the
+    given defaults.
+    """
+    type_name = "fft"
+    noc_id = 0xFF700000
+    REG_LENGTH_LOG2_ADDR = 132 * 8
+    REG_MAGNITUDE_OUT_ADDR = 133 * 8
+    REG_DIRECTION_ADDR = 134 * 8
+
+    def __init__(self, num_ports=1, length=256):
+        super().__init__(num_ports)
+        self.default_regs = {
+            self.REG_LENGTH_LOG2_ADDR: int(numpy.log2(int(length))),
+            self.REG_MAGNITUDE_OUT_ADDR: 0,
+            self.REG_DIRECTION_ADDR: 1,
+        }
+
+    def make_stage(self):
+        return FftStage(1 << self.read_reg(self.REG_LENGTH_LOG2_ADDR),
+                        forward=self.read_reg(self.REG_DIRECTION_ADDR) == 1,
+                        magnitude=self.read_reg(self.REG_MAGNITUDE_OUT_ADDR))
+
+@block_model
+class ReplayModel(BlockModel):
+    """The replay block. Samples pass straight through it, recording and
+    playback are not modelled.
+    """
+    type_name = "replay"
+    noc_id = 0x4E91A000
+    # Compat number, and the memory word size (64 bits) and address width
+    default_regs = {0x00: 0x00010000, 0x04: (64 << 16) | 30}
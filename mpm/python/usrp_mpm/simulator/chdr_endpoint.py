@@ -8,15 +8,18 @@ packet dispatch, and acts as an interface between these and the RFNoC
 Graph.
 """
 
-from threading import Thread
+from threading import Thread, Lock
 import socket
 import queue
 import select
 from uhd.chdr import ChdrPacket, ChdrWidth
+from usrp_mpm.mpmlog import TRACE
 from .rfnoc_graph import XbarNode, XportNode, StreamEndpointNode, RFNoCGraph, NodeType
-from .chdr_stream import ChdrOutputStream, ChdrInputStream
+from .chdr_stream import ChdrOutputStream, ChdrInputStream, TxBatch, peek_data_header
 
 CHDR_W = ChdrWidth.W64
+CHDR_PORT = 49153
+MAX_PACKET_LEN = 8000 # Max MTU
 
 class SelectableQueue:
     """ A simple python Queue implementation which can be selected.
@@ -61,6 +64,14 @@ class SendWrapper:
         """Queue data to be sent to addr"""
         self.queue.put((data, addr))
 
+    def send_batch(self, batch, addr):
+        """Queue every packet in a TxBatch to be sent to addr using a
+        single queue operation. The socket thread calls
+        batch.mark_sent() once the buffers may be reused.
+        """
+        batch.mark_pending()
+        self.queue.put((batch, addr))
+
 
 class ChdrEndpoint:
     """This class is created by the sim periph_manager
@@ -69,8 +80,24 @@ class ChdrEndpoint:
     traffic.
 
     The config parameter is a Config object (see simulator/config.py)
+
+    Incoming traffic is received by num_rx_workers threads, each
+    with its own socket bound to the CHDR port (num_rx_workers defaults
+    to one more than the number of stream endpoints). The kernel hashes
+    every flow (source address and port) to one of the sockets, so any
+    worker may receive control as well as data packets, and several
+    flows may share a worker. Control and management packets are
+    serialized by graph_lock. Data packets for running input streams
+    skip ChdrPacket deserialization.
+
+    The workers are Python threads in one process, so they don't decode
+    packets in parallel: only one of them holds the GIL at a time. They
+    release it while blocked in select() or recvfrom_into(), which keeps
+    a busy flow from delaying the reception of the others. Several
+    workers may queue packets into the same ChdrInputStream, whose
+    PacketRing serializes its producers.
     """
-    def __init__(self, log, config):
+    def __init__(self, log, config, num_rx_workers=None):
         self.log = log.getChild("ChdrEndpoint")
         self.config = config
         self.source_gen = config.source_gen
@@ -81,9 +108,26 @@ class ChdrEndpoint:
         self.send_wrapper = SendWrapper(self.send_queue)
 
         self.graph = RFNoCGraph(self.get_default_nodes(), self.log, 0, self.send_wrapper,
-                                CHDR_W, config.hardware.rfnoc_device_type)
-        self.thread = Thread(target=self.socket_worker, daemon=True)
-        self.thread.start()
+                                CHDR_W, config.hardware.rfnoc_device_type, config.topology)
+        # Control and management packets modify the graph, so only one
+        # worker may process them at a time
+        self.graph_lock = Lock()
+        if num_rx_workers is None:
+            # Enough sockets that the flows of all stream endpoints and the
+            # control flow can be spread out (the kernel picks the socket of
+            # each flow, so they are not guaranteed to be)
+            num_rx_workers = 1 + len(self.graph.stream_ep)
+        if not hasattr(socket, "SO_REUSEPORT"):
+            num_rx_workers = 1
+        self.num_rx_workers = num_rx_workers
+        self.log.debug("Using {} receive workers".format(num_rx_workers))
+        self.threads = []
+        for worker_index in range(num_rx_workers):
+            thread = Thread(target=self.socket_worker,
+                            args=(self._make_socket(), worker_index == 0),
+                            daemon=True)
+            thread.start()
+            self.threads.append(thread)
 
     def set_device_id(self, device_id):
         """Set the device_id for this endpoint"""
@@ -95,19 +139,28 @@ class ChdrEndpoint:
         This method is called by the daughterboard. It coresponds to
         sim_dboard.py:sim_db#set_catalina_clock_rate()
         """
-        self.graph.get_stream_spec().sample_rate = rate
+        self.graph.set_sample_rate(rate)
 
     def get_default_nodes(self):
         """Get a sensible NoC Core setup. This is the simplest
-        functional layout. It has one of each required component.
+        functional layout: one xport, and as many stream endpoints as
+        the topology asks for, all connected to one crossbar.
         """
+        num_stream_ep = self.config.topology.num_stream_ep
         nodes = [
             XportNode(0),
-            XbarNode(0, [2], [0]),
-            StreamEndpointNode(0, self.source_gen, self.sink_gen)
+            XbarNode(0, list(range(2, 2 + num_stream_ep)), [0]),
         ]
+        nodes += [StreamEndpointNode(inst, self.source_gen, self.sink_gen, self.config.stream)
+                  for inst in range(num_stream_ep)]
         return nodes
 
+    def get_stream_stats(self):
+        """Get a list of throughput counters, one entry per stream
+        endpoint (see StreamEndpointNode.get_stream_stats())
+        """
+        return [stream_ep.get_stream_stats() for stream_ep in self.graph.stream_ep]
+
     def send_strc(self, stream_ep, addr):
         pass # TODO: currently not implemented
 
@@ -120,44 +173,88 @@ class ChdrEndpoint:
     def begin_rx(self, dst_epid):
         pass # TODO: currently not implemented
 
-    def socket_worker(self):
+    def _make_socket(self):
+        """Open a UDP socket bound to the CHDR port. When there is more
+        than one receive worker, every worker binds its own socket to
+        the same port and the kernel spreads incoming flows among them.
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self.num_rx_workers > 1:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(("0.0.0.0", CHDR_PORT))
+        return sock
+
+    def socket_worker(self, sock, handle_send_queue):
         """This is the method that runs in a background thread. It
         blocks on the CHDR socket and processes packets as they come
-        in.
+        in. One of the workers also sends the packets queued through
+        the send_wrapper.
         """
         self.log.info("Starting ChdrEndpoint Thread")
-        main_sock = socket.socket(socket.AF_INET,
-                                  socket.SOCK_DGRAM)
-        main_sock.bind(("0.0.0.0", 49153))
+        wait_list = [sock, self.send_queue] if handle_send_queue else [sock]
+        # Reuse one receive buffer for the lifetime of the worker
+        buffer = bytearray(MAX_PACKET_LEN)
+        view = memoryview(buffer)
 
         while True:
             # This allows us to block on multiple sockets at the same time
-            ready_list, _, _ = select.select([main_sock, self.send_queue], [], [])
-            buffer = bytearray(8000) # Max MTU
-            for sock in ready_list:
-                if sock is main_sock:
+            ready_list, _, _ = select.select(wait_list, [], [])
+            for ready in ready_list:
+                if ready is sock:
                     # Received Data over socket
-                    n_bytes, sender = main_sock.recvfrom_into(buffer)
-                    self.log.trace("Received {} bytes of data from {}"
-                                   .format(n_bytes, sender))
+                    n_bytes, sender = sock.recvfrom_into(buffer)
+                    if self.log.isEnabledFor(TRACE):
+                        self.log.trace("Received {} bytes of data from {}"
+                                       .format(n_bytes, sender))
+                    if self._handle_data_fast(view, n_bytes):
+                        continue
                     try:
-                        packet = ChdrPacket.deserialize(CHDR_W, buffer[:n_bytes])
-                        self.log.trace("Decoded Packet: {}"
-                                       .format(packet.to_string_with_payload()))
+                        packet = ChdrPacket.deserialize(CHDR_W, bytes(view[:n_bytes]))
+                        if self.log.isEnabledFor(TRACE):
+                            self.log.trace("Decoded Packet: {}"
+                                           .format(packet.to_string_with_payload()))
                         entry_xport = (NodeType.XPORT, 0)
-                        response = self.graph.handle_packet(packet, entry_xport, sender,
-                                                            sender, n_bytes)
+                        with self.graph_lock:
+                            response = self.graph.handle_packet(packet, entry_xport, sender,
+                                                                sender, n_bytes)
 
                         if response is not None:
                             data = response.serialize()
-                            self.log.trace("Returning Packet: {}"
-                                           .format(packet.to_string_with_payload()))
-                            main_sock.sendto(bytes(data), sender)
+                            if self.log.isEnabledFor(TRACE):
+                                self.log.trace("Returning Packet: {}"
+                                               .format(packet.to_string_with_payload()))
+                            sock.sendto(bytes(data), sender)
                     except BaseException as ex:
                         self.log.warning("Unable to decode packet: {}"
                                          .format(ex))
                         raise ex
                 else:
                     data, addr = self.send_queue.get()
-                    sent_len = main_sock.sendto(data, addr)
-                    assert len(data) == sent_len, "Didn't send whole packet."
+                    if isinstance(data, TxBatch):
+                        for packet_data in data.buffers:
+                            sent_len = sock.sendto(packet_data, addr)
+                            assert len(packet_data) == sent_len, "Didn't send whole packet."
+                        data.mark_sent()
+                    else:
+                        sent_len = sock.sendto(data, addr)
+                        assert len(data) == sent_len, "Didn't send whole packet."
+
+    def _handle_data_fast(self, view, n_bytes):
+        """Hand the payload of a data packet straight to the input
+        stream of its stream endpoint, bypassing ChdrPacket.deserialize
+        and the graph.
+
+        Returns False if the packet isn't a data packet for a running
+        input stream, in which case it must take the regular path.
+        """
+        header = peek_data_header(view)
+        if header is None:
+            return False
+        dst_epid, payload_offset, length = header
+        stream_ep = self.graph.find_ep_by_id(dst_epid)
+        if stream_ep is None or stream_ep.input_stream is None:
+            return False
+        payload_end = min(length, n_bytes)
+        # The receive buffer is reused, so the payload has to be copied out
+        stream_ep.input_stream.queue_payload(bytes(view[payload_offset:payload_end]), n_bytes)
+        return True
@@ -9,10 +9,46 @@ handles managing threads, as well as interfacing with sample sources
 and sinks.
 """
 import time
-from threading import Thread
+from threading import Thread, Event, Lock
 import queue
 import socket
+import struct
+from usrp_mpm.mpmlog import TRACE
 from uhd.chdr import PacketType, StrcOpCode, StrcPayload, StrsPayload, StrsStatus, ChdrHeader, ChdrPacket
+from .config import StreamConfig
+
+# Field positions within the first 64 bit word of a CHDR header
+PKT_TYPE_OFFSET = 53
+PKT_TYPE_MASK = 0x7
+NUM_MDATA_OFFSET = 48
+NUM_MDATA_MASK = 0x1F
+SEQ_NUM_OFFSET = 32
+SEQ_NUM_MASK = 0xFFFF << SEQ_NUM_OFFSET
+LENGTH_OFFSET = 16
+LENGTH_MASK = 0xFFFF << LENGTH_OFFSET
+# The timestamp always follows the first 64 bits of the header,
+# regardless of chdr_w (RFNoC Specification section 2.2.1)
+TIMESTAMP_OFFSET = 8
+DATA_PKT_TYPES = (int(PacketType.DATA_NO_TS), int(PacketType.DATA_WITH_TS))
+
+def peek_data_header(buffer, chdr_w_bytes=8):
+    """Decode just enough of a serialized CHDR header to route a data
+    packet, without deserializing it into a ChdrPacket.
+
+    Returns a tuple of (dst_epid, payload_offset, length) if buffer
+    holds a data packet, or None for any other packet type.
+    """
+    header_word, = struct.unpack_from("<Q", buffer, 0)
+    pkt_type = (header_word >> PKT_TYPE_OFFSET) & PKT_TYPE_MASK
+    if pkt_type not in DATA_PKT_TYPES:
+        return None
+    num_mdata = (header_word >> NUM_MDATA_OFFSET) & NUM_MDATA_MASK
+    header_len = chdr_w_bytes
+    if pkt_type == DATA_PKT_TYPES[1] and chdr_w_bytes == 8:
+        header_len += 8
+    payload_offset = header_len + num_mdata * chdr_w_bytes
+    length = (header_word & LENGTH_MASK) >> LENGTH_OFFSET
+    return header_word & 0xFFFF, payload_offset, length
 
 class XferCount:
     """This class keeps track of flow control transfer status which are
@@ -56,27 +92,115 @@ class XferCount:
     def __str__(self):
         return "XferCount{{num_bytes:{}, num_packets:{}}}".format(self.num_bytes, self.num_packets)
 
+class PacketRing:
+    """A bounded multi-producer, single-consumer ring of packets.
+
+    Slots are preallocated and each index is only ever advanced by one
+    side, so get() doesn't take a lock. put() is serialized by a
+    producer lock, because the packets of one stream may arrive on
+    several ChdrEndpoint workers (the kernel hashes every flow to a
+    socket, and the data and control flows of a stream are separate
+    flows). Events are only used to park the consumer on an empty ring
+    or a producer on a full one.
+
+    Only one thread may call get().
+
+    After close(), get() returns None once the ring is empty, and put()
+    drops its items.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.slots = [None] * size
+        self.head = 0 # Next slot to read, only advanced by get()
+        self.tail = 0 # Next slot to write, only advanced by put()
+        self.high_water = 0
+        self.closed = False
+        self._not_empty = Event()
+        self._not_full = Event()
+        self._not_full.set()
+        self._put_lock = Lock()
+
+    def put(self, item):
+        """Append an item, blocking while the ring is full. May be
+        called from several threads.
+        """
+        with self._put_lock:
+            while self.tail - self.head >= self.size:
+                if self.closed:
+                    return
+                self._not_full.clear()
+                # Check again, the consumer may have made space before the clear
+                if self.tail - self.head >= self.size and not self.closed:
+                    self._not_full.wait()
+            if self.closed:
+                return
+            self.slots[self.tail % self.size] = item
+            self.tail += 1
+            depth = self.tail - self.head
+            if depth > self.high_water:
+                self.high_water = depth
+            if not self._not_empty.is_set():
+                self._not_empty.set()
+
+    def get(self):
+        """Remove and return the oldest item, blocking while the ring
+        is empty. Returns None if the ring is empty and closed.
+        """
+        while self.head == self.tail:
+            if self.closed:
+                return None
+            self._not_empty.clear()
+            # Check again, the producer may have added an item before the clear
+            if self.head == self.tail and not self.closed:
+                self._not_empty.wait()
+        index = self.head % self.size
+        item = self.slots[index]
+        self.slots[index] = None
+        self.head += 1
+        if not self._not_full.is_set():
+            self._not_full.set()
+        return item
+
+    def close(self):
+        """Close the ring, and unblock a consumer waiting in get() or a
+        producer waiting in put()
+        """
+        self.closed = True
+        self._not_empty.set()
+        self._not_full.set()
+
+    def __len__(self):
+        return self.tail - self.head
+
 class ChdrInputStream:
     """This class encapsulates an Rx Thread. This thread blocks on a
     queue which receives STRC and DATA ChdrPackets. It places the data
     packets into the sample_sink and responds to the STRC packets using
     the send_wrapper
+
+    Data packets may also be queued as bare payloads (see
+    queue_payload()), which skips deserializing them into ChdrPackets.
+
+    The buffer capacity and flow control parameters come from the
+    stream_config (see simulator/config.py:StreamConfig)
     """
-    CAPACITY_BYTES = int(5e3) # 5 KB
-    QUEUE_CAP = 3
-    def __init__(self, log, chdr_w, sample_sink, send_wrapper, our_epid):
+    def __init__(self, log, chdr_w, sample_sink, send_wrapper, our_epid, stream_config=None):
         self.log = log
         self.chdr_w = chdr_w
         self.sample_sink = sample_sink
         self.send_wrapper = send_wrapper
+        self.stream_config = stream_config if stream_config is not None else StreamConfig()
         self.xfer = XferCount()
         self.accum = XferCount()
+        self.total = XferCount()
+        self.num_strs = 0
+        self.start_time = None
         self.fc_freq = None
         self.command_target = None
         self.command_addr = None
         self.command_epid = None
         self.our_epid = our_epid
-        self.rx_queue = queue.Queue(ChdrInputStream.QUEUE_CAP)
+        self.rx_ring = PacketRing(self.stream_config.rx_ring_size)
         self.stop = False
         self.thread = Thread(target=self._rx_worker, daemon=True)
         self.thread.start()
@@ -84,14 +208,23 @@ class ChdrInputStream:
     def _rx_worker(self):
         self.log.info("Stream RX Worker Starting")
         while True:
-            packet, recv_len, addr = self.rx_queue.get()
-            # This break is here because when ChdrInputStream.stop() is called,
-            # a tuple of 3 None values is pushed into the queue to unblock the worker.
-            if self.stop:
+            item = self.rx_ring.get()
+            # ChdrInputStream.finish() closes the ring, get() then
+            # returns None
+            if item is None or self.stop:
                 break
-            header = packet.get_header()
+            packet, recv_len, addr = item
+            if self.start_time is None:
+                self.start_time = time.time()
             self.xfer.count_packet(recv_len)
             self.accum.count_packet(recv_len)
+            self.total.count_packet(recv_len)
+            if addr is None:
+                # Payload of a data packet, queued by queue_payload()
+                self.sample_sink.accept_payload(packet)
+                self._check_flow_control()
+                continue
+            header = packet.get_header()
             pkt_type = header.pkt_type
             if pkt_type in (PacketType.DATA_WITH_TS, PacketType.DATA_NO_TS):
                 self.sample_sink.accept_packet(packet)
@@ -101,33 +234,59 @@ class ChdrInputStream:
                 if req_payload.op_code == StrcOpCode.INIT:
                     self.xfer.clear()
                     self.fc_freq = XferCount.from_strc(req_payload)
+                    if self.stream_config.rx_fc_freq_packets is not None:
+                        self.fc_freq.num_packets = self.stream_config.rx_fc_freq_packets
+                    if self.stream_config.rx_fc_freq_bytes is not None:
+                        self.fc_freq.num_bytes = self.stream_config.rx_fc_freq_bytes
                     self.command_addr = addr
                     self.command_epid = req_payload.src_epid
                 elif req_payload.op_code == StrcOpCode.RESYNC:
                     self.xfer = XferCount.from_strc(req_payload)
                 resp_packet = self._generate_strs_packet(req_payload.src_epid, self.our_epid)
                 self.send_wrapper.send_packet(resp_packet, addr)
+                self.num_strs += 1
             else:
                 raise RuntimeError("RX Worker received unsupported packet: {}".format(pkt_type))
-
-            # Check if a fc status packet is due
-            if self.fc_freq is not None and self.accum.has_exceeded(self.fc_freq):
-                self.accum.clear()
-                self.log.trace("Flow Control Due, sending STRS")
-                self.command_target = None
-                resp_packet = self._generate_strs_packet(self.command_epid, self.our_epid)
-                self.log.trace("Sending Flow Control: {}".format(resp_packet.to_string_with_payload()))
-                self.send_wrapper.send_packet(resp_packet, self.command_addr)
+            self._check_flow_control()
 
         self.sample_sink.close()
         self.log.info("Stream RX Worker Done")
 
+    def _check_flow_control(self):
+        """Send a fc status packet if one is due"""
+        if self.fc_freq is not None and self.accum.has_exceeded(self.fc_freq):
+            self.accum.clear()
+            self.log.trace("Flow Control Due, sending STRS")
+            self.command_target = None
+            resp_packet = self._generate_strs_packet(self.command_epid, self.our_epid)
+            if self.log.isEnabledFor(TRACE):
+                self.log.trace("Sending Flow Control: {}"
+                               .format(resp_packet.to_string_with_payload()))
+            self.send_wrapper.send_packet(resp_packet, self.command_addr)
+            self.num_strs += 1
+
+    def get_stats(self):
+        """Get a dict of counters describing this stream's throughput
+        so far
+        """
+        elapsed = time.time() - self.start_time if self.start_time is not None else 0
+        return {
+            'packets': self.total.num_packets,
+            'bytes': self.total.num_bytes,
+            'packets_per_sec': self.total.num_packets / elapsed if elapsed > 0 else 0.0,
+            'bytes_per_sec': self.total.num_bytes / elapsed if elapsed > 0 else 0.0,
+            'strs_sent': self.num_strs,
+            'queue_high_water': self.rx_ring.high_water,
+            'queue_size': self.rx_ring.size,
+        }
+
     def finish(self):
-        """Unblocks the worker and stops the thread.
-        The worker will close its sample_sink
+        """Unblocks the worker and waits for the thread to stop.
+        The worker closes its sample_sink before it stops.
         """
         self.stop = True
-        self.rx_queue.put((None, None, None))
+        self.rx_ring.close()
+        self.thread.join()
 
     def _generate_strs_packet(self, dst_epid, src_epid):
         """Create an strs packet from the information in self.xfer"""
@@ -136,8 +295,8 @@ class ChdrInputStream:
         resp_payload = StrsPayload()
         resp_payload.src_epid = src_epid
         resp_payload.status = StrsStatus.OKAY
-        resp_payload.capacity_bytes = ChdrInputStream.CAPACITY_BYTES
-        resp_payload.capacity_pkts = 0xFFFFFF
+        resp_payload.capacity_bytes = self.stream_config.rx_capacity_bytes
+        resp_payload.capacity_pkts = self.stream_config.rx_capacity_packets
         resp_payload.xfer_count_bytes = self.xfer.num_bytes
         resp_payload.xfer_count_pkts = self.xfer.num_packets
         resp_packet = ChdrPacket(self.chdr_w, resp_header, resp_payload)
@@ -145,7 +304,58 @@ class ChdrInputStream:
 
     def queue_packet(self, packet, recv_len, addr):
         """Queue a packet to be processed by the ChdrInputStream"""
-        self.rx_queue.put((packet, recv_len, addr))
+        self.rx_ring.put((packet, recv_len, addr))
+
+    def queue_payload(self, payload, recv_len):
+        """Queue the payload of a data packet to be processed by the
+        ChdrInputStream. recv_len is the length of the whole packet,
+        which is used for flow control accounting.
+        """
+        self.rx_ring.put((payload, recv_len, None))
+
+class TxBatch:
+    """This class holds a group of serialized packets which are handed
+    to the socket thread in a single queue operation.
+
+    The packets are memoryview slices into buffers which are
+    preallocated once and reused, so a TxBatch must not be refilled
+    until the socket thread has sent it (see mark_sent()).
+    """
+    def __init__(self, num_packets, packet_len):
+        self.storage = [memoryview(bytearray(packet_len)) for _ in range(num_packets)]
+        self.buffers = []
+        self._sent = Event()
+        self._sent.set()
+
+    def reset(self):
+        """Block until the previous contents have been sent, then empty
+        the batch so it can be refilled
+        """
+        self._sent.wait()
+        self.buffers = []
+
+    def next_buffer(self):
+        """Get the full size buffer backing the next packet of the batch"""
+        return self.storage[len(self.buffers)]
+
+    def append(self, length):
+        """Commit the first length bytes of next_buffer() as a packet"""
+        self.buffers.append(self.storage[len(self.buffers)][:length])
+
+    def is_full(self):
+        """Returns true if there is no space left for another packet"""
+        return len(self.buffers) == len(self.storage)
+
+    def mark_pending(self):
+        """Called when the batch is handed over to the socket thread"""
+        self._sent.clear()
+
+    def mark_sent(self):
+        """Called by the socket thread once every packet has been sent"""
+        self._sent.set()
+
+    def __len__(self):
+        return len(self.buffers)
 
 class ChdrOutputStream:
     """This class encapsulates a Tx Thread. It takes data from its
@@ -154,7 +364,22 @@ class ChdrOutputStream:
 
     The tx stream is configured using the stream_spec object, which
     sets parameters such as sample rate and destination
+
+    Packets are not built as ChdrPackets. Instead, a header template is
+    serialized once and only the seq_num, length and timestamp fields
+    are patched into a ring of preallocated buffers. The sample source
+    fills the payload of these buffers in place, and the packets are
+    flushed to the socket thread BATCH_PACKETS at a time.
     """
+    # Number of packets handed to the socket thread at once
+    BATCH_PACKETS = 32
+    # Number of batches in the buffer ring
+    RING_BATCHES = 4
+    # Packets which are due within this many seconds are batched
+    # together instead of being sent one at a time
+    BATCH_WINDOW = 1e-3
+    # Interval in seconds between packet rate reports
+    REPORT_INTERVAL = 1.0
     def __init__(self, log, chdr_w, sample_source, stream_spec, send_wrapper):
         self.log = log
         self.chdr_w = chdr_w
@@ -167,20 +392,39 @@ class ChdrOutputStream:
         self.strs_queue = queue.Queue(100)
         self.strc_seq_num = 0
         self.data_seq_num = 0
+        self.num_batches = 0
+        self.start_time = None
+        self.finish_time = None
 
         self.thread = Thread(target=self._tx_worker, daemon=True)
         self.thread.start()
 
+    def _make_template(self, timestamp):
+        """Serialize a data packet header once.
+
+        Returns a tuple of (header_word, header_len), where header_word
+        is the first 64 bits of the header with the seq_num and length
+        fields cleared, and header_len is the number of bytes before
+        the payload.
+        """
+        header = ChdrHeader()
+        header.dst_epid = self.stream_spec.dst_epid
+        header.pkt_type = PacketType.DATA_NO_TS
+        packet = ChdrPacket(self.chdr_w, header, bytes(0), timestamp)
+        data = bytes(packet.serialize())
+        header_word, = struct.unpack_from("<Q", data, 0)
+        header_word &= ~(SEQ_NUM_MASK | LENGTH_MASK)
+        return header_word, len(data)
+
     def _tx_worker(self):
         self.log.info("Stream TX Worker Starting with {} packets/sec"
                       .format(1/self.stream_spec.seconds_per_packet()))
         self.log.info("Downstream Buffer Capacity: {} packets or {} bytes"
                       .format(self.stream_spec.capacity_packets, self.stream_spec.capacity_bytes))
-        header = ChdrHeader()
-        start_time = time.time()
-        next_send = start_time
-        header.dst_epid = self.stream_spec.dst_epid
-        header.pkt_type = PacketType.DATA_NO_TS
+        self.start_time = time.time()
+        next_send = self.start_time
+        next_report = self.start_time + self.REPORT_INTERVAL
+        seconds_per_packet = self.stream_spec.seconds_per_packet()
 
         is_continuous = self.stream_spec.is_continuous
         num_samps_left = None
@@ -191,46 +435,115 @@ class ChdrOutputStream:
         timestamp = self.stream_spec.init_timestamp  \
             if self.stream_spec.is_timed else None
 
+        # Only the first packet of a timed stream carries a timestamp
+        header_word, header_len = self._make_template(None)
+        ts_header_word, ts_header_len = self._make_template(timestamp) \
+            if timestamp is not None else (header_word, header_len)
+
+        max_packet_len = ts_header_len + self.stream_spec.packet_samples
+        ring = [TxBatch(self.BATCH_PACKETS, max_packet_len)
+                for _ in range(self.RING_BATCHES)]
+        ring_index = 0
+        batch = ring[ring_index]
+        batch.reset()
+
         while is_continuous or num_samps_left > 0:
             if self.stop:
                 self.log.info("Stream Worker Stopped")
                 break
-            header.seq_num = self.data_seq_num
-            # When seq_num gets to 65535 (Max Unsigned 16 bit integer)
-            # It wraps back around to 0
-            self.data_seq_num = int(self.data_seq_num + 1) & 0xFFFF
-            packet = ChdrPacket(self.chdr_w, header, bytes(0), timestamp)
             packet_samples = self.stream_spec.packet_samples
             if num_samps_left is not None:
                 packet_samples = min(packet_samples, num_samps_left)
                 num_samps_left -= packet_samples
-            packet = self.sample_source.fill_packet(packet, packet_samples)
-            if packet is None:
-                break
-            send_data = bytes(packet.serialize()) # Serialize before waiting
 
-            delay = next_send - time.time()
-            if delay > 0:
+            if timestamp is not None:
+                word, offset = ts_header_word, ts_header_len
+            else:
+                word, offset = header_word, header_len
+
+            # Send what we have so far if this packet isn't due yet. This
+            # and the flow control check below flush the batch, so they
+            # must happen before the packet is written into it.
+            now = time.time()
+            delay = next_send - now
+            if delay > self.BATCH_WINDOW:
+                batch, ring_index = self._flush(ring, ring_index)
                 time.sleep(delay)
-            next_send = next_send + self.stream_spec.seconds_per_packet()
+            next_send = next_send + seconds_per_packet
+
+            # Check Flow Control to assert there is space downstream. The
+            # payload may turn out shorter at the end of the source, so
+            # this checks for the longest packet we could send.
+            if not self._can_fit_packet(offset + packet_samples):
+                batch, ring_index = self._flush(ring, ring_index)
+                while not self._can_fit_packet(offset + packet_samples):
+                    strs_update = self.strs_queue.get()
+                    strs_payload = strs_update.get_payload_strs()
+                    self._update_recv(strs_payload)
 
-            timestamp = None
+            buffer = batch.next_buffer()
+            payload_len = self.sample_source.fill_buffer(buffer[offset:offset + packet_samples])
+            if not payload_len:
+                break
+            length = offset + payload_len
+            word |= (self.data_seq_num << SEQ_NUM_OFFSET) | (length << LENGTH_OFFSET)
+            struct.pack_into("<Q", buffer, 0, word)
+            if timestamp is not None:
+                struct.pack_into("<Q", buffer, TIMESTAMP_OFFSET, timestamp)
+                timestamp = None
+            # When seq_num gets to 65535 (Max Unsigned 16 bit integer)
+            # It wraps back around to 0
+            self.data_seq_num = int(self.data_seq_num + 1) & 0xFFFF
 
-            # Check Flow Control to assert there is space downstream
-            while not self._can_fit_packet(len(send_data)):
-                strs_update = self.strs_queue.get()
-                strs_payload = strs_update.get_payload_strs()
-                self._update_recv(strs_payload)
+            # The buffer was filled in place, this only records its length
+            batch.append(length)
+            self.xfer.count_packet(length)
+            if batch.is_full():
+                batch, ring_index = self._flush(ring, ring_index)
 
-            self.send_wrapper.send_data(send_data, self.stream_spec.addr)
-            self.xfer.count_packet(len(send_data))
+            if now >= next_report:
+                next_report = now + self.REPORT_INTERVAL
+                self.log.debug("Current Packet Rate is {} packets/sec"
+                               .format(self.get_stats()['packets_per_sec']))
 
+        self._flush(ring, ring_index)
+        self.finish_time = time.time()
         self.log.info("Stream Worker Done")
-        finish_time = time.time()
-        self.log.info("Actual Packet Rate was {} packets/sec"
-                      .format(self.xfer.num_packets/(finish_time - start_time)))
+        self.log.info("Actual Packet Rate was {} packets/sec in {} batches"
+                      .format(self.get_stats()['packets_per_sec'], self.num_batches))
         self.sample_source.close()
 
+    def _flush(self, ring, ring_index):
+        """Hand the current batch to the socket thread and advance
+        to the next batch in the ring. Returns the new batch and its
+        index.
+        """
+        batch = ring[ring_index]
+        if len(batch) == 0:
+            return batch, ring_index
+        self.send_wrapper.send_batch(batch, self.stream_spec.addr)
+        self.num_batches += 1
+        ring_index = (ring_index + 1) % len(ring)
+        batch = ring[ring_index]
+        batch.reset()
+        return batch, ring_index
+
+    def get_stats(self):
+        """Get a dict of counters describing this stream's throughput
+        so far
+        """
+        if self.start_time is None:
+            elapsed = 0
+        else:
+            elapsed = (self.finish_time or time.time()) - self.start_time
+        return {
+            'packets': self.xfer.num_packets,
+            'bytes': self.xfer.num_bytes,
+            'batches': self.num_batches,
+            'packets_per_sec': self.xfer.num_packets / elapsed if elapsed > 0 else 0.0,
+            'bytes_per_sec': self.xfer.num_bytes / elapsed if elapsed > 0 else 0.0,
+        }
+
     def finish(self):
         """Stops the ChdrOutputStream"""
         self.stop = True
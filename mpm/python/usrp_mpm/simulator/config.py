@@ -13,6 +13,7 @@ it identifies itself as.
 import configparser
 from .sample_source import sinks, sources, NullSamples, from_import_path
 from .hardware_presets import presets
+from .block_models import block_models
 import numbers
 
 class HardwareDescriptor:
@@ -54,6 +55,105 @@ class HardwareDescriptor:
             dict['dboard_class'],
             dict['rfnoc_device_type'])
 
+class StreamConfig:
+    """This class contains the flow control and buffering parameters of
+    the simulated stream endpoints.
+
+    rx_capacity_bytes, rx_capacity_packets -> Downstream buffer capacity
+        reported to UHD in STRS packets. This bounds the amount of data
+        UHD keeps in flight when transmitting to the simulator.
+    rx_fc_freq_bytes, rx_fc_freq_packets -> If set, these override the
+        flow control status frequency requested by UHD in the STRC init
+        packet.
+    rx_ring_size -> Number of packets which may be waiting to be
+        consumed by the SampleSink
+    """
+    def __init__(self, rx_capacity_bytes=int(5e3), rx_capacity_packets=0xFFFFFF,
+                 rx_fc_freq_bytes=None, rx_fc_freq_packets=None, rx_ring_size=256):
+        self.rx_capacity_bytes = rx_capacity_bytes
+        self.rx_capacity_packets = rx_capacity_packets
+        self.rx_fc_freq_bytes = rx_fc_freq_bytes
+        self.rx_fc_freq_packets = rx_fc_freq_packets
+        self.rx_ring_size = rx_ring_size
+
+    @classmethod
+    def from_dict(cls, dict):
+        """Construct a StreamConfig from the string values of a config
+        file section. Missing keys use the defaults.
+        """
+        # float() first so that values like 1e6 are accepted
+        return cls(**{key: int(float(value)) for key, value in dict.items()})
+
+class TopologyConfig:
+    """This class describes the NoC blocks of the simulated device, and
+    how they connect to each other and to the stream endpoints.
+
+    num_stream_ep -> Number of stream endpoints. They are named sep0,
+        sep1, ... in connections.
+    blocks -> List of (name, BlockModel) tuples. The blocks are reported
+        to UHD in this order.
+    connections -> List of ((src_name, src_port), (dst_name, dst_port))
+        tuples, one per static connection
+
+    The streams of the simulator are generated by the radios, so there
+    must be at least one radio block.
+    """
+    def __init__(self, num_stream_ep, blocks, connections):
+        self.num_stream_ep = num_stream_ep
+        self.blocks = blocks
+        self.connections = connections
+        if not any(isinstance(model, block_models["radio"]) for _, model in blocks):
+            raise ValueError("The topology needs at least one block of type radio")
+        names = {name for name, _ in blocks} | \
+            {"sep{}".format(inst) for inst in range(num_stream_ep)}
+        for connection in connections:
+            for name, _ in connection:
+                if name not in names:
+                    raise ValueError("Unknown block in connection: {}".format(name))
+
+    @classmethod
+    def from_sections(cls, topology, block_sections):
+        """Construct a TopologyConfig from the string values of the
+        [topology] section, and a list of (name, section) tuples of the
+        [block.<name>] sections.
+
+        connections is a comma separated list of edges such as
+        "radio0:0 -> ddc0:0". Every block section needs a 'type' key,
+        which selects the model (see block_models.py). The other keys
+        are passed to the model constructor.
+        """
+        blocks = []
+        for name, section in block_sections:
+            args = dict(section)
+            type_name = args.pop("type", None)
+            if type_name not in block_models:
+                raise ValueError("Unknown type {} of block {}".format(type_name, name))
+            blocks.append((name, block_models[type_name](**args)))
+        connections = []
+        for edge in topology.get("connections", "").split(","):
+            if not edge.strip():
+                continue
+            src, dst = edge.split("->")
+            connections.append(tuple(cls._parse_port(port) for port in (src, dst)))
+        return cls(int(topology.get("num_stream_ep", 1)), blocks, connections)
+
+    @staticmethod
+    def _parse_port(port):
+        name, _, index = port.strip().partition(":")
+        return (name, int(index or 0))
+
+    @classmethod
+    def default(cls):
+        """Return the default topology: a single two channel radio,
+        connected to one stream endpoint
+        """
+        return cls(1, [("radio0", block_models["radio"]())], [
+            (("sep0", 0), ("radio0", 0)),
+            (("sep0", 1), ("radio0", 1)),
+            (("radio0", 0), ("sep0", 0)),
+            (("radio0", 1), ("sep0", 1)),
+        ])
+
 class Config:
     """This class represents a configuration file for the usrp simulator.
     This file should conform to the .ini format defined by the
@@ -64,11 +164,20 @@ class Config:
     Source/Sink class to instanitate (see the decorators in
     sample_source.py). The other key value pairs in the section are
     passed to the source/sink constructor as strings through **kwargs
+
+    It may have a [stream] section, whose keys are the arguments of
+    StreamConfig.
+
+    It may have a [topology] section and [block.<name>] sections, which
+    describe the NoC blocks (see TopologyConfig). Without them, the
+    device has a single radio.
     """
-    def __init__(self, source_gen, sink_gen, hardware):
+    def __init__(self, source_gen, sink_gen, hardware, stream=None, topology=None):
         self.source_gen = source_gen
         self.sink_gen = sink_gen
         self.hardware = hardware
+        self.stream = stream if stream is not None else StreamConfig()
+        self.topology = topology if topology is not None else TopologyConfig.default()
 
     @classmethod
     def from_path(cls, log, path):
@@ -86,6 +195,19 @@ class Config:
         if 'sample.sink' in parser:
             sink_gen = Config._read_sample_section(parser['sample.sink'], sinks)
             parser.pop('sample.sink')
+        stream = None
+        if 'stream' in parser:
+            stream = StreamConfig.from_dict(dict(parser['stream']))
+            parser.pop('stream')
+        topology = None
+        block_sections = [(name[len('block.'):], dict(parser[name]))
+                          for name in parser if name.startswith('block.')]
+        if 'topology' in parser or block_sections:
+            topology_section = dict(parser['topology']) if 'topology' in parser else {}
+            topology = TopologyConfig.from_sections(topology_section, block_sections)
+            parser.pop('topology', None)
+            for name, _ in block_sections:
+                parser.pop('block.' + name)
         hardware_section = dict(parser['hardware'])
         preset_name = hardware_section.get('preset', None)
         hardware_preset = presets[preset_name].copy() if preset_name is not None else {}
@@ -99,7 +221,7 @@ class Config:
             # This helps stop you from shooting yourself in the foot when you add
             # the [sampel.sink] section
             log.warning("Unrecognized section in config file: {}".format(unused_section))
-        return cls(source_gen, sink_gen, hardware)
+        return cls(source_gen, sink_gen, hardware, stream, topology)
 
     @staticmethod
     def _read_sample_section(section, lookup):
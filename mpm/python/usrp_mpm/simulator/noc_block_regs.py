@@ -72,9 +72,12 @@ class NocBlock:
     see client_zero.hpp:block_config_info
 
     NOTE: The mtu in bytes is calculated by (2**data_mtu * CHDR_W)
+
+    model is the BlockModel of this block (see block_models.py), if any
     """
     def __init__(self, protover, num_inputs, num_outputs, ctrl_fifo_size,
-                 ctrl_max_async_msgs, noc_id, data_mtu):
+                 ctrl_max_async_msgs, noc_id, data_mtu, model=None):
+        self.model = model
         self.protover = protover
         self.num_inputs = num_inputs
         self.num_outputs = num_outputs
@@ -129,8 +132,11 @@ class NocBlockRegs:
             Port is either StreamEndpointPort or NocBlockPort
         sample_width -> Sample width of radio
         samples_per_cycle -> Samples produced by a radio cycle
-        get_stream_spec -> Callback which returns the current stream spec
-        create_tx_stream -> Callback which takes a block_index and starts a tx stream
+        get_stream_spec -> Callback which takes the block_id of a radio and
+            returns its current stream spec
+        create_tx_stream -> Callback which takes a block_index, the stream spec
+            of the radio and the list of block_ids between the radio and the
+            block_index, and starts a tx stream
         stop_tx_stream -> Callback which takes a block_index and stops a tx stream
         """
         self.log = log.getChild("Regs")
@@ -145,6 +151,15 @@ class NocBlockRegs:
         self.adjacency_list = [(src_blk.to_tuple(num_stream_ep), dst_blk.to_tuple(num_stream_ep))
                                for src_blk, dst_blk in adjacency_list]
         self.adjacency_list_reg = NocBlockRegs._parse_adjacency_list(self.adjacency_list)
+        # Routing table of the static connections: src (blk_id, port) -> dst (blk_id, port)
+        self.edges = dict(self.adjacency_list)
+        # Blocks with their own register model, by ctrl crossbar port
+        # (see client_zero.hpp:get_ctrl_xbar_port())
+        self.ctrl_port_models = {
+            1 + num_ctrl_ep + index: block.model
+            for index, block in enumerate(blocks)
+            if block.model is not None and block.model.has_regs
+        }
         self.sample_width = sample_width
         self.samples_per_cycle = samples_per_cycle
         self.radio_reg = {}
@@ -152,7 +167,10 @@ class NocBlockRegs:
         self.create_tx_stream = create_tx_stream
         self.stop_tx_stream = stop_tx_stream
 
-    def read(self, addr):
+    def read(self, addr, port=None):
+        model = self.ctrl_port_models.get(port)
+        if model is not None:
+            return model.read_reg(addr)
         # See client_zero.cpp
         if addr == PROTOVER_ADDR:
             return self.read_protover()
@@ -191,11 +209,14 @@ class NocBlockRegs:
             else:
                 raise NotImplementedError("Radio addr 0x{:08X} not implemented".format(addr))
 
-    def write_radio(self, addr, value):
+    def write_radio(self, addr, value, radio_port=None):
         """Write a value to radio registers
 
         See radio_control_impl.cpp
         """
+        if radio_port is None:
+            radio_port = self.get_radio_port()
+        stream_spec = self.get_stream_spec(radio_port)
         offset = addr - 0x1000
         assert offset >= 0
         chan = offset // 0x80
@@ -204,43 +225,72 @@ class NocBlockRegs:
             return
         reg = offset % 0x80
         if reg == REG_RX_MAX_WORDS_PER_PKT:
-            self.get_stream_spec().packet_samples = value
+            stream_spec.packet_samples = value
         elif reg == REG_RX_CMD_NUM_WORDS_HI:
-            self.get_stream_spec().set_num_words_hi(value)
+            stream_spec.set_num_words_hi(value)
         elif reg == REG_RX_CMD_NUM_WORDS_LO:
-            self.get_stream_spec().set_num_words_lo(value)
+            stream_spec.set_num_words_lo(value)
         elif reg == REG_RX_CMD_TIME_HI:
-            self.get_stream_spec().set_timestamp_hi(value)
+            stream_spec.set_timestamp_hi(value)
         elif reg == REG_RX_CMD_TIME_LO:
-            self.get_stream_spec().set_timestamp_lo(value)
+            stream_spec.set_timestamp_lo(value)
         elif reg == REG_RX_CMD:
             if value & (1 << 31) != 0:
                 value = value & ~(1 << 31) # Clear the flag
-                self.get_stream_spec().is_timed = True
+                stream_spec.is_timed = True
             if value == RX_CMD_STOP:
-                sep_block_id = self.resolve_ep_towards_outputs((self.get_radio_port(), chan))
+                sep_block_id = self.resolve_ep_towards_outputs((radio_port, chan))
                 self.stop_tx_stream(sep_block_id)
                 return
             elif value == RX_CMD_CONTINUOUS:
-                self.get_stream_spec().is_continuous = True
+                stream_spec.is_continuous = True
             elif value == RX_CMD_FINITE:
-                self.get_stream_spec().is_continuous = False
+                stream_spec.is_continuous = False
             else:
                 raise RuntimeError("Unknown Stream RX_CMD: {:08X}".format(value))
-            sep_block_id = self.resolve_ep_towards_outputs((self.get_radio_port(), chan))
-            self.create_tx_stream(sep_block_id)
+            sep_block_id, path = self.resolve_path_towards_outputs((radio_port, chan))
+            self.create_tx_stream(sep_block_id, stream_spec, path)
 
     def resolve_ep_towards_outputs(self, block_id):
         """Follow dataflow downstream through the adjacency list until
         a stream_endpoint is encountered
         """
-        for src_blk, dst_blk in self.adjacency_list:
-            if src_blk == block_id:
-                dst_index, dst_port = dst_blk
-                if dst_index <= self.num_stream_ep:
-                    return dst_blk
-                else:
-                    return self.resolve_ep_towards_outputs(dst_blk)
+        return self.resolve_path_towards_outputs(block_id)[0]
+
+    def resolve_path_towards_outputs(self, block_id):
+        """Follow dataflow downstream through the adjacency list until
+        a stream_endpoint is encountered. Returns the stream endpoint's
+        (blk_id, port), and the list of (blk_id, port) of the NoC blocks
+        in between.
+        """
+        path = []
+        dst_blk = self.edges.get(block_id)
+        while dst_blk is not None and dst_blk[0] > self.num_stream_ep:
+            if dst_blk in path:
+                raise RuntimeError("Loop in static connections at {}".format(dst_blk))
+            path.append(dst_blk)
+            dst_blk = self.edges.get(dst_blk)
+        return dst_blk, path
+
+    def resolve_path_from_ep(self, block_id):
+        """Follow dataflow downstream from a stream endpoint through the
+        adjacency list until a radio or another stream endpoint is
+        encountered. Returns the list of (blk_id, port) of the NoC
+        blocks other than radios on the way.
+        """
+        path = []
+        dst_blk = self.edges.get(block_id)
+        while dst_blk is not None and dst_blk[0] > self.num_stream_ep:
+            model = self.get_block_model(dst_blk[0])
+            if model is None or not model.has_regs or dst_blk in path:
+                break
+            path.append(dst_blk)
+            dst_blk = self.edges.get(dst_blk)
+        return path
+
+    def get_block_model(self, blk_id):
+        """Returns the BlockModel of the NoC block with the given blk_id"""
+        return self.blocks[blk_id - 1 - self.num_stream_ep].model
 
     def get_radio_port(self):
         """Returns the block_id of the radio block"""
@@ -249,6 +299,17 @@ class NocBlockRegs:
             if block.noc_id == radio_noc_id:
                 return i + 1 + self.num_stream_ep
 
+    def get_radio_port_from_ctrl_port(self, port):
+        """Returns the block_id of the radio block with the given ctrl
+        crossbar port, or None if there is no such radio
+        """
+        if port is None:
+            return None
+        index = port - 1 - self.num_ctrl_ep
+        if 0 <= index < self.num_blocks and self.blocks[index].noc_id == 0x12AD1000:
+            return index + 1 + self.num_stream_ep
+        return None
+
     # This is the FPGA compat number
     def read_protover(self):
         return 0xFFFF & self.protover
@@ -278,14 +339,19 @@ class NocBlockRegs:
             index = (offset // 4) - 1
             return self.adjacency_list_reg[index]
 
-    def write(self, addr, value):
+    def write(self, addr, value, port=None):
+        model = self.ctrl_port_models.get(port)
+        if model is not None:
+            model.write_reg(addr, value)
+            return
+        radio_port = self.get_radio_port_from_ctrl_port(port)
         if addr == 0x1040 or addr == 0x10C0:
             self.log.trace("Storing value: 0x:{:08X} to self.radio_reg for data loopback test".format(value))
             self.radio_reg = value
         # assuming 2 channels, out of bounds is
         # BASE + 2 * CHAN_OFFSET = 0x1000 + 2 * 0x80 = 0x1100
         elif 0x1000 <= addr < 0x1100:
-            self.write_radio(addr, value)
+            self.write_radio(addr, value, radio_port)
 
     def read_port_reg(self, addr):
         port = addr // 0x40
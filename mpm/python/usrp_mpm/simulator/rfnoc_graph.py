@@ -10,6 +10,7 @@ This module handles and responds to Management and Ctrl Packets. It
 also instantiates the registers and acts as an interface between
 the chdr packets on the network and the registers.
 """
+import copy
 from uhd.chdr import MgmtOpCode, MgmtOpCfg, MgmtOpSelDest
 from .noc_block_regs import NocBlockRegs, NocBlock, StreamEndpointPort, NocBlockPort
 from .rfnoc_common import Node, NodeType, StreamSpec, to_iter, swap_src_dst, RETURN_TO_SENDER
@@ -25,6 +26,11 @@ class XportNode(Node):
         super().__init__(node_inst)
         self.downstream = None
         self.addr_map = {}
+        self.routes_changed = None
+
+    def graph_init(self, log, get_device_id, routes_changed=None, **kwargs):
+        super().graph_init(log, get_device_id)
+        self.routes_changed = routes_changed
 
     def get_type(self):
         return NodeType.XPORT
@@ -48,6 +54,8 @@ class XportNode(Node):
                                       packet.get_header().dst_epid))
                 self.log.info("addr_map updated: EPID:{} -> {}".format(payload.src_epid, addr))
                 self.addr_map[payload.src_epid] = addr
+                if self.routes_changed is not None:
+                    self.routes_changed()
             else:
                 raise NotImplementedError(op.op_code)
         self.log.trace("Xport {} processed hop:\n{}"
@@ -79,6 +87,11 @@ class XbarNode(Node):
         self.nports_xport = len(xport_ports)
         self.ports = xport_ports + ports
         self.routing_table = {}
+        self.routes_changed = None
+
+    def graph_init(self, log, get_device_id, routes_changed=None, **kwargs):
+        super().graph_init(log, get_device_id)
+        self.routes_changed = routes_changed
 
     def get_type(self):
         return NodeType.XBAR
@@ -103,6 +116,8 @@ class XbarNode(Node):
                 cfg = op.get_op_payload()
                 cfg = MgmtOpCfg.parse(cfg)
                 self.routing_table[cfg.addr] = cfg.data
+                if self.routes_changed is not None:
+                    self.routes_changed()
                 self.log.debug("Xbar {} routing changed: {}"
                                .format(self.node_inst, self.routing_table))
             elif op.op_code == MgmtOpCode.SEL_DEST:
@@ -147,41 +162,69 @@ class RFNoCGraph:
 
     It serves as an interface between the ChdrEndpoint and the
     individual blocks/nodes.
+
+    topology is a TopologyConfig (see config.py) describing the NoC
+    blocks and their static connections. The stream endpoints it
+    refers to must be in graph_list.
     """
-    def __init__(self, graph_list, log, device_id, send_wrapper, chdr_w, rfnoc_device_id):
+    def __init__(self, graph_list, log, device_id, send_wrapper, chdr_w, rfnoc_device_id,
+                 topology=None):
         self.log = log.getChild("Graph")
         self.device_id = device_id
-        self.stream_spec = StreamSpec()
         self.stream_ep = []
+        # Lookup tables for the data path. They are rebuilt whenever
+        # UHD changes an EPID or a route, not on every packet.
+        self.ep_table = {}
+        self.addr_table = {}
         for node in graph_list:
             if node.__class__ is StreamEndpointNode:
                 self.stream_ep.append(node)
             node.graph_init(self.log, self.get_device_id, send_wrapper=send_wrapper,
-                            chdr_w=chdr_w, dst_to_addr=self.dst_to_addr)
+                            chdr_w=chdr_w, dst_to_addr=self.dst_to_addr,
+                            epid_changed=self._update_ep_table,
+                            routes_changed=self.addr_table.clear,
+                            get_input_stages=self.get_input_stages)
         # These must be done sequentially so that get_device_id is initialized on all nodes
         # before from_index is called on any node
         for node in graph_list:
             node.from_index(graph_list)
         self.graph_map = {node.get_local_id(): node
                           for node in graph_list}
-        # For now, just use one radio block and hardcode it to the first stream endpoint
-        radio = NocBlock(1 << 16, 2, 2, 512, 1, 0x12AD1000, 16)
-        adj_list = [
-            (StreamEndpointPort(0, 0), NocBlockPort(0, 0)),
-            (StreamEndpointPort(0, 1), NocBlockPort(0, 1)),
-            (NocBlockPort(0, 0), StreamEndpointPort(0, 0)),
-            (NocBlockPort(0, 1), StreamEndpointPort(0, 1))
-        ]
-        self.regs = NocBlockRegs(self.log, 1 << 16, True, 1, [radio], len(self.stream_ep), 1,
+        self._update_ep_table()
+        if topology is None:
+            # Avoid a circular import, config.py isn't needed otherwise
+            from .config import TopologyConfig
+            topology = TopologyConfig.default()
+        assert topology.num_stream_ep == len(self.stream_ep), \
+            "Topology has {} stream endpoints, but the graph has {}" \
+            .format(topology.num_stream_ep, len(self.stream_ep))
+        blocks = []
+        ports = {}
+        for index, (name, model) in enumerate(topology.blocks):
+            blocks.append(NocBlock(1 << 16, model.num_ports, model.num_ports, 512, 1,
+                                   model.noc_id, 16, model))
+            ports[name] = lambda port, index=index: NocBlockPort(index, port)
+        for inst in range(topology.num_stream_ep):
+            ports["sep{}".format(inst)] = lambda port, inst=inst: StreamEndpointPort(inst, port)
+        adj_list = [(ports[src_name](src_port), ports[dst_name](dst_port))
+                    for (src_name, src_port), (dst_name, dst_port) in topology.connections]
+        self.regs = NocBlockRegs(self.log, 1 << 16, True, 1, blocks, len(self.stream_ep), 1,
                                  rfnoc_device_id, adj_list, 8, 1, self.get_stream_spec,
                                  self.radio_tx_cmd, self.radio_tx_stop)
+        # One stream spec per radio, by blk_id
+        self.stream_specs = {
+            1 + len(self.stream_ep) + index: StreamSpec()
+            for index, block in enumerate(blocks)
+            if block.noc_id == 0x12AD1000
+        }
 
-    def radio_tx_cmd(self, sep_block_id):
+    def radio_tx_cmd(self, sep_block_id, stream_spec, path=()):
         """Triggers the creation of a ChdrOutputStream in the ChdrEndpoint using
-        the current stream_spec.
+        the stream_spec of the radio.
 
         This method transforms the sep_block_id into an epid useable by
-        the transmit code
+        the transmit code. The samples are processed by the models of the
+        blocks in path, on their way from the radio to the stream endpoint.
         """
         # TODO: Use the port
         sep_blk, sep_port = sep_block_id
@@ -190,10 +233,20 @@ class RFNoCGraph:
         sep_inst = sep_blk - 1
         sep_id = (NodeType.STRM_EP, sep_inst)
         stream_ep = self.graph_map[sep_id]
-        self.stream_spec.addr = self.dst_to_addr(stream_ep)
+        stages = [self.regs.get_block_model(blk).make_stage() for blk, _ in path]
+        rate_ratio = 1.0
+        for stage in stages:
+            rate_ratio *= stage.rate_ratio
+        # The radio's spec describes the samples the radio produces, the
+        # stream endpoint sends what is left of them after processing
+        stream_spec = copy.copy(stream_spec)
+        stream_spec.addr = self.dst_to_addr(stream_ep)
+        if stream_spec.sample_rate is not None:
+            stream_spec.sample_rate *= rate_ratio
+        stream_spec.total_samples = int(stream_spec.total_samples * rate_ratio)
         self.log.info("Streaming with StreamSpec:")
-        self.log.info(str(self.stream_spec))
-        stream_ep.begin_output(self.stream_spec)
+        self.log.info(str(stream_spec))
+        stream_ep.begin_output(stream_spec, stages)
 
     def radio_tx_stop(self, sep_block_id):
         """Triggers the destuction of a ChdrOutputStream in the ChdrEndpoint
@@ -209,6 +262,14 @@ class RFNoCGraph:
         stream_ep = self.graph_map[sep_id]
         stream_ep.end_output()
 
+    def get_input_stages(self, stream_ep):
+        """Returns a new list of stages for the samples received by
+        stream_ep, from the models of the blocks between it and the radio
+        """
+        # See radio_tx_cmd() for the blk_id of a stream endpoint
+        path = self.regs.resolve_path_from_ep((1 + stream_ep.node_inst, 0))
+        return [self.regs.get_block_model(blk).make_stage() for blk, _ in path]
+
     def get_device_id(self):
         return self.device_id
 
@@ -217,15 +278,23 @@ class RFNoCGraph:
         self.device_id = device_id
 
     def change_spp(self, spp):
-        """Change the Stream Samples per Packet"""
-        self.stream_spec.packet_samples = spp
+        """Change the Stream Samples per Packet of all radios"""
+        for stream_spec in self.stream_specs.values():
+            stream_spec.packet_samples = spp
+
+    def set_sample_rate(self, rate):
+        """Set the sample rate of all radios"""
+        for stream_spec in self.stream_specs.values():
+            stream_spec.sample_rate = rate
 
     def find_ep_by_id(self, epid):
         """Find a Stream Endpoint which identifies with epid"""
-        for node in self.graph_map.values():
-            if node.__class__ is StreamEndpointNode:
-                if node.epid == epid:
-                    return node
+        return self.ep_table.get(epid)
+
+    def _update_ep_table(self):
+        # Replace rather than update the table, so that it may be read
+        # without holding the graph lock
+        self.ep_table = {node.epid: node for node in self.stream_ep}
 
     # Fixme: This doesn't support intra-device connections
     # i.e. connecting nodes by connecting two internal stream endpoints
@@ -238,7 +307,15 @@ class RFNoCGraph:
         heading for src_ep.dst_epid. When it encounters an xport, it
         returns the address associated with the dst_epid in the xport's
         addr_map
+
+        The result is cached until a route changes.
         """
+        key = (src_ep.get_local_id(), src_ep.dst_epid)
+        if key not in self.addr_table:
+            self.addr_table[key] = self._find_addr(src_ep)
+        return self.addr_table[key]
+
+    def _find_addr(self, src_ep):
         current_node = src_ep
         dst_epid = src_ep.dst_epid
         while current_node.__class__ != XportNode:
@@ -273,6 +350,10 @@ class RFNoCGraph:
                                          sender=sender, num_bytes=num_bytes)
         return response_packet
 
-    def get_stream_spec(self):
-        """ Get the current output stream configuration """
-        return self.stream_spec
+    def get_stream_spec(self, radio_blk=None):
+        """ Get the current output stream configuration of a radio (by
+        blk_id), or of the first radio
+        """
+        if radio_blk is None:
+            radio_blk = min(self.stream_specs)
+        return self.stream_specs[radio_blk]
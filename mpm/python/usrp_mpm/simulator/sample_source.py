@@ -8,6 +8,15 @@ This module contains the interface for providing data to a simulator
 stream and receiving data from a simulator stream.
 """
 import importlib.util
+import math
+import mmap
+import os
+import numpy
+from uhd.dsp.signals import get_continuous_tone
+
+# Scale factor between fc32 samples in [-1.0, 1.0) and sc16 samples
+SC16_SCALE = 32768.0
+SAMPLE_FORMATS = ("sc16", "fc32")
 
 sources = {}
 sinks = {}
@@ -50,10 +59,43 @@ class SampleSource:
         """
         raise NotImplementedError()
 
+    def fill_buffer(self, buffer):
+        """This method should write samples directly into buffer (a
+        writable memoryview), filling at most len(buffer) bytes, and
+        return the number of bytes written.
+        Returning 0 signals that this source is exhausted.
+
+        The default implementation adapts fill_packet(), which costs an
+        extra copy per packet. Sources which can produce samples in
+        place should override this.
+        """
+        capture = _PayloadPacket()
+        if self.fill_packet(capture, len(buffer)) is None:
+            return 0
+        payload_len = min(len(capture.payload), len(buffer))
+        buffer[:payload_len] = capture.payload[:payload_len]
+        return payload_len
+
     def close(self):
         """Use this to clean up any resources held by the object"""
         raise NotImplementedError()
 
+class _PayloadPacket:
+    """Stands in for a ChdrPacket when adapting fill_packet() to
+    fill_buffer() or accept_packet() to accept_payload(). It only
+    holds a payload.
+    """
+    def __init__(self, payload=b""):
+        self.payload = payload
+
+    def set_payload_bytes(self, payload):
+        """Record the payload provided by the SampleSource"""
+        self.payload = bytes(payload)
+
+    def get_payload_bytes(self):
+        """Get the payload to be consumed by the SampleSink"""
+        return self.payload
+
 class SampleSink:
     """This class provides the interface of a SampleSink. It serves
     as a destination for smaples received over the network from a
@@ -63,6 +105,15 @@ class SampleSink:
         """Called whenever a new packet is received"""
         raise NotImplementedError()
 
+    def accept_payload(self, payload):
+        """Called with the payload (a bytes-like object) of a data
+        packet which was not deserialized into a ChdrPacket.
+
+        The default implementation adapts accept_packet(). Sinks which
+        can consume bytes directly should override this.
+        """
+        self.accept_packet(_PayloadPacket(payload))
+
     def close(self):
         """Use this to clean up any resources held by the object"""
         raise NotImplementedError()
@@ -76,6 +127,7 @@ class NullSamples(SampleSource, SampleSink):
     """
     def __init__(self, log=None):
         self.log = log
+        self.zeros = memoryview(bytes(0))
 
     def fill_packet(self, packet, payload_size):
         if self.log is not None:
@@ -84,11 +136,25 @@ class NullSamples(SampleSource, SampleSink):
         packet.set_payload_bytes(payload)
         return packet
 
+    def fill_buffer(self, buffer):
+        payload_size = len(buffer)
+        if self.log is not None:
+            self.log.debug("Null Source called, providing {} bytes of zeroes".format(payload_size))
+        if len(self.zeros) < payload_size:
+            self.zeros = memoryview(bytes(payload_size))
+        buffer[:] = self.zeros[:payload_size]
+        return payload_size
+
     def accept_packet(self, packet):
         if self.log is not None:
             self.log.debug("Null Source called, accepting {} bytes of payload"
                            .format(len(packet.get_payload_bytes())))
 
+    def accept_payload(self, payload):
+        if self.log is not None:
+            self.log.debug("Null Source called, accepting {} bytes of payload"
+                           .format(len(payload)))
+
     def close(self):
         pass
 
@@ -107,6 +173,9 @@ class IOSource(SampleSource):
         packet.set_payload_bytes(payload)
         return packet
 
+    def fill_buffer(self, buffer):
+        return self.read_obj.readinto(buffer)
+
     def close(self):
         self.read_obj.close()
 
@@ -123,6 +192,10 @@ class IOSink(SampleSink):
         written = self.write_obj.write(bytes(payload))
         assert written == len(payload)
 
+    def accept_payload(self, payload):
+        written = self.write_obj.write(payload)
+        assert written == len(payload)
+
     def close(self):
         self.write_obj.close()
 
@@ -142,17 +215,365 @@ class FileSource(IOSource):
         payload = self.read_obj.read(payload_size)
         if len(payload) == 0:
             if self.repeat:
-                self.read_obj.close()
-                self.read_obj = self.open()
+                self.read_obj.seek(0)
                 payload = self.read_obj.read(payload_size)
             else:
                 return None
         packet.set_payload_bytes(payload)
         return packet
 
+    def fill_buffer(self, buffer):
+        payload_len = self.read_obj.readinto(buffer)
+        if payload_len == 0 and self.repeat:
+            self.read_obj.seek(0)
+            payload_len = self.read_obj.readinto(buffer)
+        return payload_len
+
 @cli_sink
 class FileSink(IOSink):
     """This class creates a SampleSink using a file path"""
     def __init__(self, write_file):
         write = open(write_file, "wb")
         super().__init__(write)
+
+@cli_source
+class MmapFileSource(SampleSource):
+    """This class creates a SampleSource by memory-mapping a file.
+
+    Payloads are copied straight out of the mapping, and repeat wraps
+    around to the start of the mapping without reopening the file.
+    Packets are filled across the wrap, so every packet is full when
+    repeating.
+
+    file_format is the sample format of the file, either "sc16" or
+    "fc32". fc32 files are converted to sc16 with NumPy,
+    CONVERT_BLOCK_SAMPS samples at a time.
+    """
+    CONVERT_BLOCK_SAMPS = 1 << 20
+    def __init__(self, read_file, repeat=False, file_format="sc16"):
+        if file_format not in SAMPLE_FORMATS:
+            raise ValueError("Unsupported file_format: {}".format(file_format))
+        if isinstance(repeat, bool):
+            self.repeat = repeat
+        else:
+            self.repeat = repeat == "True"
+        self.file_format = file_format
+        self.file = open(read_file, "rb")
+        self.mmap = None
+        if os.fstat(self.file.fileno()).st_size > 0:
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        # Readable sc16 data, and our read position within it
+        self.data = memoryview(b"")
+        self.pos = 0
+        if file_format == "sc16":
+            if self.mmap is not None:
+                self.data = memoryview(self.mmap)
+        else:
+            self.samples = numpy.frombuffer(self.mmap, dtype=numpy.float32) \
+                if self.mmap is not None else numpy.zeros(0, dtype=numpy.float32)
+            # Drop a trailing I without a Q
+            self.samples = self.samples[:len(self.samples) & ~1]
+            self.file_pos = 0
+            self.scratch = numpy.empty(2 * self.CONVERT_BLOCK_SAMPS, dtype=numpy.float32)
+            self.converted = numpy.empty(2 * self.CONVERT_BLOCK_SAMPS, dtype=numpy.int16)
+
+    def _convert_block(self):
+        """Convert the next block of the fc32 file to sc16. Returns the
+        converted data as a memoryview, which is empty at the end of
+        the file.
+        """
+        if self.file_pos >= len(self.samples):
+            if not self.repeat or len(self.samples) == 0:
+                return memoryview(b"")
+            self.file_pos = 0
+        block = self.samples[self.file_pos:self.file_pos + len(self.scratch)]
+        self.file_pos += len(block)
+        scratch = self.scratch[:len(block)]
+        numpy.multiply(block, SC16_SCALE, out=scratch)
+        numpy.clip(scratch, -SC16_SCALE, SC16_SCALE - 1, out=scratch)
+        converted = self.converted[:len(block)]
+        converted[:] = scratch
+        return memoryview(converted).cast("B")
+
+    def _next_chunk(self, max_len):
+        """Get a view of up to max_len bytes of sc16 data without
+        copying it. Returns an empty view when the source is exhausted.
+        """
+        if self.pos >= len(self.data):
+            if self.file_format == "sc16":
+                if not self.repeat or len(self.data) == 0:
+                    return memoryview(b"")
+            else:
+                self.data = self._convert_block()
+            self.pos = 0
+        chunk = self.data[self.pos:self.pos + max_len]
+        self.pos += len(chunk)
+        return chunk
+
+    def fill_buffer(self, buffer):
+        filled = 0
+        while filled < len(buffer):
+            chunk = self._next_chunk(len(buffer) - filled)
+            if len(chunk) == 0:
+                break
+            buffer[filled:filled + len(chunk)] = chunk
+            filled += len(chunk)
+        return filled
+
+    def fill_packet(self, packet, payload_size):
+        payload = bytearray(payload_size)
+        payload_len = self.fill_buffer(memoryview(payload))
+        if payload_len == 0:
+            return None
+        packet.set_payload_bytes(bytes(payload[:payload_len]))
+        return packet
+
+    def close(self):
+        # Views into the mapping have to be released before closing it
+        self.data.release()
+        self.samples = None
+        if self.mmap is not None:
+            self.mmap.close()
+        self.file.close()
+
+@cli_sink
+class MmapFileSink(SampleSink):
+    """This class creates a SampleSink by memory-mapping a file.
+
+    Payloads are written into the mapping, which is grown by at least
+    GROW_BYTES whenever it is full. prealloc_bytes sets the initial size
+    of the file, so a capture of known length never has to be remapped.
+    The file is truncated to the amount of data written when the sink
+    is closed.
+
+    file_format is the sample format of the file, either "sc16" or
+    "fc32". Samples are converted from sc16 to fc32 with NumPy.
+    """
+    GROW_BYTES = 64 * 1024 * 1024
+    def __init__(self, write_file, file_format="sc16", prealloc_bytes=0):
+        if file_format not in SAMPLE_FORMATS:
+            raise ValueError("Unsupported file_format: {}".format(file_format))
+        self.file_format = file_format
+        self.file = open(write_file, "w+b")
+        self.mmap = None
+        self.view = None
+        self.size = 0
+        self.written = 0
+        prealloc_bytes = int(float(prealloc_bytes))
+        if prealloc_bytes > 0:
+            self._remap(prealloc_bytes)
+
+    def _remap(self, size):
+        """Resize the file to size bytes and map all of it"""
+        if self.mmap is not None:
+            self.view.release()
+            self.mmap.close()
+        self.file.truncate(size)
+        self.mmap = mmap.mmap(self.file.fileno(), size)
+        self.view = memoryview(self.mmap)
+        self.size = size
+
+    def accept_payload(self, payload):
+        if self.file_format == "fc32":
+            samples = numpy.frombuffer(payload, dtype=numpy.int16)
+            samples = samples.astype(numpy.float32) / numpy.float32(SC16_SCALE)
+            payload = memoryview(samples).cast("B")
+        end = self.written + len(payload)
+        if end > self.size:
+            self._remap(max(end, self.size + self.GROW_BYTES))
+        self.view[self.written:end] = payload
+        self.written = end
+
+    def accept_packet(self, packet):
+        self.accept_payload(bytes(packet.get_payload_bytes()))
+
+    def close(self):
+        if self.mmap is not None:
+            self.view.release()
+            self.mmap.close()
+        self.file.truncate(self.written)
+        self.file.close()
+
+def _to_sc16(samples):
+    """Convert an array of complex samples in [-1.0, 1.0) to interleaved
+    sc16 samples
+    """
+    interleaved = numpy.empty(2 * len(samples), dtype=numpy.float32)
+    interleaved[0::2] = samples.real
+    interleaved[1::2] = samples.imag
+    interleaved *= SC16_SCALE
+    numpy.clip(interleaved, -SC16_SCALE, SC16_SCALE - 1, out=interleaved)
+    return interleaved.astype(numpy.int16)
+
+class TableSource(SampleSource):
+    """This class is the base of the synthetic signal sources. It repeats
+    a table of complex samples forever.
+
+    The table is converted to sc16 once. To serve any packet as a single
+    contiguous slice, the sc16 buffer holds the table followed by as much
+    of its own start as the largest packet requested so far. The buffer
+    only grows when a packet larger than all previous ones is requested,
+    so in steady state no memory is allocated per packet.
+    """
+    def __init__(self, samples):
+        self.table = _to_sc16(numpy.asarray(samples, dtype=numpy.complex64))
+        self.period = self.table.nbytes
+        self.buffer = memoryview(self.table).cast("B")
+        self.pos = 0
+
+    def _reserve(self, payload_size):
+        """Make sure a payload_size slice can be taken from any position"""
+        if len(self.buffer) - self.period >= payload_size:
+            return
+        reps = 1 + -(-payload_size // self.period) # Round up
+        self.buffer = memoryview(numpy.tile(self.table, reps)).cast("B")
+
+    def fill_buffer(self, buffer):
+        payload_size = len(buffer)
+        self._reserve(payload_size)
+        buffer[:] = self.buffer[self.pos:self.pos + payload_size]
+        self.pos = (self.pos + payload_size) % self.period
+        return payload_size
+
+    def fill_packet(self, packet, payload_size):
+        self._reserve(payload_size)
+        packet.set_payload_bytes(bytes(self.buffer[self.pos:self.pos + payload_size]))
+        self.pos = (self.pos + payload_size) % self.period
+        return packet
+
+    def close(self):
+        pass
+
+@cli_source
+class ToneSource(TableSource):
+    """This source provides a complex tone at freq Hz, given a sample
+    rate of rate Hz. The table holds a whole number of periods (see
+    uhd.dsp.signals.get_continuous_tone()), so the phase is continuous
+    when it repeats.
+    """
+    def __init__(self, rate=1e6, freq=1e5, ampl=0.5):
+        tone = get_continuous_tone(float(rate), float(freq), float(ampl), desired_size=1)
+        super().__init__(tone)
+
+@cli_source
+class MultiToneSource(TableSource):
+    """This source provides the sum of several complex tones. freqs is
+    a comma separated list of frequencies in Hz, and ampl is the
+    amplitude of each tone. The table is long enough to hold a whole
+    number of periods of every tone.
+
+    If that would take more than MAX_TABLE_SIZE samples (or a frequency
+    is not a whole number of Hz), there is no table, and every packet is
+    computed from a phase accumulator instead.
+    """
+    MAX_TABLE_SIZE = 1 << 20
+    def __init__(self, rate=1e6, freqs="1e5,2.5e5", ampl=0.25):
+        rate = float(rate)
+        freqs = [float(freq) for freq in str(freqs).split(",")]
+        self.ampl = float(ampl)
+        self.steps = numpy.array([2 * numpy.pi * freq / rate for freq in freqs])
+        self.phases = numpy.zeros(len(freqs))
+        length = self._table_length(rate, freqs)
+        if length is None:
+            self.table = None
+        else:
+            super().__init__(self._next_samples(length))
+
+    def _table_length(self, rate, freqs):
+        """Return the least common multiple of the periods of all tones,
+        in samples, or None if there is no such period or it is longer
+        than MAX_TABLE_SIZE
+        """
+        if not all(float(value).is_integer() for value in [rate] + freqs):
+            return None
+        length = 1
+        for freq in freqs:
+            period = int(rate) // math.gcd(int(rate), int(freq))
+            length = length * period // math.gcd(length, period)
+            if length > self.MAX_TABLE_SIZE:
+                return None
+        return length
+
+    def _next_samples(self, num_samps):
+        """Return the next num_samps samples, and advance the phases"""
+        phase = self.phases[:, numpy.newaxis] + \
+            self.steps[:, numpy.newaxis] * numpy.arange(num_samps)
+        self.phases = (self.phases + self.steps * num_samps) % (2 * numpy.pi)
+        return self.ampl * numpy.exp(1j * phase).sum(axis=0)
+
+    def fill_buffer(self, buffer):
+        if self.table is not None:
+            return super().fill_buffer(buffer)
+        payload_size = len(buffer) & ~3 # Whole sc16 samples only
+        buffer[:payload_size] = memoryview(_to_sc16(self._next_samples(payload_size // 4))).cast("B")
+        return payload_size
+
+    def fill_packet(self, packet, payload_size):
+        if self.table is not None:
+            return super().fill_packet(packet, payload_size)
+        packet.set_payload_bytes(_to_sc16(self._next_samples(payload_size // 4)).tobytes())
+        return packet
+
+@cli_source
+class NoiseSource(TableSource):
+    """This source provides complex white gaussian noise with a total
+    power of ampl**2. The noise repeats every table_size samples.
+    """
+    def __init__(self, ampl=0.1, table_size=1 << 16, seed=None):
+        table_size = int(float(table_size))
+        rng = numpy.random.default_rng(None if seed is None else int(seed))
+        noise = rng.standard_normal(table_size) + 1j * rng.standard_normal(table_size)
+        super().__init__(noise * (float(ampl) / math.sqrt(2)))
+
+@cli_source
+class ChirpSource(TableSource):
+    """This source provides a linear chirp which sweeps from start_freq
+    to stop_freq Hz over duration seconds, then starts over.
+    """
+    def __init__(self, rate=1e6, start_freq=-2.5e5, stop_freq=2.5e5, duration=1e-3, ampl=0.5):
+        rate = float(rate)
+        start_freq = float(start_freq)
+        length = max(int(rate * float(duration)), 1)
+        slope = (float(stop_freq) - start_freq) / (length / rate)
+        t = numpy.arange(length) / rate
+        phase = 2 * numpy.pi * (start_freq * t + 0.5 * slope * t ** 2)
+        super().__init__(float(ampl) * numpy.exp(1j * phase))
+
+@cli_source
+class PrbsBurstSource(TableSource):
+    """This source provides BPSK bursts coded with a PRBS sequence.
+
+    Each burst holds one period of the PRBS (2**order - 1 symbols, for
+    order 7, 9, 15 or 23), with samples_per_symbol samples per symbol,
+    followed by gap_samples samples of zeroes.
+    """
+    # Feedback taps of the ITU-T O.150 PRBS polynomials. PRBS31 is left
+    # out, one period of it would not fit into memory.
+    TAPS = {7: 6, 9: 5, 15: 14, 23: 18}
+    def __init__(self, order=7, samples_per_symbol=4, gap_samples=1000, ampl=0.5):
+        order = int(order)
+        if order not in PrbsBurstSource.TAPS:
+            raise ValueError("Unsupported PRBS order: {}".format(order))
+        bits = self._prbs(order, PrbsBurstSource.TAPS[order])
+        symbols = numpy.float32(ampl) * (1 - 2 * bits.astype(numpy.float32))
+        burst = numpy.repeat(symbols, int(samples_per_symbol))
+        gap = numpy.zeros(int(gap_samples), dtype=numpy.float32)
+        super().__init__(numpy.concatenate((burst, gap)))
+
+    @staticmethod
+    def _prbs(order, tap):
+        """Generate one period of a PRBS sequence using a Fibonacci LFSR,
+        starting with all ones in the register.
+
+        Every output bit is the XOR of the bits output order and tap
+        steps before it, so the sequence is computed tap bits at a time.
+        """
+        length = (1 << order) - 1
+        # The first order entries hold the initial register contents
+        bits = numpy.ones(order + length, dtype=numpy.uint8)
+        for start in range(order, order + length, tap):
+            stop = min(start + tap, order + length)
+            numpy.bitwise_xor(bits[start - order:stop - order],
+                              bits[start - tap:stop - tap],
+                              out=bits[start:stop])
+        return bits[order:]
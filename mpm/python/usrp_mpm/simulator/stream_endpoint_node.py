@@ -12,6 +12,7 @@ from uhd.chdr import MgmtOpCode, MgmtOpCfg, MgmtOp, PacketType, CtrlStatus, Ctrl
 from .rfnoc_common import Node, NodeType, to_iter, swap_src_dst, RETURN_TO_SENDER
 from .stream_ep_regs import StreamEpRegs, STRM_STATUS_FC_ENABLED
 from .chdr_stream import ChdrOutputStream, ChdrInputStream
+from .block_models import ProcessedSource, ProcessedSink
 
 class StreamEndpointNode(Node):
     """Represents a Stream endpoint node
@@ -21,7 +22,7 @@ class StreamEndpointNode(Node):
     registers of the noc_blocks which are held in the RFNoCGraph and
     passed into handle_packet as the regs parameter
     """
-    def __init__(self, node_inst, source_gen, sink_gen):
+    def __init__(self, node_inst, source_gen, sink_gen, stream_config=None):
         super().__init__(node_inst)
         self.epid = node_inst
         self.dst_epid = None
@@ -37,8 +38,11 @@ class StreamEndpointNode(Node):
         self.chdr_w = None
         self.send_wrapper = None
         self.dst_to_addr = None
+        self.epid_changed = None
+        self.get_input_stages = None
         self.source_gen = source_gen
         self.sink_gen = sink_gen
+        self.stream_config = stream_config
         self.downstream_capacity = None
         self.strs_handlers = {}
         self.ep_regs = StreamEpRegs(self.get_epid, self.set_epid, self.set_dst_epid,
@@ -70,12 +74,15 @@ class StreamEndpointNode(Node):
         self.begin_input()
         return STRM_STATUS_FC_ENABLED
 
-    def graph_init(self, log, set_device_id, send_wrapper, chdr_w, dst_to_addr, **kwargs):
+    def graph_init(self, log, set_device_id, send_wrapper, chdr_w, dst_to_addr,
+                   epid_changed=None, get_input_stages=None, **kwargs):
         super().graph_init(log, set_device_id)
         self.ep_regs.log = log
         self.chdr_w = chdr_w
         self.send_wrapper = send_wrapper
         self.dst_to_addr = dst_to_addr
+        self.epid_changed = epid_changed
+        self.get_input_stages = get_input_stages
 
     def get_type(self):
         return NodeType.STRM_EP
@@ -87,6 +94,8 @@ class StreamEndpointNode(Node):
     def set_epid(self, epid):
         """Set this endpoint's endpoint id"""
         self.epid = epid
+        if self.epid_changed is not None:
+            self.epid_changed()
 
     def set_dst_epid(self, dst_epid):
         """Set this endpoint's destination endpoint id"""
@@ -135,10 +144,10 @@ class StreamEndpointNode(Node):
             raise RuntimeError("Control Status not OK: {}".format(payload.status))
         if payload.op_code == CtrlOpCode.READ:
             payload.is_ack = True
-            payload.set_data([regs.read(payload.address)])
+            payload.set_data([regs.read(payload.address, payload.dst_port)])
         elif payload.op_code == CtrlOpCode.WRITE:
             payload.is_ack = True
-            regs.write(payload.address, payload.get_data()[0])
+            regs.write(payload.address, payload.get_data()[0], payload.dst_port)
         else:
             raise NotImplementedError("Unknown Control OpCode: {}".format(payload.op_code))
         packet.set_payload(payload)
@@ -177,9 +186,10 @@ class StreamEndpointNode(Node):
         packet = ChdrPacket(self.chdr_w, header, payload)
         self.send_wrapper.send_packet(packet, addr)
 
-    def begin_output(self, stream_spec):
+    def begin_output(self, stream_spec, stages=()):
         """Spin up a new ChdrOutputStream thread which transmits from src_epid
-        according to stream_spec.
+        according to stream_spec. The samples are passed through stages
+        (see block_models.py) before they are sent.
 
         This is triggered from RFNoC Graph when the radio receives a
         Stream Command
@@ -192,7 +202,10 @@ class StreamEndpointNode(Node):
         stream_spec.capacity_packets = self.downstream_capacity[0]
         stream_spec.capacity_bytes = self.downstream_capacity[1]
         self.downstream_capacity = None
-        self.output_stream = ChdrOutputStream(self.log, self.chdr_w, self.source_gen(),
+        source = self.source_gen()
+        if stages:
+            source = ProcessedSource(source, stages)
+        self.output_stream = ChdrOutputStream(self.log, self.chdr_w, source,
                                               stream_spec, self.send_wrapper)
 
     def end_output(self):
@@ -219,5 +232,20 @@ class StreamEndpointNode(Node):
         # a new one on the same epid, just quietly close the old one.
         if self.input_stream is not None:
             self.input_stream.finish()
+        sink = self.sink_gen()
+        stages = self.get_input_stages(self) if self.get_input_stages is not None else []
+        if stages:
+            sink = ProcessedSink(sink, stages)
         self.input_stream = ChdrInputStream(self.log, self.chdr_w,
-                                            self.sink_gen(), self.send_wrapper, self.epid)
+                                            sink, self.send_wrapper, self.epid,
+                                            self.stream_config)
+
+    def get_stream_stats(self):
+        """Get the throughput counters of the streams running on this
+        endpoint. A direction is None if no stream was started.
+        """
+        return {
+            'epid': self.epid,
+            'rx': self.input_stream.get_stats() if self.input_stream is not None else None,
+            'tx': self.output_stream.get_stats() if self.output_stream is not None else None,
+        }
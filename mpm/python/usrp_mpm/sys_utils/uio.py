@@ -204,3 +204,12 @@ class UIO(object):
         """
         assert not self._read_only
         return self._uio.poke32(addr, val)
+
+    def pokes32(self, addr_vals):
+        """
+        Writes a list of (addr, val) tuples, in order, with a single call into
+        the C++ register interface.
+        Will throw if read_only was set to True.
+        """
+        assert not self._read_only
+        return self._uio.pokes32(addr_vals)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+#
+# Copyright 2026 Ettus Research, a National Instruments Brand
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""
+Benchmark the MPM RPC round trip cost
+
+Replays the sequence of queries a UHD session makes during initialization,
+once as individual RPC calls and once as a single multicall(), and compares
+the time it takes. Run it against a real device, or against the simulator
+(usrp_hwd.py with the sim periph manager):
+
+    mpm_rpc_benchmark.py -a 127.0.0.1 -n 20
+"""
+
+import argparse
+import time
+from mprpc import RPCClient
+
+DEFAULT_MPM_RPC_PORT = 49601
+
+# Queries made by a UHD session during init, as (method, args). Methods which
+# require a claim are listed without the token.
+INIT_SEQUENCE = [
+    ('get_mpm_compat_num', []),
+    ('get_device_info', []),
+    ('get_dboard_info', []),
+    ('get_proto_ver', []),
+    ('get_chdr_width', []),
+    ('get_num_timekeepers', []),
+    ('get_clock_sources', []),
+    ('get_time_sources', []),
+    ('get_clock_source', []),
+    ('get_time_source', []),
+    ('get_chdr_link_types', []),
+    ('get_chdr_link_options', ['udp']),
+    ('get_timekeeper_time', [0, False]),
+    ('get_mb_sensors', []),
+]
+
+
+def parse_args():
+    """ Parse command line arguments """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-a", "--address", default="127.0.0.1",
+                        help="Device address")
+    parser.add_argument("-p", "--port", default=DEFAULT_MPM_RPC_PORT, type=int,
+                        help="MPM RPC port")
+    parser.add_argument("-n", "--iterations", default=10, type=int,
+                        help="Number of times to replay the init sequence")
+    return parser.parse_args()
+
+
+def get_calls(client, token, available):
+    """
+    Return the list of calls to benchmark: the init sequence, plus reading
+    every motherboard sensor.
+    """
+    calls = [(method, args) for method, args in INIT_SEQUENCE
+             if method in available]
+    if 'get_mb_sensors' in available:
+        sensors = call_one(client, token, available, 'get_mb_sensors', [])
+        calls += [('get_mb_sensor', [sensor]) for sensor in sensors]
+    return calls
+
+
+def call_one(client, token, available, method, args):
+    """ Execute a single RPC call, adding the token if required """
+    if available[method]:
+        return client.call(method, token, *args)
+    return client.call(method, *args)
+
+
+def run_individual(client, token, available, calls):
+    """ Execute every call in its own round trip. Returns the number of errors. """
+    errors = 0
+    for method, args in calls:
+        try:
+            call_one(client, token, available, method, args)
+        except Exception: # pylint: disable=broad-except
+            errors += 1
+    return errors
+
+
+def run_multicall(client, token, calls):
+    """ Execute all calls in one multicall(). Returns the number of errors. """
+    results = client.call('multicall', token, calls)
+    return sum(1 for error, _ in results if error)
+
+
+def benchmark(func, iterations):
+    """ Run func iterations times, return (best, mean) duration in seconds """
+    durations = []
+    for _ in range(iterations):
+        start = time.monotonic()
+        func()
+        durations.append(time.monotonic() - start)
+    return min(durations), sum(durations) / len(durations)
+
+
+def main():
+    """ Go, go, go! """
+    args = parse_args()
+    client = RPCClient(args.address, args.port,
+                       pack_params={'use_bin_type': True})
+    available = {
+        method: requires_token
+        for method, _, requires_token in client.call('list_methods')
+    }
+    if 'multicall' not in available:
+        print("This MPM version does not support multicall().")
+        return False
+    token = client.call('claim', 'mpm_rpc_benchmark')
+    try:
+        calls = get_calls(client, token, available)
+        print("Replaying {} calls, {} iterations...".format(
+            len(calls), args.iterations))
+        individual = benchmark(
+            lambda: run_individual(client, token, available, calls),
+            args.iterations)
+        multicall = benchmark(
+            lambda: run_multicall(client, token, calls),
+            args.iterations)
+        errors = run_individual(client, token, available, calls)
+        if errors:
+            print("Warning: {} calls failed on this device.".format(errors))
+    finally:
+        client.call('unclaim', token)
+    print("{:<12} {:>12} {:>12}".format("", "best [ms]", "mean [ms]"))
+    for name, (best, mean) in (("individual", individual),
+                               ("multicall", multicall)):
+        print("{:<12} {:>12.2f} {:>12.2f}".format(name, best * 1e3, mean * 1e3))
+    print("Speedup (mean): {:.1f}x".format(individual[1] / multicall[1]))
+    return True
+
+
+if __name__ == "__main__":
+    exit(not main())